@@ -2,12 +2,25 @@
 上下文管理器
 
 管理会话上下文和对话记忆。
+
+内存中只缓存活跃会话：
+- 会话按最近最少使用（LRU）排列，超过会话数或字节预算时淘汰最久未用的会话
+- 每个会话只保留最近 MAX_MESSAGES 条消息
+- 后台清理线程定期移除超过 SESSION_TTL 未访问的会话
+- 被淘汰的会话再次访问时，从 agent_messages 表恢复最近的消息窗口
 """
 
+import atexit
+import logging
+import threading
 import uuid
+from collections import OrderedDict
 from typing import Dict, Optional, List
 from datetime import datetime, timedelta
 from ..models.context import ContextState
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
 
 
 def _get_db_session():
@@ -23,6 +36,12 @@ def _get_db_session():
     return get_db_context
 
 
+def _report_sync_error(future) -> None:
+    """写队列任务完成回调：记录同步失败"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"同步消息到数据库失败：{future.exception()}")
+
+
 class ContextManager:
     """
     上下文管理器
@@ -36,34 +55,56 @@ class ContextManager:
 
     # 上下文配置
     MAX_TOKENS = 4000  # 最大 token 数
-    MAX_MESSAGES = 30  # 最大消息轮数
+    MAX_MESSAGES = 30  # 最大消息轮数（每个会话在内存中保留的消息数）
     SESSION_TTL = timedelta(hours=24)  # 会话超时时间
 
-    def __init__(self):
-        self._contexts: Dict[str, ContextState] = {}
-        self._last_accessed: Dict[str, datetime] = {}
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sweep_interval: Optional[float] = None,
+    ):
+        self.max_sessions = max_sessions or settings.AGENT_CONTEXT_MAX_SESSIONS
+        self.max_bytes = max_bytes or settings.AGENT_CONTEXT_MAX_BYTES
+        self.sweep_interval = sweep_interval or settings.AGENT_CONTEXT_SWEEP_SECONDS
+
+        # {session_id: ContextState}，按访问顺序排列（最近访问的在末尾）
+        self._contexts: "OrderedDict[str, ContextState]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._evictions = 0
+        self._hydrations = 0
+
+        # 后台清理线程
+        self._sweeper: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
 
     def _sync_to_db(self, session_id: str, role: str, content: str) -> None:
         """
         同步消息到数据库
 
+        通过单写队列异步提交（与其他小写入合并为一次提交），不阻塞事件循环。
+
         Args:
             session_id: 会话 ID
             role: 消息角色（user/assistant）
             content: 消息内容
         """
         try:
+            from backend.db.write_queue import get_write_queue
             from backend.services.agent_session_service import AgentSessionService
 
-            with _get_db_session()() as session:
-                AgentSessionService.add_message(
-                    db=session,
+            future = get_write_queue().submit(
+                lambda db: AgentSessionService.add_message(
+                    db=db,
                     session_id=session_id,
                     role=role,
                     content=content,
                 )
+            )
+            future.add_done_callback(_report_sync_error)
         except Exception as e:
-            print(f"同步消息到数据库失败：{e}")
+            logger.warning(f"同步消息到数据库失败：{e}")
 
     def add_message_to_context(self, session_id: str, role: str, content: str) -> None:
         """
@@ -77,31 +118,111 @@ class ContextManager:
         # 获取或创建上下文
         context = self.get_or_create(session_id)
 
-        # 添加到内存中的上下文
-        context.add_message(role, content)
+        # 添加到内存中的上下文（只保留最近的消息，更早的消息在数据库中）
+        with self._lock:
+            before = context.size_bytes
+            context.add_message(role, content)
+            context.trim(self.MAX_MESSAGES)
+            if self._contexts.get(session_id) is context:
+                self._total_bytes += context.size_bytes - before
+                self._enforce_budget(keep=session_id)
 
         # 同步到数据库
         self._sync_to_db(session_id, role, content)
 
-    def _ensure_session_exists(self, session_id: str) -> None:
+    def _load_from_db(self, session_id: str, create: bool) -> Optional[ContextState]:
         """
-        确保会话在数据库中存在
+        从数据库恢复会话最近的消息窗口
 
         Args:
             session_id: 会话 ID
+            create: 会话不存在时是否创建数据库记录
+
+        Returns:
+            Optional[ContextState]: 恢复的上下文；会话不存在且 create 为 False 时返回 None
         """
+        context = ContextState(session_id=session_id)
         try:
             from backend.services.agent_session_service import AgentSessionService
 
             with _get_db_session()() as session:
-                AgentSessionService.get_or_create_session(session, session_id)
+                if create:
+                    AgentSessionService.get_or_create_session(session, session_id)
+                elif not AgentSessionService.get_session(session, session_id):
+                    return None
+
+                messages = AgentSessionService.get_recent_messages(
+                    session, session_id, limit=self.MAX_MESSAGES
+                )
+                for message in messages:
+                    context.add_message(message.role, message.content, message.timestamp.isoformat())
         except Exception as e:
-            print(f"确保会话存在失败：{e}")
+            logger.warning(f"恢复会话上下文失败：{e}")
+            if not create:
+                return None
+
+        if context.messages:
+            self._hydrations += 1
+        return context
+
+    def _touch(self, session_id: str) -> ContextState:
+        """标记会话为最近访问（调用方需持有锁）"""
+        self._contexts.move_to_end(session_id)
+        context = self._contexts[session_id]
+        context.last_accessed = datetime.now()
+        return context
+
+    def _insert(self, context: ContextState) -> ContextState:
+        """
+        放入缓存并执行预算淘汰
+
+        并发未命中时以先放入的上下文为准
+        """
+        with self._lock:
+            if context.session_id in self._contexts:
+                return self._touch(context.session_id)
+            self._contexts[context.session_id] = context
+            self._total_bytes += context.size_bytes
+            self._enforce_budget(keep=context.session_id)
+            return context
+
+    def _remove(self, session_id: str) -> Optional[ContextState]:
+        """移出缓存（调用方需持有锁）"""
+        context = self._contexts.pop(session_id, None)
+        if context is not None:
+            self._total_bytes -= context.size_bytes
+        return context
+
+    def _enforce_budget(self, keep: Optional[str] = None) -> int:
+        """
+        超出会话数或字节预算时淘汰最久未访问的会话（调用方需持有锁）
+
+        Args:
+            keep: 不淘汰的会话（当前正在使用的会话）
+
+        Returns:
+            int: 淘汰的会话数量
+        """
+        evicted = 0
+        while len(self._contexts) > self.max_sessions or self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._contexts))
+            if oldest == keep:
+                if len(self._contexts) == 1:
+                    break
+                # 当前会话移到末尾，继续淘汰其他会话
+                self._contexts.move_to_end(oldest)
+                continue
+            self._remove(oldest)
+            evicted += 1
+        self._evictions += evicted
+        return evicted
 
     def get_or_create(self, session_id: Optional[str] = None) -> ContextState:
         """
         获取或创建会话上下文
 
+        缓存未命中时从数据库恢复最近的消息（会话不存在则创建）。
+
         Args:
             session_id: 会话 ID，为空则创建新会话
 
@@ -111,30 +232,33 @@ class ContextManager:
         if session_id is None:
             session_id = self._generate_session_id()
 
-        # 检查是否已存在
-        if session_id not in self._contexts:
-            self._contexts[session_id] = ContextState(session_id=session_id)
-            # 确保数据库中存在会话记录
-            self._ensure_session_exists(session_id)
+        with self._lock:
+            if session_id in self._contexts:
+                return self._touch(session_id)
 
-        # 更新最后访问时间
-        self._last_accessed[session_id] = datetime.now()
-        return self._contexts[session_id]
+        # 未命中：在锁外读取数据库，避免阻塞其他会话
+        context = self._load_from_db(session_id, create=True)
+        return self._insert(context)
 
-    def get(self, session_id: str) -> Optional[ContextState]:
+    def get(self, session_id: str, hydrate: bool = False) -> Optional[ContextState]:
         """
         获取会话上下文
 
         Args:
             session_id: 会话 ID
+            hydrate: 缓存未命中时是否从数据库恢复（不创建新会话）
 
         Returns:
             Optional[ContextState]: 上下文状态，不存在返回 None
         """
-        # 更新最后访问时间
-        if session_id in self._contexts:
-            self._last_accessed[session_id] = datetime.now()
-        return self._contexts.get(session_id)
+        with self._lock:
+            if session_id in self._contexts:
+                return self._touch(session_id)
+
+        if not hydrate:
+            return None
+        context = self._load_from_db(session_id, create=False)
+        return self._insert(context) if context is not None else None
 
     def delete(self, session_id: str) -> bool:
         """
@@ -146,36 +270,66 @@ class ContextManager:
         Returns:
             bool: 是否成功删除
         """
-        if session_id in self._contexts:
-            del self._contexts[session_id]
-            if session_id in self._last_accessed:
-                del self._last_accessed[session_id]
-            return True
-        return False
+        with self._lock:
+            return self._remove(session_id) is not None
 
     def clear(self) -> None:
         """清空所有会话"""
-        self._contexts.clear()
-        self._last_accessed.clear()
+        with self._lock:
+            self._contexts.clear()
+            self._total_bytes = 0
 
     def cleanup_expired(self) -> int:
         """
-        清理过期会话
+        清理过期会话并执行内存预算
 
         Returns:
             int: 清理的会话数量
         """
-        now = datetime.now()
-        expired = [
-            sid
-            for sid, last_accessed in self._last_accessed.items()
-            if now - last_accessed > self.SESSION_TTL
-        ]
-
-        for sid in expired:
-            self.delete(sid)
-
-        return len(expired)
+        deadline = datetime.now() - self.SESSION_TTL
+        expired = 0
+        with self._lock:
+            # 按访问顺序排列，遇到第一个未过期的会话即可停止
+            while self._contexts:
+                oldest = next(iter(self._contexts))
+                if self._contexts[oldest].last_accessed > deadline:
+                    break
+                self._remove(oldest)
+                expired += 1
+            evicted = self._enforce_budget()
+
+        return expired + evicted
+
+    # ============ 后台清理 ============
+
+    def start_sweeper(self) -> None:
+        """启动后台清理线程（重复调用无副作用）"""
+        with self._lock:
+            if self._sweeper and self._sweeper.is_alive():
+                return
+            self._stopping.clear()
+            self._sweeper = threading.Thread(target=self._sweep, name="context-sweeper", daemon=True)
+            self._sweeper.start()
+            atexit.register(self.stop_sweeper)
+
+    def stop_sweeper(self, timeout: float = 5.0) -> None:
+        """停止后台清理线程"""
+        with self._lock:
+            thread = self._sweeper
+            if not thread or not thread.is_alive():
+                return
+            self._stopping.set()
+        thread.join(timeout)
+
+    def _sweep(self) -> None:
+        """每 sweep_interval 秒清理一次过期会话，直到 stop_sweeper()"""
+        while not self._stopping.wait(self.sweep_interval):
+            try:
+                removed = self.cleanup_expired()
+                if removed:
+                    logger.info(f"Context sweeper removed {removed} sessions")
+            except Exception as e:
+                logger.warning(f"Context sweep failed: {e}")
 
     def should_compress(self, context: ContextState) -> bool:
         """
@@ -203,13 +357,16 @@ class ContextManager:
 
     def get_stats(self) -> Dict[str, int]:
         """获取统计信息"""
-        return {
-            "active_sessions": len(self._contexts),
-            "total_messages": sum(len(ctx.messages) for ctx in self._contexts.values()),
-            "total_operations": sum(
-                len(ctx.last_operations) for ctx in self._contexts.values()
-            ),
-        }
+        with self._lock:
+            contexts = list(self._contexts.values())
+            return {
+                "active_sessions": len(contexts),
+                "total_messages": sum(len(ctx.messages) for ctx in contexts),
+                "total_operations": sum(len(ctx.last_operations) for ctx in contexts),
+                "total_bytes": self._total_bytes,
+                "evictions": self._evictions,
+                "hydrations": self._hydrations,
+            }
 
 
 # 单例实例
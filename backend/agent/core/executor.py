@@ -24,6 +24,14 @@ from .context import ContextManager
 
 logger = get_agent_logger()
 
+# 推理追踪日志中思考 / 观察内容的最大长度
+TRACE_PREVIEW_LENGTH = 200
+
+
+def _clip(text: str) -> str:
+    """截断过长的追踪内容"""
+    return f"{text[:TRACE_PREVIEW_LENGTH]}..." if len(text) > TRACE_PREVIEW_LENGTH else text
+
 
 @dataclass
 class ReasoningStep:
@@ -122,7 +130,7 @@ class ReActExecutor:
 
         while iteration < self.max_iterations:
             iteration += 1
-            logger.info(f"[ReAct] 第 {iteration}/{self.max_iterations} 次迭代")
+            logger.info("[ReAct] 第 %d/%d 次迭代", iteration, self.max_iterations, extra={"trace": "iteration"})
 
             try:
                 # ========== Step 1: Thought（思考）==========
@@ -136,7 +144,7 @@ class ReActExecutor:
                 thought = response.content or ""
                 has_tool_call = response.has_tool_calls
 
-                logger.info(f"[ReAct] Thought: {thought[:200]}..." if len(thought) > 200 else f"[ReAct] Thought: {thought}")
+                logger.info("[ReAct] Thought: %s", _clip(thought), extra={"trace": "thought"})
 
                 # ========== Step 2: Action（行动）==========
                 if has_tool_call:
@@ -184,7 +192,7 @@ class ReActExecutor:
                                 content=obs_content,
                             )
                         )
-                        logger.info(f"[ReAct] Observation: {obs_content[:200]}..." if len(obs_content) > 200 else f"[ReAct] Observation: {obs_content}")
+                        logger.info("[ReAct] Observation: %s", _clip(obs_content), extra={"trace": "observation"})
 
                     # 检查是否有需要确认的操作
                     for result in tool_results:
@@ -294,7 +302,7 @@ class ReActExecutor:
             name = function.get("name")
             arguments = function.get("arguments", {})
 
-            logger.info(f"[ReAct] 执行技能：{name}, 参数：{arguments}")
+            logger.info("[ReAct] 执行技能：%s, 参数：%s", name, arguments, extra={"trace": "tool_call"})
 
             # 解析参数
             try:
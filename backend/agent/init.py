@@ -6,9 +6,11 @@ Agent 模块初始化
 
 import os
 import asyncio
+import logging
 from typing import Dict, Any, Optional
 from .llm.base import LLMClient, LLMMessage, LLMToolDefinition, LLMResponse, LLMProviderType, AuthenticationError, RateLimitError, TimeoutError, ServerError
 from .llm.client_with_fallback import LLMClientWithFallback
+from .llm.credentials import AICredentials, CredentialsLoadError, get_credential_manager
 from .llm.factory import LLMClientFactory
 from .skills.base import BaseSkill, RiskLevel
 from .skills.registry import SkillRegistry
@@ -17,6 +19,8 @@ from .core.context import ContextManager, get_context_manager
 from .core.executor import ReActExecutor
 from backend.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # 全局 Agent 执行器实例
 _agent_executor: Optional[ReActExecutor] = None
 _context_manager: Optional[ContextManager] = None
@@ -28,96 +32,58 @@ class AgentConfigError(Exception):
     pass
 
 
-def _get_api_key_from_db() -> tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
-    """
-    从数据库读取 AI 配置
-
-    Returns:
-        (deepseek_api_key, deepseek_model, doubao_api_key, doubao_model) 元组
-    """
-    try:
-        from backend.db.session import get_db_context
-        from backend.models.user import User
-        from backend.services.user_service import UserService
-
-        with get_db_context() as db:
-            user = db.query(User).first()
-            if not user or not user.ai_config:
-                return None, None, None, None
-
-            ai_config = user.ai_config
-            provider = ai_config.get("provider", "")
-            encrypted_key = ai_config.get("api_key", "")
-            model = ai_config.get("model", "")
-
-            # 解密 API Key
-            try:
-                api_key = UserService.decrypt_api_key(encrypted_key)
-            except Exception:
-                # 解密失败，可能是加密格式变化
-                api_key = encrypted_key
-
-            if provider == "deepseek":
-                return api_key, model or "deepseek-chat", None, None
-            elif provider == "doubao":
-                return None, None, api_key, model or "doubao-seed-2-0-lite-260215"
-            else:
-                return None, None, None, None
-
-    except Exception as e:
-        print(f"从数据库读取 AI 配置失败：{e}")
-        return None, None, None, None
-
-
-def _create_llm_client_with_fallback() -> LLMClientWithFallback:
+def _create_llm_client_with_fallback(credentials: Optional[AICredentials] = None) -> LLMClientWithFallback:
     """
     创建带故障转移的 LLM 客户端
 
+    Args:
+        credentials: 解密后的 AI 配置（由 CredentialManager 缓存，未配置时为 None）
+
     Returns:
         LLMClientWithFallback: LLM 客户端实例
     """
     clients = []
 
-    # 从数据库读取 AI 配置
-    deepseek_key, deepseek_model, doubao_key, doubao_model = _get_api_key_from_db()
-
     # 尝试创建 DeepSeek 客户端
-    if deepseek_key:
+    if credentials and credentials.provider == "deepseek":
         try:
-            from .llm.deepseek import DeepSeekClient
             client = LLMClientFactory.create(
                 LLMProviderType.DEEPSEEK,
-                {"api_key": deepseek_key, "base_url": "https://api.deepseek.com", "model": deepseek_model}
+                {"api_key": credentials.api_key, "base_url": "https://api.deepseek.com", "model": credentials.model}
             )
             if client:
                 clients.append(client)
-                print(f"DeepSeek 客户端创建成功，模型：{deepseek_model}")
+                logger.info(f"DeepSeek 客户端创建成功，模型：{credentials.model}")
         except Exception as e:
-            print(f"创建 DeepSeek 客户端失败：{e}")
+            logger.error(f"创建 DeepSeek 客户端失败：{e}")
 
     # 尝试创建豆包客户端
-    if doubao_key:
+    if credentials and credentials.provider == "doubao":
         try:
-            from .llm.doubao import DoubaoClient
             client = LLMClientFactory.create(
                 LLMProviderType.DOUBAO,
-                {"api_key": doubao_key, "base_url": "https://ark.cn-beijing.volces.com/api/v3", "model": doubao_model}
+                {"api_key": credentials.api_key, "base_url": "https://ark.cn-beijing.volces.com/api/v3", "model": credentials.model}
             )
             if client:
                 clients.append(client)
-                print(f"豆包客户端创建成功，模型：{doubao_model}")
+                logger.info(f"豆包客户端创建成功，模型：{credentials.model}")
         except Exception as e:
-            print(f"创建豆包客户端失败：{e}")
+            logger.error(f"创建豆包客户端失败：{e}")
 
     # 如果没有任何客户端，创建一个空的 DeepSeek 客户端（会在运行时失败）
     if not clients:
         from .llm.deepseek import DeepSeekClient
         clients.append(DeepSeekClient(api_key="", base_url="https://api.deepseek.com", model="deepseek-chat"))
-        print("警告：未找到 AI 配置，创建一个空的 DeepSeek 客户端")
+        logger.warning("未找到 AI 配置，创建一个空的 DeepSeek 客户端")
 
     return LLMClientWithFallback(clients=clients)
 
 
+def _get_llm_client() -> LLMClientWithFallback:
+    """获取当前 AI 配置对应的 LLM 客户端（配置未变化时复用同一实例）"""
+    return get_credential_manager().get_client("agent", _create_llm_client_with_fallback)
+
+
 def initialize_agent() -> ReActExecutor:
     """
     初始化 Agent 执行器
@@ -128,7 +94,7 @@ def initialize_agent() -> ReActExecutor:
     global _agent_executor, _context_manager
 
     # 创建 LLM 客户端（带故障转移）
-    llm_client = _create_llm_client_with_fallback()
+    llm_client = _get_llm_client()
 
     # 获取上下文管理器
     _context_manager = get_context_manager()
@@ -139,6 +105,7 @@ def initialize_agent() -> ReActExecutor:
     skill_registry.register(QueryJournalsSkill(), category="journal")
     skill_registry.register(UpdateJournalSkill(), category="journal")
     skill_registry.register(DeleteJournalSkill(), category="journal")
+    skill_registry.register(JournalStatsSkill(), category="journal")
 
     # 注册记忆系统 Skills
     from .skills.memory_skills import (
@@ -230,37 +197,22 @@ async def execute_chat(
     """
     global _agent_executor, _pending_confirmations
 
-    # 如果执行器未初始化，则初始化
-    if _agent_executor is None:
-        _agent_executor = initialize_agent()
-
-    # 每次调用时重新从数据库读取 API Key 配置
-    deepseek_key, deepseek_model, doubao_key, doubao_model = _get_api_key_from_db()
+    # 读取缓存的 AI 配置（仅在配置变化后重新查询数据库和解密）
+    try:
+        credentials = get_credential_manager().get_credentials()
+    except CredentialsLoadError as e:
+        raise AgentConfigError(f"读取 AI 配置失败：{str(e)}，请稍后重试")
 
     # 检查是否有有效的 API Key
-    has_valid_key = bool(deepseek_key) or bool(doubao_key)
-    if not has_valid_key:
+    if not credentials or not credentials.api_key:
         raise AgentConfigError("未配置 AI API Key，请先在设置中配置 DeepSeek 或豆包 API Key")
 
-    # 如果需要，重新初始化 LLM 客户端（当 API Key 发生变化时）
-    llm_client = _agent_executor.llm
-    need_reinit = False
-
-    # 检查当前客户端是否有效
-    if hasattr(llm_client, 'clients') and llm_client.clients:
-        has_valid_client = False
-        for client in llm_client.clients:
-            if hasattr(client, 'api_key') and client.api_key:
-                has_valid_client = True
-                break
-        if not has_valid_client:
-            need_reinit = True
-    elif hasattr(_agent_executor.llm, 'api_key') and not _agent_executor.llm.api_key:
-        need_reinit = True
+    # 如果执行器未初始化，则初始化
+    if _agent_executor is None:
+        _agent_executor = initialize_agent()
 
-    # 如果需要重新初始化且有有效的 API Key
-    if need_reinit and has_valid_key:
-        _agent_executor.llm = _create_llm_client_with_fallback()
+    # 配置变化后客户端随之重建，未变化时为同一实例
+    _agent_executor.llm = _get_llm_client()
 
     try:
         # 执行 ReAct 循环
@@ -328,42 +280,30 @@ async def execute_stream_chat(
     """
     global _agent_executor, _pending_confirmations
 
-    # 如果执行器未初始化，则初始化
-    if _agent_executor is None:
-        _agent_executor = initialize_agent()
-
-    # 每次调用时重新从数据库读取 API Key 配置
-    deepseek_key, deepseek_model, doubao_key, doubao_model = _get_api_key_from_db()
+    # 读取缓存的 AI 配置（仅在配置变化后重新查询数据库和解密）
+    try:
+        credentials = get_credential_manager().get_credentials()
+    except CredentialsLoadError as e:
+        yield {
+            "type": "error",
+            "data": f"读取 AI 配置失败：{str(e)}，请稍后重试"
+        }
+        return
 
     # 检查是否有有效的 API Key
-    has_valid_key = bool(deepseek_key) or bool(doubao_key)
-    if not has_valid_key:
+    if not credentials or not credentials.api_key:
         yield {
             "type": "error",
             "data": "未配置 AI API Key，请先在设置中配置 DeepSeek 或豆包 API Key"
         }
         return
 
-    # 如果需要，重新初始化 LLM 客户端（当 API Key 发生变化时）
-    llm_client = _agent_executor.llm
-    need_reinit = False
-
-    # 检查当前客户端是否有效
-    if hasattr(llm_client, 'clients') and llm_client.clients:
-        has_valid_client = False
-        for client in llm_client.clients:
-            if hasattr(client, 'api_key') and client.api_key:
-                has_valid_client = True
-                break
-        if not has_valid_client:
-            need_reinit = True
-    elif hasattr(_agent_executor.llm, 'api_key') and not _agent_executor.llm.api_key:
-        need_reinit = True
+    # 如果执行器未初始化，则初始化
+    if _agent_executor is None:
+        _agent_executor = initialize_agent()
 
-    # 如果需要重新初始化且有有效的 API Key
-    if need_reinit and has_valid_key:
-        _agent_executor.llm = _create_llm_client_with_fallback()
-        llm_client = _agent_executor.llm
+    # 配置变化后客户端随之重建，未变化时为同一实例
+    _agent_executor.llm = _get_llm_client()
 
     # 获取上下文
     context = _agent_executor.context_manager.get_or_create(session_id)
@@ -481,4 +421,5 @@ from .skills.journal_skills import (
     QueryJournalsSkill,
     UpdateJournalSkill,
     DeleteJournalSkill,
+    JournalStatsSkill,
 )
@@ -20,6 +20,7 @@ from .factory import LLMClientFactory
 from .client_with_fallback import LLMClientWithFallback
 from .deepseek import DeepSeekClient
 from .doubao import DoubaoClient
+from .transport import get_http_session, close_http_session
 
 # 注册提供商
 LLMClientFactory.register_provider(LLMProviderType.DEEPSEEK, DeepSeekClient)
@@ -40,4 +41,6 @@ __all__ = [
     "LLMClientWithFallback",
     "DeepSeekClient",
     "DoubaoClient",
+    "get_http_session",
+    "close_http_session",
 ]
@@ -0,0 +1,168 @@
+"""
+AI 凭据与 LLM 客户端缓存
+
+对话每一轮都需要 AI 配置，原先每次都要开数据库会话、查询用户、Fernet 解密 API Key。
+这里按 AI 配置版本号缓存解密后的凭据和由它构建的客户端：
+
+- 版本号 = (数据库纪元, AI 配置版本)：保存 AI 配置、JSON 导入时调用 invalidate_ai_config()，
+  备份恢复 / 数据重置通过 backend.db.versions.bump_all() 递增纪元
+- 版本未变时直接返回缓存（无锁、无数据库访问）；版本变化后第一次访问重新加载并清空已构建的客户端
+- 读取失败（如数据库尚未初始化）抛出 CredentialsLoadError 且不缓存，下次调用重试；
+  调用方据此区分「读取配置出错」和「未配置 API Key」
+
+用法:
+    manager = get_credential_manager()
+    credentials = manager.get_credentials()
+    llm = manager.get_client("agent", build_client)
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from backend.db.versions import get_versions
+
+logger = logging.getLogger(__name__)
+
+# 各提供商的默认模型
+DEFAULT_MODELS = {
+    "deepseek": "deepseek-chat",
+    "doubao": "doubao-seed-2-0-lite-260215",
+}
+
+
+class CredentialsLoadError(Exception):
+    """从数据库读取 AI 配置失败（区别于未配置）"""
+    pass
+
+
+@dataclass(frozen=True)
+class AICredentials:
+    """解密后的 AI 配置"""
+
+    provider: str
+    api_key: str
+    model: str
+
+
+def load_ai_credentials() -> Optional[AICredentials]:
+    """
+    从数据库读取并解密 AI 配置
+
+    Returns:
+        未配置或提供商不支持时返回 None；数据库访问失败时抛出异常
+    """
+    from backend.db.session import get_db_context
+    from backend.models.user import User
+    from backend.services.user_service import UserService
+
+    with get_db_context() as db:
+        user = db.query(User).first()
+        if not user or not user.ai_config:
+            return None
+        ai_config = dict(user.ai_config)
+
+    provider = ai_config.get("provider", "")
+    encrypted_key = ai_config.get("api_key", "")
+    if provider not in DEFAULT_MODELS or not encrypted_key:
+        return None
+
+    # 解密 API Key
+    try:
+        api_key = UserService.decrypt_api_key(encrypted_key)
+    except Exception:
+        # 解密失败，可能是加密格式变化
+        api_key = encrypted_key
+
+    return AICredentials(
+        provider=provider,
+        api_key=api_key,
+        model=ai_config.get("model") or DEFAULT_MODELS[provider],
+    )
+
+
+class CredentialManager:
+    """按 AI 配置版本缓存凭据和 LLM 客户端"""
+
+    def __init__(self, loader: Callable[[], Optional[AICredentials]] = load_ai_credentials):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._version = 0
+        self._cached_stamp: Optional[Tuple[int, int]] = None
+        self._credentials: Optional[AICredentials] = None
+        self._clients: Dict[str, Any] = {}
+        self._stats = {"hits": 0, "loads": 0, "builds": 0}
+
+    def stamp(self) -> Tuple[int, int]:
+        """当前版本号（数据库纪元, AI 配置版本）"""
+        return get_versions(())[0], self._version
+
+    def invalidate(self) -> None:
+        """AI 配置已变化，下次访问时重新加载"""
+        with self._lock:
+            self._version += 1
+
+    def get_credentials(self) -> Optional[AICredentials]:
+        """
+        获取解密后的 AI 配置（未配置时返回 None）
+
+        Raises:
+            CredentialsLoadError: 读取配置失败（结果不缓存）
+        """
+        stamp = self.stamp()
+        if stamp == self._cached_stamp:
+            self._stats["hits"] += 1
+            return self._credentials
+
+        with self._lock:
+            if stamp != self._cached_stamp:
+                try:
+                    credentials = self._loader()
+                except Exception as e:
+                    logger.warning(f"从数据库读取 AI 配置失败：{e}")
+                    raise CredentialsLoadError(str(e)) from e
+                self._stats["loads"] += 1
+                self._credentials = credentials
+                self._clients.clear()
+                # 使用加载前取得的版本号：加载期间配置再次变化时，下次访问仍会重新加载
+                self._cached_stamp = stamp
+            return self._credentials
+
+    def get_client(self, name: str, build: Callable[[Optional[AICredentials]], Any]) -> Any:
+        """
+        获取按当前凭据构建的客户端（同一版本内只构建一次）
+
+        Args:
+            name: 客户端名称（不同用途的客户端分别缓存）
+            build: 以凭据（可能为 None）构建客户端的函数
+        """
+        credentials = self.get_credentials()
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None or client[0] is not credentials:
+                self._stats["builds"] += 1
+                client = self._clients[name] = (credentials, build(credentials))
+            return client[1]
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计"""
+        return dict(self._stats)
+
+
+_credential_manager: Optional[CredentialManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_credential_manager() -> CredentialManager:
+    """获取全局凭据管理器"""
+    global _credential_manager
+    if _credential_manager is None:
+        with _manager_lock:
+            if _credential_manager is None:
+                _credential_manager = CredentialManager()
+    return _credential_manager
+
+
+def invalidate_ai_config() -> None:
+    """AI 配置写入后调用，使缓存的凭据和客户端失效"""
+    get_credential_manager().invalidate()
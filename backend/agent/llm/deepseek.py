@@ -7,6 +7,7 @@ import aiohttp
 import asyncio
 from typing import List, Dict, Any, Optional, AsyncIterator
 
+from .transport import get_http_session
 from .base import (
     LLMClient,
     LLMMessage,
@@ -70,33 +71,33 @@ class DeepSeekClient(LLMClient):
             payload["tool_choice"] = "auto"
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url, headers=headers, json=payload, timeout=self.timeout,
-                    ssl=False,
-                ) as response:
-                    if response.status == 401:
-                        raise AuthenticationError("API Key 无效")
-                    elif response.status == 429:
-                        raise RateLimitError("请求频率超限")
-                    elif response.status >= 500:
-                        raise ServerError(f"服务端错误：{response.status}")
-                    elif response.status != 200:
-                        raise TimeoutError(f"请求失败：{response.status}")
-
-                    data = await response.json()
-
-                    choice = data["choices"][0]
-                    content = choice["message"].get("content", "")
-                    tool_calls = choice["message"].get("tool_calls", [])
-
-                    return LLMResponse(
-                        content=content,
-                        tool_calls=tool_calls,
-                        usage=data.get("usage", {}),
-                        model=data.get("model", self.model),
-                        finish_reason=choice.get("finish_reason", ""),
-                    )
+            session = get_http_session()
+            async with session.post(
+                url, headers=headers, json=payload, timeout=self.timeout,
+                ssl=False,
+            ) as response:
+                if response.status == 401:
+                    raise AuthenticationError("API Key 无效")
+                elif response.status == 429:
+                    raise RateLimitError("请求频率超限")
+                elif response.status >= 500:
+                    raise ServerError(f"服务端错误：{response.status}")
+                elif response.status != 200:
+                    raise TimeoutError(f"请求失败：{response.status}")
+
+                data = await response.json()
+
+                choice = data["choices"][0]
+                content = choice["message"].get("content", "")
+                tool_calls = choice["message"].get("tool_calls", [])
+
+                return LLMResponse(
+                    content=content,
+                    tool_calls=tool_calls,
+                    usage=data.get("usage", {}),
+                    model=data.get("model", self.model),
+                    finish_reason=choice.get("finish_reason", ""),
+                )
 
         except asyncio.TimeoutError:
             raise TimeoutError("请求超时")
@@ -137,30 +138,30 @@ class DeepSeekClient(LLMClient):
             ]
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    url, headers=headers, json=payload, timeout=self.timeout,
-                    ssl=False,
-                ) as response:
-                    if response.status != 200:
-                        raise ServerError(f"请求失败：{response.status}")
-
-                    async for line in response.content:
-                        line = line.decode("utf-8").strip()
-                        if line.startswith("data: "):
-                            line = line[6:]
-                            if line == "[DONE]":
-                                break
-                            try:
-                                data = json.loads(line)
-                                if data["choices"]:
-                                    content = data["choices"][0]["delta"].get(
-                                        "content", ""
-                                    )
-                                    if content:
-                                        yield content
-                            except json.JSONDecodeError:
-                                continue
+            session = get_http_session()
+            async with session.post(
+                url, headers=headers, json=payload, timeout=self.timeout,
+                ssl=False,
+            ) as response:
+                if response.status != 200:
+                    raise ServerError(f"请求失败：{response.status}")
+
+                async for line in response.content:
+                    line = line.decode("utf-8").strip()
+                    if line.startswith("data: "):
+                        line = line[6:]
+                        if line == "[DONE]":
+                            break
+                        try:
+                            data = json.loads(line)
+                            if data["choices"]:
+                                content = data["choices"][0]["delta"].get(
+                                    "content", ""
+                                )
+                                if content:
+                                    yield content
+                        except json.JSONDecodeError:
+                            continue
 
         except asyncio.TimeoutError:
             raise TimeoutError("请求超时")
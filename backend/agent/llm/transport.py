@@ -0,0 +1,51 @@
+"""
+LLM HTTP 连接池
+
+所有 LLM 客户端共享一个 aiohttp.ClientSession（每个事件循环一个），
+复用 TCP/TLS 连接，避免每次请求重新握手。
+"""
+
+import asyncio
+import weakref
+from typing import Optional
+
+import aiohttp
+
+
+# 连接池上限（同时在途的 LLM 请求很少，主要收益来自 keep-alive）
+POOL_LIMIT = 20
+POOL_LIMIT_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 60
+
+# {事件循环: ClientSession}，循环被回收时自动移除
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    获取当前事件循环的共享 HTTP 会话
+
+    必须在协程中调用。会话不要用 async with 关闭，由 close_http_session 统一关闭。
+    """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT,
+            limit_per_host=POOL_LIMIT_PER_HOST,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        _sessions[loop] = session
+    return session
+
+
+async def close_http_session() -> None:
+    """关闭当前事件循环的共享 HTTP 会话（应用关闭时调用）"""
+    loop = asyncio.get_running_loop()
+    session: Optional[aiohttp.ClientSession] = _sessions.pop(loop, None)
+    if session is not None and not session.closed:
+        await session.close()
@@ -7,6 +7,15 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 
+# 每条消息的固定开销估算（字典、时间戳等），用于内存预算
+MESSAGE_OVERHEAD_BYTES = 128
+
+
+def estimate_message_bytes(content: str) -> int:
+    """估算单条消息占用的内存字节数"""
+    return len(content.encode("utf-8")) + MESSAGE_OVERHEAD_BYTES
+
+
 @dataclass
 class ContextState:
     """上下文状态"""
@@ -18,23 +27,41 @@ class ContextState:
     last_operations: List[Dict[str, Any]] = field(default_factory=list)
     references: Dict[str, Any] = field(default_factory=dict)  # 改名为 references
     token_count: int = 0
+    size_bytes: int = 0  # 消息占用的估算字节数
 
     def __post_init__(self):
         """初始化后设置 last_accessed"""
         if self.last_accessed is None:
             self.last_accessed = datetime.now()
+        self.size_bytes = sum(estimate_message_bytes(m["content"]) for m in self.messages)
 
-    def add_message(self, role: str, content: str) -> None:
+    def add_message(self, role: str, content: str, timestamp: Optional[str] = None) -> None:
         """添加消息"""
         self.messages.append(
             {
                 "role": role,
                 "content": content,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp or datetime.now().isoformat(),
             }
         )
+        self.size_bytes += estimate_message_bytes(content)
         self.last_accessed = datetime.now()
 
+    def trim(self, max_messages: int) -> int:
+        """
+        只保留最近 max_messages 条消息（更早的消息仍在数据库中）
+
+        Returns:
+            int: 释放的估算字节数
+        """
+        excess = len(self.messages) - max_messages
+        if excess <= 0:
+            return 0
+        freed = sum(estimate_message_bytes(m["content"]) for m in self.messages[:excess])
+        del self.messages[:excess]
+        self.size_bytes -= freed
+        return freed
+
     def add_operation(self, skill: str, result: Dict[str, Any]) -> None:
         """添加操作记录"""
         self.last_operations.append(
@@ -60,3 +87,4 @@ class ContextState:
         self.last_operations.clear()
         self.references.clear()
         self.token_count = 0
+        self.size_bytes = 0
@@ -4,7 +4,6 @@
 实现日记的创建、查询、更新、删除等操作。
 """
 
-import asyncio
 from typing import Optional, List
 from sqlalchemy.orm import Session
 
@@ -13,6 +12,8 @@ from backend.db.session import get_db_context
 from backend.models.diary import Diary, MOOD_TYPES
 from backend.models.user import User
 from backend.schemas.journal import DiaryCreate, DiaryUpdate
+from backend.services.diary_history_service import DiaryHistoryService
+from backend.services.journal_stats_service import JournalStatsService
 
 # 导入事件总线
 from backend.agent.utils.event_bus import get_event_bus, AgentEvents
@@ -99,12 +100,12 @@ class CreateJournalSkill(BaseSkill):
                 db.commit()
                 db.refresh(diary)
 
-                # 触发事件
+                # 触发事件（只等待入队，回调在事件总线的分发线程中执行）
                 event_bus = get_event_bus()
-                asyncio.create_task(event_bus.emit(
+                await event_bus.emit(
                     AgentEvents.JOURNAL_CREATED,
                     {"id": diary.id, "title": diary.title, "mood": diary.mood}
-                ))
+                )
 
                 mood_text = f"心情：{mood}" if mood else ""
                 tags_text = f"，标签：{', '.join(tags)}" if tags else ""
@@ -294,6 +295,9 @@ class UpdateJournalSkill(BaseSkill):
                 if not diary:
                     return SkillResult.fail(f"未找到 ID 为 {journal_id} 的日记")
 
+                # 记录编辑版本
+                DiaryHistoryService.record_edit(db, diary, title, content)
+
                 # 记录变更
                 changes = []
 
@@ -379,10 +383,115 @@ class DeleteJournalSkill(BaseSkill):
             return SkillResult.fail(f"删除失败：{str(e)}")
 
 
+MOOD_LABELS = {"great": "很好", "good": "好", "neutral": "一般", "bad": "差", "terrible": "很差"}
+
+
+class JournalStatsSkill(BaseSkill):
+    """日记统计 Skill"""
+
+    name = "journal_stats"
+    description = (
+        "统计日记的标签和心情（无需逐篇读取日记）："
+        "tag_frequency 标签使用频率；mood_by_tag 每个标签下的心情分布；mood_timeline 心情随时间的变化"
+    )
+    trigger_words = ["日记统计", "心情统计", "标签统计", "心情趋势", "心情变化", "经常写"]
+    risk_level = RiskLevel.LOW
+
+    parameters: List[SkillParameter] = [
+        SkillParameter(
+            name="stat",
+            type="string",
+            description="统计类型",
+            required=True,
+            enum=["tag_frequency", "mood_by_tag", "mood_timeline"],
+        ),
+        SkillParameter(
+            name="days",
+            type="integer",
+            description="统计最近多少天，不填表示全部（mood_timeline 默认 90 天）",
+            required=False,
+        ),
+        SkillParameter(
+            name="tags",
+            type="array",
+            description="mood_by_tag 只统计这些标签；mood_timeline 取第一个标签筛选",
+            required=False,
+        ),
+        SkillParameter(
+            name="mood",
+            type="string",
+            description="tag_frequency 只统计该心情的日记",
+            required=False,
+            enum=MOOD_TYPES,
+        ),
+        SkillParameter(
+            name="granularity",
+            type="string",
+            description="mood_timeline 的聚合粒度",
+            required=False,
+            enum=["day", "week", "month"],
+            default="week",
+        ),
+    ]
+
+    async def execute(
+        self,
+        stat: str,
+        days: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        mood: Optional[str] = None,
+        granularity: str = "week",
+    ) -> SkillResult:
+        """执行日记统计"""
+        try:
+            with get_db_context() as db:
+                if stat == "tag_frequency":
+                    data, status_code = JournalStatsService.tag_frequency(db, days=days, mood=mood)
+                elif stat == "mood_by_tag":
+                    data, status_code = JournalStatsService.mood_by_tag(db, days=days, tags=tags)
+                elif stat == "mood_timeline":
+                    data, status_code = JournalStatsService.mood_timeline(
+                        db, days=days or 90, granularity=granularity, tag=tags[0] if tags else None
+                    )
+                else:
+                    return SkillResult.fail(f"不支持的统计类型：{stat}")
+
+            if status_code >= 400:
+                return SkillResult.fail(data.get("message", "统计失败"))
+
+            items = data["items"]
+            if not items:
+                return SkillResult.ok("没有符合条件的日记", data=data)
+
+            if stat == "tag_frequency":
+                summary = "、".join(f"{item['tag']}（{item['count']} 次）" for item in items[:10])
+                response = f"最常用的标签：{summary}"
+            elif stat == "mood_by_tag":
+                lines = []
+                for item in items[:10]:
+                    moods = "，".join(
+                        f"{MOOD_LABELS[m]} {n}" for m, n in item["moods"].items() if n
+                    )
+                    lines.append(f"{item['tag']}：共 {item['total']} 篇（{moods}）")
+                response = "各标签的心情分布：\n" + "\n".join(lines)
+            else:
+                lines = [
+                    f"{item['period']}：{item['total']} 篇，平均心情 {item['average_mood']}"
+                    for item in items[-12:]
+                ]
+                response = "心情趋势（心情值 2 为很好，-2 为很差）：\n" + "\n".join(lines)
+
+            return SkillResult.ok(response=response, data=data)
+
+        except Exception as e:
+            return SkillResult.fail(f"统计失败：{str(e)}")
+
+
 # 导出所有 Skills
 __all__ = [
     "CreateJournalSkill",
     "QueryJournalsSkill",
     "UpdateJournalSkill",
     "DeleteJournalSkill",
+    "JournalStatsSkill",
 ]
@@ -2,11 +2,29 @@
 事件总线模块
 
 用于 Agent 模块内部的事件通信，支持数据变更自动刷新。
+
+发布与投递解耦：emit / emit_sync 只把事件放入队列，回调在专用分发线程的事件循环中执行：
+- 每种事件一个有界队列，按发布顺序投递；慢订阅者只拖慢自己订阅的事件
+- 所有事件共享一个工作池（信号量），限制同时执行的回调数；同步回调在线程池中执行
+- 队列满时 emit 等待（背压），emit_sync 不阻塞调用方而是丢弃并计数
+- DATA_REFRESH / STATE_CHANGED 在合并窗口内相同数据只投递一次，批量写入只触发少量刷新
+
+协程订阅者运行在分发线程的事件循环上，而不是发布方（请求处理）的事件循环上。
+回调中不能直接使用绑定到其他事件循环的对象（asyncio.Queue / Lock / Future、aiohttp 会话等），
+需要通过目标循环的 call_soon_threadsafe / asyncio.run_coroutine_threadsafe 转交。
 """
 
 import asyncio
-from typing import Dict, List, Callable, Any, Optional
-from functools import wraps
+import atexit
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Callable, Any, Optional, Tuple
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
 
 
 # 预定义事件类型
@@ -53,16 +71,49 @@ class EventBus:
     支持异步事件处理和多订阅者
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        debounce_ms: Optional[float] = None,
+        coalesce_events: Optional[Tuple[str, ...]] = None,
+    ):
+        """
+        初始化事件总线
+
+        Args:
+            queue_size: 每种事件的队列上限
+            workers: 同时执行的回调上限
+            debounce_ms: 合并窗口（毫秒）
+            coalesce_events: 需要合并的事件类型
+        """
         self._subscribers: Dict[str, List[Callable]] = {}
+        self.queue_size = queue_size or settings.EVENT_BUS_QUEUE_SIZE
+        self.workers = workers or settings.EVENT_BUS_WORKERS
+        self.debounce = (settings.EVENT_BUS_DEBOUNCE_MS if debounce_ms is None else debounce_ms) / 1000
+        self.coalesce_events = frozenset(
+            coalesce_events if coalesce_events is not None
+            else (AgentEvents.DATA_REFRESH, AgentEvents.STATE_CHANGED)
+        )
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
         self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = threading.Event()
+        self._stopping: Optional[asyncio.Event] = None
 
-    @property
-    def loop(self) -> asyncio.AbstractEventLoop:
-        """获取事件循环"""
-        if self._loop is None:
-            self._loop = asyncio.get_event_loop()
-        return self._loop
+        # 以下状态只在分发线程中访问
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._drainers: Dict[str, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 合并中的事件 {(事件, 数据指纹): (数据, 发布时间)}
+        self._pending: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        # 投递统计 {事件: {指标: 值}}
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    # ============ 订阅 ============
 
     def subscribe(self, event: str, callback: Callable) -> Callable:
         """
@@ -70,35 +121,61 @@ class EventBus:
 
         Args:
             event: 事件名称
-            callback: 回调函数
+            callback: 回调函数（协程在分发线程的事件循环中执行，不是订阅方所在的循环；
+                      同步函数在线程池中执行）
 
         Returns:
             取消订阅函数
         """
-        if event not in self._subscribers:
-            self._subscribers[event] = []
-
-        self._subscribers[event].append(callback)
+        with self._lock:
+            self._subscribers.setdefault(event, []).append(callback)
 
         # 返回取消订阅函数
         def unsubscribe():
-            self._subscribers[event].remove(callback)
-            if not self._subscribers[event]:
-                del self._subscribers[event]
+            self.unsubscribe(event, callback)
 
         return unsubscribe
 
     def unsubscribe(self, event: str, callback: Callable) -> None:
         """取消订阅"""
-        if event in self._subscribers:
-            self._subscribers[event].remove(callback)
-            if not self._subscribers[event]:
-                del self._subscribers[event]
+        with self._lock:
+            callbacks = self._subscribers.get(event)
+            if callbacks and callback in callbacks:
+                callbacks.remove(callback)
+                if not callbacks:
+                    del self._subscribers[event]
+
+    def clear(self) -> None:
+        """清空所有事件"""
+        with self._lock:
+            self._subscribers.clear()
+
+    def get_subscriber_count(self, event: str) -> int:
+        """获取事件订阅数"""
+        return len(self._subscribers.get(event, []))
+
+    def event(self, event: str):
+        """
+        事件装饰器
+
+        使用方式:
+        @bus.event(AgentEvents.JOURNAL_CREATED)
+        async def on_journal_created(data):
+            pass
+        """
+        def decorator(func: Callable) -> Callable:
+            self.subscribe(event, func)
+            return func
+        return decorator
+
+    # ============ 发布 ============
 
     async def emit(self, event: str, data: Any = None) -> None:
         """
         触发事件（异步）
 
+        只等待事件入队，不等待回调执行；队列已满时等待空位（背压）。
+
         Args:
             event: 事件名称
             data: 事件数据
@@ -106,19 +183,22 @@ class EventBus:
         if event not in self._subscribers:
             return
 
-        # 异步执行所有回调
-        for callback in self._subscribers[event]:
-            try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(data)
-                else:
-                    callback(data)
-            except Exception as e:
-                print(f"Event callback error for '{event}': {e}")
+        loop = self.loop
+        emitted_at = time.monotonic()
+        if asyncio.get_running_loop() is loop:
+            # 回调中再次发布：不能等待自己所在的循环，队列满时丢弃
+            self._accept(event, data, emitted_at)
+            return
+
+        await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._accept_wait(event, data, emitted_at), loop)
+        )
 
     def emit_sync(self, event: str, data: Any = None) -> None:
         """
-        触发事件（同步）
+        触发事件（同步，线程安全）
+
+        不阻塞调用方；队列已满时丢弃事件并计入 dropped。
 
         Args:
             event: 事件名称
@@ -127,33 +207,200 @@ class EventBus:
         if event not in self._subscribers:
             return
 
-        for callback in self._subscribers[event]:
-            try:
-                callback(data)
-            except Exception as e:
-                print(f"Event callback error for '{event}': {e}")
+        self.loop.call_soon_threadsafe(self._accept, event, data, time.monotonic())
 
-    def clear(self) -> None:
-        """清空所有事件"""
-        self._subscribers.clear()
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """等待已发布的事件（包括合并中的事件）全部投递完成（不要在回调中调用）"""
+        if self.running:
+            asyncio.run_coroutine_threadsafe(self._drain_all(), self._loop).result(timeout)
 
-    def get_subscriber_count(self, event: str) -> int:
-        """获取事件订阅数"""
-        return len(self._subscribers.get(event, []))
+    async def flush_async(self) -> None:
+        """在其他事件循环中等待已发布的事件全部投递完成"""
+        if self.running:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._drain_all(), self._loop))
 
-    def event(self, event: str):
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
         """
-        事件装饰器
+        获取投递统计
 
-        使用方式:
-        @bus.event(AgentEvents.JOURNAL_CREATED)
-        async def on_journal_created(data):
-            pass
+        每种事件包含：emitted（发布）、coalesced（被合并）、dropped（队列满丢弃）、
+        delivered / errors（回调成功 / 失败次数）、queued（当前积压）、
+        avg_latency_ms / max_latency_ms（发布到回调完成的耗时）
         """
-        def decorator(func: Callable) -> Callable:
-            self.subscribe(event, func)
-            return func
-        return decorator
+        with self._lock:
+            snapshot = {event: dict(stats) for event, stats in self._stats.items()}
+
+        for event, stats in snapshot.items():
+            calls = stats["delivered"] + stats["errors"]
+            stats["avg_latency_ms"] = round(stats.pop("latency_total_ms") / calls, 3) if calls else 0.0
+            stats["max_latency_ms"] = round(stats["max_latency_ms"], 3)
+            queue = self._queues.get(event)
+            stats["queued"] = queue.qsize() if queue is not None else 0
+        return snapshot
+
+    # ============ 生命周期 ============
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """获取分发线程的事件循环（首次访问时启动分发线程）"""
+        if not self.running:
+            self.start()
+        return self._loop
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive() and self._loop is not None)
+
+    def start(self) -> None:
+        """启动分发线程（重复调用无副作用）"""
+        with self._lock:
+            if self.running:
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+            self._thread.start()
+        self._ready.wait(5.0)
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止分发线程（未投递的事件被丢弃）"""
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            if not thread or not thread.is_alive() or loop is None:
+                return
+            loop.call_soon_threadsafe(self._stopping.set)
+        thread.join(timeout)
+
+    # ============ 分发线程 ============
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._main(loop))
+        finally:
+            loop.close()
+            self._loop = None
+
+    async def _main(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._stopping = asyncio.Event()
+        self._queues.clear()
+        self._drainers.clear()
+        self._pending.clear()
+        self._loop = loop
+        self._ready.set()
+
+        await self._stopping.wait()
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        drainers = list(self._drainers.values())
+        for task in drainers:
+            task.cancel()
+        await asyncio.gather(*drainers, return_exceptions=True)
+
+    def _get_stats(self, event: str) -> Dict[str, float]:
+        stats = self._stats.get(event)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(event, {
+                    "emitted": 0, "coalesced": 0, "dropped": 0, "delivered": 0, "errors": 0,
+                    "latency_total_ms": 0.0, "max_latency_ms": 0.0,
+                })
+        return stats
+
+    def _get_queue(self, event: str) -> asyncio.Queue:
+        """获取事件队列（首次使用时创建队列和消费协程）"""
+        queue = self._queues.get(event)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self._queues[event] = queue
+            self._drainers[event] = asyncio.create_task(self._drain(event, queue))
+        return queue
+
+    def _coalesce(self, event: str, data: Any, emitted_at: float) -> bool:
+        """合并刷新类事件，返回 True 表示已由合并逻辑接管"""
+        if event not in self.coalesce_events:
+            return False
+
+        try:
+            fingerprint = json.dumps(data, sort_keys=True, default=str)
+        except (TypeError, ValueError):
+            fingerprint = repr(data)
+
+        key = (event, fingerprint)
+        if key in self._pending:
+            self._get_stats(event)["coalesced"] += 1
+        else:
+            self._pending[key] = (data, emitted_at)
+            if self._flush_handle is None:
+                self._flush_handle = self._loop.call_later(self.debounce, self._flush_pending)
+        return True
+
+    def _flush_pending(self) -> None:
+        """合并窗口结束，投递窗口内的事件"""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for (event, _), (data, emitted_at) in pending.items():
+            self._put_nowait(event, data, emitted_at)
+
+    def _put_nowait(self, event: str, data: Any, emitted_at: float) -> None:
+        try:
+            self._get_queue(event).put_nowait((data, emitted_at))
+        except asyncio.QueueFull:
+            stats = self._get_stats(event)
+            stats["dropped"] += 1
+            if stats["dropped"] % 100 == 1:
+                logger.warning(f"Event queue full for '{event}', dropped {stats['dropped']} event(s) so far")
+
+    def _accept(self, event: str, data: Any, emitted_at: float) -> None:
+        """接收事件（不等待）"""
+        self._get_stats(event)["emitted"] += 1
+        if not self._coalesce(event, data, emitted_at):
+            self._put_nowait(event, data, emitted_at)
+
+    async def _accept_wait(self, event: str, data: Any, emitted_at: float) -> None:
+        """接收事件（队列满时等待）"""
+        self._get_stats(event)["emitted"] += 1
+        if not self._coalesce(event, data, emitted_at):
+            await self._get_queue(event).put((data, emitted_at))
+
+    async def _drain(self, event: str, queue: asyncio.Queue) -> None:
+        """按顺序投递单个事件类型的队列"""
+        stats = self._get_stats(event)
+        while True:
+            data, emitted_at = await queue.get()
+            try:
+                with self._lock:
+                    callbacks = list(self._subscribers.get(event, ()))
+                for callback in callbacks:
+                    async with self._semaphore:
+                        try:
+                            if asyncio.iscoroutinefunction(callback):
+                                await callback(data)
+                            else:
+                                # 同步回调放到线程池执行，不阻塞其他事件的投递
+                                await asyncio.to_thread(callback, data)
+                            stats["delivered"] += 1
+                        except Exception as e:
+                            stats["errors"] += 1
+                            logger.error(f"Event callback error for '{event}': {e}")
+                latency_ms = (time.monotonic() - emitted_at) * 1000
+                stats["latency_total_ms"] += latency_ms * len(callbacks)
+                if latency_ms > stats["max_latency_ms"]:
+                    stats["max_latency_ms"] = latency_ms
+            finally:
+                queue.task_done()
+
+    async def _drain_all(self) -> None:
+        """立即结束合并窗口并等待所有队列清空"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_pending()
+        for queue in list(self._queues.values()):
+            await queue.join()
 
 
 # 全局事件总线单例
@@ -171,4 +418,6 @@ def get_event_bus() -> EventBus:
 def reset_event_bus() -> None:
     """重置事件总线（用于测试）"""
     global _event_bus
+    if _event_bus is not None:
+        _event_bus.stop()
     _event_bus = None
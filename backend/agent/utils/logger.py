@@ -4,16 +4,19 @@
 
 import logging
 
+from backend.core.config import settings
+from backend.core.logging_config import TraceSampler
+
 
 def get_agent_logger() -> logging.Logger:
-    """获取 Agent 日志记录器"""
+    """
+    获取 Agent 日志记录器
+
+    不单独挂 handler，记录传播到根 logger 的队列（见 backend.core.logging_config），
+    由日志线程写出；带 trace 字段的推理追踪日志按 AGENT_TRACE_LOG_RATE 限速。
+    """
     logger = logging.getLogger("agent")
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+    if not any(isinstance(f, TraceSampler) for f in logger.filters):
+        logger.addFilter(TraceSampler(settings.AGENT_TRACE_LOG_RATE, settings.AGENT_TRACE_LOG_BURST))
         logger.setLevel(logging.INFO)
     return logger
@@ -18,49 +18,77 @@ class SecurityCheckResult:
     action: str = "allow"  # allow, block, warn
 
 
+# re.IGNORECASE 视为同一字母、但 str.lower() 不会转换的字符（İ ı → i，ſ → s），
+# 预筛选前先折叠，避免用这些字符绕过锚点检查
+_CASE_FOLD = (("İ", "i"), ("ı", "i"), ("ſ", "s"))
+
+
 class Gatekeeper:
     """
     守门员 - 恶意模式检测
 
     检测 Prompt 注入、权限提升、数据泄露等攻击模式。
+
+    每条规则带一个小写字面量锚点（规则能匹配时输入中必然包含它）：
+    先在转小写后的输入里做子串查找，只有锚点命中的规则才执行正则确认。
+    正常消息通常不含任何锚点，整个检查只是一次转小写加若干次 C 层子串查找。
     """
 
     def __init__(self):
-        # 恶意模式正则
+        # 恶意模式正则：(正则, 攻击类型, 锚点)
         self.malicious_patterns = [
             # Prompt 注入模式
-            (r"忽略.{0,10}指令", "prompt_injection"),
-            (r"ignore.{0,10}instruction", "prompt_injection"),
-            (r"forget.{0,10}previous", "prompt_injection"),
-            (r"disregard.{0,10}above", "prompt_injection"),
-            (r"绕过.{0,10}限制", "prompt_injection"),
-            (r"bypass.{0,10}restriction", "prompt_injection"),
+            (r"忽略.{0,10}指令", "prompt_injection", "忽略"),
+            (r"ignore.{0,10}instruction", "prompt_injection", "ignore"),
+            (r"forget.{0,10}previous", "prompt_injection", "forget"),
+            (r"disregard.{0,10}above", "prompt_injection", "disregard"),
+            (r"绕过.{0,10}限制", "prompt_injection", "绕过"),
+            (r"bypass.{0,10}restriction", "prompt_injection", "bypass"),
             # 权限提升模式
-            (r"给我.{0,10}管理员", "privilege_escalation"),
-            (r"grant.{0,10}admin", "privilege_escalation"),
-            (r"sudo", "privilege_escalation"),
-            (r"提升.{0,10}权限", "privilege_escalation"),
+            (r"给我.{0,10}管理员", "privilege_escalation", "给我"),
+            (r"grant.{0,10}admin", "privilege_escalation", "grant"),
+            (r"sudo", "privilege_escalation", "sudo"),
+            (r"提升.{0,10}权限", "privilege_escalation", "提升"),
             # 数据泄露模式
-            (r"显示.{0,10}系统提示", "data_leak"),
-            (r"show.{0,10}system prompt", "data_leak"),
-            (r"reveal.{0,10}instruction", "data_leak"),
-            (r"你的.{0,10}提示词", "data_leak"),
+            (r"显示.{0,10}系统提示", "data_leak", "显示"),
+            (r"show.{0,10}system prompt", "data_leak", "system prompt"),
+            (r"reveal.{0,10}instruction", "data_leak", "reveal"),
+            (r"你的.{0,10}提示词", "data_leak", "提示词"),
             # 命令注入模式
-            (r";\s*rm\s+", "command_injection"),
-            (r"\|\s*bash", "command_injection"),
-            (r"`.*`", "command_injection"),
+            (r";\s*rm\s+", "command_injection", ";"),
+            (r"\|\s*bash", "command_injection", "bash"),
+            # 同一行内成对的反引号（等价于 `.*`，但不回溯）
+            (r"`[^`\n]*`", "command_injection", "`"),
             # SQL 注入模式
-            (r"'\s*OR\s+'1'\s*=\s*'1", "sql_injection"),
-            (r";\s*DROP\s+TABLE", "sql_injection"),
-            (r"--\s*$", "sql_injection"),
+            (r"'\s*OR\s+'1'\s*=\s*'1", "sql_injection", "'1'"),
+            (r";\s*DROP\s+TABLE", "sql_injection", "table"),
+            (r"--\s*$", "sql_injection", "--"),
         ]
 
         # 编译正则
         self.compiled_patterns = [
-            (re.compile(pattern, re.IGNORECASE), attack_type)
-            for pattern, attack_type in self.malicious_patterns
+            (re.compile(pattern, re.IGNORECASE), attack_type, anchor)
+            for pattern, attack_type, anchor in self.malicious_patterns
         ]
 
+    def match(self, user_input: str) -> Optional[str]:
+        """
+        匹配恶意模式
+
+        Returns:
+            第一条命中规则的攻击类型（按规则顺序），未命中返回 None
+        """
+        lowered = user_input
+        if not lowered.isascii():
+            # str.translate 在非 ASCII 文本上逐字符处理较慢，逐个 replace 走 C 层子串查找
+            for char, folded in _CASE_FOLD:
+                lowered = lowered.replace(char, folded)
+        lowered = lowered.lower()
+        for pattern, attack_type, anchor in self.compiled_patterns:
+            if (anchor is None or anchor in lowered) and pattern.search(user_input):
+                return attack_type
+        return None
+
     def check(self, user_input: str) -> SecurityCheckResult:
         """
         检查用户输入
@@ -88,27 +116,28 @@ class Gatekeeper:
             )
 
         # 检查恶意模式
-        for pattern, attack_type in self.compiled_patterns:
-            if pattern.search(user_input):
-                return SecurityCheckResult(
-                    is_safe=False,
-                    reason=f"检测到潜在{attack_type}攻击模式",
-                    action="block",
-                )
+        attack_type = self.match(user_input)
+        if attack_type:
+            return SecurityCheckResult(
+                is_safe=False,
+                reason=f"检测到潜在{attack_type}攻击模式",
+                action="block",
+            )
 
         # 检查通过
         return SecurityCheckResult(is_safe=True, action="allow")
 
-    def add_pattern(self, pattern: str, attack_type: str) -> None:
+    def add_pattern(self, pattern: str, attack_type: str, anchor: Optional[str] = None) -> None:
         """
         添加新的检测模式
 
         Args:
             pattern: 正则表达式
             attack_type: 攻击类型
+            anchor: 任何匹配都必然包含的字面量（不区分大小写）；不提供时每条消息都执行该正则
         """
         compiled = re.compile(pattern, re.IGNORECASE)
-        self.compiled_patterns.append((compiled, attack_type))
+        self.compiled_patterns.append((compiled, attack_type, anchor.lower() if anchor else None))
 
 
 # 单例实例
@@ -4,9 +4,9 @@ Agent API 路由
 处理 Agent 聊天、确认和历史记录请求。
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Literal
 import uuid
 import asyncio
 import json
@@ -121,35 +121,54 @@ async def confirm(request: ConfirmRequest):
 
 
 @router.get("/history", response_model=Dict[str, Any])
-async def get_history(session_id: str, limit: int = 10):
+async def get_history(
+    session_id: str,
+    limit: int = Query(10, ge=1, le=200),
+    before: Optional[int] = Query(None, description="游标：只返回该消息 ID 之前的消息"),
+    order: Literal["asc", "desc"] = Query("asc", description="窗口内排序：asc 从旧到新，desc 从新到旧"),
+    compact: bool = Query(False, description="紧凑格式（不含 extra_data）"),
+):
     """
     获取会话历史
 
-    返回指定会话的对话历史记录，优先从数据库读取。
+    返回最近的 limit 条消息（而不是最早的），优先从数据库读取。
+    向上滚动加载更早的消息时，把响应中的 next_before 作为 before 传入。
     """
     try:
         from backend.db.session import SessionLocal
+        from backend.db.write_queue import get_write_queue
         from backend.services.agent_session_service import AgentSessionService
 
+        # 等待写队列中的消息落库
+        await get_write_queue().flush_async()
+
         db = SessionLocal()
         try:
-            # 从数据库获取消息
-            messages = AgentSessionService.get_messages(db, session_id, limit)
+            # 从数据库获取最近的消息窗口（从新到旧）
+            messages, has_more = AgentSessionService.get_message_window(
+                db, session_id, limit=limit, before=before, compact=compact
+            )
+            next_before = messages[-1].id if has_more else None
+            if order == "asc":
+                messages.reverse()
 
             # 转换为前端格式
-            formatted_messages = [
-                {
+            formatted_messages = []
+            for msg in messages:
+                item = {
+                    "id": msg.id,
                     "role": msg.role,
                     "content": msg.content,
                     "timestamp": msg.timestamp.isoformat(),
                 }
-                for msg in messages
-            ]
+                if not compact:
+                    item["extra_data"] = msg.extra_data
+                formatted_messages.append(item)
         finally:
             db.close()
 
         # 如果数据库中没有消息，尝试从内存中获取（向后兼容）
-        if not formatted_messages:
+        if not formatted_messages and before is None:
             ctx_manager = get_context_manager()
             if ctx_manager:
                 context = ctx_manager.get(session_id)
@@ -157,7 +176,12 @@ async def get_history(session_id: str, limit: int = 10):
                     formatted_messages = context.messages[-limit:] if context.messages else []
 
         return success_response(
-            data={"messages": formatted_messages, "session_id": session_id},
+            data={
+                "messages": formatted_messages,
+                "session_id": session_id,
+                "has_more": has_more,
+                "next_before": next_before,
+            },
             message="获取历史成功",
             code=200,
         )
@@ -175,6 +199,7 @@ async def delete_session(session_id: str):
     """
     try:
         from backend.db.session import SessionLocal
+        from backend.db.write_queue import get_write_queue
         from backend.services.agent_session_service import AgentSessionService
 
         # 同时删除内存和数据库中的会话
@@ -182,6 +207,9 @@ async def delete_session(session_id: str):
         if ctx_manager:
             ctx_manager.delete(session_id)
 
+        # 等待写队列中的消息落库，避免删除后又被写入
+        await get_write_queue().flush_async()
+
         # 从数据库删除
         db = SessionLocal()
         try:
@@ -256,24 +284,15 @@ async def list_sessions():
     """
     try:
         from backend.db.session import SessionLocal
+        from backend.db.write_queue import get_write_queue
         from backend.services.agent_session_service import AgentSessionService
 
+        await get_write_queue().flush_async()
+
         db = SessionLocal()
         try:
-            # 从数据库获取会话列表
-            db_sessions = AgentSessionService.get_all_sessions(db, limit=100)
-
-            sessions = []
-            for db_session in db_sessions:
-                # 获取最新消息
-                last_message = db_session.messages[-1] if db_session.messages else None
-                sessions.append({
-                    "session_id": db_session.session_id,
-                    "message_count": db_session.message_count,
-                    "last_message_time": db_session.updated_at.isoformat() if db_session.updated_at else None,
-                    "last_message_preview": last_message.content[:50] if last_message else None,
-                    "last_message_role": last_message.role if last_message else None,
-                })
+            # 从会话表读取摘要（不加载消息）
+            sessions = AgentSessionService.list_session_summaries(db, limit=100)
         finally:
             db.close()
 
@@ -299,7 +318,8 @@ async def get_session(session_id: str):
         if not ctx_manager:
             return error_response(message="上下文管理器未初始化", code=500)
 
-        context = ctx_manager.get(session_id)
+        # 不在内存中时从数据库恢复最近的消息
+        context = ctx_manager.get(session_id, hydrate=True)
         if not context:
             return error_response(message="会话不存在", code=404)
 
@@ -1,14 +1,16 @@
 """资产系统 API 接口"""
 from datetime import date
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from sqlalchemy.orm import Session
 
 from backend.db.session import get_db
 from backend.schemas.common import success_response
+from backend.core.http_cache import response_cache
 from backend.schemas.asset import (
     AssetCategoryCreate,
     AssetCategoryUpdate,
     AssetItemCreate,
+    AssetItemBatchCreate,
     AssetItemUpdate,
     AssetSnapshotCreate,
 )
@@ -22,11 +24,16 @@ router = APIRouter(prefix="/api/assets", tags=["assets"])
 
 
 @router.get("/summary")
-async def get_summary(db: Session = Depends(get_db)):
-    data, status_code = AssetSummaryService.get_summary(db)
-    if status_code >= 400:
-        raise HTTPException(status_code=status_code, detail=data)
-    return success_response(data=data, message="获取资产汇总成功")
+async def get_summary(request: Request, db: Session = Depends(get_db)):
+    def build():
+        data, status_code = AssetSummaryService.get_summary(db)
+        if status_code >= 400:
+            raise HTTPException(status_code=status_code, detail=data)
+        return success_response(data=data, message="获取资产汇总成功")
+
+    return response_cache.conditional_get(
+        request, ["users", "asset_categories", "asset_items"], build
+    )
 
 
 @router.get("/snapshots")
@@ -117,6 +124,17 @@ async def create_item(
     return success_response(data=data, message="资产创建成功", code=status_code)
 
 
+@router.post("/items/batch")
+async def create_items_batch(
+    request: AssetItemBatchCreate,
+    db: Session = Depends(get_db),
+):
+    data, status_code = AssetItemService.create_items_batch(db, request)
+    if status_code >= 400:
+        raise HTTPException(status_code=status_code, detail=data)
+    return success_response(data=data, message="资产批量创建成功", code=status_code)
+
+
 @router.put("/items/{item_id}")
 async def update_item(
     item_id: int,
@@ -34,7 +34,7 @@ async def setup_pin(
 
     验证规则：6 位数字
     """
-    data, status_code = AuthService.setup_pin(db, request.pin)
+    data, status_code = await AuthService.setup_pin_async(db, request.pin)
 
     if status_code >= 400:
         raise HTTPException(
@@ -57,7 +57,7 @@ async def verify_pin_code(
     """
     验证 PIN 码
     """
-    data, status_code = AuthService.verify_pin(db, request.pin)
+    data, status_code = await AuthService.verify_pin_async(db, request.pin)
 
     if status_code >= 400:
         raise HTTPException(
@@ -79,7 +79,7 @@ async def change_pin(
     """
     修改 PIN 码
     """
-    data, status_code = AuthService.change_pin(db, request.old_pin, request.new_pin)
+    data, status_code = await AuthService.change_pin_async(db, request.old_pin, request.new_pin)
 
     if status_code >= 400:
         raise HTTPException(
@@ -125,23 +125,21 @@ async def get_pin_verify_requirements(db: Session = Depends(get_db)):
 
 import asyncio
 
-def _run_async(coro):
-    """在新事件循环中运行异步函数"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
+def _run_async(coro, loop: Optional[asyncio.AbstractEventLoop] = None):
+    """在调用方提供的事件循环中运行异步函数（未提供时临时创建）"""
+    if loop is not None:
         return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+    return asyncio.run(coro)
 
 
-def handle_auth_action(action: str, params: dict) -> dict:
+def handle_auth_action(action: str, params: dict, loop: Optional[asyncio.AbstractEventLoop] = None) -> dict:
     """
     处理 IPC 通信中的认证相关操作
 
     Args:
         action: 操作类型
         params: 操作参数
+        loop: IPC 主事件循环（复用同一个循环，bcrypt 在专用线程池中执行）
 
     Returns:
         操作结果
@@ -154,7 +152,7 @@ def handle_auth_action(action: str, params: dict) -> dict:
             pin = params.get('pin', '')
             request = PinVerifyRequest(pin=pin)
             try:
-                result = _run_async(verify_pin_code(request, db))
+                result = _run_async(verify_pin_code(request, db), loop)
                 return {
                     'action': 'verify_pin',
                     'status': 'ok',
@@ -172,7 +170,7 @@ def handle_auth_action(action: str, params: dict) -> dict:
             pin = params.get('pin', '')
             request = PinSetupRequest(pin=pin)
             try:
-                result = _run_async(setup_pin(request, db))
+                result = _run_async(setup_pin(request, db), loop)
                 return {
                     'action': 'set_pin',
                     'status': 'ok',
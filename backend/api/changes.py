@@ -0,0 +1,125 @@
+"""变更订阅 API 接口
+
+前端通过变更记录增量更新缓存：
+- GET /api/changes?since=seq：拉取 seq 之后的变更（IPC 模式断线补齐 / 轮询兜底）
+- GET /api/changes/stream：SSE 推送（开发模式；生产模式由 IPC 推送帧 db_changes 送达）
+"""
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from backend.db.cdc import change_feed
+from backend.schemas.common import success_response
+
+
+router = APIRouter(prefix="/api/changes", tags=["changes"])
+
+# 单个 SSE 连接积压的批次上限，超过后发送 reset 让前端全量刷新
+STREAM_QUEUE_SIZE = 256
+# 心跳间隔（秒），防止空闲连接被代理断开
+HEARTBEAT_SECONDS = 15.0
+
+
+@router.get("")
+async def get_changes(
+    since: int = Query(0, ge=0, description="上次收到的变更序号"),
+    limit: int = Query(500, ge=1, le=1000)
+):
+    """
+    获取指定序号之后的变更
+
+    reset 为 true 时缓冲区已不包含所需记录，前端应全量刷新
+    """
+    changes, reset = change_feed.since(since, limit)
+    return success_response(
+        data={
+            "seq": changes[-1]["seq"] if changes else change_feed.seq,
+            "reset": reset,
+            "changes": changes
+        },
+        message="获取变更成功"
+    )
+
+
+def _sse(event_type: str, seq: int, payload: dict) -> str:
+    data = json.dumps({"type": event_type, "seq": seq, **payload}, ensure_ascii=False)
+    return f"id: {seq}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="从该序号之后开始推送（默认只推送新变更）")
+):
+    """
+    变更推送（SSE）
+
+    每个提交批次一条事件：event: changes，data: {"type": "changes", "seq": 12, "changes": [...]}
+    断线重连时浏览器自动携带 Last-Event-ID，服务端从该序号补齐。
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    state = {"overflow": False}
+
+    def offer(batch: dict) -> None:
+        try:
+            queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            state["overflow"] = True
+
+    def listener(batch: dict) -> None:
+        # 在提交线程中调用，转交给本连接所在的事件循环
+        loop.call_soon_threadsafe(offer, batch)
+
+    async def generate():
+        # 在生成器内注册（响应未开始迭代就被丢弃时不遗留监听器）；先注册再补齐，重复的记录按 seq 过滤
+        change_feed.add_listener(listener)
+        last_seq = change_feed.seq if since is None else since
+        try:
+            if since is not None:
+                changes, reset = change_feed.since(since, limit=1000)
+                if reset:
+                    last_seq = change_feed.seq
+                    yield _sse("reset", last_seq, {})
+                elif changes:
+                    last_seq = changes[-1]["seq"]
+                    yield _sse("changes", last_seq, {"changes": changes})
+
+            while not await request.is_disconnected():
+                try:
+                    batch = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if state["overflow"]:
+                    # 消费过慢，丢弃积压并要求全量刷新
+                    while not queue.empty():
+                        queue.get_nowait()
+                    state["overflow"] = False
+                    last_seq = change_feed.seq
+                    yield _sse("reset", last_seq, {})
+                    continue
+
+                changes = [c for c in batch["changes"] if c["seq"] > last_seq]
+                if changes:
+                    last_seq = changes[-1]["seq"]
+                    yield _sse("changes", last_seq, {"changes": changes})
+        finally:
+            change_feed.remove_listener(listener)
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
@@ -0,0 +1,39 @@
+"""首页看板 API 接口"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+
+from backend.db.session import get_db
+from backend.services.dashboard_service import DashboardService
+from backend.schemas.common import success_response
+
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+
+@router.get("")
+async def get_dashboard(
+    days: int = Query(30, ge=1, le=365, description="每日趋势天数"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取首页看板数据
+
+    返回：
+    - scores: 八大系统当前评分和平均分
+    - dimensions: 各系统今日 / 区间内日志数、评分变化次数和评分区间
+    - diet: 今日 / 本月 / 区间内饮食偏离数
+    - journal: 日记数和心情分布
+    - daily: 每日日志、偏离、日记数量
+    """
+    data, status_code = DashboardService.get_dashboard(db, days=days)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取看板数据成功"
+    )
@@ -0,0 +1,63 @@
+"""
+诊断 API 接口（仅开发模式注册）
+
+暴露慢查询统计（用于定位全表扫描和设计索引）、响应缓存命中情况和事件总线投递统计
+"""
+from fastapi import APIRouter, Query
+
+from backend.agent.utils.event_bus import get_event_bus
+from backend.core.http_cache import response_cache
+from backend.db.profiler import query_profiler
+from backend.schemas.common import success_response
+
+
+router = APIRouter(prefix="/api/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=200, description="返回数量"),
+    order_by: str = Query("total_ms", description="排序字段：total_ms, max_ms, count")
+):
+    """
+    获取慢查询排行
+
+    按 SQL 指纹聚合，包含次数、平均/最大耗时、最慢样本参数和 EXPLAIN QUERY PLAN。
+    需设置环境变量 DB_SLOW_QUERY_ENABLED=true 才会采集。
+    """
+    return success_response(
+        data={
+            "enabled": query_profiler.enabled,
+            "threshold_ms": query_profiler.threshold_ms,
+            "queries": query_profiler.top(limit=limit, order_by=order_by)
+        },
+        message="获取慢查询统计成功"
+    )
+
+
+@router.delete("/slow-queries")
+async def reset_slow_queries():
+    """清空慢查询统计"""
+    cleared = query_profiler.reset()
+    return success_response(
+        data={"cleared": cleared},
+        message="慢查询统计已清空"
+    )
+
+
+@router.get("/response-cache")
+async def get_response_cache_stats():
+    """获取 ETag 响应缓存统计（304 次数、缓存命中、未命中）"""
+    return success_response(
+        data=response_cache.get_stats(),
+        message="获取响应缓存统计成功"
+    )
+
+
+@router.get("/event-bus")
+async def get_event_bus_metrics():
+    """获取事件总线投递统计（发布、合并、丢弃、投递、延迟）"""
+    return success_response(
+        data=get_event_bus().get_metrics(),
+        message="获取事件总线统计成功"
+    )
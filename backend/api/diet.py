@@ -1,5 +1,5 @@
 """饮食系统 API 接口"""
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, Request, status, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 
@@ -10,10 +10,13 @@ from backend.schemas.system import (
     FuelBaselineUpdate,
     FuelStatistics,
     MealDeviationCreate,
+    MealDeviationBatchCreate,
     MealDeviationUpdate,
     MealDeviationResponse,
 )
 from backend.schemas.common import success_response, error_response
+from backend.core.http_cache import response_cache
+from backend.core.serialization import json_response
 
 
 router = APIRouter(prefix="/api/diet", tags=["diet-system"])
@@ -22,25 +25,28 @@ router = APIRouter(prefix="/api/diet", tags=["diet-system"])
 # ============ 饮食基准管理 ============
 
 @router.get("/baseline")
-async def get_diet_baseline(db: Session = Depends(get_db)):
+async def get_diet_baseline(request: Request, db: Session = Depends(get_db)):
     """
     获取饮食基准
 
-    返回用户设置的早餐、午餐、晚餐和口味基准
+    返回用户设置的早餐、午餐、晚餐和口味基准（支持 ETag / If-None-Match）
     """
-    data, status_code = DietService.get_fuel_baseline(db)
-
-    if status_code >= 400:
-        raise HTTPException(
-            status_code=status_code,
-            detail=data
+    def build():
+        data, status_code = DietService.get_fuel_baseline(db)
+
+        if status_code >= 400:
+            raise HTTPException(
+                status_code=status_code,
+                detail=data
+            )
+
+        return success_response(
+            data=data["data"],
+            message=data["message"],
+            code=data["code"]
         )
 
-    return success_response(
-        data=data["data"],
-        message=data["message"],
-        code=data["code"]
-    )
+    return response_cache.conditional_get(request, ["users", "systems"], build)
 
 
 @router.put("/baseline")
@@ -99,6 +105,31 @@ async def create_deviation(
     )
 
 
+@router.post("/deviations/batch")
+async def create_deviations_batch(
+    request: MealDeviationBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    批量创建偏离事件
+
+    整批在一个事务内写入，饮食统计和评分只重算一次
+    """
+    data, status_code = DietService.create_meal_deviations_batch(db, request)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="偏离事件批量创建成功",
+        code=status_code
+    )
+
+
 @router.get("/deviations")
 async def get_deviations(
     start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
@@ -126,10 +157,11 @@ async def get_deviations(
             detail=data
         )
 
-    return success_response(
+    # 列表接口直接序列化，跳过 jsonable_encoder
+    return json_response(success_response(
         data=data,
         message="获取偏离事件成功"
-    )
+    ))
 
 
 @router.get("/deviations/{deviation_id}")
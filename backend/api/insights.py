@@ -1,16 +1,18 @@
 """AI 洞察 API 接口"""
-from fastapi import APIRouter, HTTPException, Depends, status, Query, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Request, status, Query, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import Literal
 
 from backend.db.session import get_db
 from backend.services.insight_service import InsightService
+from backend.services.insight_job_service import InsightJobService
 from backend.schemas.insight import (
     InsightGenerateRequest,
     InsightGenerateResponse,
     InsightResponse,
 )
 from backend.schemas.common import success_response, error_response
+from backend.core.http_cache import response_cache
 
 
 router = APIRouter(prefix="/api/insights", tags=["insights"])
@@ -71,11 +73,71 @@ async def get_insights(
 
 
 @router.get("/latest")
-async def get_latest_insight_endpoint(db: Session = Depends(get_db)):
+async def get_latest_insight_endpoint(request: Request, db: Session = Depends(get_db)):
     """
-    获取最新洞察
+    获取最新洞察（支持 ETag / If-None-Match）
     """
-    data, status_code = InsightService.get_latest_insight_endpoint(db)
+    def build():
+        data, status_code = InsightService.get_latest_insight_endpoint(db)
+
+        if status_code >= 400:
+            raise HTTPException(
+                status_code=status_code,
+                detail=data
+            )
+
+        return success_response(
+            data=data,
+            message="获取最新洞察成功"
+        )
+
+    return response_cache.conditional_get(request, ["insights"], build)
+
+
+@router.post("/jobs")
+async def create_insight_job(db: Session = Depends(get_db)):
+    """
+    提交后台洞察生成任务（立即返回，通过 /jobs/{job_id} 轮询进度）
+    """
+    data, status_code = InsightJobService.enqueue(db)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="洞察任务已提交"
+    )
+
+
+@router.get("/jobs/latest")
+async def get_latest_insight_job(db: Session = Depends(get_db)):
+    """
+    获取最近一个洞察任务
+    """
+    data, status_code = InsightJobService.get_latest_job(db)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取洞察任务成功"
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_insight_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    获取洞察任务状态
+    """
+    data, status_code = InsightJobService.get_job(db, job_id)
 
     if status_code >= 400:
         raise HTTPException(
@@ -85,7 +147,7 @@ async def get_latest_insight_endpoint(db: Session = Depends(get_db)):
 
     return success_response(
         data=data,
-        message="获取最新洞察成功"
+        message="获取洞察任务成功"
     )
 
 
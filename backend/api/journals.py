@@ -1,15 +1,23 @@
 """日记管理 API 接口"""
-from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi import APIRouter, HTTPException, Depends, Request, status, Query
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import Optional, Literal
+from typing import Optional, Literal, List
 
+from backend.core.serialization import json_response
 from backend.db.session import get_db
 from backend.services.journal_service import JournalService
+from backend.services.attachment_service import AttachmentService
+from backend.services.attachment_store import get_attachment_store
+from backend.services.diary_history_service import DiaryHistoryService
+from backend.services.journal_stats_service import JournalStatsService
 from backend.schemas.journal import (
     DiaryCreate,
+    DiaryBatchCreate,
     DiaryUpdate,
     DiaryResponse,
     DiaryDeleteResponse,
+    DiaryAttachmentImport,
     MoodType,
 )
 from backend.schemas.common import success_response, error_response
@@ -43,6 +51,31 @@ async def create_diary(
     )
 
 
+@router.post("/batch")
+async def create_diaries_batch(
+    request: DiaryBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    批量创建日记
+
+    整批在一个事务内写入，任一条目无效则全部不写入
+    """
+    data, status_code = JournalService.create_diaries_batch(db, request)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="日记批量创建成功",
+        code=status_code
+    )
+
+
 @router.get("")
 async def get_diaries(
     page: int = Query(1, ge=1),
@@ -72,10 +105,11 @@ async def get_diaries(
             detail=data
         )
 
-    return success_response(
+    # 列表接口直接序列化，跳过 jsonable_encoder
+    return json_response(success_response(
         data=data,
         message="获取日记列表成功"
-    )
+    ))
 
 
 @router.get("/{diary_id}")
@@ -143,3 +177,282 @@ async def delete_diary(
         data=data,
         message="日记删除成功"
     )
+
+
+# ============ 日记统计 ============
+
+@router.get("/stats/tags")
+async def get_tag_frequency(
+    days: Optional[int] = Query(None, ge=1, le=3650, description="最近 N 天，默认全部"),
+    mood: Optional[MoodType] = Query(None, description="只统计该心情的日记"),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """
+    获取标签使用频率
+    """
+    data, status_code = JournalStatsService.tag_frequency(db, days=days, mood=mood, limit=limit)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取标签统计成功"
+    )
+
+
+@router.get("/stats/mood-by-tag")
+async def get_mood_by_tag(
+    days: Optional[int] = Query(None, ge=1, le=3650, description="最近 N 天，默认全部"),
+    tags: Optional[List[str]] = Query(None, description="只统计这些标签，默认取最常用的标签"),
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """
+    获取标签 × 心情热力图
+    """
+    data, status_code = JournalStatsService.mood_by_tag(db, days=days, tags=tags, limit=limit)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取心情标签统计成功"
+    )
+
+
+@router.get("/stats/mood-timeline")
+async def get_mood_timeline(
+    days: Optional[int] = Query(90, ge=1, le=3650, description="最近 N 天"),
+    granularity: Literal["day", "week", "month"] = Query("week", description="聚合粒度"),
+    tag: Optional[str] = Query(None, max_length=50, description="只统计带该标签的日记"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取心情随时间的变化
+    """
+    data, status_code = JournalStatsService.mood_timeline(db, days=days, granularity=granularity, tag=tag)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取心情趋势成功"
+    )
+
+
+# ============ 日记历史版本 ============
+
+@router.get("/{diary_id}/history")
+async def list_diary_versions(
+    diary_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    获取日记的历史版本列表（只返回元数据，不含内容）
+    """
+    data, status_code = DiaryHistoryService.list_versions(db, diary_id)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取历史版本成功"
+    )
+
+
+@router.get("/{diary_id}/history/{version}")
+async def get_diary_version(
+    diary_id: int,
+    version: int,
+    db: Session = Depends(get_db)
+):
+    """
+    获取日记指定版本的完整内容
+    """
+    data, status_code = DiaryHistoryService.get_version(db, diary_id, version)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取历史版本成功"
+    )
+
+
+# ============ 日记附件 ============
+
+@router.post("/{diary_id}/attachments")
+async def upload_attachment(
+    diary_id: int,
+    request: Request,
+    filename: str = Query(..., max_length=255, description="原始文件名（用于判断类型）"),
+    db: Session = Depends(get_db)
+):
+    """
+    上传附件
+
+    请求体为文件的原始字节（非 multipart），服务端按块写入磁盘并计算 SHA-256，
+    相同内容的文件只保存一份。
+    """
+    data, status_code = await AttachmentService.upload_attachment(
+        db, diary_id, filename, request.stream()
+    )
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="附件上传成功",
+        code=status_code
+    )
+
+
+@router.post("/{diary_id}/attachments/import")
+def import_attachment(
+    diary_id: int,
+    request: DiaryAttachmentImport,
+    http_request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    从本地文件导入附件（IPC 模式使用，文件由后端按块复制）
+
+    路径由 Electron 主进程的文件选择对话框给出，只接受经过认证的 IPC 请求；
+    开发模式的 HTTP 服务不开放此接口，避免本机任意页面读取本地文件。
+    """
+    if not getattr(http_request.app.state, "local_file_access", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=error_response(message="仅支持在桌面应用中导入本地文件", code=403)
+        )
+
+    data, status_code = AttachmentService.import_attachment(
+        db, diary_id, request.source_path, request.filename
+    )
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="附件导入成功",
+        code=status_code
+    )
+
+
+@router.get("/{diary_id}/attachments")
+async def list_attachments(
+    diary_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    获取日记的附件列表
+    """
+    data, status_code = AttachmentService.list_attachments(db, diary_id)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取附件列表成功"
+    )
+
+
+@router.get("/attachments/{attachment_id}")
+async def download_attachment(
+    attachment_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    下载附件（支持 Range 请求，视频可拖动播放）
+    """
+    attachment = AttachmentService.get_attachment(db, attachment_id)
+    if not attachment:
+        raise HTTPException(status_code=404, detail=error_response(message="附件不存在", code=404))
+
+    return FileResponse(
+        get_attachment_store().blob_path(attachment.sha256),
+        media_type=attachment.mime_type,
+        filename=attachment.filename,
+        content_disposition_type="inline",
+        headers={"Cache-Control": "private, max-age=31536000, immutable"},
+    )
+
+
+@router.get("/attachments/{attachment_id}/thumbnail")
+def get_attachment_thumbnail(
+    attachment_id: int,
+    size: Optional[int] = Query(None, ge=32, le=1024),
+    db: Session = Depends(get_db)
+):
+    """
+    获取图片缩略图（首次请求时生成并缓存；无法生成时返回原图）
+    """
+    attachment = AttachmentService.get_attachment(db, attachment_id)
+    if not attachment or attachment.file_type != "image":
+        raise HTTPException(status_code=404, detail=error_response(message="附件不存在", code=404))
+
+    store = get_attachment_store()
+    thumbnail = store.thumbnail(attachment.sha256, size)
+    if thumbnail is None:
+        return FileResponse(store.blob_path(attachment.sha256), media_type=attachment.mime_type)
+
+    return FileResponse(
+        thumbnail,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "private, max-age=31536000, immutable"},
+    )
+
+
+@router.delete("/attachments/{attachment_id}")
+async def delete_attachment(
+    attachment_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    删除附件（内容不再被引用时删除 blob）
+    """
+    data, status_code = AttachmentService.delete_attachment(db, attachment_id)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="附件删除成功"
+    )
@@ -1,23 +1,81 @@
 """八大系统 API 接口"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
 from sqlalchemy.orm import Session
 
 from backend.db.session import get_db
 from backend.services.system_service import SystemService
+from backend.services.analytics_service import AnalyticsService
+from backend.schemas.system import SystemLogBatchCreate
 from backend.schemas.common import success_response
+from backend.core.http_cache import response_cache
 
 
 router = APIRouter(prefix="/api/systems", tags=["systems"])
 
 
 @router.get("/scores")
-async def get_all_systems_scores(db: Session = Depends(get_db)):
+async def get_all_systems_scores(request: Request, db: Session = Depends(get_db)):
     """
     获取八大系统评分摘要
 
-    返回所有系统的当前评分和平均分
+    返回所有系统的当前评分和平均分（支持 ETag / If-None-Match）
     """
-    data, status_code = SystemService.get_all_systems_scores(db)
+    def build():
+        data, status_code = SystemService.get_all_systems_scores(db)
+
+        if status_code >= 400:
+            raise HTTPException(
+                status_code=status_code,
+                detail=data
+            )
+
+        return success_response(
+            data=data["data"],
+            message=data["message"],
+            code=data["code"]
+        )
+
+    return response_cache.conditional_get(request, ["users", "systems"], build)
+
+
+@router.get("/trends")
+async def get_systems_trends(
+    days: int = Query(30, ge=7, le=365, description="统计天数"),
+    window: int = Query(7, ge=1, le=30, description="滑动平均窗口（天）"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取八大系统的评分趋势分析
+
+    包含每日评分、滑动平均、连续记录天数、饮食偏离和心情，以及各维度间的相关系数。
+    结果缓存到相关数据表有新的写入为止。
+    """
+    data, status_code = AnalyticsService.get_trends(db, days=days, window=window)
+
+    if status_code >= 400:
+        raise HTTPException(
+            status_code=status_code,
+            detail=data
+        )
+
+    return success_response(
+        data=data,
+        message="获取趋势分析成功"
+    )
+
+
+@router.post("/{system_type}/logs/batch")
+async def create_system_logs_batch(
+    system_type: str,
+    request: SystemLogBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    批量创建系统日志
+
+    system_type 为八维系统类型（如 PHYSICAL），系统不存在时自动创建
+    """
+    data, status_code = SystemService.create_system_logs_batch(db, system_type, request)
 
     if status_code >= 400:
         raise HTTPException(
@@ -26,7 +84,7 @@ async def get_all_systems_scores(db: Session = Depends(get_db)):
         )
 
     return success_response(
-        data=data["data"],
-        message=data["message"],
-        code=data["code"]
-    )
\ No newline at end of file
+        data=data,
+        message="系统日志批量创建成功",
+        code=status_code
+    )
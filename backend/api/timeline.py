@@ -5,6 +5,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 
+from backend.core.serialization import json_response
 from backend.db.session import get_db
 from backend.services.timeline_service import TimelineService
 from backend.schemas.timeline import TimelineEventType
@@ -49,7 +50,8 @@ async def get_timeline(
             detail=data
         )
 
-    return success_response(
+    # 列表接口直接序列化，跳过 jsonable_encoder
+    return json_response(success_response(
         data=data,
         message="获取审计时间轴成功"
-    )
+    ))
@@ -1,5 +1,5 @@
 """用户配置 API 接口"""
-from fastapi import APIRouter, HTTPException, Depends, status, Body
+from fastapi import APIRouter, HTTPException, Depends, Request, status, Body
 from sqlalchemy.orm import Session
 from typing import Optional
 from pydantic import BaseModel, Field
@@ -15,6 +15,7 @@ from backend.schemas.user import (
     AIConfigResponse,
 )
 from backend.schemas.common import success_response, error_response
+from backend.core.http_cache import response_cache
 
 
 router = APIRouter(prefix="/api/user", tags=["user"])
@@ -32,22 +33,25 @@ class APIKeyVerifyRequest(BaseModel):
 # ============ 用户信息 ============
 
 @router.get("/profile")
-async def get_user_profile(db: Session = Depends(get_db)):
+async def get_user_profile(request: Request, db: Session = Depends(get_db)):
     """
-    获取用户信息
+    获取用户信息（支持 ETag / If-None-Match）
     """
-    data, status_code = UserService.get_user_profile(db)
+    def build():
+        data, status_code = UserService.get_user_profile(db)
 
-    if status_code >= 400:
-        raise HTTPException(
-            status_code=status_code,
-            detail=data
+        if status_code >= 400:
+            raise HTTPException(
+                status_code=status_code,
+                detail=data
+            )
+
+        return success_response(
+            data=data,
+            message="获取用户信息成功"
         )
 
-    return success_response(
-        data=data,
-        message="获取用户信息成功"
-    )
+    return response_cache.conditional_get(request, ["users"], build)
 
 
 @router.patch("/profile")
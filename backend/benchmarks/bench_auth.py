@@ -0,0 +1,65 @@
+"""
+PIN 校验事件循环阻塞基准测试
+
+在同一个事件循环里并发执行若干次 PIN 校验，同时用一个定时心跳模拟其他 UI 请求，
+统计心跳的最大延迟（事件循环被阻塞的时间）：
+- sync：原先在 async 路由内直接调用 bcrypt.checkpw
+- pool：AuthService.verify_pin_hash_async（bcrypt 在专用线程池中执行）
+
+用法:
+    python backend/benchmarks/bench_auth.py [--checks 8] [--tick-ms 5]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services.auth_service import AuthService
+
+
+async def _verify_sync(pin: str, pin_hash: str) -> bool:
+    return AuthService.verify_pin_hash(pin, pin_hash)
+
+
+async def _run(verify, checks: int, tick: float, pin_hash: str):
+    """返回 (校验总耗时 秒, 心跳最大延迟 毫秒)"""
+    done = asyncio.Event()
+    lags = []
+
+    async def heartbeat():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append(time.perf_counter() - start - tick)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(tick)
+    start = time.perf_counter()
+    await asyncio.gather(*(verify("000000", pin_hash) for _ in range(checks)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await beat
+    return elapsed, max(lags) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PIN verification event loop benchmark")
+    parser.add_argument("--checks", type=int, default=8)
+    parser.add_argument("--tick-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    pin_hash = AuthService.hash_pin("123456")
+    print("=" * 72)
+    print(f"PIN verify benchmark (checks={args.checks}, heartbeat={args.tick_ms} ms)")
+    print("=" * 72)
+    for name, verify in (("sync", _verify_sync), ("pool", AuthService.verify_pin_hash_async)):
+        elapsed, max_lag = asyncio.run(_run(verify, args.checks, args.tick_ms / 1000, pin_hash))
+        print(f"{name:<6} total {elapsed * 1000:8.1f} ms   max event loop stall {max_lag:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+日志吞吐基准测试
+
+多线程并发写日志，对比调用方看到的耗时：
+- sync：原先的同步 handler（控制台 + app.log + error.log，调用线程内 JSON 格式化和写盘）
+- queue：setup_logging 的队列管道（调用线程只入队，后台线程格式化和写盘）
+
+--emit-delay-ms 给每次写出附加延迟，模拟慢磁盘 / 被阻塞的 stderr 管道。
+最后统计 Agent 追踪日志限速（TraceSampler）放行的比例。
+
+用法:
+    python backend/benchmarks/bench_logging.py [--records 20000] [--threads 4] [--emit-delay-ms 0.05]
+"""
+import argparse
+import io
+import logging
+import logging.handlers
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.core.logging_config import JSONFormatter, TraceSampler, setup_logging, stop_logging
+
+
+class _SlowStream(io.StringIO):
+    """每次 flush 附加固定延迟的输出流"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def flush(self):
+        if self.delay:
+            time.sleep(self.delay)
+        self.seek(0)
+        self.truncate()
+
+
+def _setup_sync(log_dir: Path, stream) -> None:
+    """基线：与改造前 setup_logging 相同的同步 handler"""
+    logger = logging.getLogger()
+    logger.handlers.clear()
+    logger.setLevel(logging.INFO)
+    formatter = JSONFormatter()
+    console = logging.StreamHandler(stream)
+    console.setFormatter(formatter)
+    logger.addHandler(console)
+    for name, level in (("app.log", logging.DEBUG), ("error.log", logging.ERROR)):
+        handler = logging.handlers.RotatingFileHandler(
+            log_dir / name, maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8"
+        )
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+
+def _teardown() -> None:
+    stop_logging()
+    logger = logging.getLogger()
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers.clear()
+
+
+def _drive(records: int, threads: int):
+    """返回 (调用方总吞吐 条/秒, 单次调用 p99 耗时 微秒)"""
+    log = logging.getLogger("bench.logging")
+    per_thread = records // threads
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(n: int):
+        local = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            log.info("request handled: path=%s status=%d elapsed=%.2fms", f"/api/journal/{i}", 200, 1.5)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    return per_thread * threads / elapsed, p99
+
+
+def bench_pipelines(records: int, threads: int, delay: float) -> None:
+    for name in ("sync", "queue"):
+        with tempfile.TemporaryDirectory() as tmp:
+            stream = _SlowStream(delay)
+            if name == "sync":
+                _setup_sync(Path(tmp), stream)
+            else:
+                setup_logging(log_dir=tmp, stream=stream, queue_size=records * 2)
+            rate, p99 = _drive(records, threads)
+            drain_start = time.perf_counter()
+            _teardown()
+            drain = time.perf_counter() - drain_start
+        print(f"{name:<6} {rate:12,.0f} records/s (caller)   p99 {p99:9.1f} us   drain {drain:6.2f} s")
+
+
+def bench_sampler(records: int, rate: float, burst: int) -> None:
+    sampler = TraceSampler(rate, burst)
+    record = logging.LogRecord("agent", logging.INFO, __file__, 0, "[ReAct] Thought: %s", ("...",), None)
+    record.trace = "thought"
+    start = time.perf_counter()
+    passed = sum(1 for _ in range(records) if sampler.filter(record))
+    elapsed = time.perf_counter() - start
+    print(
+        f"sampler: {passed}/{records} trace records passed in {elapsed * 1000:.1f} ms "
+        f"(rate={rate}/s, burst={burst}, {elapsed / records * 1e9:.0f} ns/record)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logging pipeline benchmark")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--emit-delay-ms", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Logging benchmark (records={args.records}, threads={args.threads}, emit delay={args.emit_delay_ms} ms)")
+    print("=" * 72)
+    bench_pipelines(args.records, args.threads, args.emit_delay_ms / 1000)
+    print("-" * 72)
+    bench_sampler(args.records, rate=5, burst=20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+中间件开销基准测试
+
+直接以 ASGI 调用方式驱动一个最小 JSON 接口，对比：
+- bare：无自定义中间件
+- legacy：原先的四层 BaseHTTPMiddleware（安全头、请求日志、限流、超时）
+- fused：RequestPipelineMiddleware（单层纯 ASGI）
+
+用法:
+    python backend/benchmarks/bench_middleware.py [--requests 5000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+
+from backend.core.middleware import RequestPipelineMiddleware, rate_limiter
+
+
+# ============ 基线：原 BaseHTTPMiddleware 实现 ============
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        client_ip = request.client.host if request.client else "unknown"
+        allowed, limit_info = rate_limiter.is_allowed(client_ip, "default")
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(limit_info["limit"])
+        response.headers["X-RateLimit-Remaining"] = str(limit_info["remaining"])
+        response.headers["X-RateLimit-Reset"] = limit_info["reset"]
+        if not allowed:
+            return JSONResponse(status_code=429, content={"code": 429})
+        return response
+
+
+class LegacyTimeoutMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        return await asyncio.wait_for(call_next(request), timeout=30.0)
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.headers["Content-Security-Policy"] = "default-src 'self'"
+        return response
+
+
+class LegacyRequestLoggingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = datetime.now()
+        response = await call_next(request)
+        process_time = (datetime.now() - start_time).total_seconds() * 1000
+        response.headers["X-Process-Time"] = f"{process_time:.2f}ms"
+        return response
+
+
+# ============ 测试应用 ============
+
+def build_app(mode: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"code": 200, "message": "pong", "data": {"action": "pong"}}
+
+    if mode == "legacy":
+        app.add_middleware(LegacySecurityHeadersMiddleware)
+        app.add_middleware(LegacyRequestLoggingMiddleware)
+        app.add_middleware(LegacyRateLimitMiddleware)
+        app.add_middleware(LegacyTimeoutMiddleware)
+    elif mode == "fused":
+        app.add_middleware(RequestPipelineMiddleware, timeout=30.0)
+    return app
+
+
+async def drive(app, count: int) -> float:
+    """直接调用 ASGI 应用，返回平均每请求耗时（微秒）"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/ping",
+        "raw_path": b"/api/ping",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"127.0.0.1")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    # 预热（触发路由编译、lifespan 外的惰性初始化）
+    for _ in range(100):
+        await app(dict(scope), receive, send)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Middleware overhead benchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    # 避免限流影响测量
+    rate_limiter.rate_limits["default"] = {"capacity": 10 ** 9, "refill_rate": 10 ** 9}
+
+    print("=" * 60)
+    print(f"Middleware benchmark ({args.requests} requests)")
+    print("=" * 60)
+    results = {}
+    for mode in ("bare", "legacy", "fused"):
+        results[mode] = asyncio.run(drive(build_app(mode), args.requests))
+        overhead = results[mode] - results["bare"]
+        print(f"{mode:<8} {results[mode]:>8.1f} us/request    overhead: {overhead:>7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
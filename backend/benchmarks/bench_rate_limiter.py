@@ -0,0 +1,122 @@
+"""
+限流器微基准测试
+
+使用 10k 个不同的客户端键（模拟大量客户端突发请求），对比：
+- legacy：原实现（每次检查补充三次令牌，超过 100 个 IP 后每次请求全量扫描）
+- lru：RateLimiter（单次补充，LRU 队首均摊 O(1) 淘汰）
+
+用法:
+    python backend/benchmarks/bench_rate_limiter.py [--keys 10000] [--checks 200000]
+"""
+import argparse
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.core.middleware import RateLimiter
+
+
+# ============ 基线：原实现 ============
+
+class LegacyTokenBucket:
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.refill_rate = refill_rate
+        self.last_update = time.time()
+
+    def refill(self):
+        now = time.time()
+        elapsed = now - self.last_update
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.last_update = now
+
+    def consume(self, tokens=1):
+        self.refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def get_remaining(self):
+        self.refill()
+        return int(self.tokens)
+
+    def get_wait_time(self, tokens=1):
+        self.refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.refill_rate
+
+
+class LegacyRateLimiter:
+    def __init__(self):
+        self.buckets = defaultdict(dict)
+        self.rate_limits = {"default": {"capacity": 120, "refill_rate": 2.0}}
+
+    def is_allowed(self, ip, endpoint_type="default", tokens=1):
+        config = self.rate_limits["default"]
+        if endpoint_type not in self.buckets[ip]:
+            self.buckets[ip][endpoint_type] = LegacyTokenBucket(config["capacity"], config["refill_rate"])
+        bucket = self.buckets[ip][endpoint_type]
+        allowed = bucket.consume(tokens)
+        wait_time = bucket.get_wait_time(config["capacity"])
+        reset_time = datetime.now() + timedelta(seconds=wait_time)
+        self._cleanup_idle_buckets()
+        return allowed, {"limit": config["capacity"], "remaining": bucket.get_remaining(), "reset": reset_time.isoformat()}
+
+    def _cleanup_idle_buckets(self):
+        if len(self.buckets) <= 100:
+            return
+        now = time.time()
+        keys_to_remove = []
+        for ip_key, buckets in self.buckets.items():
+            all_full = all(b.tokens >= b.capacity for b in buckets.values())
+            all_old = all(now - b.last_update > 300 for b in buckets.values())
+            if all_full or all_old:
+                keys_to_remove.append(ip_key)
+        for k in keys_to_remove[:50]:
+            del self.buckets[k]
+
+
+def run(name: str, limiter, keys, checks: int) -> None:
+    start = time.perf_counter()
+    allowed = 0
+    for i in range(checks):
+        ok, _ = limiter.is_allowed(keys[i % len(keys)], "default")
+        allowed += ok
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<8} {elapsed / checks * 1e6:>8.2f} us/check    "
+        f"allowed: {allowed:>7}    buckets: {len(limiter.buckets)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limiter microbenchmark")
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--checks", type=int, default=200000)
+    parser.add_argument("--legacy-checks", type=int, default=2000,
+                        help="legacy 实现为 O(n)，使用较少的检查次数")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    keys = [f"10.{rng.randint(0, 255)}.{n // 256 % 256}.{n % 256}" for n in range(args.keys)]
+    rng.shuffle(keys)
+
+    print("=" * 60)
+    print(f"Rate limiter benchmark ({args.keys} distinct client keys)")
+    print("=" * 60)
+    run("legacy", LegacyRateLimiter(), keys, args.legacy_checks)
+    run("lru", RateLimiter(), keys, args.checks)
+    run("lru-cap", RateLimiter(max_buckets=1000), keys, args.checks)
+
+
+if __name__ == "__main__":
+    main()
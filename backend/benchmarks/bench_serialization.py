@@ -0,0 +1,188 @@
+"""
+JSON 序列化基准测试
+
+在临时数据库中写入大量日记和饮食偏离事件，对比大列表接口各阶段的旧实现与新实现：
+- 列表导出：逐条 model_validate().model_dump() vs dump_list()
+- 响应序列化：jsonable_encoder + JSONResponse vs json_response()（orjson）
+- 时间轴：为全部事件创建模型 vs 只为当前页创建
+- 端到端：通过 ASGI 调用 /api/journal 和 /api/timeline
+
+用法:
+    python backend/benchmarks/bench_serialization.py [--diaries 5000] [--deviations 2000] [--page-size 100] [--rounds 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+# 必须在导入 backend 模块之前指定临时数据库
+_tmp_dir = tempfile.mkdtemp(prefix="bench_serialization_")
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_tmp_dir) / 'bench.db'}"
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert
+
+from backend.core import serialization
+from backend.core.serialization import FastJSONResponse, dump_list, json_response
+from backend.db.init_db import init_db
+from backend.db.session import SessionLocal
+from backend.models.diary import Diary
+from backend.models.dimension import MealDeviation
+from backend.models.user import User
+from backend.schemas.common import success_response
+from backend.schemas.journal import DiaryResponse
+from backend.schemas.timeline import TimelineEventItem
+from backend.services.diet_service import DietService
+from backend.services.journal_service import JournalService
+from backend.services.timeline_service import TimelineService
+
+
+def _seed(diaries: int, deviations: int) -> None:
+    db = SessionLocal()
+    init_db(db)
+    user = db.query(User).first()
+    system = DietService.get_or_create_fuel_system(db, user.id)
+    now = datetime.now()
+    moods = ["great", "good", "neutral", "bad", "terrible"]
+    db.execute(insert(Diary), [
+        {
+            "user_id": user.id,
+            "title": f"日记 {i}",
+            "content": "今天完成了计划中的事情，记录一下心得。" * 20,
+            "mood": moods[i % len(moods)],
+            "tags": ["工作", "阅读"] if i % 2 else ["运动"],
+            "created_at": now - timedelta(minutes=37 * i),
+            "updated_at": now - timedelta(minutes=37 * i),
+        }
+        for i in range(diaries)
+    ])
+    db.execute(insert(MealDeviation), [
+        {
+            "system_id": system.id,
+            "description": f"晚餐多吃了一份甜点 {i}",
+            "occurred_at": now - timedelta(minutes=53 * i),
+        }
+        for i in range(deviations)
+    ])
+    db.commit()
+    db.close()
+
+
+def _timeit(fn, rounds: int) -> float:
+    """返回平均耗时（毫秒）"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def _report(name: str, legacy_ms: float, fast_ms: float) -> None:
+    print(f"{name:<28} legacy {legacy_ms:9.3f} ms   fast {fast_ms:9.3f} ms   x{legacy_ms / fast_ms:5.2f}")
+
+
+def _legacy_timeline_events(db, user_id: int) -> list:
+    """基线：旧实现为全部日记创建事件模型"""
+    events = []
+    for diary in db.query(Diary).filter(Diary.user_id == user_id).all():
+        events.append(TimelineEventItem(
+            id=f"diary_{diary.id}",
+            type="diary",
+            title=diary.title or "无标题日记",
+            content=diary.content or "",
+            time=diary.created_at.strftime("%H:%M"),
+            timestamp=int(diary.created_at.timestamp() * 1000),
+        ))
+    events.sort(key=lambda x: x.timestamp, reverse=True)
+    return events
+
+
+def bench_stages(page_size: int, rounds: int) -> None:
+    db = SessionLocal()
+    user = db.query(User).first()
+    diaries = db.query(Diary).order_by(Diary.created_at.desc()).limit(page_size).all()
+
+    _report(
+        f"dump list ({page_size} diaries)",
+        _timeit(lambda: [DiaryResponse.model_validate(d).model_dump() for d in diaries], rounds),
+        _timeit(lambda: dump_list(DiaryResponse, diaries), rounds),
+    )
+
+    journal_page, _ = JournalService.get_diaries(db, page_size=page_size)
+    payload = success_response(data=journal_page)
+    _report(
+        "render journal page",
+        _timeit(lambda: JSONResponse(jsonable_encoder(payload)).body, rounds),
+        _timeit(lambda: json_response(payload).body, rounds),
+    )
+
+    timeline_page, _ = TimelineService.get_timeline(db, page_size=page_size)
+    payload = success_response(data=timeline_page)
+    _report(
+        "render timeline page",
+        _timeit(lambda: JSONResponse(jsonable_encoder(payload)).body, rounds),
+        _timeit(lambda: json_response(payload).body, rounds),
+    )
+
+    _report(
+        "timeline service",
+        _timeit(lambda: _legacy_timeline_events(db, user.id), max(rounds // 10, 1)),
+        _timeit(lambda: TimelineService.get_timeline(db, type="diary", page_size=page_size), max(rounds // 10, 1)),
+    )
+    db.close()
+
+
+def bench_endpoints(page_size: int, rounds: int) -> None:
+    from backend.api.journals import router as journals_router
+    from backend.api.timeline import router as timeline_router
+
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.include_router(journals_router)
+    app.include_router(timeline_router)
+
+    async def run(path: str) -> float:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get(path)
+            start = time.perf_counter()
+            for _ in range(rounds):
+                response = await client.get(path)
+                assert response.status_code == 200
+            return (time.perf_counter() - start) / rounds * 1000
+
+    for path in (f"/api/journal?page_size={page_size}", f"/api/timeline?page_size={page_size}"):
+        print(f"GET {path:<36} {asyncio.run(run(path)):9.3f} ms/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON serialization benchmark")
+    parser.add_argument("--diaries", type=int, default=5000)
+    parser.add_argument("--deviations", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(
+        f"Serialization benchmark (diaries={args.diaries}, deviations={args.deviations}, "
+        f"page_size={args.page_size}, orjson={'yes' if serialization.orjson else 'no'})"
+    )
+    print("=" * 80)
+    _seed(args.diaries, args.deviations)
+    bench_stages(args.page_size, args.rounds)
+    print("-" * 80)
+    bench_endpoints(args.page_size, max(args.rounds // 4, 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+SQLite 引擎配置基准测试
+
+对比旧配置（QueuePool 5+10、pool_pre_ping、仅 WAL）与调优配置
+（连接级 PRAGMA、单写连接 + 读连接池、关闭 pre-ping）的读写吞吐。
+
+用法:
+    python backend/benchmarks/bench_sqlite_engine.py [--writes 2000] [--reads 20000] [--threads 4]
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+
+from backend.db.session import create_db_engine
+
+
+def _legacy_engine(url: str):
+    """基线：与调优前 session.py 相同的配置"""
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        future=True
+    )
+
+    @event.listens_for(engine, "connect")
+    def _wal(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+    return engine, engine
+
+
+def _tuned_engine(url: str):
+    return create_db_engine(url, role="reader"), create_db_engine(url, role="writer")
+
+
+def _prepare(write_engine):
+    with write_engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS bench (id INTEGER PRIMARY KEY, k INTEGER, payload TEXT)"
+        ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bench_k ON bench (k)"))
+
+
+def _bench_writes(write_engine, count: int) -> float:
+    """每次写入一个独立事务（模拟 API 单条创建）"""
+    start = time.perf_counter()
+    for i in range(count):
+        with write_engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO bench (k, payload) VALUES (:k, :p)"),
+                {"k": i % 100, "p": "x" * 200}
+            )
+    return count / (time.perf_counter() - start)
+
+
+def _bench_reads(read_engine, count: int, threads: int) -> float:
+    """多线程短查询（每次取连接 → 查询 → 归还，模拟 API 读请求）"""
+    per_thread = count // threads
+
+    def worker():
+        for i in range(per_thread):
+            with read_engine.connect() as conn:
+                conn.execute(text("SELECT COUNT(*) FROM bench WHERE k = :k"), {"k": i % 100}).scalar()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def run(name: str, factory, writes: int, reads: int, threads: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/bench.db"
+        read_engine, write_engine = factory(url)
+        try:
+            _prepare(write_engine)
+            write_tps = _bench_writes(write_engine, writes)
+            read_qps = _bench_reads(read_engine, reads, threads)
+            print(f"{name:<8} writes: {write_tps:>10.0f} tx/s    reads: {read_qps:>10.0f} q/s")
+        finally:
+            read_engine.dispose()
+            write_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite engine profile benchmark")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"SQLite engine benchmark (writes={args.writes}, reads={args.reads}, threads={args.threads})")
+    print("=" * 60)
+    run("legacy", _legacy_engine, args.writes, args.reads, args.threads)
+    run("tuned", _tuned_engine, args.writes, args.reads, args.threads)
+
+
+if __name__ == "__main__":
+    main()
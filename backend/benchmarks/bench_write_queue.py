@@ -0,0 +1,166 @@
+"""
+单写队列基准测试
+
+混合负载：多个写线程各自提交小事务（模拟 Agent 消息持久化 + API 写入），
+同时有读线程持续查询。对比：
+- legacy：旧配置（15 连接池，各线程直接提交，依赖 busy 重试）
+- queue：通过 WriteQueue 单写线程组提交
+
+用法:
+    python backend/benchmarks/bench_write_queue.py [--writers 8] [--writes 300] [--readers 2]
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+
+def _legacy_engine(url: str):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": 1},
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        future=True
+    )
+
+    @event.listens_for(engine, "connect")
+    def _wal(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+    return engine
+
+
+def _insert(conn, i: int) -> None:
+    conn.execute(
+        text("INSERT INTO bench (k, payload) VALUES (:k, :p)"),
+        {"k": i % 100, "p": "x" * 200}
+    )
+
+
+def _readers(read_engine, stop: threading.Event, count: int):
+    def worker():
+        while not stop.is_set():
+            with read_engine.connect() as conn:
+                conn.execute(text("SELECT COUNT(*) FROM bench WHERE k = 7")).scalar()
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def bench_legacy(url: str, writers: int, writes: int, readers: int) -> None:
+    engine = _legacy_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE bench (id INTEGER PRIMARY KEY, k INTEGER, payload TEXT)"))
+
+    errors = [0]
+    lock = threading.Lock()
+
+    def writer(offset: int):
+        for i in range(writes):
+            try:
+                with engine.begin() as conn:
+                    _insert(conn, offset + i)
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+
+    stop = threading.Event()
+    reader_threads = _readers(engine, stop, readers)
+    threads = [threading.Thread(target=writer, args=(n * writes,)) for n in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in reader_threads:
+        t.join()
+    engine.dispose()
+
+    ok = writers * writes - errors[0]
+    print(f"legacy   {ok / elapsed:>10.0f} writes/s    lock errors: {errors[0]}")
+
+
+def bench_queue(url: str, writers: int, writes: int, readers: int) -> None:
+    from backend.db import session as db_session
+    from backend.db.write_queue import WriteQueue
+
+    # 指向临时数据库
+    db_session.DatabaseManager._original_url = url
+    db_session.DatabaseManager.recreate_engine()
+    with db_session.write_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE bench (id INTEGER PRIMARY KEY, k INTEGER, payload TEXT)"))
+
+    queue = WriteQueue()
+    errors = [0]
+    lock = threading.Lock()
+
+    def writer(offset: int):
+        futures = [
+            queue.submit(lambda db, i=offset + i: _insert(db, i))
+            for i in range(writes)
+        ]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    stop = threading.Event()
+    reader_threads = _readers(db_session.engine, stop, readers)
+    threads = [threading.Thread(target=writer, args=(n * writes,)) for n in range(writers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in reader_threads:
+        t.join()
+    queue.stop()
+
+    stats = queue.get_stats()
+    ok = writers * writes - errors[0]
+    print(
+        f"queue    {ok / elapsed:>10.0f} writes/s    lock errors: {errors[0]}    "
+        f"batches: {stats['batches']} (max {stats['max_batch_size']})"
+    )
+    db_session.DatabaseManager.close_all_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write queue mixed-load benchmark")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=300)
+    parser.add_argument("--readers", type=int, default=2)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Write queue benchmark (writers={args.writers}, writes={args.writes}, readers={args.readers})")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_legacy(f"sqlite:///{tmp}/legacy.db", args.writers, args.writes, args.readers)
+        bench_queue(f"sqlite:///{tmp}/queue.db", args.writers, args.writes, args.readers)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,10 +28,38 @@ class Settings(BaseSettings):
     DATA_DIR: Path = Path(os.getenv("APP_DATA_DIR", BASE_DIR))
     SQLITE_URL: str = f"sqlite:///{DATA_DIR}/life_canvas.db"
     DATABASE_URL: str = os.getenv("DATABASE_URL", SQLITE_URL)
+    # 慢查询诊断（开发模式使用，记录超过阈值的 SQL 及其执行计划）
+    DB_SLOW_QUERY_ENABLED: bool = os.getenv("DB_SLOW_QUERY_ENABLED", "False").lower() == "true"
+    DB_SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("DB_SLOW_QUERY_THRESHOLD_MS", "50.0"))
+    # 读连接池大小（写入固定使用单连接）
+    # 取连接是阻塞调用：async 路由在 await 期间不要持有会话的读事务（先 commit/close 释放连接），
+    # 否则并发请求占满连接池后，事件循环线程会阻塞在取连接上
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", "5"))
+    DB_READ_POOL_OVERFLOW: int = int(os.getenv("DB_READ_POOL_OVERFLOW", "10"))
+    # 取连接的超时时间（秒）
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # SQLite 连接参数
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+    SQLITE_MMAP_SIZE_MB: int = int(os.getenv("SQLITE_MMAP_SIZE_MB", "128"))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # 变更捕获（CDC）保留的最近变更条数（断线重连补齐用）
+    CDC_BUFFER_SIZE: int = int(os.getenv("CDC_BUFFER_SIZE", "1000"))
 
     # ============ 备份配置 ============
     BACKUP_DIR: Path = Path(os.getenv("BACKUP_DIR", DATA_DIR / "backups"))
 
+    # ============ 日记历史配置 ============
+    # 每隔多少个版本保存一次全文关键帧（还原任意版本最多应用 N-1 个增量）
+    DIARY_HISTORY_KEYFRAME_INTERVAL: int = int(os.getenv("DIARY_HISTORY_KEYFRAME_INTERVAL", "10"))
+
+    # ============ 附件配置 ============
+    # 附件按 SHA-256 内容寻址存储，相同文件只保存一份
+    ATTACHMENT_DIR: Path = Path(os.getenv("ATTACHMENT_DIR", DATA_DIR / "attachments"))
+    ATTACHMENT_MAX_BYTES: int = int(os.getenv("ATTACHMENT_MAX_BYTES", str(500 * 1024 * 1024)))
+    ATTACHMENT_CHUNK_SIZE: int = int(os.getenv("ATTACHMENT_CHUNK_SIZE", str(1024 * 1024)))
+    # 缩略图最长边（像素），需要安装 Pillow
+    ATTACHMENT_THUMBNAIL_SIZE: int = int(os.getenv("ATTACHMENT_THUMBNAIL_SIZE", "320"))
+
     # ============ 安全配置 ============
     # 加密密钥 - 优先从环境变量读取，否则生成并保存
     ENCRYPTION_KEY: Optional[str] = os.getenv("ENCRYPTION_KEY")
@@ -40,6 +68,8 @@ class Settings(BaseSettings):
     PIN_MAX_ATTEMPTS: int = int(os.getenv("PIN_MAX_ATTEMPTS", "3"))
     PIN_LOCK_DURATION_SECONDS: int = int(os.getenv("PIN_LOCK_DURATION", "30"))
     PIN_MIN_LENGTH: int = int(os.getenv("PIN_MIN_LENGTH", "6"))
+    # bcrypt 专用线程池大小（PIN 哈希 / 校验不占用事件循环）
+    AUTH_HASH_WORKERS: int = int(os.getenv("AUTH_HASH_WORKERS", "2"))
 
     # 会话配置
     SESSION_EXPIRE_SECONDS: int = int(os.getenv("SESSION_EXPIRE", "300"))  # 5 分钟
@@ -53,10 +83,20 @@ class Settings(BaseSettings):
     # 上下文配置
     AGENT_CONTEXT_MAX_MESSAGES: int = int(os.getenv("AGENT_CONTEXT_MAX_MESSAGES", "20"))
     AGENT_CONTEXT_RECENT_MESSAGES: int = int(os.getenv("AGENT_CONTEXT_RECENT_MESSAGES", "10"))
+    # 内存中的会话上下文缓存上限（超出后按最近最少使用淘汰，需要时从数据库恢复）
+    AGENT_CONTEXT_MAX_SESSIONS: int = int(os.getenv("AGENT_CONTEXT_MAX_SESSIONS", "200"))
+    AGENT_CONTEXT_MAX_BYTES: int = int(os.getenv("AGENT_CONTEXT_MAX_BYTES", str(8 * 1024 * 1024)))
+    # 过期会话清理间隔（秒）
+    AGENT_CONTEXT_SWEEP_SECONDS: float = float(os.getenv("AGENT_CONTEXT_SWEEP_SECONDS", "300"))
 
     # 确认配置
     AGENT_CONFIRMATION_CODE_LENGTH: int = int(os.getenv("AGENT_CONFIRMATION_CODE_LENGTH", "6"))
 
+    # 事件总线配置
+    EVENT_BUS_QUEUE_SIZE: int = int(os.getenv("EVENT_BUS_QUEUE_SIZE", "256"))  # 每种事件的队列上限
+    EVENT_BUS_WORKERS: int = int(os.getenv("EVENT_BUS_WORKERS", "4"))  # 同时执行的回调上限
+    EVENT_BUS_DEBOUNCE_MS: float = float(os.getenv("EVENT_BUS_DEBOUNCE_MS", "200"))  # 刷新类事件合并窗口
+
     # ============ AI 服务配置 ============
     # DeepSeek 配置
     DEEPSEEK_API_URL: str = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1")
@@ -75,9 +115,28 @@ class Settings(BaseSettings):
     RATE_LIMIT_DEFAULT_REFILL_RATE: float = float(os.getenv("RATE_LIMIT_DEFAULT_REFILL_RATE", "2.0"))
     RATE_LIMIT_AUTH_CAPACITY: int = int(os.getenv("RATE_LIMIT_AUTH_CAPACITY", "30"))
     RATE_LIMIT_AUTH_REFILL_RATE: float = float(os.getenv("RATE_LIMIT_AUTH_REFILL_RATE", "0.5"))
+    # 令牌桶数量上限和空闲淘汰时间（秒）
+    RATE_LIMIT_MAX_BUCKETS: int = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "10000"))
+    RATE_LIMIT_IDLE_SECONDS: float = float(os.getenv("RATE_LIMIT_IDLE_SECONDS", "300"))
 
     # ============ 洞察配置 ============
     INSIGHT_DAILY_LIMIT: int = int(os.getenv("INSIGHT_DAILY_LIMIT", "3"))
+    # 后台自动任务（评分变化 / 每日定时）的每日生成次数，与用户手动次数分开计算
+    INSIGHT_AUTO_DAILY_LIMIT: int = int(os.getenv("INSIGHT_AUTO_DAILY_LIMIT", "3"))
+    # 评分未变化时复用最近洞察的时间窗口（小时），0 表示不复用
+    INSIGHT_REUSE_HOURS: int = int(os.getenv("INSIGHT_REUSE_HOURS", "24"))
+    # 后台预生成洞察
+    INSIGHT_JOB_ENABLED: bool = os.getenv("INSIGHT_JOB_ENABLED", "true").lower() == "true"
+    INSIGHT_JOB_WORKERS: int = int(os.getenv("INSIGHT_JOB_WORKERS", "1"))
+    INSIGHT_JOB_QUEUE_SIZE: int = int(os.getenv("INSIGHT_JOB_QUEUE_SIZE", "32"))
+    # 评分变化后等待多久再生成（秒），期间的连续变化合并为一次
+    INSIGHT_JOB_DEBOUNCE_SECONDS: float = float(os.getenv("INSIGHT_JOB_DEBOUNCE_SECONDS", "60"))
+    # 每日定时任务的检查间隔（秒）
+    INSIGHT_JOB_SCHEDULE_INTERVAL: float = float(os.getenv("INSIGHT_JOB_SCHEDULE_INTERVAL", "3600"))
+    # 临时性失败（限流、服务端错误、超时）的重试次数和退避基础 / 最大延迟（秒）
+    INSIGHT_JOB_MAX_RETRIES: int = int(os.getenv("INSIGHT_JOB_MAX_RETRIES", "2"))
+    INSIGHT_JOB_RETRY_BASE_DELAY: float = float(os.getenv("INSIGHT_JOB_RETRY_BASE_DELAY", "5"))
+    INSIGHT_JOB_RETRY_MAX_DELAY: float = float(os.getenv("INSIGHT_JOB_RETRY_MAX_DELAY", "60"))
 
     # ============ IPC 认证配置 ============
     # IPC 通信令牌（开发模式下可禁用认证便于调试）
@@ -88,6 +147,11 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json 或 text
     LOG_FILE: Optional[Path] = Path(os.getenv("LOG_FILE")) if os.getenv("LOG_FILE") else None
+    # 日志队列容量（由后台线程写出，队列满时丢弃并计数）
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Agent 推理追踪日志（Thought / Observation 等）的限速：每秒条数与突发上限
+    AGENT_TRACE_LOG_RATE: float = float(os.getenv("AGENT_TRACE_LOG_RATE", "5"))
+    AGENT_TRACE_LOG_BURST: int = int(os.getenv("AGENT_TRACE_LOG_BURST", "20"))
 
     @property
     def get_encryption_key(self) -> bytes:
@@ -0,0 +1,152 @@
+"""
+HTTP 响应校验缓存（ETag / 条件 GET）
+
+读多写少的接口（系统评分、资产汇总、饮食基准、最新洞察、用户信息）被前端频繁轮询。
+每个缓存资源声明其依赖的数据表，ETag 由请求地址和这些表的版本号
+（见 backend.db.versions）计算得出：
+
+- 请求带 If-None-Match 且与当前 ETag 相同：直接返回 304，不执行服务逻辑
+- 版本未变：返回缓存的序列化响应体
+- 版本已变：执行服务逻辑，序列化后缓存
+
+响应中的 timestamp 表示响应时间而非数据版本：缓存时去掉，每次返回时重新写入当前时间，
+命中缓存也不会返回首次生成时的旧时间戳。
+
+用法:
+    @router.get("/scores")
+    async def get_scores(request: Request, db: Session = Depends(get_db)):
+        return response_cache.conditional_get(request, ["systems"], lambda: build(db))
+"""
+import hashlib
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from backend.core.serialization import dumps
+from backend.db.versions import get_versions
+
+
+@dataclass
+class CachedResponse:
+    """缓存的响应"""
+
+    versions: Tuple[int, ...]
+    etag: str
+    body: bytes
+    stamped: bool = False  # 原响应带 timestamp，返回时需重新写入
+
+
+def make_etag(key: str, versions: Tuple[int, ...]) -> str:
+    """根据缓存键和版本号生成强 ETag"""
+    digest = hashlib.blake2b(f"{key}|{versions}".encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def _serialize(payload: Any) -> Tuple[bytes, bool]:
+    """序列化响应数据，标准响应体中的 timestamp 不进入缓存，返回 (body, 是否需重新写入时间戳)"""
+    if isinstance(payload, dict) and "timestamp" in payload:
+        rest = {k: v for k, v in payload.items() if k != "timestamp"}
+        if rest:
+            return dumps(rest), True
+    return dumps(payload), False
+
+
+def _render(cached: CachedResponse) -> bytes:
+    """生成响应体，需要时在末尾写入当前时间戳（与 success_response 的格式一致）"""
+    if not cached.stamped:
+        return cached.body
+    timestamp = int(datetime.now().timestamp() * 1000)
+    return cached.body[:-1] + b',"timestamp":' + str(timestamp).encode() + b"}"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 请求头是否命中（支持多值和弱校验前缀）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    基于表版本的响应缓存（LRU）
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"not_modified": 0, "hits": 0, "misses": 0}
+
+    def conditional_get(
+        self,
+        request: Request,
+        tables: Sequence[str],
+        build: Callable[[], Any],
+    ) -> Response:
+        """
+        处理条件 GET
+
+        Args:
+            request: 当前请求
+            tables: 响应依赖的数据表
+            build: 生成响应数据的函数（可抛出 HTTPException，错误响应不缓存）
+
+        Returns:
+            304 响应或带 ETag 的 JSON 响应
+        """
+        key = request.url.path
+        if request.url.query:
+            key = f"{key}?{request.url.query}"
+
+        # 先取版本再生成数据：生成期间若有写入，版本已变，缓存项不会被再次命中
+        versions = get_versions(tables)
+        etag = make_etag(key, versions)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self._stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached.versions == versions:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return Response(content=_render(cached), media_type="application/json", headers=headers)
+
+        self._stats["misses"] += 1
+        body, stamped = _serialize(build())
+        entry = CachedResponse(versions=versions, etag=etag, body=body, stamped=stamped)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return Response(content=_render(entry), media_type="application/json", headers=headers)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取缓存统计"""
+        return {**self._stats, "entries": len(self._entries)}
+
+
+# 全局响应缓存
+response_cache = ResponseCache()
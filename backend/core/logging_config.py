@@ -1,10 +1,34 @@
-"""日志配置"""
+"""日志配置
+
+所有 handler 都挂在后台 QueueListener 线程上，调用方只负责把记录放入内存队列：
+
+- 业务线程 / 事件循环：过滤（请求 ID、限速）→ 冻结消息 → 入队，不做格式化和磁盘 IO
+- 日志线程：格式化（JSON / 文本）→ 控制台、app.log、error.log
+- 队列满时丢弃新记录并计数，下一条成功入队的记录会附带丢弃数量，日志写入永远不阻塞调用方
+"""
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
 from pathlib import Path
 from datetime import datetime
-import json
+from typing import Dict, List, Optional, TextIO
+
+from backend.core.serialization import dumps_str
+
+
+# 当前请求 ID（HTTP 中间件和 IPC 循环设置，ContextFilter 写入日志记录）
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def new_request_id() -> str:
+    """生成请求 ID"""
+    return uuid.uuid4().hex[:16]
 
 
 class JSONFormatter(logging.Formatter):
@@ -12,7 +36,7 @@ class JSONFormatter(logging.Formatter):
 
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.utcfromtimestamp(record.created).isoformat(),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -21,6 +45,11 @@ class JSONFormatter(logging.Formatter):
             "line": record.lineno
         }
 
+        # 请求 ID
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            log_data["request_id"] = request_id
+
         # 添加异常信息
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
@@ -29,26 +58,144 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, "extra_data"):
             log_data.update(record.extra_data)
 
-        return json.dumps(log_data, ensure_ascii=False)
+        return dumps_str(log_data, lenient=True)
 
 
 class ContextFilter(logging.Filter):
-    """添加上下文信息的过滤器"""
+    """添加上下文信息的过滤器（须在产生日志的线程中执行，才能读到当前请求的上下文）"""
 
     def filter(self, record: logging.LogRecord) -> bool:
         # 添加请求 ID（如果存在）
-        # from backend.core.logging import request_id_var
-        # request_id = request_id_var.get(None)
-        # if request_id:
-        #     record.request_id = request_id
+        request_id = request_id_var.get()
+        if request_id:
+            record.request_id = request_id
+
+        return True
+
+
+class TraceSampler(logging.Filter):
+    """
+    高频追踪日志限速过滤器
 
+    只作用于带 trace 字段的记录（logger.info(..., extra={"trace": "thought"})），
+    每种 trace 一个令牌桶：超出速率的记录直接丢弃，下一条放行的记录附带被丢弃的条数。
+    WARNING 及以上级别的记录始终放行。
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # 延迟导入：middleware 依赖本模块的 request_id_var
+        from backend.core.middleware import TokenBucket
+        self._bucket_cls = TokenBucket
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = getattr(record, "trace", None)
+        if trace is None or record.levelno >= logging.WARNING:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(trace)
+            if bucket is None:
+                bucket = self._buckets[trace] = self._bucket_cls(self.burst, self.rate, now)
+            if not bucket.consume(1, now):
+                self._suppressed[trace] = self._suppressed.get(trace, 0) + 1
+                return False
+            suppressed = self._suppressed.pop(trace, 0)
+
+        if suppressed:
+            record.msg = f"{record.msg} (+{suppressed} suppressed)"
         return True
 
+    def get_stats(self) -> Dict[str, int]:
+        """当前各 trace 尚未报告的丢弃条数"""
+        with self._lock:
+            return dict(self._suppressed)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    只入队、不格式化的 QueueHandler
+
+    标准 QueueHandler 会在调用方线程里完整格式化一次（为跨进程 pickle 做准备）；
+    这里队列在进程内，只需冻结消息参数，保留 exc_info 交给日志线程格式化。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 参数可能是之后会被修改的可变对象，入队前先合成消息
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            record.msg = f"{record.msg} (+{dropped} log records dropped: queue full)"
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# 当前的日志线程（setup_logging 重复调用时先停止旧线程）
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _install_queue(logger: logging.Logger, handlers: List[logging.Handler], queue_size: int) -> None:
+    global _listener
+    with _listener_lock:
+        _stop_listener()
+
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        # 请求 ID 只能在产生日志的线程中读取，过滤器挂在入队 handler 上
+        # （挂在根 logger 上对子 logger 传播上来的记录不生效）
+        queue_handler.addFilter(ContextFilter())
+
+        logger.handlers.clear()
+        logger.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def stop_logging() -> None:
+    """停止日志线程（写出队列中剩余的记录）"""
+    with _listener_lock:
+        _stop_listener()
+
+
+atexit.register(stop_logging)
+
 
 def setup_logging(
     log_level: str = "INFO",
     log_dir: str = None,
-    enable_json: bool = True
+    enable_json: bool = True,
+    stream: TextIO = None,
+    file_logging: bool = True,
+    queue_size: int = None,
 ) -> logging.Logger:
     """
     设置应用日志
@@ -57,25 +204,19 @@ def setup_logging(
         log_level: 日志级别 (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_dir: 日志目录
         enable_json: 是否使用 JSON 格式
+        stream: 控制台输出流（默认 stdout；IPC 模式 stdout 用于通信，须传 stderr）
+        file_logging: 是否写入日志文件
+        queue_size: 日志队列容量（默认取 settings.LOG_QUEUE_SIZE）
 
     Returns:
         配置好的 logger
     """
-    # 创建日志目录
-    if log_dir:
-        log_path = Path(log_dir)
-        log_path.mkdir(exist_ok=True)
-    else:
-        log_path = Path(__file__).parent.parent / "logs"
-        log_path.mkdir(exist_ok=True)
+    from backend.core.config import settings
 
     # 获取根 logger
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, log_level.upper()))
 
-    # 清除现有 handlers
-    logger.handlers.clear()
-
     # 创建格式化器
     if enable_json:
         formatter = JSONFormatter()
@@ -85,39 +226,49 @@ def setup_logging(
             datefmt='%Y-%m-%d %H:%M:%S'
         )
 
+    handlers: List[logging.Handler] = []
+
     # 控制台 handler
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = logging.StreamHandler(stream or sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-
-    # 文件 handler - 所有日志
-    all_log_file = log_path / "app.log"
-    file_handler = logging.handlers.RotatingFileHandler(
-        all_log_file,
-        maxBytes=10 * 1024 * 1024,  # 10 MB
-        backupCount=5,
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-
-    # 文件 handler - 仅错误日志
-    error_log_file = log_path / "error.log"
-    error_handler = logging.handlers.RotatingFileHandler(
-        error_log_file,
-        maxBytes=10 * 1024 * 1024,  # 10 MB
-        backupCount=5,
-        encoding='utf-8'
-    )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    logger.addHandler(error_handler)
-
-    # 添加上下文过滤器
-    context_filter = ContextFilter()
-    logger.addFilter(context_filter)
+    handlers.append(console_handler)
+
+    if file_logging:
+        # 创建日志目录
+        if log_dir:
+            log_path = Path(log_dir)
+            log_path.mkdir(exist_ok=True)
+        else:
+            log_path = Path(__file__).parent.parent / "logs"
+            log_path.mkdir(exist_ok=True)
+
+        # 文件 handler - 所有日志
+        all_log_file = log_path / "app.log"
+        file_handler = logging.handlers.RotatingFileHandler(
+            all_log_file,
+            maxBytes=10 * 1024 * 1024,  # 10 MB
+            backupCount=5,
+            encoding='utf-8'
+        )
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+        # 文件 handler - 仅错误日志
+        error_log_file = log_path / "error.log"
+        error_handler = logging.handlers.RotatingFileHandler(
+            error_log_file,
+            maxBytes=10 * 1024 * 1024,  # 10 MB
+            backupCount=5,
+            encoding='utf-8'
+        )
+        error_handler.setLevel(logging.ERROR)
+        error_handler.setFormatter(formatter)
+        handlers.append(error_handler)
+
+    # 根 logger 只保留入队 handler，格式化和写出都在日志线程中完成
+    _install_queue(logger, handlers, queue_size or settings.LOG_QUEUE_SIZE)
 
     # 设置第三方库的日志级别
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -1,287 +1,344 @@
 """请求限流和超时处理中间件"""
+import asyncio
 import sys
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
 from starlette.responses import JSONResponse
-from collections import defaultdict
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, Optional, Tuple
 import logging
 import time
 
+from backend.core.config import settings
+from backend.core.logging_config import new_request_id, request_id_var
+
 logger = logging.getLogger(__name__)
 
 
 class TokenBucket:
     """令牌桶数据结构"""
 
-    def __init__(self, capacity: int, refill_rate: float):
+    __slots__ = ("capacity", "tokens", "refill_rate", "last_update")
+
+    def __init__(self, capacity: int, refill_rate: float, now: Optional[float] = None):
         """
         初始化令牌桶
 
         Args:
             capacity: 桶容量（最大令牌数）
             refill_rate: 补充速率（每秒补充的令牌数）
+            now: 当前单调时间（默认 time.monotonic()）
         """
         self.capacity = capacity
-        self.tokens = capacity  # 初始满桶
+        self.tokens = float(capacity)  # 初始满桶
         self.refill_rate = refill_rate
-        self.last_update = time.time()
+        self.last_update = time.monotonic() if now is None else now
 
-    def refill(self):
+    def refill(self, now: float) -> None:
         """补充令牌（基于时间流逝）"""
-        now = time.time()
         elapsed = now - self.last_update
-        tokens_to_add = elapsed * self.refill_rate
-        self.tokens = min(self.capacity, self.tokens + tokens_to_add)
-        self.last_update = now
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.last_update = now
 
-    def consume(self, tokens: int = 1) -> bool:
+    def consume(self, tokens: float, now: float) -> bool:
         """
-        消费令牌
+        补充并消费令牌（每次检查只补充一次）
 
         Args:
             tokens: 需要消费的令牌数
+            now: 当前单调时间
 
         Returns:
             是否成功消费
         """
-        self.refill()
+        self.refill(now)
         if self.tokens >= tokens:
             self.tokens -= tokens
             return True
         return False
 
-    def get_remaining(self) -> int:
-        """获取剩余令牌数"""
-        self.refill()
-        return int(self.tokens)
-
-    def get_wait_time(self, tokens: int = 1) -> float:
-        """获取需要等待的时间（秒）"""
-        self.refill()
+    def get_wait_time(self, tokens: float) -> float:
+        """获取攒够指定令牌数需要等待的时间（秒，基于最近一次补充）"""
         if self.tokens >= tokens:
             return 0.0
-        tokens_needed = tokens - self.tokens
-        return tokens_needed / self.refill_rate
+        return (tokens - self.tokens) / self.refill_rate
 
 
 class RateLimiter:
-    """基于令牌桶的限流器"""
+    """
+    基于令牌桶的限流器
+
+    令牌桶按 (IP, 端点类型) 存放在 LRU 有序字典中，每次访问移到末尾：
+    - 空闲淘汰只检查队首（最久未访问），每个桶最多被淘汰一次，均摊 O(1)
+    - 桶数量超过上限时直接淘汰最久未访问的桶，内存占用固定
+    - 被淘汰的桶再次出现时按满桶重建；空闲超过回满时间的桶本就是满桶，语义不变
+    """
+
+    def __init__(self, max_buckets: Optional[int] = None, idle_seconds: Optional[float] = None):
+        """
+        初始化限流器
 
-    def __init__(self):
-        # 存储每个 IP 的令牌桶 {ip: {endpoint_type: TokenBucket}}
-        self.buckets: Dict[str, Dict[str, TokenBucket]] = defaultdict(dict)
+        Args:
+            max_buckets: 最多保留的令牌桶数量
+            idle_seconds: 空闲多久后淘汰令牌桶（秒）
+        """
+        self.max_buckets = max_buckets or settings.RATE_LIMIT_MAX_BUCKETS
+        self.idle_seconds = idle_seconds or settings.RATE_LIMIT_IDLE_SECONDS
+
+        # 存储令牌桶 {(ip, endpoint_type): TokenBucket}，按最近访问排序
+        self.buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
 
         # 限流配置（容量和补充速率）
         # 容量 = 最大突发请求数，refill_rate = 每秒补充的令牌数
         self.rate_limits = {
-            "default": {"capacity": 120, "refill_rate": 2.0},   # 120 突发，平均 120 次/分钟
-            "auth": {"capacity": 30, "refill_rate": 0.5},       # 30 突发，平均 30 次/分钟
+            "default": {  # 120 突发，平均 120 次/分钟
+                "capacity": settings.RATE_LIMIT_DEFAULT_CAPACITY,
+                "refill_rate": settings.RATE_LIMIT_DEFAULT_REFILL_RATE,
+            },
+            "auth": {  # 30 突发，平均 30 次/分钟
+                "capacity": settings.RATE_LIMIT_AUTH_CAPACITY,
+                "refill_rate": settings.RATE_LIMIT_AUTH_REFILL_RATE,
+            },
             "sensitive": {"capacity": 30, "refill_rate": 0.5},  # 30 突发，平均 30 次/分钟
         }
 
-    def is_allowed(self, ip: str, endpoint_type: str = "default", tokens: int = 1) -> tuple[bool, dict]:
+        # 端点权重：(方法, 路径前缀) -> 每次请求消耗的令牌数，未匹配的请求消耗 1
+        # Agent 对话会调用大模型，开销远高于普通读取
+        self.endpoint_costs: Dict[Tuple[str, str], float] = {
+            ("POST", "/api/agent/chat"): 5,
+            ("POST", "/api/agent/confirm"): 2,
+        }
+
+    def get_cost(self, method: str, path: str) -> float:
+        """获取请求消耗的令牌数"""
+        for (cost_method, prefix), cost in self.endpoint_costs.items():
+            if method == cost_method and path.startswith(prefix):
+                return cost
+        return 1
+
+    def is_allowed(self, ip: str, endpoint_type: str = "default", tokens: float = 1) -> tuple[bool, dict]:
         """
         检查是否允许请求（令牌桶算法）
 
         Args:
             ip: 客户端 IP
             endpoint_type: 端点类型
-            tokens: 需要消费的令牌数（默认 1）
+            tokens: 需要消费的令牌数（默认 1，见 get_cost）
 
         Returns:
             (是否允许，限制信息)
         """
+        now = time.monotonic()
+
         # 获取限流配置
         config = self.rate_limits.get(endpoint_type, self.rate_limits["default"])
         capacity = config["capacity"]
-        refill_rate = config["refill_rate"]
 
-        # 获取或创建令牌桶
-        if endpoint_type not in self.buckets[ip]:
-            self.buckets[ip][endpoint_type] = TokenBucket(capacity, refill_rate)
+        # 获取或创建令牌桶（移到 LRU 末尾）
+        key = (ip, endpoint_type)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity, config["refill_rate"], now)
+            self.buckets[key] = bucket
+        else:
+            self.buckets.move_to_end(key)
 
-        bucket = self.buckets[ip][endpoint_type]
+        # 尝试消费令牌（权重不超过容量，避免永远无法通过）
+        is_allowed = bucket.consume(min(tokens, capacity), now)
 
-        # 尝试消费令牌
-        is_allowed = bucket.consume(tokens)
+        # 淘汰空闲 / 超量的令牌桶
+        self._evict(now)
 
         # 计算重置时间（桶满所需时间）
-        wait_time = bucket.get_wait_time(capacity)
-        reset_time = datetime.now() + timedelta(seconds=wait_time)
-
-        # 定期清理空闲记录（防止内存泄漏）
-        self._cleanup_idle_buckets(ip)
+        reset_time = datetime.now() + timedelta(seconds=bucket.get_wait_time(capacity))
 
         # 返回限制信息
         limit_info = {
             "limit": capacity,
-            "remaining": bucket.get_remaining(),
+            "remaining": int(bucket.tokens),
             "reset": reset_time.isoformat()
         }
 
         return is_allowed, limit_info
 
-    def _cleanup_idle_buckets(self, ip: str):
-        """清理空闲的令牌桶（当 IP 超过 100 个时触发）"""
-        if len(self.buckets) <= 100:
-            return
-
-        # 清理空记录或超过 5 分钟未活动的 IP
-        now = time.time()
-        keys_to_remove = []
-        for ip_key, buckets in self.buckets.items():
-            # 检查所有桶是否都满（表示长时间未使用）
-            all_full = all(b.tokens >= b.capacity for b in buckets.values())
-            # 或者检查最后更新时间是否超过 5 分钟
-            all_old = all(now - b.last_update > 300 for b in buckets.values())
-
-            if all_full or all_old:
-                keys_to_remove.append(ip_key)
+    def _evict(self, now: float) -> None:
+        """从 LRU 队首淘汰空闲令牌桶，并保证数量不超过上限"""
+        buckets = self.buckets
+        while len(buckets) > self.max_buckets:
+            buckets.popitem(last=False)
 
-        # 删除空闲记录
-        for k in keys_to_remove[:50]:
-            del self.buckets[k]
+        # 队首是最久未访问的桶，未过期则后面的也都未过期
+        while buckets:
+            oldest = next(iter(buckets.values()))
+            if now - oldest.last_update <= self.idle_seconds:
+                break
+            buckets.popitem(last=False)
 
 
 # 全局限流器实例
 rate_limiter = RateLimiter()
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """请求限流中间件"""
-
-    async def dispatch(self, request: Request, call_next):
-        # 获取客户端 IP
-        client_ip = self._get_client_ip(request)
-
-        # 根据路径确定端点类型
-        endpoint_type = self._get_endpoint_type(request.url.path)
-
-        # 检查限流
-        allowed, limit_info = rate_limiter.is_allowed(client_ip, endpoint_type)
-
-        # 添加限流信息到响应头
-        response = await call_next(request)
-        response.headers["X-RateLimit-Limit"] = str(limit_info["limit"])
-        response.headers["X-RateLimit-Remaining"] = str(limit_info["remaining"])
-        response.headers["X-RateLimit-Reset"] = limit_info["reset"]
-
-        if not allowed:
-            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "code": 429,
-                    "message": "请求过于频繁，请稍后再试",
-                    "data": limit_info,
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-            )
-
-        return response
-
-    def _get_client_ip(self, request: Request) -> str:
-        """获取客户端 IP"""
-        # 尝试从不同的头部获取真实 IP
-        forwarded = request.headers.get("X-Forwarded-For")
-        if forwarded:
-            return forwarded.split(",")[0].strip()
-
-        real_ip = request.headers.get("X-Real-IP")
-        if real_ip:
-            return real_ip
-
-        # 回退到直接连接的 IP
-        if request.client:
-            return request.client.host
-
-        return "unknown"
-
-    def _get_endpoint_type(self, path: str) -> str:
-        """根据路径确定端点类型"""
-        # 认证类：PIN 验证、PIN 设置
-        if "/pin/" in path or "/auth/" in path:
-            return "auth"
-        # 敏感操作：数据备份、导入、删除
-        if "/backup/" in path or "/import" in path or "/delete" in path:
-            return "sensitive"
-        # AI 洞察生成：限制频率
-        if "/insights/generate" in path:
-            return "sensitive"
-        return "default"
-
-
-class TimeoutMiddleware(BaseHTTPMiddleware):
-    """请求超时中间件"""
-
-    def __init__(self, app, timeout: float = 30.0):
-        super().__init__(app)
+# 安全响应头（预编码，避免每个请求重复编码）
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", b"default-src 'self'"),
+]
+
+
+def get_client_ip(scope: Scope) -> str:
+    """获取客户端 IP"""
+    # 尝试从不同的头部获取真实 IP
+    forwarded = None
+    real_ip = None
+    for name, value in scope.get("headers", ()):
+        if name == b"x-forwarded-for":
+            forwarded = value
+        elif name == b"x-real-ip":
+            real_ip = value
+
+    if forwarded:
+        return forwarded.decode("latin-1").split(",")[0].strip()
+    if real_ip:
+        return real_ip.decode("latin-1")
+
+    # 回退到直接连接的 IP
+    client = scope.get("client")
+    if client:
+        return client[0]
+
+    return "unknown"
+
+
+def get_request_id(scope: Scope) -> str:
+    """获取请求 ID（优先使用请求头 X-Request-ID）"""
+    for name, value in scope.get("headers", ()):
+        if name == b"x-request-id" and value:
+            return value.decode("latin-1")[:64]
+    return new_request_id()
+
+
+def get_endpoint_type(path: str) -> str:
+    """根据路径确定端点类型"""
+    # 认证类：PIN 验证、PIN 设置
+    if "/pin/" in path or "/auth/" in path:
+        return "auth"
+    # 敏感操作：数据备份、导入、删除
+    if "/backup/" in path or "/import" in path or "/delete" in path:
+        return "sensitive"
+    # AI 洞察生成：限制频率
+    if "/insights/generate" in path:
+        return "sensitive"
+    return "default"
+
+
+class RequestPipelineMiddleware:
+    """
+    请求处理中间件（纯 ASGI）
+
+    将限流、超时、安全头、请求计时、请求 ID 合并为一层，替代原先的四个 BaseHTTPMiddleware：
+    - 限流在分发前检查，被拒绝的请求不再执行业务逻辑
+    - 响应头在 send 的 http.response.start 消息中追加，不缓冲响应体，流式响应保持背压
+    - 超时只约束到响应开始（与 BaseHTTPMiddleware 的 call_next 语义一致），SSE 流不会被截断
+    """
+
+    def __init__(self, app: ASGIApp, timeout: float = 30.0):
+        self.app = app
         self.timeout = timeout
 
-    async def dispatch(self, request: Request, call_next):
-        import asyncio
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        # 请求 ID：沿用调用方传入的 X-Request-ID，否则生成；写入日志上下文并在响应头返回
+        request_id = get_request_id(scope)
+        request_id_token = request_id_var.set(request_id)
         try:
-            # 使用超时包装器
-            response = await asyncio.wait_for(
-                call_next(request),
-                timeout=self.timeout
-            )
-            return response
-
-        except asyncio.TimeoutError:
-            logger.warning(f"Request timeout: {request.url.path}")
-            return JSONResponse(
-                status_code=status.HTTP_408_REQUEST_TIMEOUT,
-                content={
-                    "code": 408,
-                    "message": "请求超时",
-                    "data": {"timeout": self.timeout},
-                    "timestamp": int(datetime.now().timestamp() * 1000)
-                }
-            )
-
-
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """安全头中间件"""
-
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-
-        # 添加安全头
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
+            await self._dispatch(scope, receive, send, request_id)
+        finally:
+            request_id_var.reset(request_id_token)
+
+    async def _dispatch(self, scope: Scope, receive: Receive, send: Send, request_id: str) -> None:
+        start_time = time.perf_counter()
+        path = scope["path"]
+
+        # 1. 限流（分发前检查）
+        client_ip = get_client_ip(scope)
+        allowed, limit_info = rate_limiter.is_allowed(
+            client_ip,
+            get_endpoint_type(path),
+            rate_limiter.get_cost(scope["method"], path)
+        )
+        rate_headers = [
+            (b"x-ratelimit-limit", str(limit_info["limit"]).encode()),
+            (b"x-ratelimit-remaining", str(limit_info["remaining"]).encode()),
+            (b"x-ratelimit-reset", limit_info["reset"].encode()),
+            (b"x-request-id", request_id.encode()),
+        ]
 
-        return response
-
-
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """请求日志中间件"""
-
-    async def dispatch(self, request: Request, call_next):
-        start_time = datetime.now()
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for IP: {client_ip}")
+            await self._send_json(send, status.HTTP_429_TOO_MANY_REQUESTS, {
+                "code": 429,
+                "message": "请求过于频繁，请稍后再试",
+                "data": limit_info,
+                "timestamp": int(datetime.now().timestamp() * 1000)
+            }, rate_headers)
+            return
 
-        # 处理请求
+        response_started = False
+        deadline = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                # 响应已开始，取消超时（流式响应可继续输出）
+                if deadline is not None:
+                    deadline.reschedule(None)
+
+                process_time = (time.perf_counter() - start_time) * 1000
+                headers = list(message.get("headers", ()))
+                headers.extend(rate_headers)
+                headers.extend(SECURITY_HEADERS)
+                headers.append((b"x-process-time", f"{process_time:.2f}ms".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        # 2. 分发（带超时）
         try:
-            response = await call_next(request)
-            status_code = response.status_code
-
-            # 计算处理时间
-            process_time = (datetime.now() - start_time).total_seconds() * 1000
-
-            # 添加处理时间到响应头
-            response.headers["X-Process-Time"] = f"{process_time:.2f}ms"
-
-            return response
+            async with asyncio.timeout(self.timeout) as deadline:
+                await self.app(scope, receive, send_wrapper)
+
+        except TimeoutError:
+            if response_started:
+                raise
+            logger.warning(f"Request timeout: {path}")
+            await self._send_json(send, status.HTTP_408_REQUEST_TIMEOUT, {
+                "code": 408,
+                "message": "请求超时",
+                "data": {"timeout": self.timeout},
+                "timestamp": int(datetime.now().timestamp() * 1000)
+            }, rate_headers)
 
         except Exception as e:
-            process_time = (datetime.now() - start_time).total_seconds() * 1000
             print(f"[MIDDLEWARE ERROR] {type(e).__name__}: {e}", file=sys.stderr)
             import traceback
             traceback.print_exc(file=sys.stderr)
             raise
+
+    @staticmethod
+    async def _send_json(send: Send, status_code: int, content: dict, extra_headers: list) -> None:
+        """直接发送 JSON 响应（限流 / 超时）"""
+        response = JSONResponse(status_code=status_code, content=content)
+        headers = list(response.raw_headers)
+        headers.extend(extra_headers)
+        headers.extend(SECURITY_HEADERS)
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": response.body})
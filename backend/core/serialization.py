@@ -0,0 +1,145 @@
+"""
+统一 JSON 序列化
+
+API 响应、IPC 帧、JSON 日志和 SQLAlchemy JSON 列共用同一套编解码：
+
+- 安装了 orjson 时使用 orjson（C 实现，原生支持 datetime / date / UUID / Enum / dataclass）
+- 未安装时回退到标准库 json（ensure_ascii=False、紧凑分隔符），输出格式保持一致
+
+列表接口的快速路径：
+- dump_list()：用缓存的 TypeAdapter 一次性完成「ORM 对象列表 -> 字典列表」的校验和导出，
+  替代逐条 model_validate().model_dump()
+- json_response()：直接返回序列化好的响应，跳过 FastAPI 的 jsonable_encoder 递归遍历
+
+用法:
+    from backend.core.serialization import dumps, loads, json_response
+
+    frame = dumps({"id": 1, "data": [...]})          # bytes
+    return json_response(success_response(data=data))
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+from uuid import UUID
+
+from pydantic import BaseModel, TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用标准库 json
+    orjson = None
+
+
+# orjson 默认只接受字符串键；与标准库行为保持一致，允许 int 等键
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _default(obj: Any) -> Any:
+    """orjson / json 不能原生处理的类型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _default_stdlib(obj: Any) -> Any:
+    """标准库回退时额外处理 orjson 原生支持的类型"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    return _default(obj)
+
+
+def _lenient(default: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    def fallback(obj: Any) -> Any:
+        try:
+            return default(obj)
+        except TypeError:
+            return str(obj)
+    return fallback
+
+
+# ============ 编解码 ============
+
+def dumps(obj: Any, lenient: bool = False) -> bytes:
+    """
+    序列化为 UTF-8 JSON 字节
+
+    Args:
+        obj: 待序列化对象
+        lenient: 为 True 时无法序列化的对象转为 str，而不是抛出 TypeError（用于日志）
+    """
+    if orjson is not None:
+        default = _lenient(_default) if lenient else _default
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+    default = _lenient(_default_stdlib) if lenient else _default_stdlib
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any, lenient: bool = False) -> str:
+    """序列化为 JSON 字符串（SQLAlchemy json_serializer、日志格式化器使用）"""
+    return dumps(obj, lenient=lenient).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """解析 JSON（接受 bytes / bytearray / memoryview / str）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+# ============ 列表快速路径 ============
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def dump_list(model: Type[BaseModel], objects: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    把 ORM 对象列表一次性校验并导出为字典列表
+
+    等价于 [model.model_validate(o).model_dump() for o in objects]，但整个列表在
+    pydantic-core 中一次完成，不为每一条创建中间模型实例。
+    """
+    adapter = _list_adapter(model)
+    return adapter.dump_python(adapter.validate_python(list(objects), from_attributes=True))
+
+
+# ============ 响应 ============
+
+class FastJSONResponse(JSONResponse):
+    """使用统一序列化的 JSON 响应（应用的默认响应类）"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    background: Optional[BackgroundTask] = None,
+) -> FastJSONResponse:
+    """
+    直接返回序列化好的 JSON 响应
+
+    路由函数返回普通 dict 时，FastAPI 会先用 jsonable_encoder 递归复制一遍再序列化；
+    大列表接口返回此响应可跳过这一步（datetime 等类型由序列化器直接处理）。
+    """
+    return FastJSONResponse(content, status_code=status_code, headers=headers, background=background)
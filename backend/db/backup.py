@@ -3,6 +3,7 @@ import os
 import shutil
 import json
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -14,6 +15,12 @@ from backend.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 备份包内的附件引用清单
+ATTACHMENT_MANIFEST = "attachments.json"
+
+# 共享 blob 目录的写入（导出 blob 到写完清单）与回收互斥
+_blob_lock = threading.Lock()
+
 
 class DatabaseBackup:
     """数据库备份管理器"""
@@ -36,6 +43,9 @@ class DatabaseBackup:
         self.backup_dir = base_backup_dir / backup_type / today
         self.backup_dir.mkdir(parents=True, exist_ok=True)
 
+        # 附件 blob 在所有备份间共享（按内容哈希存储），备份包内只记录引用
+        self.blob_dir = base_backup_dir / "blobs"
+
         # 保存备份类型信息，用于列表展示
         self.backup_type = backup_type
 
@@ -99,13 +109,18 @@ class DatabaseBackup:
             with open(metadata_file, 'w', encoding='utf-8') as f:
                 json.dump(metadata, f, indent=2, ensure_ascii=False)
 
-            # 创建 ZIP 压缩包
-            with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                zipf.write(temp_db, self.db_path.name)
-                zipf.write(metadata_file, "metadata.json")
+            with _blob_lock:
+                # 附件：blob 复制（或硬链接）到共享 blob 目录，备份包内写入引用清单
+                manifest_file = self._backup_attachments(temp_db, temp_dir)
+
+                # 创建 ZIP 压缩包
+                with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                    zipf.write(temp_db, self.db_path.name)
+                    zipf.write(metadata_file, "metadata.json")
+                    if manifest_file:
+                        zipf.write(manifest_file, ATTACHMENT_MANIFEST)
 
             print(f"[OK] Backup created: {backup_path}")
-            return str(backup_path)
 
         finally:
             # 清理临时文件
@@ -114,6 +129,7 @@ class DatabaseBackup:
 
         # 清理旧备份
         self._cleanup_old_backups()
+        return str(backup_path)
 
     def restore_backup(self, backup_path: str, verify: bool = True) -> bool:
         """
@@ -212,6 +228,9 @@ class DatabaseBackup:
                 raise ValueError("恢复的数据库无效：缺少必需的表")
 
             logger.info("Database verification passed")
+
+            # 恢复备份引用的附件 blob
+            self._restore_attachments(temp_dir / ATTACHMENT_MANIFEST)
             return True
 
         except Exception as e:
@@ -256,6 +275,49 @@ class DatabaseBackup:
             if temp_dir and temp_dir.exists():
                 shutil.rmtree(temp_dir)
 
+    def _backup_attachments(self, db_file: Path, temp_dir: Path) -> Optional[Path]:
+        """
+        备份附件 blob
+
+        blob 按哈希存放在 BACKUP_DIR/blobs，多个备份共享同一份内容；
+        备份包内只包含 attachments.json（引用的哈希列表）。
+
+        Returns:
+            清单文件路径，没有附件时返回 None
+        """
+        from backend.services.attachment_service import referenced_hashes
+        from backend.services.attachment_store import get_attachment_store
+
+        hashes = referenced_hashes(db_file)
+        if not hashes:
+            return None
+
+        copied = get_attachment_store().export_blobs(hashes, self.blob_dir)
+        logger.info(f"Attachment blobs referenced: {len(hashes)}, newly copied: {copied}")
+
+        manifest_file = temp_dir / ATTACHMENT_MANIFEST
+        with open(manifest_file, 'w', encoding='utf-8') as f:
+            json.dump({"blob_dir": "blobs", "hashes": hashes}, f)
+        return manifest_file
+
+    def _restore_attachments(self, manifest_file: Path) -> None:
+        """按备份清单从共享 blob 目录恢复缺失的附件"""
+        if not manifest_file.exists():
+            return
+        try:
+            from backend.services.attachment_store import get_attachment_store
+
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            hashes = manifest.get("hashes", [])
+            restored = get_attachment_store().import_blobs(hashes, self.blob_dir)
+            missing = [h for h in hashes if not get_attachment_store().has_blob(h)]
+            logger.info(f"Attachment blobs restored: {restored}")
+            if missing:
+                logger.warning(f"{len(missing)} attachment blob(s) not found in {self.blob_dir}")
+        except Exception as e:
+            logger.warning(f"Attachment restore failed: {e}")
+
     def _verify_backup(self, backup_path: Path) -> bool:
         """验证备份文件"""
         try:
@@ -417,6 +479,44 @@ class DatabaseBackup:
                 backup_file.unlink()
                 print(f"[INFO] Deleted old backup: {backup_file.name}")
 
+        # 备份包被删除（含手动删除）后，回收不再被任何清单引用的 blob
+        self._collect_blob_garbage()
+
+    def _collect_blob_garbage(self) -> int:
+        """
+        删除共享 blob 目录中不再被任何现存备份清单引用的 blob
+
+        任一备份包无法读取时不删除任何 blob，避免误删仍被引用的内容。
+
+        Returns:
+            删除的 blob 数量
+        """
+        if not self.blob_dir.exists():
+            return 0
+
+        with _blob_lock:
+            referenced = set()
+            for backup_file in self.blob_dir.parent.rglob("*.zip"):
+                try:
+                    with zipfile.ZipFile(backup_file) as zipf:
+                        if ATTACHMENT_MANIFEST not in zipf.namelist():
+                            continue
+                        manifest = json.loads(zipf.read(ATTACHMENT_MANIFEST))
+                    referenced.update(manifest.get("hashes", []))
+                except (OSError, zipfile.BadZipFile, ValueError) as e:
+                    logger.warning(f"Skip blob GC, unreadable backup {backup_file}: {e}")
+                    return 0
+
+            removed = 0
+            for blob in self.blob_dir.glob("*/*"):
+                if blob.is_file() and blob.name not in referenced:
+                    blob.unlink(missing_ok=True)
+                    removed += 1
+
+        if removed:
+            logger.info(f"Removed {removed} unreferenced backup blob(s)")
+        return removed
+
     def _close_all_connections(self):
         """关闭所有数据库连接（SQLite 特有）"""
         try:
@@ -663,6 +763,8 @@ def export_to_json(db_path: str, output_dir: str = None, use_classified_dir: boo
                 "file_path": attachment.file_path,
                 "file_type": attachment.file_type,
                 "file_size": attachment.file_size,
+                "sha256": attachment.sha256,
+                "mime_type": attachment.mime_type,
                 "created_at": attachment.created_at.isoformat() if attachment.created_at else None
             })
 
@@ -673,6 +775,11 @@ def export_to_json(db_path: str, output_dir: str = None, use_classified_dir: boo
                 "diary_id": history.diary_id,
                 "title_snapshot": history.title_snapshot,
                 "content_snapshot": history.content_snapshot,
+                "version": history.version,
+                "is_keyframe": history.is_keyframe,
+                "content_delta": history.content_delta,
+                "content_hash": history.content_hash,
+                "content_length": history.content_length,
                 "created_at": history.created_at.isoformat() if history.created_at else None
             })
 
@@ -969,6 +1076,8 @@ def import_from_json(db_path: str, data: dict) -> dict:
                     existing.file_path = attachment_data.get("file_path")
                     existing.file_type = attachment_data.get("file_type")
                     existing.file_size = attachment_data.get("file_size")
+                    existing.sha256 = attachment_data.get("sha256")
+                    existing.mime_type = attachment_data.get("mime_type")
                 else:
                     diary_attachment = DiaryAttachment(
                         id=attachment_data["id"],
@@ -977,6 +1086,8 @@ def import_from_json(db_path: str, data: dict) -> dict:
                         file_path=attachment_data.get("file_path"),
                         file_type=attachment_data.get("file_type"),
                         file_size=attachment_data.get("file_size"),
+                        sha256=attachment_data.get("sha256"),
+                        mime_type=attachment_data.get("mime_type"),
                         created_at=dt.fromisoformat(attachment_data["created_at"]) if attachment_data.get("created_at") else None
                     )
                     db.add(diary_attachment)
@@ -990,18 +1101,42 @@ def import_from_json(db_path: str, data: dict) -> dict:
                     existing.diary_id = history_data.get("diary_id")
                     existing.title_snapshot = history_data.get("title_snapshot")
                     existing.content_snapshot = history_data.get("content_snapshot")
+                    existing.version = history_data.get("version")
+                    existing.is_keyframe = history_data.get("is_keyframe", 1)
+                    existing.content_delta = history_data.get("content_delta")
+                    existing.content_hash = history_data.get("content_hash")
+                    existing.content_length = history_data.get("content_length")
                 else:
                     diary_edit_history = DiaryEditHistory(
                         id=history_data["id"],
                         diary_id=history_data.get("diary_id"),
                         title_snapshot=history_data.get("title_snapshot"),
                         content_snapshot=history_data.get("content_snapshot"),
+                        version=history_data.get("version"),
+                        is_keyframe=history_data.get("is_keyframe", 1),
+                        content_delta=history_data.get("content_delta"),
+                        content_hash=history_data.get("content_hash"),
+                        content_length=history_data.get("content_length"),
                         created_at=dt.fromisoformat(history_data["created_at"]) if history_data.get("created_at") else None
                     )
                     db.add(diary_edit_history)
                 stats["diary_edit_history"] += 1
 
+        # 导入的记录可能覆盖已有行，每日汇总和标签索引整体重建
+        from backend.db.rollups import rebuild_rollups
+        from backend.db.tag_index import rebuild_tag_index
+        from backend.db.versions import mark_written
+        rebuild_rollups(db.connection())
+        rebuild_tag_index(db.connection())
+        mark_written(db, "daily_rollups", "diary_tags")
+
         db.commit()
+
+        # 导入可能覆盖 AI 配置，缓存的凭据和 LLM 客户端失效
+        if stats["users"]:
+            from backend.agent.llm.credentials import invalidate_ai_config
+            invalidate_ai_config()
+
         print(f"[OK] Data imported from JSON: {stats}")
         return stats
 
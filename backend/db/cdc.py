@@ -0,0 +1,284 @@
+"""
+变更数据捕获（CDC）
+
+在会话层捕获每次提交涉及的行级变更，生成紧凑的变更记录：
+    {"seq": 12, "table": "diaries", "id": 5, "op": "insert", "version": 3}
+
+- op 为 insert / update / delete；ORM 批量语句和文本 SQL 无法得知行 ID，记为 op="bulk"、id=None
+- version 为提交后该表的版本号（见 versions.py），与 ETag 使用同一计数器
+- 同一事务内对同一行的多次修改合并为一条（先插入后删除则不产生记录）
+- 嵌套事务（SAVEPOINT，如写队列中每个任务）回滚时，丢弃该保存点之后捕获的记录
+
+变更按提交批次发布到 change_feed，由开发模式的 SSE 接口和生产模式的 IPC 推送帧转发给前端，
+前端据此增量更新缓存，无需轮询整个列表。change_feed 保留最近的记录，断线重连时可按 seq 补齐。
+"""
+import logging
+import queue as queue_module
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.sql.elements import TextClause
+
+from backend.core.config import settings
+from backend.db import versions
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "pending_row_changes"
+# 保存点开始时的待发布记录快照 {SessionTransaction: 记录副本}
+_SAVEPOINTS_KEY = "pending_row_savepoints"
+
+# 变更批次：{"seq": 最后一条记录的序号, "changes": [记录, ...]}
+ChangeBatch = Dict[str, Any]
+
+
+class ChangeFeed:
+    """
+    变更发布中心
+
+    保存最近的变更记录（环形缓冲），并把每个提交批次推送给监听器。
+    监听器在提交线程中同步调用，必须快速返回（只做入队）。
+    """
+
+    def __init__(self, buffer_size: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size or settings.CDC_BUFFER_SIZE)
+        self._listeners: List[Callable[[ChangeBatch], None]] = []
+
+    @property
+    def seq(self) -> int:
+        """最新变更序号"""
+        return self._seq
+
+    def add_listener(self, callback: Callable[[ChangeBatch], None]) -> None:
+        """注册监听器"""
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[ChangeBatch], None]) -> None:
+        """移除监听器"""
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def publish(self, changes: List[Dict[str, Any]]) -> Optional[ChangeBatch]:
+        """发布一个提交批次的变更"""
+        if not changes:
+            return None
+
+        now = int(time.time() * 1000)
+        with self._lock:
+            for record in changes:
+                self._seq += 1
+                record["seq"] = self._seq
+                record["ts"] = now
+                self._buffer.append(record)
+            batch = {"seq": self._seq, "changes": changes}
+            listeners = list(self._listeners)
+
+        for callback in listeners:
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.warning(f"Change listener failed: {e}")
+        return batch
+
+    def since(self, seq: int, limit: int = 500) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        获取序号大于 seq 的变更
+
+        Returns:
+            (变更列表, 是否需要全量刷新)；请求的序号早于缓冲区起点时需要全量刷新
+        """
+        with self._lock:
+            if seq > self._seq:
+                # 序号来自上一个进程（重启后计数归零）
+                return [], True
+            if seq < self._seq and (not self._buffer or self._buffer[0]["seq"] > seq + 1):
+                return [], True
+            changes = [record for record in self._buffer if record["seq"] > seq]
+        return changes[:limit], False
+
+    def reset(self) -> None:
+        """数据库整体替换后清空缓冲（客户端收到 reset 事件后全量刷新）"""
+        with self._lock:
+            self._buffer.clear()
+        self.publish([{"table": "*", "id": None, "op": "reset", "version": None}])
+
+
+# 全局变更发布中心
+change_feed = ChangeFeed()
+
+
+class ChangePusher:
+    """
+    变更推送线程（生产模式的 IPC 推送帧）
+
+    帧格式：{"type": "db_changes", "seq": 12, "changes": [...]}；积压过多时发送
+    {"type": "db_changes", "seq": 最新序号, "reset": True, "changes": []} 要求前端全量刷新。
+    提交线程只负责入队，由推送线程合并积压的批次后调用 write 写出，避免阻塞数据库提交。
+    """
+
+    def __init__(
+        self,
+        write: Callable[[Dict[str, Any]], None],
+        feed: Optional[ChangeFeed] = None,
+        queue_size: int = 1024
+    ):
+        self.write = write
+        self.feed = feed or change_feed
+        self._pending: queue_module.Queue = queue_module.Queue(maxsize=queue_size)
+        self._overflow = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """注册监听并启动推送线程"""
+        self.feed.add_listener(self._listener)
+        self._thread = threading.Thread(target=self._push_loop, name="ipc-push", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """移除监听，发送完已入队的批次后停止"""
+        self.feed.remove_listener(self._listener)
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _listener(self, batch: ChangeBatch) -> None:
+        try:
+            self._pending.put_nowait(batch)
+        except queue_module.Full:
+            self._overflow.set()
+
+    def _push_loop(self) -> None:
+        while True:
+            batches = [self._pending.get()]
+            while True:
+                try:
+                    batches.append(self._pending.get_nowait())
+                except queue_module.Empty:
+                    break
+            stopping = batches[-1] is None
+            batches = [batch for batch in batches if batch is not None]
+            try:
+                if self._overflow.is_set():
+                    # 积压过多，要求前端全量刷新
+                    self._overflow.clear()
+                    self.write({"type": "db_changes", "seq": self.feed.seq, "reset": True, "changes": []})
+                elif batches:
+                    changes = [c for batch in batches for c in batch["changes"]]
+                    self.write({"type": "db_changes", "seq": batches[-1]["seq"], "changes": changes})
+            except Exception as e:
+                logger.error(f"Failed to push changes: {e}")
+            if stopping:
+                return
+
+
+# ============ 会话事件 ============
+
+def _pending(session) -> Dict[Tuple[str, Any], str]:
+    return session.info.setdefault(_PENDING_KEY, {})
+
+
+def _identity(obj) -> Any:
+    # after_flush 时新对象尚未登记 identity，直接从主键属性读取
+    state = inspect(obj)
+    identity = state.mapper.primary_key_from_instance(obj)
+    return identity[0] if len(identity) == 1 else list(identity)
+
+
+def _record(pending: Dict[Tuple[str, Any], str], table: str, row_id: Any, op: str) -> None:
+    key = (table, row_id if not isinstance(row_id, list) else tuple(row_id))
+    previous = pending.get(key)
+    if previous is None:
+        pending[key] = op
+    elif previous == "insert" and op == "delete":
+        del pending[key]
+    elif op == "delete":
+        pending[key] = "delete"
+    # insert 后的 update 仍记为 insert；update 后的 update 不变
+
+
+def _after_flush(session, flush_context) -> None:
+    pending = _pending(session)
+    for obj in session.new:
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            _record(pending, table, _identity(obj), "insert")
+    for obj in session.dirty:
+        table = getattr(obj, "__tablename__", None)
+        if table and session.is_modified(obj, include_collections=False):
+            _record(pending, table, _identity(obj), "update")
+    for obj in session.deleted:
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            _record(pending, table, _identity(obj), "delete")
+
+
+def _do_orm_execute(orm_execute_state) -> None:
+    statement = orm_execute_state.statement
+    table = None
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        target = getattr(statement, "table", None)
+        table = mapper.local_table.name if mapper is not None else getattr(target, "name", None)
+    elif isinstance(statement, TextClause):
+        match = versions._WRITE_TARGET.match(statement.text)
+        if match:
+            table = match.group(1)
+    if table:
+        _pending(orm_execute_state.session)[(table, None)] = "bulk"
+
+
+def _after_commit(session) -> None:
+    session.info.pop(_SAVEPOINTS_KEY, None)
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    change_feed.publish([
+        {
+            "table": table,
+            "id": list(row_id) if isinstance(row_id, tuple) else row_id,
+            "op": op,
+            "version": versions.get_version(table),
+        }
+        for (table, row_id), op in pending.items()
+    ])
+
+
+def _after_rollback(session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_SAVEPOINTS_KEY, None)
+        return
+    # 回滚的是保存点：恢复到保存点开始时的记录
+    snapshot = session.info.get(_SAVEPOINTS_KEY, {}).get(session.get_nested_transaction())
+    if snapshot is not None:
+        session.info[_PENDING_KEY] = snapshot
+
+
+def _after_transaction_create(session, transaction) -> None:
+    # begin_nested() 先 flush 再创建保存点，此时的记录均属于保存点之前
+    if transaction.nested:
+        session.info.setdefault(_SAVEPOINTS_KEY, {})[transaction] = dict(_pending(session))
+
+
+def _after_transaction_end(session, transaction) -> None:
+    if transaction.nested:
+        session.info.get(_SAVEPOINTS_KEY, {}).pop(transaction, None)
+
+
+def install_change_capture(session_cls) -> None:
+    """为会话类挂载变更捕获事件（需在 install_version_tracking 之后调用，以读取提交后的版本）"""
+    event.listen(session_cls, "after_flush", _after_flush)
+    event.listen(session_cls, "do_orm_execute", _do_orm_execute)
+    event.listen(session_cls, "after_commit", _after_commit)
+    event.listen(session_cls, "after_rollback", _after_rollback)
+    event.listen(session_cls, "after_transaction_create", _after_transaction_create)
+    event.listen(session_cls, "after_transaction_end", _after_transaction_end)
@@ -2,7 +2,8 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import inspect
 from backend.db.base import Base
-from backend.db.session import engine, SessionLocal
+from backend.db.session import engine, write_engine, SessionLocal
+from backend.db.migrations import run_migrations
 
 # 导入所有模型确保它们被 SQLAlchemy 注册
 from backend.models.user import User, UserSettings
@@ -15,11 +16,12 @@ from backend.models.dimension import (
     SYSTEM_TYPES,
     DEFAULT_SYSTEM_DETAILS
 )
-from backend.models.diary import Diary, DiaryAttachment, DiaryEditHistory
+from backend.models.diary import Diary, DiaryAttachment, DiaryEditHistory, DiaryTag
 from backend.models.insight import Insight
 from backend.models.record import DailyRecord
 from backend.models.asset import AssetCategory, AssetItem, AssetSnapshot
 from backend.models.session import AgentSession, AgentMessage
+from backend.models.rollup import DailyRollup
 
 
 def ensure_database_initialized(db: Session) -> bool:
@@ -39,13 +41,18 @@ def ensure_database_initialized(db: Session) -> bool:
         print(f"[INFO] Found {len(existing_tables)} existing tables. Checking for new tables...")
 
     # 1. 创建所有表（包括新增的模型）
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=write_engine)
 
     # 检查是否有新表被创建
     new_tables = [t for t in inspector.get_table_names() if t not in existing_tables]
     if new_tables:
         print(f"[OK] Created new tables: {new_tables}")
 
+    # 1.1 执行版本化迁移（为已有数据库补充索引 / 列）
+    applied = run_migrations(write_engine)
+    if applied:
+        print(f"[OK] Applied {applied} schema migration(s)")
+
     # 2. 检查并创建默认用户
     user = db.query(User).first()
     if not user:
@@ -71,7 +78,8 @@ def init_db(db: Session) -> None:
     """初始化数据库（完整版）"""
     # 1. 创建所有表
     print("[INFO] Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=write_engine)
+    run_migrations(write_engine)
 
     # 2. 初始化默认用户
     _create_default_user(db)
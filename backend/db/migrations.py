@@ -0,0 +1,384 @@
+"""
+数据库版本化迁移
+
+`Base.metadata.create_all` 只会创建缺失的表，不会为已有数据库补充索引和列。
+本模块维护一个有序的迁移列表，按版本号依次在线执行，并记录到 schema_version 表：
+- 新数据库：create_all 已建好表和索引，迁移全部幂等，仅登记版本
+- 旧数据库：补齐缺失的索引 / 列
+- 已是最新：启动时只执行一次 MAX(version) 查询即跳过
+
+新增迁移时在 MIGRATIONS 末尾追加，版本号严格递增，且 upgrade 必须幂等。
+迁移中的 DDL 和回填语句直接写在迁移里，不引用 ORM 模型或业务模块，
+以免模型后续变化改变旧版本迁移的执行结果。
+"""
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    """单个迁移"""
+
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# ============ DDL 辅助函数（均为幂等操作） ============
+
+def create_index(conn: Connection, name: str, table: str, columns: Sequence[str]) -> None:
+    """创建索引（已存在则跳过）"""
+    cols = ", ".join(columns)
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    """检查表中是否存在指定列"""
+    rows = conn.execute(text(f"PRAGMA table_info({table})")).fetchall()
+    return any(row[1] == column for row in rows)
+
+
+def index_columns(conn: Connection, name: str) -> List[str]:
+    """获取索引的列（索引不存在时为空列表）"""
+    rows = conn.execute(text(f"PRAGMA index_info({name})")).fetchall()
+    return [row[2] for row in sorted(rows, key=lambda r: r[0])]
+
+
+def has_table(conn: Connection, table: str) -> bool:
+    """检查表是否存在"""
+    row = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": table}
+    ).first()
+    return row is not None
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    """
+    添加列（已存在则跳过）
+
+    Args:
+        conn: 数据库连接
+        table: 表名
+        column: 列名
+        ddl: 列定义，如 "VARCHAR(200)" 或 "INTEGER DEFAULT 0"
+    """
+    if not has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+# ============ 迁移定义 ============
+
+def _v1_hot_path_indexes(conn: Connection) -> None:
+    """热点过滤条件的复合索引"""
+    create_index(conn, "ix_diaries_user_created", "diaries", ["user_id", "created_at"])
+    create_index(conn, "ix_diaries_mood", "diaries", ["mood"])
+    create_index(conn, "ix_meal_deviations_system_occurred", "meal_deviations", ["system_id", "occurred_at"])
+    create_index(conn, "ix_system_score_logs_system_created", "system_score_logs", ["system_id", "created_at"])
+    create_index(conn, "ix_insights_user_generated", "insights", ["user_id", "generated_at"])
+    create_index(conn, "ix_agent_messages_session_timestamp", "agent_messages", ["session_id", "timestamp"])
+    create_index(conn, "ix_system_logs_system_created", "system_logs", ["system_id", "created_at"])
+
+
+def _v2_insight_score_hash(conn: Connection) -> None:
+    """洞察评分向量哈希（相同评分复用已有洞察）"""
+    add_column(conn, "insights", "score_hash", "VARCHAR(64)")
+    create_index(conn, "ix_insights_user_score_hash", "insights", ["user_id", "score_hash"])
+
+
+def _v3_insight_jobs(conn: Connection) -> None:
+    """洞察后台生成任务表"""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS insight_jobs ("
+        "id INTEGER NOT NULL, "
+        "user_id INTEGER, "
+        '"trigger" VARCHAR(20) NOT NULL, '
+        "status VARCHAR(20) NOT NULL, "
+        "attempts INTEGER NOT NULL, "
+        "error TEXT, "
+        "insight_id INTEGER, "
+        "created_at DATETIME DEFAULT (localnow()), "
+        "started_at DATETIME, "
+        "finished_at DATETIME, "
+        "PRIMARY KEY (id), "
+        "FOREIGN KEY(user_id) REFERENCES users (id), "
+        "FOREIGN KEY(insight_id) REFERENCES insights (id)"
+        ")"
+    ))
+    create_index(conn, "ix_insight_jobs_id", "insight_jobs", ["id"])
+    create_index(conn, "ix_insight_jobs_user_status", "insight_jobs", ["user_id", "status"])
+
+
+def _v4_agent_session_summary(conn: Connection) -> None:
+    """会话最新消息摘要列（会话列表不再加载消息）"""
+    add_column(conn, "agent_sessions", "last_message_preview", "VARCHAR(50)")
+    add_column(conn, "agent_sessions", "last_message_role", "VARCHAR(32)")
+    add_column(conn, "agent_sessions", "last_message_at", "DATETIME")
+
+    # 回填已有会话的最新消息（相关子查询走 ix_agent_messages_session_timestamp）
+    latest = (
+        "SELECT {col} FROM agent_messages m "
+        "WHERE m.session_id = agent_sessions.session_id "
+        "ORDER BY m.timestamp DESC, m.id DESC LIMIT 1"
+    )
+    conn.execute(text(
+        "UPDATE agent_sessions SET "
+        f"last_message_preview = ({latest.format(col='substr(m.content, 1, 50)')}), "
+        f"last_message_role = ({latest.format(col='m.role')}), "
+        f"last_message_at = ({latest.format(col='m.timestamp')}) "
+        "WHERE last_message_at IS NULL"
+    ))
+    create_index(
+        conn, "ix_agent_sessions_active_updated", "agent_sessions",
+        ["is_active", "updated_at", "session_id", "message_count",
+         "last_message_at", "last_message_role", "last_message_preview"]
+    )
+
+
+def _v5_agent_messages_window_index(conn: Connection) -> None:
+    """消息历史窗口索引扩展为 (session_id, timestamp, id)"""
+    columns = ["session_id", "timestamp", "id"]
+    if index_columns(conn, "ix_agent_messages_session_timestamp") != columns:
+        conn.execute(text("DROP INDEX IF EXISTS ix_agent_messages_session_timestamp"))
+        create_index(conn, "ix_agent_messages_session_timestamp", "agent_messages", columns)
+
+
+def _v6_attachment_blobs(conn: Connection) -> None:
+    """附件内容寻址存储：内容哈希与 MIME 类型"""
+    add_column(conn, "diary_attachments", "sha256", "VARCHAR(64)")
+    add_column(conn, "diary_attachments", "mime_type", "VARCHAR(100)")
+    create_index(conn, "ix_diary_attachments_diary", "diary_attachments", ["diary_id"])
+    create_index(conn, "ix_diary_attachments_sha256", "diary_attachments", ["sha256"])
+
+
+def _v7_diary_history_delta(conn: Connection) -> None:
+    """日记编辑历史：版本号与增量存储"""
+    add_column(conn, "diary_edit_history", "version", "INTEGER")
+    add_column(conn, "diary_edit_history", "is_keyframe", "INTEGER DEFAULT 1")
+    add_column(conn, "diary_edit_history", "content_delta", "TEXT")
+    add_column(conn, "diary_edit_history", "content_hash", "VARCHAR(40)")
+    add_column(conn, "diary_edit_history", "content_length", "INTEGER")
+
+    # 已有的全文快照均为关键帧，按 ID 顺序编号
+    conn.execute(text(
+        "UPDATE diary_edit_history SET "
+        "version = (SELECT COUNT(*) FROM diary_edit_history h "
+        "WHERE h.diary_id = diary_edit_history.diary_id AND h.id <= diary_edit_history.id), "
+        "is_keyframe = 1, "
+        "content_length = length(content_snapshot) "
+        "WHERE version IS NULL"
+    ))
+    create_index(conn, "ix_diary_edit_history_diary_version", "diary_edit_history", ["diary_id", "version"])
+
+
+# v8 回填语句（与迁移一起固定，后续修改 backend.db.rollups 不影响旧库升级结果）
+_V8_BACKFILL = [
+    "INSERT INTO daily_rollups (user_id, date, dimension, log_count, updated_at) "
+    "SELECT s.user_id, date(l.created_at), s.type, COUNT(*), :now "
+    "FROM system_logs l JOIN systems s ON s.id = l.system_id "
+    "WHERE l.created_at IS NOT NULL GROUP BY s.user_id, date(l.created_at), s.type",
+
+    "INSERT INTO daily_rollups (user_id, date, dimension, score_count, score_min, score_max, score_last, updated_at) "
+    "SELECT s.user_id, date(g.created_at) AS day, s.type, COUNT(*), MIN(g.new_score), MAX(g.new_score), "
+    "(SELECT g2.new_score FROM system_score_logs g2 WHERE g2.system_id = g.system_id "
+    "AND date(g2.created_at) = date(g.created_at) ORDER BY g2.created_at DESC, g2.id DESC LIMIT 1), :now "
+    "FROM system_score_logs g JOIN systems s ON s.id = g.system_id "
+    "WHERE g.created_at IS NOT NULL GROUP BY g.system_id, date(g.created_at) "
+    "ON CONFLICT (user_id, date, dimension) DO UPDATE SET "
+    "score_count = excluded.score_count, score_min = excluded.score_min, "
+    "score_max = excluded.score_max, score_last = excluded.score_last",
+
+    "INSERT INTO daily_rollups (user_id, date, dimension, deviation_count, updated_at) "
+    "SELECT s.user_id, date(d.occurred_at), s.type, COUNT(*), :now "
+    "FROM meal_deviations d JOIN systems s ON s.id = d.system_id "
+    "WHERE d.occurred_at IS NOT NULL GROUP BY s.user_id, date(d.occurred_at), s.type "
+    "ON CONFLICT (user_id, date, dimension) DO UPDATE SET deviation_count = excluded.deviation_count",
+
+    "INSERT INTO daily_rollups (user_id, date, dimension, diary_count, "
+    "mood_great, mood_good, mood_neutral, mood_bad, mood_terrible, updated_at) "
+    "SELECT user_id, date(created_at), 'JOURNAL', COUNT(*), "
+    "SUM(CASE WHEN mood = 'great' THEN 1 ELSE 0 END), SUM(CASE WHEN mood = 'good' THEN 1 ELSE 0 END), "
+    "SUM(CASE WHEN mood = 'neutral' THEN 1 ELSE 0 END), SUM(CASE WHEN mood = 'bad' THEN 1 ELSE 0 END), "
+    "SUM(CASE WHEN mood = 'terrible' THEN 1 ELSE 0 END), :now "
+    "FROM diaries WHERE created_at IS NOT NULL AND user_id IS NOT NULL GROUP BY user_id, date(created_at)",
+]
+
+
+def _v8_daily_rollups(conn: Connection) -> None:
+    """每日汇总表（一次性从原始表回填）"""
+    counter = "INTEGER DEFAULT '0' NOT NULL"
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS daily_rollups ("
+        "id INTEGER NOT NULL, "
+        "user_id INTEGER NOT NULL, "
+        "date DATE NOT NULL, "
+        "dimension VARCHAR(20) NOT NULL, "
+        f"log_count {counter}, "
+        f"score_count {counter}, "
+        "score_min INTEGER, "
+        "score_max INTEGER, "
+        "score_last INTEGER, "
+        f"deviation_count {counter}, "
+        f"diary_count {counter}, "
+        f"mood_great {counter}, "
+        f"mood_good {counter}, "
+        f"mood_neutral {counter}, "
+        f"mood_bad {counter}, "
+        f"mood_terrible {counter}, "
+        "updated_at DATETIME DEFAULT (localnow()), "
+        "PRIMARY KEY (id), "
+        "CONSTRAINT uq_daily_rollups_user_date_dimension UNIQUE (user_id, date, dimension), "
+        "FOREIGN KEY(user_id) REFERENCES users (id)"
+        ")"
+    ))
+    create_index(conn, "ix_daily_rollups_id", "daily_rollups", ["id"])
+
+    now = datetime.now()
+    conn.execute(text("DELETE FROM daily_rollups"))
+    for statement in _V8_BACKFILL:
+        conn.execute(text(statement), {"now": now})
+
+
+def _v9_tags(value) -> List[str]:
+    """v9 回填时的标签规范化（固定副本：JSON 数组 / 重复编码的 JSON 字符串 / 逗号分隔字符串）"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            parsed = value.split(",")
+        if isinstance(parsed, str):
+            return _v9_tags(parsed)
+        value = parsed if isinstance(parsed, list) else []
+    if not isinstance(value, (list, tuple)):
+        return []
+    tags: List[str] = []
+    for tag in value:
+        if isinstance(tag, str):
+            tag = tag.strip()[:50]
+            if tag and tag not in tags:
+                tags.append(tag)
+    return tags
+
+
+def _v9_diary_tags(conn: Connection) -> None:
+    """日记标签索引表（一次性从 diaries.tags 回填）"""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS diary_tags ("
+        "diary_id INTEGER NOT NULL, "
+        "tag VARCHAR(50) NOT NULL, "
+        "PRIMARY KEY (diary_id, tag), "
+        "FOREIGN KEY(diary_id) REFERENCES diaries (id)"
+        ")"
+    ))
+    create_index(conn, "ix_diary_tags_tag_diary", "diary_tags", ["tag", "diary_id"])
+
+    conn.execute(text("DELETE FROM diary_tags"))
+    rows = [
+        {"diary_id": diary_id, "tag": tag}
+        for diary_id, tags in conn.execute(text("SELECT id, tags FROM diaries WHERE tags IS NOT NULL"))
+        for tag in _v9_tags(tags)
+    ]
+    if rows:
+        conn.execute(text("INSERT OR IGNORE INTO diary_tags (diary_id, tag) VALUES (:diary_id, :tag)"), rows)
+
+
+def _v10_insight_background(conn: Connection) -> None:
+    """洞察来源标记（后台自动任务使用独立的每日额度）"""
+    add_column(conn, "insights", "background", "BOOLEAN DEFAULT 0 NOT NULL")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "hot path composite indexes", _v1_hot_path_indexes),
+    Migration(2, "insight score hash", _v2_insight_score_hash),
+    Migration(3, "insight jobs table", _v3_insight_jobs),
+    Migration(4, "agent session summary columns", _v4_agent_session_summary),
+    Migration(5, "agent messages window index", _v5_agent_messages_window_index),
+    Migration(6, "attachment blob columns", _v6_attachment_blobs),
+    Migration(7, "diary history delta storage", _v7_diary_history_delta),
+    Migration(8, "daily rollups table", _v8_daily_rollups),
+    Migration(9, "diary tags index table", _v9_diary_tags),
+    Migration(10, "insight background flag", _v10_insight_background),
+]
+
+
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+# ============ 迁移执行 ============
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(200) NOT NULL, "
+        "applied_at DATETIME NOT NULL, "
+        "duration_ms FLOAT"
+        ")"
+    ))
+
+
+def get_current_version(conn: Connection) -> int:
+    """获取当前数据库 schema 版本（无版本表时为 0）"""
+    if not has_table(conn, SCHEMA_VERSION_TABLE):
+        return 0
+    version = conn.execute(text(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+    return version or 0
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    执行所有未应用的迁移
+
+    每个迁移在独立事务中执行并登记版本，失败时回滚该迁移并抛出异常，
+    已成功的迁移保留。
+
+    Args:
+        engine: 数据库引擎
+
+    Returns:
+        本次执行的迁移数量
+    """
+    # 快速路径：已是最新版本则直接返回
+    with engine.connect() as conn:
+        current = get_current_version(conn)
+    if current >= LATEST_VERSION:
+        return 0
+
+    pending = [m for m in MIGRATIONS if m.version > current]
+    logger.info(f"Schema version {current} -> {LATEST_VERSION}, {len(pending)} migration(s) pending")
+
+    for migration in pending:
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            _ensure_version_table(conn)
+            migration.upgrade(conn)
+            duration_ms = (time.perf_counter() - start) * 1000
+            conn.execute(
+                text(
+                    f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description, applied_at, duration_ms) "
+                    "VALUES (:version, :description, :applied_at, :duration_ms)"
+                ),
+                {
+                    "version": migration.version,
+                    "description": migration.description,
+                    "applied_at": datetime.now(),
+                    "duration_ms": round(duration_ms, 2),
+                }
+            )
+        logger.info(f"Applied migration v{migration.version}: {migration.description} ({duration_ms:.1f}ms)")
+
+    return len(pending)
@@ -0,0 +1,250 @@
+"""
+慢查询诊断模块
+
+挂载 SQLAlchemy 引擎事件，记录超过阈值的 SQL 语句：
+- 按归一化 SQL 指纹聚合（次数、总耗时、最大耗时）
+- 捕获最慢一次的绑定参数和 EXPLAIN QUERY PLAN
+- 通过开发模式诊断接口暴露 Top N，为索引设计提供数据
+"""
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 指纹归一化规则：字符串、数字字面量和 IN 列表折叠为占位符
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+# 仅对查询类语句执行 EXPLAIN（DDL / PRAGMA 无执行计划）
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")
+
+# 单条参数记录的最大长度（避免大文本撑爆内存）
+_MAX_PARAM_REPR = 200
+
+
+def fingerprint_sql(statement: str) -> str:
+    """
+    生成 SQL 指纹
+
+    Args:
+        statement: 原始 SQL
+
+    Returns:
+        去掉字面量和多余空白后的 SQL，用作聚合键
+    """
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?+)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class SlowQueryStats:
+    """单个 SQL 指纹的慢查询统计"""
+
+    fingerprint: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_seen: float = 0.0
+    sample_statement: str = ""
+    sample_params: Optional[str] = None
+    query_plan: List[str] = field(default_factory=list)
+
+    @property
+    def full_scan(self) -> bool:
+        """执行计划中是否存在全表扫描（SCAN 且未使用索引）"""
+        return any(
+            step.startswith("SCAN") and "USING" not in step
+            for step in self.query_plan
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_seen": self.last_seen,
+            "sample_statement": self.sample_statement,
+            "sample_params": self.sample_params,
+            "query_plan": self.query_plan,
+            "full_scan": self.full_scan,
+        }
+
+
+class QueryProfiler:
+    """
+    慢查询分析器
+
+    通过 before/after_cursor_execute 事件计时，超过阈值的语句按指纹聚合。
+    """
+
+    def __init__(self, threshold_ms: float = 50.0, max_fingerprints: int = 500):
+        """
+        初始化分析器
+
+        Args:
+            threshold_ms: 慢查询阈值（毫秒）
+            max_fingerprints: 最多保留的指纹数量
+        """
+        self.threshold_ms = threshold_ms
+        self.max_fingerprints = max_fingerprints
+        self._stats: Dict[str, SlowQueryStats] = {}
+        self._lock = threading.Lock()
+        self._engines: List[Engine] = []
+
+    # ============ 引擎挂载 ============
+
+    def install(self, engine: Engine) -> None:
+        """挂载到引擎（重复挂载会被忽略）"""
+        if event.contains(engine, "before_cursor_execute", self._before_execute):
+            return
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        self._engines.append(engine)
+        logger.info(f"Slow query profiler installed (threshold={self.threshold_ms}ms)")
+
+    def uninstall(self, engine: Engine) -> None:
+        """从引擎卸载"""
+        if not event.contains(engine, "before_cursor_execute", self._before_execute):
+            return
+        event.remove(engine, "before_cursor_execute", self._before_execute)
+        event.remove(engine, "after_cursor_execute", self._after_execute)
+        if engine in self._engines:
+            self._engines.remove(engine)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._engines)
+
+    # ============ 事件回调 ============
+
+    # 计时起点挂在本条语句的执行上下文上：语句失败时 after_cursor_execute 不会触发，
+    # 上下文随之丢弃，不会残留到连接上打乱后续语句的计时
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_profiler_start", None)
+        if start is None:
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        key = fingerprint_sql(statement)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                if len(self._stats) >= self.max_fingerprints:
+                    self._evict_fastest()
+                stats = self._stats[key] = SlowQueryStats(fingerprint=key)
+            is_new_max = elapsed_ms > stats.max_ms
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.last_seen = time.time()
+            if is_new_max:
+                stats.max_ms = elapsed_ms
+                stats.sample_statement = statement
+                stats.sample_params = _format_params(parameters, executemany)
+
+        # 只在出现新的最慢样本时重新采集执行计划，避免每次都多一次往返
+        if is_new_max and not executemany:
+            plan = self._explain(conn, statement, parameters)
+            with self._lock:
+                stats.query_plan = plan
+
+        logger.warning(
+            f"Slow query ({elapsed_ms:.1f}ms): {key[:200]}",
+            extra={"extra_data": {"slow_query_ms": round(elapsed_ms, 2)}},
+        )
+
+    def _explain(self, conn, statement: str, parameters) -> List[str]:
+        """在同一 DBAPI 连接上执行 EXPLAIN QUERY PLAN"""
+        if conn.dialect.name != "sqlite":
+            return []
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+                # 行格式：(id, parent, notused, detail)
+                return [row[-1] for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception as e:
+            logger.debug(f"EXPLAIN QUERY PLAN failed: {e}")
+            return []
+
+    def _evict_fastest(self) -> None:
+        """指纹数超限时淘汰总耗时最小的一条"""
+        victim = min(self._stats.values(), key=lambda s: s.total_ms)
+        del self._stats[victim.fingerprint]
+
+    # ============ 查询接口 ============
+
+    def top(self, limit: int = 20, order_by: str = "total_ms") -> List[Dict[str, Any]]:
+        """
+        获取慢查询排行
+
+        Args:
+            limit: 返回数量
+            order_by: 排序字段（total_ms, max_ms, count）
+
+        Returns:
+            统计字典列表
+        """
+        if order_by not in ("total_ms", "max_ms", "count"):
+            order_by = "total_ms"
+        with self._lock:
+            ranked = sorted(
+                self._stats.values(),
+                key=lambda s: getattr(s, order_by),
+                reverse=True,
+            )
+            return [s.to_dict() for s in ranked[:limit]]
+
+    def reset(self) -> int:
+        """清空统计，返回清除的指纹数"""
+        with self._lock:
+            count = len(self._stats)
+            self._stats.clear()
+        return count
+
+
+def _format_params(parameters, executemany: bool) -> Optional[str]:
+    """格式化绑定参数（截断长值）"""
+    if parameters is None:
+        return None
+    if executemany:
+        return f"<executemany: {len(parameters)} rows>"
+    text = repr(parameters)
+    if len(text) > _MAX_PARAM_REPR:
+        text = text[:_MAX_PARAM_REPR] + "..."
+    return text
+
+
+# 全局分析器实例
+query_profiler = QueryProfiler(threshold_ms=settings.DB_SLOW_QUERY_THRESHOLD_MS)
+
+
+def install_query_profiler(engine: Engine) -> None:
+    """按配置为引擎挂载慢查询分析器"""
+    if settings.DB_SLOW_QUERY_ENABLED:
+        query_profiler.install(engine)
@@ -0,0 +1,284 @@
+"""
+每日汇总（daily_rollups）维护
+
+在会话层捕获日志、评分日志、饮食偏离和日记的写入，按 (用户, 日期, 维度) 增量更新汇总行，
+与业务写入在同一事务内完成，回滚时一起回滚：
+
+- after_flush：遍历本次 flush 的新增 / 修改 / 删除对象，计算各汇总行的增量后 UPSERT
+- track_inserted()：ORM 批量插入语句（insert().returning()）不经过 flush，由调用方显式登记
+- rebuild_rollups()：从原始表整体重算（迁移回填、JSON 导入后调用）
+
+评分日志只追加，汇总中的评分最小 / 最大 / 最后值不随删除回退。
+"""
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection
+
+from backend.db.versions import mark_written
+
+logger = logging.getLogger(__name__)
+
+# 日记汇总使用的维度名（与 backend.models.rollup.JOURNAL_DIMENSION 一致）
+JOURNAL_DIMENSION = "JOURNAL"
+
+# 心情 -> 汇总列
+MOOD_COLUMNS = {
+    "great": "mood_great",
+    "good": "mood_good",
+    "neutral": "mood_neutral",
+    "bad": "mood_bad",
+    "terrible": "mood_terrible",
+}
+
+COUNTER_COLUMNS = (
+    "log_count", "score_count", "deviation_count", "diary_count", *MOOD_COLUMNS.values()
+)
+
+# 表 -> 决定汇总日期的列
+_DATE_COLUMNS = {
+    "system_logs": "created_at",
+    "system_score_logs": "created_at",
+    "meal_deviations": "occurred_at",
+    "diaries": "created_at",
+}
+
+# 修改后会影响汇总的列
+_TRACKED_UPDATES = {
+    "system_logs": ("system_id", "created_at"),
+    "meal_deviations": ("system_id", "occurred_at"),
+    "diaries": ("user_id", "created_at", "mood"),
+}
+
+RollupKey = Tuple[int, str, str]  # (user_id, 日期, 维度)
+
+
+_UPSERT_SQL = text(
+    "INSERT INTO daily_rollups (user_id, date, dimension, "
+    + ", ".join(COUNTER_COLUMNS)
+    + ", score_min, score_max, score_last, updated_at) VALUES (:user_id, :date, :dimension, "
+    + ", ".join(f":{column}" for column in COUNTER_COLUMNS)
+    + ", :score_min, :score_max, :score_last, :updated_at) "
+    "ON CONFLICT (user_id, date, dimension) DO UPDATE SET "
+    + ", ".join(f"{column} = {column} + excluded.{column}" for column in COUNTER_COLUMNS)
+    + ", score_min = CASE WHEN excluded.score_min IS NULL THEN score_min "
+    "WHEN score_min IS NULL THEN excluded.score_min ELSE MIN(score_min, excluded.score_min) END, "
+    "score_max = CASE WHEN excluded.score_max IS NULL THEN score_max "
+    "WHEN score_max IS NULL THEN excluded.score_max ELSE MAX(score_max, excluded.score_max) END, "
+    "score_last = COALESCE(excluded.score_last, score_last), "
+    "updated_at = excluded.updated_at"
+)
+
+
+# ============ 增量计算 ============
+
+def _to_day(value: Any) -> str:
+    """把时间值转换为日期字符串（服务端默认值尚未加载时按当天计算）"""
+    if value is None:
+        return date.today().isoformat()
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10]
+
+
+def _current(obj, attr: str) -> Any:
+    # 只读取已加载的值，不在 flush 事件中触发懒加载
+    return inspect(obj).dict.get(attr)
+
+
+def _previous(obj, attr: str) -> Any:
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return _current(obj, attr)
+
+
+class _Collector:
+    """收集一批对象对汇总行的增量"""
+
+    def __init__(self):
+        # (所属, ID, 日期) -> 计数增量；所属为 "system"（按 system_id）或 "user"（日记）
+        self.counters: Dict[Tuple[str, int, str], Dict[str, int]] = {}
+        # (system_id, 日期) -> [(评分日志 ID, 评分)]
+        self.scores: Dict[Tuple[int, str], List[Tuple[int, int]]] = {}
+
+    def _add(self, owner: str, owner_id: Any, day: str, column: str, sign: int) -> None:
+        if owner_id is None:
+            return
+        counters = self.counters.setdefault((owner, owner_id, day), {})
+        counters[column] = counters.get(column, 0) + sign
+
+    def add(self, table: str, values: Dict[str, Any], sign: int) -> None:
+        day = _to_day(values.get(_DATE_COLUMNS[table]))
+        if table == "system_logs":
+            self._add("system", values.get("system_id"), day, "log_count", sign)
+        elif table == "meal_deviations":
+            self._add("system", values.get("system_id"), day, "deviation_count", sign)
+        elif table == "diaries":
+            self._add("user", values.get("user_id"), day, "diary_count", sign)
+            mood_column = MOOD_COLUMNS.get(values.get("mood"))
+            if mood_column:
+                self._add("user", values.get("user_id"), day, mood_column, sign)
+        elif table == "system_score_logs" and sign > 0 and values.get("system_id") is not None:
+            self._add("system", values["system_id"], day, "score_count", sign)
+            self.scores.setdefault((values["system_id"], day), []).append(
+                (values.get("id") or 0, values.get("new_score"))
+            )
+
+    def add_object(self, obj, sign: int, previous: bool = False) -> None:
+        table = getattr(obj, "__tablename__", None)
+        if table not in _DATE_COLUMNS:
+            return
+        read = _previous if previous else _current
+        columns = ("id", "system_id", "user_id", "mood", "new_score", _DATE_COLUMNS[table])
+        self.add(table, {column: read(obj, column) for column in columns if hasattr(obj, column)}, sign)
+
+    def add_update(self, obj) -> None:
+        """修改了影响汇总的列时，先减去旧值的贡献再加上新值的贡献"""
+        table = getattr(obj, "__tablename__", None)
+        columns = _TRACKED_UPDATES.get(table)
+        if not columns:
+            return
+        state = inspect(obj)
+        if not any(state.attrs[column].history.has_changes() for column in columns):
+            return
+        self.add_object(obj, -1, previous=True)
+        self.add_object(obj, 1)
+
+    def __bool__(self) -> bool:
+        return bool(self.counters)
+
+    def to_rows(self, connection: Connection) -> Dict[RollupKey, Dict[str, Any]]:
+        """把增量转换为汇总行（系统维度需要查询系统所属用户和类型）"""
+        system_ids = {owner_id for owner, owner_id, _ in self.counters if owner == "system"}
+        systems: Dict[int, Tuple[int, str]] = {}
+        if system_ids:
+            placeholders = ", ".join(f":id{i}" for i in range(len(system_ids)))
+            result = connection.execute(
+                text(f"SELECT id, user_id, type FROM systems WHERE id IN ({placeholders})"),
+                {f"id{i}": system_id for i, system_id in enumerate(system_ids)},
+            )
+            systems = {row.id: (row.user_id, row.type) for row in result}
+
+        rows: Dict[RollupKey, Dict[str, Any]] = {}
+        for (owner, owner_id, day), counters in self.counters.items():
+            if owner == "system":
+                if owner_id not in systems:
+                    continue
+                user_id, dimension = systems[owner_id]
+            else:
+                user_id, dimension = owner_id, JOURNAL_DIMENSION
+
+            row = rows.setdefault((user_id, day, dimension), {
+                **{column: 0 for column in COUNTER_COLUMNS},
+                "score_min": None, "score_max": None, "score_last": None,
+            })
+            for column, delta in counters.items():
+                row[column] += delta
+
+            if owner == "system":
+                events = sorted(e for e in self.scores.get((owner_id, day), []) if e[1] is not None)
+                if events:
+                    values = [score for _, score in events]
+                    row["score_min"] = min(values)
+                    row["score_max"] = max(values)
+                    row["score_last"] = values[-1]
+        return rows
+
+
+def _apply(connection: Connection, collector: _Collector) -> None:
+    if not collector:
+        return
+    now = datetime.now()
+    params = [
+        {"user_id": user_id, "date": day, "dimension": dimension, "updated_at": now, **values}
+        for (user_id, day, dimension), values in collector.to_rows(connection).items()
+        if any(values[column] for column in COUNTER_COLUMNS) or values["score_last"] is not None
+    ]
+    if params:
+        connection.execute(_UPSERT_SQL, params)
+
+
+# ============ 会话事件 ============
+
+def _after_flush(session, flush_context) -> None:
+    collector = _Collector()
+    for obj in session.new:
+        collector.add_object(obj, 1)
+    for obj in session.dirty:
+        collector.add_update(obj)
+    for obj in session.deleted:
+        collector.add_object(obj, -1, previous=True)
+    if collector:
+        _apply(session.connection(), collector)
+        mark_written(session, "daily_rollups")
+
+
+def track_inserted(session, objects: Iterable[Any]) -> None:
+    """登记 ORM 批量插入语句写入的对象（须在同一事务内、提交前调用）"""
+    collector = _Collector()
+    for obj in objects:
+        collector.add_object(obj, 1)
+    if collector:
+        _apply(session.connection(), collector)
+        mark_written(session, "daily_rollups")
+
+
+def install_rollup_tracking(session_cls) -> None:
+    """为会话类挂载每日汇总维护事件"""
+    event.listen(session_cls, "after_flush", _after_flush)
+
+
+# ============ 整体重算 ============
+
+_REBUILD_STATEMENTS = [
+    # 系统日志数
+    "INSERT INTO daily_rollups (user_id, date, dimension, log_count, updated_at) "
+    "SELECT s.user_id, date(l.created_at), s.type, COUNT(*), :now "
+    "FROM system_logs l JOIN systems s ON s.id = l.system_id "
+    "WHERE l.created_at IS NOT NULL GROUP BY s.user_id, date(l.created_at), s.type",
+
+    # 评分变化：次数、最小 / 最大、当天最后一次评分
+    "INSERT INTO daily_rollups (user_id, date, dimension, score_count, score_min, score_max, score_last, updated_at) "
+    "SELECT s.user_id, date(g.created_at) AS day, s.type, COUNT(*), MIN(g.new_score), MAX(g.new_score), "
+    "(SELECT g2.new_score FROM system_score_logs g2 WHERE g2.system_id = g.system_id "
+    "AND date(g2.created_at) = date(g.created_at) ORDER BY g2.created_at DESC, g2.id DESC LIMIT 1), :now "
+    "FROM system_score_logs g JOIN systems s ON s.id = g.system_id "
+    "WHERE g.created_at IS NOT NULL GROUP BY g.system_id, date(g.created_at) "
+    "ON CONFLICT (user_id, date, dimension) DO UPDATE SET "
+    "score_count = excluded.score_count, score_min = excluded.score_min, "
+    "score_max = excluded.score_max, score_last = excluded.score_last",
+
+    # 饮食偏离数
+    "INSERT INTO daily_rollups (user_id, date, dimension, deviation_count, updated_at) "
+    "SELECT s.user_id, date(d.occurred_at), s.type, COUNT(*), :now "
+    "FROM meal_deviations d JOIN systems s ON s.id = d.system_id "
+    "WHERE d.occurred_at IS NOT NULL GROUP BY s.user_id, date(d.occurred_at), s.type "
+    "ON CONFLICT (user_id, date, dimension) DO UPDATE SET deviation_count = excluded.deviation_count",
+
+    # 日记数和心情分布
+    "INSERT INTO daily_rollups (user_id, date, dimension, diary_count, "
+    + ", ".join(MOOD_COLUMNS.values()) + ", updated_at) "
+    f"SELECT user_id, date(created_at), '{JOURNAL_DIMENSION}', COUNT(*), "
+    + ", ".join(f"SUM(CASE WHEN mood = '{mood}' THEN 1 ELSE 0 END)" for mood in MOOD_COLUMNS)
+    + ", :now FROM diaries WHERE created_at IS NOT NULL AND user_id IS NOT NULL "
+    "GROUP BY user_id, date(created_at)",
+]
+
+
+def rebuild_rollups(connection: Connection) -> None:
+    """
+    从原始表重算全部汇总行
+
+    Args:
+        connection: 数据库连接（调用方负责事务）
+    """
+    now = datetime.now()
+    connection.execute(text("DELETE FROM daily_rollups"))
+    for statement in _REBUILD_STATEMENTS:
+        connection.execute(text(statement), {"now": now})
+    logger.info("Daily rollups rebuilt")
@@ -1,75 +1,261 @@
 """数据库会话管理（增强版）"""
+import asyncio
 import logging
-from sqlalchemy import create_engine, text, event
+import re
+import threading
+import weakref
+from datetime import datetime
+from sqlalchemy import create_engine, text, event, func
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.elements import TextClause
 from contextlib import contextmanager
-from typing import Generator
+from typing import Generator, Optional, Tuple
 
 from backend.core.config import settings
+from backend.core.serialization import dumps_str, loads
+from backend.db.profiler import install_query_profiler
+from backend.db.versions import install_version_tracking, bump_all
+from backend.db.rollups import install_rollup_tracking
+from backend.db.tag_index import install_tag_index
+from backend.db.cdc import install_change_capture, change_feed
 
 logger = logging.getLogger(__name__)
 
+IS_SQLITE = "sqlite" in settings.DATABASE_URL
 
-# 针对 SQLite 的特殊参数
-connect_args = {"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-
-# 创建引擎，配置连接池
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args=connect_args,
-    poolclass=QueuePool,
-    pool_size=5,  # 连接池大小
-    max_overflow=10,  # 最大溢出连接数
-    pool_timeout=30,  # 获取连接的超时时间（秒）
-    pool_recycle=1800,  # 连接回收时间（秒）- 30分钟
-    pool_pre_ping=True,  # 连接前检查可用性
-    echo=False,  # 生产环境关闭 SQL 日志
-    future=True  # 使用 SQLAlchemy 2.0 风格
-)
-
-
-# 为 SQLite 配置本地时间（而非 UTC）
-@event.listens_for(engine, "connect")
-def set_sqlite_local_time(dbapi_conn, connection_record):
-    """配置 SQLite 使用本地时间"""
-    if "sqlite" in settings.DATABASE_URL:
-        from datetime import datetime
-
-        # 创建本地时间函数（返回 ISO 格式字符串）
-        def local_now():
-            """返回当前本地时间（ISO 格式字符串）"""
-            return datetime.now().isoformat()
-
-        # 注册到 SQLite
-        dbapi_conn.create_function("localnow", 0, local_now)
-
-        # 优化 SQLite 性能
-        cursor = dbapi_conn.cursor()
-        try:
-            cursor.execute("PRAGMA journal_mode=WAL")
-        except Exception:
-            pass
+# 文本 SQL 中的写语句（ORM 语句通过 is_dml 判断）
+_WRITE_SQL = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+
+
+def local_now() -> str:
+    """返回当前本地时间（ISO 格式字符串）"""
+    return datetime.now().isoformat()
+
+
+def _configure_sqlite_connection(dbapi_conn, connection_record):
+    """
+    SQLite 连接初始化
+
+    - 注册 localnow() 函数，使 server_default 使用本地时间（而非 UTC）
+    - 设置 WAL 及连接级性能参数
+    """
+    dbapi_conn.create_function("localnow", 0, local_now)
+
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # WAL 下 NORMAL 仅在检查点时 fsync，掉电最多丢失最近的事务，不会损坏数据库
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        # 负数表示 KiB
+        cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    except Exception as e:
+        logger.warning(f"Failed to apply SQLite pragmas: {e}")
+    finally:
         cursor.close()
 
 
-# 创建本地时间函数（用于模型中的 server_default）
-from sqlalchemy import func
+def _disable_pysqlite_transactions(dbapi_conn, connection_record):
+    """
+    关闭 pysqlite 自带的隐式事务管理
+
+    pysqlite 只在 DML 前隐式 BEGIN，会导致 SAVEPOINT 直接开启并提交事务，
+    写连接改为由 SQLAlchemy 显式 BEGIN（见 _begin_immediate）。
+    """
+    dbapi_conn.isolation_level = None
+
+
+def _begin_immediate(conn):
+    """写连接事务开始即获取写锁，避免读锁升级写锁时的 SQLITE_BUSY"""
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def create_db_engine(url: str, role: str = "reader") -> Engine:
+    """
+    创建数据库引擎
+
+    SQLite 为单文件数据库，同一时刻只允许一个写事务：
+    - reader：多连接池，供并发读取（容量 DB_READ_POOL_SIZE + DB_READ_POOL_OVERFLOW）
+    - writer：单连接（pool_size=1, max_overflow=0），写入在连接池层面排队，
+      避免多个连接争抢写锁导致 "database is locked"
+
+    本地文件不存在连接失效问题，因此关闭 pool_pre_ping，省去每次取连接的 SELECT 1。
+
+    注意：会话在事务结束（commit / rollback / close）前一直占用连接，而连接池取连接会阻塞
+    调用线程。async 路由在 await 耗时操作（AI 调用、bcrypt、上传流）之前须先 commit 释放连接，
+    否则连接池耗尽时事件循环线程阻塞在取连接上，持有连接的协程也无法恢复执行。
+
+    Args:
+        url: 数据库 URL
+        role: reader 或 writer
+
+    Returns:
+        配置好的引擎
+    """
+    is_sqlite = "sqlite" in url
+    if role == "writer":
+        pool_size, max_overflow = 1, 0
+    else:
+        pool_size = settings.DB_READ_POOL_SIZE
+        max_overflow = settings.DB_READ_POOL_OVERFLOW
+
+    new_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if is_sqlite else {},
+        poolclass=QueuePool,
+        pool_size=pool_size,  # 连接池大小
+        max_overflow=max_overflow,  # 最大溢出连接数
+        pool_timeout=settings.DB_POOL_TIMEOUT,  # 获取连接的超时时间（秒）
+        pool_recycle=1800,  # 连接回收时间（秒）- 30分钟
+        pool_pre_ping=not is_sqlite,  # 仅远程数据库需要连接前检查
+        echo=False,  # 生产环境关闭 SQL 日志
+        future=True,  # 使用 SQLAlchemy 2.0 风格
+        json_serializer=dumps_str,  # JSON 列使用统一序列化（orjson 可用时走 orjson）
+        json_deserializer=loads,
+    )
+
+    if is_sqlite:
+        event.listen(new_engine, "connect", _configure_sqlite_connection)
+        if role == "writer":
+            event.listen(new_engine, "connect", _disable_pysqlite_transactions)
+            event.listen(new_engine, "begin", _begin_immediate)
+
+    # 慢查询诊断（由 DB_SLOW_QUERY_ENABLED 控制）
+    install_query_profiler(new_engine)
+    return new_engine
+
+
+# 持有写连接（事务未结束）的会话 -> 取得写连接时的调用上下文；会话被回收时自动移除
+_writer_holders: "weakref.WeakKeyDictionary[Session, Tuple[int, Optional[int]]]" = weakref.WeakKeyDictionary()
+_writer_holders_lock = threading.Lock()
+
+
+def _call_context() -> Tuple[int, Optional[int]]:
+    """当前调用上下文：(线程 ID, asyncio 任务 ID)，同一事件循环上的不同请求互不影响"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return threading.get_ident(), id(task) if task is not None else None
+
+
+def holds_writer(exclude: Optional[Session] = None) -> bool:
+    """当前调用上下文中是否有会话持有未结束的写事务"""
+    context = _call_context()
+    with _writer_holders_lock:
+        return any(owner == context and session is not exclude for session, owner in _writer_holders.items())
+
+
+def _writer_held_by_suspended_task(exclude: Optional[Session] = None) -> bool:
+    """
+    同一线程上另一个 asyncio 任务是否持有未结束的写事务
+
+    同一线程同一时刻只运行一个任务，持有写连接的其他任务必然停在某个 await 上；
+    当前任务在取连接处阻塞会卡住整个事件循环，那个任务永远没有机会提交。
+    """
+    thread_id, task_id = _call_context()
+    if task_id is None:
+        return False
+    with _writer_holders_lock:
+        return any(
+            owner[0] == thread_id and owner[1] != task_id and session is not exclude
+            for session, owner in _writer_holders.items()
+        )
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话
+
+    读取走 reader 连接池；flush 和写语句走单写连接。
+    一旦当前事务发生写入，后续语句都固定在写连接上，保证能读到未提交的修改。
+
+    写连接只有一个，以下两种情况在取连接处等待只会一直等到超时，直接抛出 RuntimeError：
+    - 同一调用上下文（线程 + asyncio 任务）在一个会话的写事务结束前用另一个会话写入
+    - 同一事件循环上另一个任务写入后未提交就 await（写事务跨 await），
+      当前任务阻塞取连接会卡住事件循环；写路径须在 await 之前提交
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        write_bind = self.info.get("write_bind")
+        if write_bind is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+        if self.info.get("use_writer") or self._flushing or _is_write_clause(clause):
+            if self not in _writer_holders:
+                if holds_writer(exclude=self):
+                    raise RuntimeError(
+                        "当前线程已有会话持有未提交的写事务，嵌套写会话会等待单写连接直到超时；"
+                        "请先提交外层会话或复用同一个会话"
+                    )
+                if _writer_held_by_suspended_task(exclude=self):
+                    raise RuntimeError(
+                        "同一事件循环上另一个任务持有未提交的写事务并在 await 中挂起，"
+                        "等待单写连接会阻塞事件循环；写入后须在 await 之前提交"
+                    )
+                with _writer_holders_lock:
+                    _writer_holders[self] = _call_context()
+            self.info["use_writer"] = True
+            return write_bind
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def _is_write_clause(clause) -> bool:
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause):
+        return bool(_WRITE_SQL.match(clause.text))
+    return bool(getattr(clause, "is_dml", False))
+
+
+# 提交后递增写入表的版本号（用于 ETag / 响应缓存失效）
+install_version_tracking(RoutingSession)
+# 提交后发布行级变更记录（用于前端增量更新，须在版本追踪之后挂载）
+install_change_capture(RoutingSession)
+# flush 时增量维护每日汇总表
+install_rollup_tracking(RoutingSession)
+# flush 时同步日记标签索引表
+install_tag_index(RoutingSession)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_writer_routing(session, transaction):
+    """根事务结束后恢复读路由"""
+    if transaction.parent is None:
+        session.info.pop("use_writer", None)
+        with _writer_holders_lock:
+            _writer_holders.pop(session, None)
+
+
+def _create_session_factory(read_engine: Engine, write_bind: Engine) -> sessionmaker:
+    return sessionmaker(
+        class_=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        bind=read_engine,
+        expire_on_commit=False,  # 避免提交后对象过期
+        info={"write_bind": write_bind} if write_bind is not read_engine else {}
+    )
+
+
+# 创建引擎：SQLite 使用读连接池 + 单写连接，其他数据库共用一个引擎
+engine = create_db_engine(settings.DATABASE_URL, role="reader")
+write_engine = create_db_engine(settings.DATABASE_URL, role="writer") if IS_SQLITE else engine
+
 
 # 定义一个使用本地时间的函数（仅适用于 SQLite）
-if "sqlite" in settings.DATABASE_URL:
+if IS_SQLITE:
     # SQLite 使用自定义函数
     localnow_func = func.localnow
 else:
     # 其他数据库使用本地时间的函数
     localnow_func = func.now
 
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
-    bind=engine,
-    expire_on_commit=False  # 避免提交后对象过期
-)
+SessionLocal = _create_session_factory(engine, write_engine)
 
 
 @contextmanager
@@ -156,19 +342,24 @@ class DatabaseManager:
 
     @staticmethod
     def get_pool_status() -> dict:
-        """获取连接池状态"""
-        pool = engine.pool
-        status = {
-            "size": pool.size(),
-            "checked_in": pool.checkedin(),
-            "checked_out": pool.checkedout(),
-        }
-
-        # SQLite 的连接池不支持 overflow
-        if hasattr(pool, "max_overflow"):
-            status["max_overflow"] = pool.max_overflow()
-            status["overflow"] = pool.overflow()
-
+        """获取连接池状态（读连接池 + 写连接）"""
+        def _status(target_engine: Engine) -> dict:
+            pool = target_engine.pool
+            status = {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+            }
+
+            # SQLite 的连接池不支持 overflow
+            if hasattr(pool, "max_overflow"):
+                status["max_overflow"] = pool.max_overflow()
+                status["overflow"] = pool.overflow()
+            return status
+
+        status = _status(engine)
+        if write_engine is not engine:
+            status["writer"] = _status(write_engine)
         return status
 
     @staticmethod
@@ -176,6 +367,8 @@ class DatabaseManager:
         """关闭所有数据库连接"""
         try:
             engine.dispose()
+            if write_engine is not engine:
+                write_engine.dispose()
             logger.info("All database connections closed")
         except Exception as e:
             logger.error(f"Error closing connections: {e}")
@@ -187,7 +380,7 @@ class DatabaseManager:
 
         在 ZIP 备份恢复后调用，用于指向新的数据库文件
         """
-        global engine, SessionLocal
+        global engine, write_engine, SessionLocal
 
         try:
             # 记录当前引擎状态
@@ -196,57 +389,31 @@ class DatabaseManager:
 
             # 关闭旧引擎的所有连接
             engine.dispose()
+            if write_engine is not engine:
+                write_engine.dispose()
             logger.info("Disposed old engine connections")
 
-            # 重新创建引擎
-            connect_args = {"check_same_thread": False} if "sqlite" in DatabaseManager._original_url else {}
-            logger.info(f"Creating new engine with URL: {DatabaseManager._original_url}")
-
-            engine = create_engine(
-                DatabaseManager._original_url,
-                connect_args=connect_args,
-                poolclass=QueuePool,
-                pool_size=5,
-                max_overflow=10,
-                pool_timeout=30,
-                pool_recycle=1800,
-                pool_pre_ping=True,
-                echo=False,
-                future=True
-            )
+            # 重新创建引擎（连接初始化和慢查询诊断由 create_db_engine 统一挂载）
+            url = DatabaseManager._original_url
+            logger.info(f"Creating new engine with URL: {url}")
 
-            logger.info(f"New engine created with database path: {engine.url.database}")
-
-            # 重新配置 SQLite 本地时间事件监听
-            @event.listens_for(engine, "connect")
-            def set_sqlite_local_time(dbapi_conn, connection_record):
-                if "sqlite" in DatabaseManager._original_url:
-                    from datetime import datetime
-
-                    def local_now():
-                        return datetime.now().isoformat()
+            engine = create_db_engine(url, role="reader")
+            write_engine = create_db_engine(url, role="writer") if "sqlite" in url else engine
 
-                    dbapi_conn.create_function("localnow", 0, local_now)
-
-                    cursor = dbapi_conn.cursor()
-                    try:
-                        cursor.execute("PRAGMA journal_mode=WAL")
-                    except Exception:
-                        pass
-                    cursor.close()
+            logger.info(f"New engine created with database path: {engine.url.database}")
 
             # 重新创建 SessionLocal
-            SessionLocal = sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=engine,
-                expire_on_commit=False
-            )
+            SessionLocal = _create_session_factory(engine, write_engine)
+
+            # 数据库文件已替换，所有缓存版本失效，通知前端全量刷新
+            bump_all()
+            change_feed.reset()
 
             # 更新模块级变量
             import sys
             current_module = sys.modules[__name__]
             current_module.engine = engine
+            current_module.write_engine = write_engine
             current_module.SessionLocal = SessionLocal
 
             # 测试新引擎
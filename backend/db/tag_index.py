@@ -0,0 +1,132 @@
+"""
+日记标签索引（diary_tags）同步
+
+Diary.tags 是 JSON 数组，无法建索引。diary_tags 保存其规范化副本（每个标签一行），
+在会话层随日记的写入自动同步，与业务写入在同一事务内完成：
+
+- after_flush：新增日记写入标签；修改了 tags 的日记先删后写；删除的日记删除标签
+- track_inserted()：ORM 批量插入语句不经过 flush，由调用方显式登记
+- rebuild_tag_index()：从 diaries.tags 整体重建（迁移回填、JSON 导入后调用）
+"""
+import json
+import logging
+from typing import Any, Iterable, List
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection
+
+from backend.db.versions import mark_written
+
+logger = logging.getLogger(__name__)
+
+# 与 DiaryTag.tag 列长度一致
+MAX_TAG_LENGTH = 50
+
+_INSERT_SQL = text("INSERT OR IGNORE INTO diary_tags (diary_id, tag) VALUES (:diary_id, :tag)")
+
+
+def normalize_tags(tags: Any) -> List[str]:
+    """
+    把 tags 列的值规范化为去重后的标签列表
+
+    兼容历史数据中以 JSON 字符串或逗号分隔字符串保存的标签。
+    """
+    if tags is None:
+        return []
+    if isinstance(tags, str):
+        try:
+            parsed = json.loads(tags)
+        except (json.JSONDecodeError, TypeError):
+            parsed = tags.split(",")
+        if isinstance(parsed, str):
+            # 重复编码的 JSON 字符串
+            return normalize_tags(parsed)
+        tags = parsed if isinstance(parsed, list) else []
+    if not isinstance(tags, (list, tuple)):
+        return []
+
+    result: List[str] = []
+    for tag in tags:
+        if not isinstance(tag, str):
+            continue
+        tag = tag.strip()[:MAX_TAG_LENGTH]
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+def _replace(connection: Connection, diary_ids: Iterable[int], rows: List[dict]) -> None:
+    diary_ids = list(diary_ids)
+    if diary_ids:
+        placeholders = ", ".join(f":id{i}" for i in range(len(diary_ids)))
+        connection.execute(
+            text(f"DELETE FROM diary_tags WHERE diary_id IN ({placeholders})"),
+            {f"id{i}": diary_id for i, diary_id in enumerate(diary_ids)},
+        )
+    if rows:
+        connection.execute(_INSERT_SQL, rows)
+
+
+def _rows(diary_id: int, tags: Any) -> List[dict]:
+    return [{"diary_id": diary_id, "tag": tag} for tag in normalize_tags(tags)]
+
+
+# ============ 会话事件 ============
+
+def _after_flush(session, flush_context) -> None:
+    stale: List[int] = []
+    rows: List[dict] = []
+    for obj in session.new:
+        if getattr(obj, "__tablename__", None) == "diaries":
+            rows.extend(_rows(obj.id, inspect(obj).dict.get("tags")))
+    for obj in session.dirty:
+        if getattr(obj, "__tablename__", None) != "diaries":
+            continue
+        if inspect(obj).attrs.tags.history.has_changes():
+            stale.append(obj.id)
+            rows.extend(_rows(obj.id, inspect(obj).dict.get("tags")))
+    for obj in session.deleted:
+        if getattr(obj, "__tablename__", None) == "diaries":
+            stale.append(obj.id)
+
+    if stale or rows:
+        _replace(session.connection(), stale, rows)
+        mark_written(session, "diary_tags")
+
+
+def track_inserted(session, diaries: Iterable[Any]) -> None:
+    """登记 ORM 批量插入语句写入的日记（须在同一事务内、提交前调用）"""
+    rows: List[dict] = []
+    for diary in diaries:
+        rows.extend(_rows(diary.id, diary.tags))
+    if rows:
+        session.connection().execute(_INSERT_SQL, rows)
+        mark_written(session, "diary_tags")
+
+
+def install_tag_index(session_cls) -> None:
+    """为会话类挂载标签索引同步事件"""
+    event.listen(session_cls, "after_flush", _after_flush)
+
+
+# ============ 整体重建 ============
+
+def rebuild_tag_index(connection: Connection) -> int:
+    """
+    从 diaries.tags 重建全部标签索引
+
+    Args:
+        connection: 数据库连接（调用方负责事务）
+
+    Returns:
+        写入的标签行数
+    """
+    connection.execute(text("DELETE FROM diary_tags"))
+    rows: List[dict] = []
+    for diary_id, tags in connection.execute(text("SELECT id, tags FROM diaries WHERE tags IS NOT NULL")):
+        # 原始 SQL 读到的是 JSON 文本
+        rows.extend(_rows(diary_id, tags))
+    if rows:
+        connection.execute(_INSERT_SQL, rows)
+    logger.info(f"Diary tag index rebuilt: {len(rows)} rows")
+    return len(rows)
@@ -0,0 +1,135 @@
+"""
+表版本计数器
+
+为每张表维护一个单调递增的版本号，事务提交成功后为本次写入涉及的表加一。
+读接口可据此生成 ETag、判断缓存是否仍然有效，而无需重新查询数据库。
+
+写入来源统一在会话层捕获：
+- ORM flush（新增 / 修改 / 删除对象）
+- ORM 批量 update / delete 语句
+- 文本 SQL 中的 INSERT / UPDATE / DELETE
+- 会话连接上直接执行的派生写入（每日汇总、标签索引），由写入方调用 mark_written() 登记
+
+数据库文件被整体替换（备份恢复、重置）时调用 bump_all() 使所有版本失效。
+全局纪元以每次启动的随机数为初值：计数器只存在于内存，若从 0 开始，重启后会重现
+与上次相同的版本元组，客户端保留的旧 ETag 将误命中 304。启动迁移在任何 ETag
+发出之前执行，同样由新的纪元覆盖。
+"""
+import logging
+import re
+import secrets
+import threading
+from typing import Callable, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.sql.elements import TextClause
+
+# 文本 SQL 中的写入目标表
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM|REPLACE\s+INTO)\s+[\"`]?(\w+)",
+    re.IGNORECASE
+)
+
+_PENDING_KEY = "pending_table_writes"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_versions: Dict[str, int] = {}
+# 全局纪元：每次启动随机取值，数据库整体替换时递增
+_epoch = secrets.randbits(48)
+# 提交监听器：事务提交后以涉及的表集合回调（须快速返回，不可访问数据库）
+_commit_listeners: List[Callable[[FrozenSet[str]], None]] = []
+
+
+def get_version(table: str) -> int:
+    """获取表的当前版本"""
+    return _versions.get(table, 0)
+
+
+def get_versions(tables: Iterable[str]) -> Tuple[int, ...]:
+    """获取一组表的版本（首位为全局纪元）"""
+    return (_epoch, *(_versions.get(t, 0) for t in tables))
+
+
+def bump(*tables: str) -> None:
+    """递增指定表的版本"""
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def bump_all() -> None:
+    """使所有表版本失效（数据库文件被替换时调用）"""
+    global _epoch
+    with _lock:
+        _epoch += 1
+
+
+def add_commit_listener(callback: Callable[[FrozenSet[str]], None]) -> None:
+    """注册提交监听器（重复注册无副作用）"""
+    if callback not in _commit_listeners:
+        _commit_listeners.append(callback)
+
+
+def remove_commit_listener(callback: Callable[[FrozenSet[str]], None]) -> None:
+    """移除提交监听器"""
+    if callback in _commit_listeners:
+        _commit_listeners.remove(callback)
+
+
+def _pending(session) -> Set[str]:
+    return session.info.setdefault(_PENDING_KEY, set())
+
+
+def mark_written(session, *tables: str) -> None:
+    """登记会话当前事务中绕过 ORM 写入的表（提交后递增版本，回滚时丢弃）"""
+    _pending(session).update(tables)
+
+
+def _after_flush(session, flush_context) -> None:
+    tables = _pending(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+
+def _do_orm_execute(orm_execute_state) -> None:
+    statement = orm_execute_state.statement
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        table = getattr(statement, "table", None)
+        name = mapper.local_table.name if mapper is not None else getattr(table, "name", None)
+        if name:
+            _pending(orm_execute_state.session).add(name)
+    elif isinstance(statement, TextClause):
+        match = _WRITE_TARGET.match(statement.text)
+        if match:
+            _pending(orm_execute_state.session).add(match.group(1))
+
+
+def _after_commit(session) -> None:
+    tables = session.info.pop(_PENDING_KEY, None)
+    if tables:
+        bump(*tables)
+        changed = frozenset(tables)
+        for callback in _commit_listeners:
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.warning(f"Commit listener failed: {e}")
+
+
+def _after_rollback(session) -> None:
+    # 嵌套事务（SAVEPOINT）回滚时保留记录，多递增一次版本无副作用
+    if not session.in_nested_transaction():
+        session.info.pop(_PENDING_KEY, None)
+
+
+def install_version_tracking(session_cls) -> None:
+    """为会话类挂载版本追踪事件"""
+    event.listen(session_cls, "after_flush", _after_flush)
+    event.listen(session_cls, "do_orm_execute", _do_orm_execute)
+    event.listen(session_cls, "after_commit", _after_commit)
+    event.listen(session_cls, "after_rollback", _after_rollback)
@@ -0,0 +1,255 @@
+"""
+单写队列（组提交）
+
+SQLite 同一时刻只允许一个写事务。高频的小写入（如 Agent 消息持久化）各自提交时，
+会与 API 写入争抢写锁并各自付出一次提交开销。WriteQueue 将这类写入交给一个专用
+写线程串行执行，并把队列中积压的多个小事务合并为一次提交：
+
+- 每个任务在独立 SAVEPOINT 中执行，单个任务失败只回滚自身
+- 任务内部调用 db.commit() 只会 flush，由队列在批次结束时统一提交
+- 写线程与 API 写入共用单写连接（见 session.create_db_engine），读取不受影响
+
+适用范围：只有"提交即返回、不需要立即读回"的高频写入走队列，目前只有 Agent 消息持久化
+（ContextManager._sync_to_db）。其余写入不经过队列：
+- API 写接口需要在同一请求内读回自增 ID / 默认值并返回给前端
+- Agent Skills 在 get_db_context() 会话中读写交错，并把写入结果返回给模型
+这些写入仍在各自会话中直接提交，由单写连接（session.create_db_engine 的 writer 引擎）串行；
+放入队列只会多一次线程切换和 linger 等待。
+
+用法:
+    queue = get_write_queue()
+    future = queue.submit(lambda db: db.add(obj))   # 异步提交，返回 Future
+    result = queue.run(fn)                           # 阻塞等待结果（不能在持有写事务时调用）
+    result = await queue.run_async(fn)               # 在事件循环中等待（同样不能在持有写事务时调用）
+"""
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from backend.db.session import RoutingSession, holds_writer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteJob = Callable[[RoutingSession], T]
+
+# 停止信号
+_STOP = object()
+
+
+class _BatchSession(RoutingSession):
+    """批次会话：任务内的 commit() 降级为 flush()，由队列统一提交"""
+
+    def commit(self) -> None:
+        self.flush()
+
+    def commit_batch(self) -> None:
+        super().commit()
+
+
+class WriteQueue:
+    """
+    单写线程 + 组提交队列
+    """
+
+    def __init__(self, max_batch: int = 64, linger_ms: float = 2.0, max_pending: int = 10000):
+        """
+        初始化写队列
+
+        Args:
+            max_batch: 单次提交合并的最大任务数
+            linger_ms: 收到任务后等待更多任务合并的时间（毫秒）
+            max_pending: 队列最大长度，满时 submit 阻塞（背压）
+        """
+        self.max_batch = max_batch
+        self.linger = linger_ms / 1000
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "committed": 0,
+            "failed": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+        }
+
+    # ============ 生命周期 ============
+
+    def start(self) -> None:
+        """启动写线程（重复调用无副作用）"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._worker, name="db-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+            logger.info("Database write queue started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """处理完已提交的任务后停止写线程"""
+        with self._lock:
+            thread = self._thread
+            if not thread or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        logger.info("Database write queue stopped")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # ============ 提交接口 ============
+
+    def submit(self, job: WriteJob) -> "Future[T]":
+        """
+        提交写任务
+
+        Args:
+            job: 接收数据库会话的可调用对象，返回值作为 Future 结果
+
+        Returns:
+            Future，批次提交成功后完成
+        """
+        if not self.running:
+            self.start()
+        future: "Future[T]" = Future()
+        self._queue.put((job, future))
+        self._count("submitted")
+        return future
+
+    def run(self, job: WriteJob, timeout: Optional[float] = None) -> T:
+        """
+        提交写任务并阻塞等待结果
+
+        写线程需要单写连接，调用方持有未结束的写事务（或在写任务内部调用）时会互相等待，
+        这两种情况直接抛出 RuntimeError。
+        """
+        self._check_can_wait()
+        return self.submit(job).result(timeout)
+
+    async def run_async(self, job: WriteJob) -> T:
+        """
+        提交写任务并在事件循环中等待结果
+
+        当前协程持有未结束的写事务时，写线程拿不到单写连接、协程也不会再提交，
+        与 run() 一样直接抛出 RuntimeError。
+        """
+        self._check_can_wait()
+        return await asyncio.wrap_future(self.submit(job))
+
+    def _check_can_wait(self) -> None:
+        """等待写队列前检查：在写任务内部或持有写事务时等待会死锁"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("不能在写任务内部同步等待写队列，请直接使用传入的会话")
+        if holds_writer():
+            raise RuntimeError("当前会话持有未提交的写事务，等待写队列会死锁；请先提交或改用 submit()")
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """等待当前队列中的任务全部提交"""
+        if self.running:
+            self.run(lambda db: None, timeout)
+
+    async def flush_async(self) -> None:
+        """在事件循环中等待当前队列中的任务全部提交（读己之写）"""
+        if self.running:
+            await self.run_async(lambda db: None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {**stats, "pending": self._queue.qsize()}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    # ============ 写线程 ============
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop_after = self._collect(batch)
+            self._execute(batch)
+            if stop_after:
+                return
+
+    def _collect(self, batch: List[Tuple[WriteJob, Future]]) -> bool:
+        """在 linger 时间内收集更多任务，返回是否收到停止信号"""
+        deadline = time.perf_counter() + self.linger
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    def _execute(self, batch: List[Tuple[WriteJob, Future]]) -> None:
+        """在一个事务中执行批次，每个任务使用独立 SAVEPOINT"""
+        from backend.db import session as db_session
+
+        db = _BatchSession(
+            bind=db_session.engine,
+            autoflush=False,
+            expire_on_commit=False,
+            info={"write_bind": db_session.write_engine, "use_writer": True}
+        )
+        done: List[Tuple[Future, Any]] = []
+        try:
+            for job, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.begin_nested():
+                        result = job(db)
+                    done.append((future, result))
+                except Exception as e:
+                    self._count("failed")
+                    logger.error(f"Write job failed: {e}")
+                    future.set_exception(e)
+
+            db.commit_batch()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Write batch commit failed ({len(done)} jobs): {e}")
+            for future, _ in done:
+                future.set_exception(e)
+            self._count("failed", len(done))
+            return
+        finally:
+            db.close()
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["committed"] += len(done)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(batch))
+        for future, result in done:
+            future.set_result(result)
+
+
+# 单例实例
+_write_queue: Optional[WriteQueue] = None
+
+
+def get_write_queue() -> WriteQueue:
+    """获取 WriteQueue 单例"""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue()
+    return _write_queue
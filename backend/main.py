@@ -5,7 +5,6 @@ Life Canvas OS - Python Backend
 - 生产模式：python main.py (IPC 通信，Electron 调用)
 """
 import sys
-import json
 import threading
 import os
 import argparse
@@ -61,18 +60,19 @@ if IS_DEV:
     from backend.api.insights import router as insights_router
     from backend.api.data import router as data_router
     from backend.api.timeline import router as timeline_router
+    from backend.api.dashboard import router as dashboard_router
     from backend.api.asset import router as asset_router
     from backend.api.agent import router as agent_router
+    from backend.api.changes import router as changes_router
+    from backend.api.diagnostics import router as diagnostics_router
 
     # 导入中间件和异常处理
     from backend.core.middleware import (
-        RateLimitMiddleware,
-        TimeoutMiddleware,
-        SecurityHeadersMiddleware,
-        RequestLoggingMiddleware
+        RequestPipelineMiddleware,
     )
     from backend.core.exceptions import setup_exception_handlers
     from backend.core.logging_config import setup_logging
+    from backend.core.serialization import FastJSONResponse
 
     # 设置日志
     setup_logging(log_level="INFO", enable_json=True)
@@ -111,11 +111,29 @@ if IS_DEV:
         pool_status = DatabaseManager.get_pool_status()
         print(f"[INFO] Pool status: {pool_status}")
 
+        # 启动洞察后台生成
+        from backend.core.config import settings
+        if settings.INSIGHT_JOB_ENABLED:
+            from backend.services.insight_job_service import get_insight_job_runner
+            get_insight_job_runner().start()
+
+        # 启动会话上下文清理
+        from backend.agent.core.context import get_context_manager
+        get_context_manager().start_sweeper()
+
         print("="*50 + "\n")
 
         yield  # 应用运行中
 
         # ===== 关闭时 =====
+        from backend.db.write_queue import get_write_queue
+        from backend.agent.llm.transport import close_http_session
+        from backend.services.insight_job_service import get_insight_job_runner
+        from backend.agent.core.context import get_context_manager
+        get_insight_job_runner().stop()
+        get_context_manager().stop_sweeper()
+        await close_http_session()
+        get_write_queue().stop()
         DatabaseManager.close_all_connections()
         print("[INFO] All database connections closed")
 
@@ -126,7 +144,8 @@ if IS_DEV:
         version="1.0.0",
         docs_url="/docs",
         redoc_url="/redoc",
-        lifespan=lifespan
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
     )
 
     # 添加 CORS 中间件
@@ -138,11 +157,8 @@ if IS_DEV:
         allow_headers=["*"],
     )
 
-    # 添加自定义中间件（注意顺序很重要）
-    app.add_middleware(SecurityHeadersMiddleware)
-    app.add_middleware(RequestLoggingMiddleware)
-    app.add_middleware(RateLimitMiddleware)
-    app.add_middleware(TimeoutMiddleware, timeout=30.0)
+    # 添加自定义中间件（限流、超时、安全头、请求计时合并为一层纯 ASGI 中间件）
+    app.add_middleware(RequestPipelineMiddleware, timeout=30.0)
 
     # 设置全局异常处理
     setup_exception_handlers(app)
@@ -158,8 +174,12 @@ if IS_DEV:
     app.include_router(insights_router, tags=["insights"])
     app.include_router(data_router, tags=["data-management"])
     app.include_router(timeline_router, tags=["timeline"])
+    app.include_router(dashboard_router, tags=["dashboard"])
     app.include_router(asset_router, tags=["assets"])
     app.include_router(agent_router, tags=["agent"])
+    app.include_router(changes_router, tags=["changes"])
+    # 诊断接口仅在开发模式下暴露
+    app.include_router(diagnostics_router, tags=["diagnostics"])
 
     @app.get("/")
     async def root():
@@ -185,6 +205,12 @@ else:
     import asyncio
     from httpx import AsyncClient
 
+    import logging
+    from backend.core.logging_config import new_request_id, request_id_var, setup_logging
+    from backend.core.serialization import FastJSONResponse, dumps, loads
+
+    ipc_logger = logging.getLogger("ipc")
+
     # FastAPI 应用实例（用于内部调用）
     _app = None
     _app_lock = threading.Lock()
@@ -209,8 +235,10 @@ else:
                     from backend.api.insights import router as insights_router
                     from backend.api.data import router as data_router
                     from backend.api.timeline import router as timeline_router
+                    from backend.api.dashboard import router as dashboard_router
                     from backend.api.asset import router as asset_router
                     from backend.api.agent import router as agent_router
+                    from backend.api.changes import router as changes_router
                     from backend.core.exceptions import setup_exception_handlers
 
                     # 创建 FastAPI 应用
@@ -218,6 +246,7 @@ else:
                         title="Life Canvas OS API",
                         description="八维生命平衡系统 API",
                         version="1.0.0",
+                        default_response_class=FastJSONResponse,
                     )
 
                     # 添加 CORS 中间件
@@ -232,6 +261,9 @@ else:
                     # 设置全局异常处理
                     setup_exception_handlers(_app)
 
+                    # 请求只来自经过认证的 IPC 帧，允许按路径导入用户选择的本地文件
+                    _app.state.local_file_access = True
+
                     # 注册路由
                     _app.include_router(health_router, tags=["health"])
                     _app.include_router(test_router, tags=["test"])
@@ -243,12 +275,14 @@ else:
                     _app.include_router(insights_router, tags=["insights"])
                     _app.include_router(data_router, tags=["data-management"])
                     _app.include_router(timeline_router, tags=["timeline"])
+                    _app.include_router(dashboard_router, tags=["dashboard"])
                     _app.include_router(asset_router, tags=["assets"])
                     _app.include_router(agent_router, tags=["agent"])
+                    _app.include_router(changes_router, tags=["changes"])
 
         return _app
 
-    async def call_api(method: str, path: str, params: dict = None, body: dict = None):
+    async def call_api(method: str, path: str, params: dict = None, body: dict = None, headers: dict = None):
         """内部调用 API"""
         app = get_app_instance()
 
@@ -265,19 +299,29 @@ else:
             request_kwargs['params'] = params
         if body and method in ['POST', 'PUT', 'PATCH']:
             request_kwargs['json'] = body
+        if headers:
+            request_kwargs['headers'] = headers
 
         transport = ASGITransport(app=app)
         async with AsyncClient(transport=transport, base_url="http://test") as ac:
             response = await ac.request(**request_kwargs)
-            return response.json()
 
-    def api_call_wrapper(method: str, path: str, params: dict = None, body: dict = None):
+            # 条件请求：资源未变化时不返回数据，由前端继续使用本地缓存
+            etag = response.headers.get('etag')
+            if response.status_code == 304:
+                return {'code': 304, 'not_modified': True, 'etag': etag}
+
+            result = loads(response.content)
+            if etag and isinstance(result, dict):
+                result['etag'] = etag
+            return result
+
+    # IPC 请求串行处理，复用同一个事件循环（LLM 连接池等按循环缓存的资源得以跨请求保留）
+    ipc_event_loop = asyncio.new_event_loop()
+
+    def api_call_wrapper(method: str, path: str, params: dict = None, body: dict = None, headers: dict = None):
         """同步包装器"""
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(call_api(method, path, params, body))
-        finally:
-            loop.close()
+        return ipc_event_loop.run_until_complete(call_api(method, path, params, body, headers))
 
     def handle_generic_action(action: str, params: dict):
         """通用 action 处理器 - 将 action 映射到 API 调用"""
@@ -312,14 +356,34 @@ else:
         # 保留连字符：api_pin_verify-requirements -> /api/pin/verify-requirements
         path = '/' + path_part.replace('_', '/')
 
-        # 从 params 中过滤掉 'action' 和 'id' 字段（这些是 IPC 请求的元数据）
-        filtered_params = {k: v for k, v in params.items() if k not in ('action', 'id')}
+        # 从 params 中过滤掉 'action'、'id' 和 'if_none_match' 字段（这些是 IPC 请求的元数据）
+        filtered_params = {k: v for k, v in params.items() if k not in ('action', 'id', 'if_none_match')}
+
+        # 条件请求：携带上次返回的 etag，未变化时返回 not_modified
+        if_none_match = params.get('if_none_match')
+        headers = {'If-None-Match': if_none_match} if if_none_match else None
 
         # 对于 POST/PUT/PATCH 请求，params 作为 body 传递；对于 GET/DELETE，作为查询参数
         if method in ['POST', 'PUT', 'PATCH']:
-            return api_call_wrapper(method, path, None, filtered_params)
+            return api_call_wrapper(method, path, None, filtered_params, headers)
         else:
-            return api_call_wrapper(method, path, filtered_params, None)
+            return api_call_wrapper(method, path, filtered_params, None, headers)
+
+    # stdout 由响应和推送帧共用，写入需加锁保证帧完整
+    _stdout_lock = threading.Lock()
+
+    def write_frame(payload: dict):
+        """发送一帧（长度前缀格式：字节长度 + 换行 + JSON）"""
+        frame_bytes = dumps(payload)
+        with _stdout_lock:
+            sys.stdout.buffer.write(f'{len(frame_bytes)}\n'.encode('utf-8'))
+            sys.stdout.buffer.write(frame_bytes)
+            sys.stdout.buffer.flush()
+
+    def start_change_push():
+        """启动变更推送：把 CDC 变更批次作为无 id 的推送帧发送给 Electron"""
+        from backend.db.cdc import ChangePusher
+        ChangePusher(write_frame).start()
 
     def ipc_loop():
         """IPC 通信循环（带认证机制）"""
@@ -345,9 +409,9 @@ else:
 
         action_handlers = {
             'ping': lambda params: {'action': 'pong', 'status': 'ok'},
-            'verify_pin': lambda params: handle_auth_action('verify_pin', params),
-            'set_pin': lambda params: handle_auth_action('set_pin', params),
-            'get_auth_status': lambda params: handle_auth_action('get_auth_status', params),
+            'verify_pin': lambda params: handle_auth_action('verify_pin', params, ipc_event_loop),
+            'set_pin': lambda params: handle_auth_action('set_pin', params, ipc_event_loop),
+            'get_auth_status': lambda params: handle_auth_action('get_auth_status', params, ipc_event_loop),
             # 通用 API 调用处理器
             'api_call': lambda params: handle_generic_action(params.get('action', ''), params),
         }
@@ -374,11 +438,13 @@ else:
                 # 读取指定长度的 JSON 数据
                 json_bytes = sys.stdin.buffer.read(length)
                 if len(json_bytes) < length:
-                    print(f"[IPC] Incomplete data: expected {length}, got {len(json_bytes)}", file=sys.stderr, flush=True)
+                    ipc_logger.warning("[IPC] Incomplete data: expected %d, got %d", length, len(json_bytes))
                     continue
 
-                json_data = json_bytes.decode('utf-8')
-                request = json.loads(json_data)
+                request = loads(json_bytes)
+
+                # 请求 ID 写入日志上下文（run_until_complete 创建的任务会复制当前上下文）
+                request_id_var.set(str(request.get('id') or new_request_id()))
 
                 # ========== IPC 认证验证 ==========
                 if auth_enabled:
@@ -386,18 +452,14 @@ else:
                     is_valid, payload, error_msg = authenticator.verify_request(request)
 
                     if not is_valid:
-                        print(f"[IPC] 认证失败：{error_msg}", file=sys.stderr, flush=True)
+                        ipc_logger.warning("[IPC] 认证失败：%s", error_msg)
                         error_response = {
                             'id': request.get('id', ''),
                             'success': False,
                             'error': f'认证失败：{error_msg}',
                             'code': 'AUTH_FAILED'
                         }
-                        error_str = json.dumps(error_response, ensure_ascii=False)
-                        error_bytes = error_str.encode('utf-8')
-                        sys.stdout.buffer.write(f'{len(error_bytes)}\n'.encode('utf-8'))
-                        sys.stdout.buffer.write(error_bytes)
-                        sys.stdout.buffer.flush()
+                        write_frame(error_response)
                         continue
 
                     # 认证通过，使用解析后的 payload
@@ -424,30 +486,36 @@ else:
                     }
 
                 # 发送响应（长度前缀格式）
-                response_str = json.dumps(response, ensure_ascii=False)
-                response_bytes = response_str.encode('utf-8')
-                # 使用字节长度，并发送字节数据
-                sys.stdout.buffer.write(f'{len(response_bytes)}\n'.encode('utf-8'))
-                sys.stdout.buffer.write(response_bytes)
-                sys.stdout.buffer.flush()
+                write_frame(response)
 
             except Exception as e:
-                print(f"[IPC] Error processing request: {e}", file=sys.stderr, flush=True)
-                import traceback
-                traceback.print_exc(file=sys.stderr)
+                ipc_logger.exception("[IPC] Error processing request: %s", e)
                 error_response = {
                     'id': request.get('id', '') if 'request' in locals() else '',
                     'success': False,
                     'error': str(e)
                 }
-                error_str = json.dumps(error_response, ensure_ascii=False)
-                error_bytes = error_str.encode('utf-8')
-                # 使用字节长度，并发送字节数据
-                sys.stdout.buffer.write(f'{len(error_bytes)}\n'.encode('utf-8'))
-                sys.stdout.buffer.write(error_bytes)
-                sys.stdout.buffer.flush()
+                write_frame(error_response)
 
     if __name__ == "__main__":
+        from backend.core.config import settings
+
+        # 日志由后台线程写到 stderr（stdout 专用于 IPC 帧），不阻塞请求处理
+        setup_logging(log_level=settings.LOG_LEVEL, enable_json=settings.LOG_FORMAT == "json",
+                      stream=sys.stderr, file_logging=False)
+
+        # 启动洞察后台生成
+        if settings.INSIGHT_JOB_ENABLED:
+            from backend.services.insight_job_service import get_insight_job_runner
+            get_insight_job_runner().start()
+
+        # 启动会话上下文清理
+        from backend.agent.core.context import get_context_manager
+        get_context_manager().start_sweeper()
+
+        # 数据变更推送给前端
+        start_change_push()
+
         # 在单独线程中启动 IPC 循环
         ipc_thread = threading.Thread(target=ipc_loop, daemon=True)
         ipc_thread.start()
@@ -9,8 +9,9 @@ from .dimension import (
     SYSTEM_TYPES,
     DEFAULT_SYSTEM_DETAILS
 )
-from .diary import Diary, DiaryAttachment, DiaryEditHistory, MOOD_TYPES
-from .insight import Insight, AI_PROVIDERS
+from .diary import Diary, DiaryAttachment, DiaryEditHistory, DiaryTag, MOOD_TYPES
+from .insight import Insight, InsightJob, AI_PROVIDERS
 from .record import DailyRecord
 from .asset import AssetCategory, AssetItem, AssetSnapshot
 from .session import AgentSession, AgentMessage
+from .rollup import DailyRollup
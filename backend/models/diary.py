@@ -1,5 +1,5 @@
 """日记模型"""
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Index
 from backend.db.base import Base
 from backend.db.session import localnow_func
 
@@ -7,6 +7,10 @@ from backend.db.session import localnow_func
 class Diary(Base):
     """日记表"""
     __tablename__ = "diaries"
+    __table_args__ = (
+        Index("ix_diaries_user_created", "user_id", "created_at"),
+        Index("ix_diaries_mood", "mood"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), default=1)
@@ -30,32 +34,67 @@ class Diary(Base):
         return self.created_at
 
 
+class DiaryTag(Base):
+    """
+    日记标签索引表
+
+    Diary.tags（JSON）的规范化副本，每个标签一行，由会话层自动同步（见 backend.db.tag_index），
+    用于按标签筛选和 GROUP BY 聚合。
+    """
+    __tablename__ = "diary_tags"
+    __table_args__ = (
+        Index("ix_diary_tags_tag_diary", "tag", "diary_id"),
+    )
+
+    diary_id = Column(Integer, ForeignKey("diaries.id"), primary_key=True)
+    tag = Column(String(50), primary_key=True)
+
+
 class DiaryAttachment(Base):
     """日记附件表"""
     __tablename__ = "diary_attachments"
+    __table_args__ = (
+        Index("ix_diary_attachments_diary", "diary_id"),
+        Index("ix_diary_attachments_sha256", "sha256"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     diary_id = Column(Integer, ForeignKey("diaries.id"), nullable=False)
 
     # 附件信息
     filename = Column(String(255), nullable=False)  # 原始文件名
-    file_path = Column(String(500), nullable=False)  # 存储路径
+    file_path = Column(String(500), nullable=False)  # 存储路径（相对附件目录的 blob 路径）
     file_type = Column(String(50), nullable=False)  # 文件类型：image, pdf, docx, video
     file_size = Column(Integer, nullable=False)  # 文件大小（字节）
+    sha256 = Column(String(64), nullable=True)  # 内容哈希（blob 键，相同内容共享一个 blob）
+    mime_type = Column(String(100), nullable=True)  # MIME 类型
 
     created_at = Column(DateTime, server_default=localnow_func())
 
 
 class DiaryEditHistory(Base):
-    """日记编辑历史表"""
+    """
+    日记编辑历史表
+
+    每个版本保存完整标题；内容为关键帧（content_snapshot 为全文）
+    或增量（content_delta 为相对上一版本的差异，content_snapshot 为空）。
+    """
     __tablename__ = "diary_edit_history"
+    __table_args__ = (
+        Index("ix_diary_edit_history_diary_version", "diary_id", "version"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     diary_id = Column(Integer, ForeignKey("diaries.id"), nullable=False)
+    version = Column(Integer, nullable=True)  # 版本号（每篇日记从 1 开始）
 
     # 编辑快照
     title_snapshot = Column(String(200), nullable=False)
-    content_snapshot = Column(Text, nullable=False)
+    content_snapshot = Column(Text, nullable=False)  # 关键帧的全文，增量版本为空
+    is_keyframe = Column(Integer, default=1)  # 是否关键帧：0 或 1
+    content_delta = Column(Text, nullable=True)  # 增量（JSON 编码的差异操作）
+    content_hash = Column(String(40), nullable=True)  # 该版本全文的哈希（校验增量链）
+    content_length = Column(Integer, nullable=True)  # 该版本全文长度（列表展示用）
 
     created_at = Column(DateTime, server_default=localnow_func())
 
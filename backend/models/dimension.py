@@ -1,5 +1,5 @@
 """系统维度模型（八维系统）"""
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Text, ForeignKey, Index
 from backend.db.base import Base
 from backend.db.session import localnow_func
 
@@ -23,6 +23,9 @@ class System(Base):
 class SystemLog(Base):
     """系统日志表"""
     __tablename__ = "system_logs"
+    __table_args__ = (
+        Index("ix_system_logs_system_created", "system_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     system_id = Column(Integer, ForeignKey("systems.id"), nullable=False)
@@ -49,6 +52,9 @@ class SystemAction(Base):
 class MealDeviation(Base):
     """饮食偏离事件表"""
     __tablename__ = "meal_deviations"
+    __table_args__ = (
+        Index("ix_meal_deviations_system_occurred", "system_id", "occurred_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     system_id = Column(Integer, ForeignKey("systems.id"), nullable=False)
@@ -65,6 +71,9 @@ class MealDeviation(Base):
 class SystemScoreLog(Base):
     """系统评分变化日志表"""
     __tablename__ = "system_score_logs"
+    __table_args__ = (
+        Index("ix_system_score_logs_system_created", "system_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     system_id = Column(Integer, ForeignKey("systems.id"), nullable=False)
@@ -1,5 +1,5 @@
 """AI 洞察模型"""
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Text, JSON, DateTime, ForeignKey, Index, text
 from backend.db.base import Base
 from backend.db.session import localnow_func
 
@@ -7,6 +7,10 @@ from backend.db.session import localnow_func
 class Insight(Base):
     """洞察表"""
     __tablename__ = "insights"
+    __table_args__ = (
+        Index("ix_insights_user_generated", "user_id", "generated_at"),
+        Index("ix_insights_user_score_hash", "user_id", "score_hash"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), default=1)
@@ -22,9 +26,46 @@ class Insight(Base):
     # 使用的 AI 提供商
     provider_used = Column(String, nullable=False)  # deepseek, doubao
 
+    # 评分向量哈希（评分未变化时复用洞察；AI 调用失败生成的默认洞察为空，不参与复用）
+    score_hash = Column(String(64), nullable=True)
+
+    # 是否由后台自动任务生成（评分变化 / 每日定时，使用独立的每日额度）
+    background = Column(Boolean, nullable=False, default=False, server_default=text("0"))
+
     generated_at = Column(DateTime, server_default=localnow_func())
     created_at = Column(DateTime, server_default=localnow_func())
 
 
+class InsightJob(Base):
+    """洞察后台生成任务表"""
+    __tablename__ = "insight_jobs"
+    __table_args__ = (
+        Index("ix_insight_jobs_user_status", "user_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), default=1)
+
+    # 触发来源：score_change（评分变化）, daily（每日定时）, manual（手动）
+    trigger = Column(String(20), nullable=False, default="manual")
+
+    # 状态：pending, running, succeeded, skipped, failed
+    status = Column(String(20), nullable=False, default="pending")
+
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+
+    # 生成（或复用）的洞察
+    insight_id = Column(Integer, ForeignKey("insights.id"), nullable=True)
+
+    created_at = Column(DateTime, server_default=localnow_func())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+# 洞察任务状态
+INSIGHT_JOB_STATUSES = ["pending", "running", "succeeded", "skipped", "failed"]
+
+
 # AI 提供商枚举
 AI_PROVIDERS = ["deepseek", "doubao"]
@@ -0,0 +1,46 @@
+"""每日汇总模型"""
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, UniqueConstraint
+from backend.db.base import Base
+from backend.db.session import localnow_func
+
+
+# 日记汇总使用的维度名（其余维度为 SYSTEM_TYPES）
+JOURNAL_DIMENSION = "JOURNAL"
+
+
+class DailyRollup(Base):
+    """
+    每日汇总表
+
+    按 (用户, 日期, 维度) 预先聚合首页需要的统计，由写入路径增量维护（见 backend.db.rollups）。
+    维度为八大系统类型或 JOURNAL：
+    - 系统维度：日志数、评分最小 / 最大 / 最后值、饮食偏离数（仅 FUEL）
+    - JOURNAL：日记数和各心情的数量
+    """
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "date", "dimension", name="uq_daily_rollups_user_date_dimension"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    dimension = Column(String(20), nullable=False)
+
+    # 系统维度
+    log_count = Column(Integer, nullable=False, default=0, server_default="0")
+    score_count = Column(Integer, nullable=False, default=0, server_default="0")  # 评分变化次数
+    score_min = Column(Integer, nullable=True)
+    score_max = Column(Integer, nullable=True)
+    score_last = Column(Integer, nullable=True)
+    deviation_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # 日记维度
+    diary_count = Column(Integer, nullable=False, default=0, server_default="0")
+    mood_great = Column(Integer, nullable=False, default=0, server_default="0")
+    mood_good = Column(Integer, nullable=False, default=0, server_default="0")
+    mood_neutral = Column(Integer, nullable=False, default=0, server_default="0")
+    mood_bad = Column(Integer, nullable=False, default=0, server_default="0")
+    mood_terrible = Column(Integer, nullable=False, default=0, server_default="0")
+
+    updated_at = Column(DateTime, server_default=localnow_func(), onupdate=localnow_func())
@@ -1,6 +1,6 @@
 """Agent 会话模型"""
 from datetime import datetime
-from sqlalchemy import String, Text, DateTime, Integer, ForeignKey, JSON
+from sqlalchemy import String, Text, DateTime, Integer, ForeignKey, JSON, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from backend.db.base import Base
 
@@ -12,6 +12,14 @@ class AgentSession(Base):
     存储所有 Agent 会话的基本信息和消息历史
     """
     __tablename__ = "agent_sessions"
+    __table_args__ = (
+        # 会话列表的覆盖索引：按活跃状态过滤、按更新时间排序，列表字段均可直接从索引读取
+        Index(
+            "ix_agent_sessions_active_updated",
+            "is_active", "updated_at", "session_id", "message_count",
+            "last_message_at", "last_message_role", "last_message_preview",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     session_id: Mapped[str] = mapped_column(String(64), unique=True, index=True, nullable=False)
@@ -20,6 +28,11 @@ class AgentSession(Base):
     title: Mapped[str | None] = mapped_column(String(256), nullable=True, comment="会话标题（由 AI 生成）")
     message_count: Mapped[int] = mapped_column(Integer, default=0, comment="消息数量")
 
+    # 最新消息摘要（写消息时同步更新，列表无需加载消息）
+    last_message_preview: Mapped[str | None] = mapped_column(String(50), nullable=True, comment="最新消息预览")
+    last_message_role: Mapped[str | None] = mapped_column(String(32), nullable=True, comment="最新消息角色")
+    last_message_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, comment="最新消息时间")
+
     # 时间戳
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now, nullable=False)
@@ -45,6 +58,10 @@ class AgentMessage(Base):
     存储会话中的每条消息
     """
     __tablename__ = "agent_messages"
+    __table_args__ = (
+        # 历史窗口按 (timestamp, id) 倒序分页
+        Index("ix_agent_messages_session_timestamp", "session_id", "timestamp", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     session_id: Mapped[str] = mapped_column(String(64), ForeignKey("agent_sessions.session_id", ondelete="CASCADE"), nullable=False, index=True)
@@ -68,6 +68,7 @@ from .journal import (
     DiaryListParams,
     DiaryAttachmentBase,
     DiaryAttachmentResponse,
+    DiaryAttachmentImport,
     DiaryEditHistoryResponse,
 )
 
@@ -146,6 +147,7 @@ __all__ = [
     "DiaryListParams",
     "DiaryAttachmentBase",
     "DiaryAttachmentResponse",
+    "DiaryAttachmentImport",
     "DiaryEditHistoryResponse",
     # Insight
     "AIProvider",
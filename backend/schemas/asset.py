@@ -3,6 +3,8 @@ from typing import Optional, List, Literal
 from datetime import datetime, date
 from pydantic import BaseModel, Field, ConfigDict
 
+from backend.schemas.common import BATCH_MAX_ITEMS
+
 
 CategoryKind = Literal["asset", "liability"]
 
@@ -43,6 +45,14 @@ class AssetItemCreate(AssetItemBase):
     pass
 
 
+class AssetItemBatchEntry(AssetItemBase):
+    category_id: int = Field(..., description="所属分类 ID")
+
+
+class AssetItemBatchCreate(BaseModel):
+    items: List[AssetItemBatchEntry] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="资产条目列表")
+
+
 class AssetItemUpdate(BaseModel):
     name: Optional[str] = Field(None, max_length=200)
     amount: Optional[float] = None
@@ -8,6 +8,9 @@ from datetime import datetime
 
 T = TypeVar("T")
 
+# 批量写入接口单次最多条目数
+BATCH_MAX_ITEMS = 500
+
 
 class ApiResponse(BaseModel, Generic[T]):
     """统一 API 响应格式
@@ -68,6 +68,24 @@ class InsightGenerateResponse(BaseModel):
         return int(self.generated_at.timestamp() * 1000)
 
 
+# ============ 后台生成任务 ============
+class InsightJobResponse(BaseModel):
+    """洞察后台生成任务响应"""
+    id: int
+    user_id: int
+    trigger: str
+    status: Literal["pending", "running", "succeeded", "skipped", "failed"]
+    attempts: int
+    error: Optional[str] = None
+    insight_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # ============ 洞察查询参数 ============
 class InsightListParams(BaseModel):
     """洞察列表查询参数"""
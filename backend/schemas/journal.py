@@ -2,6 +2,7 @@
 from pydantic import BaseModel, Field, field_validator, computed_field
 from typing import Optional, Literal, List, Any, Dict
 from datetime import datetime
+from backend.schemas.common import BATCH_MAX_ITEMS
 
 
 # 情绪类型
@@ -59,6 +60,11 @@ class DiaryCreate(DiaryBase):
     pass
 
 
+class DiaryBatchCreate(BaseModel):
+    """批量创建日记"""
+    items: List[DiaryCreate] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="日记列表")
+
+
 class DiaryUpdate(BaseModel):
     """更新日记（所有字段可选）"""
     title: Optional[str] = Field(default="未命名", max_length=200)
@@ -157,6 +163,8 @@ class DiaryAttachmentResponse(DiaryAttachmentBase):
     """日记附件响应"""
     id: int
     diary_id: int
+    sha256: Optional[str] = None
+    mime_type: Optional[str] = None
     created_at: datetime
 
     # 时间戳字段（前端使用，无时区歧义）
@@ -170,6 +178,12 @@ class DiaryAttachmentResponse(DiaryAttachmentBase):
         from_attributes = True
 
 
+class DiaryAttachmentImport(BaseModel):
+    """从本地文件导入附件（IPC 模式下渲染进程无法直接上传二进制）"""
+    source_path: str = Field(..., description="本地文件路径")
+    filename: Optional[str] = Field(None, max_length=255, description="显示的文件名（默认取路径中的文件名）")
+
+
 # ============ 日记编辑历史 ============
 class DiaryEditHistoryResponse(BaseModel):
     """日记编辑历史响应"""
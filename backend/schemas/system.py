@@ -2,6 +2,7 @@
 from pydantic import BaseModel, Field, field_validator, computed_field
 from typing import Optional, Literal, Any, Dict, List
 from datetime import datetime
+from backend.schemas.common import BATCH_MAX_ITEMS
 
 
 # 系统类型
@@ -44,6 +45,11 @@ class MealDeviationCreate(BaseModel):
     occurred_at: Optional[datetime] = Field(None, description="发生时间（默认当前时间）")
 
 
+class MealDeviationBatchCreate(BaseModel):
+    """批量创建偏离事件"""
+    items: List[MealDeviationCreate] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="偏离事件列表")
+
+
 class MealDeviationUpdate(BaseModel):
     """更新偏离事件"""
     description: Optional[str] = Field(None, description="偏离描述")
@@ -140,6 +146,11 @@ class SystemLogCreate(SystemLogBase):
     pass
 
 
+class SystemLogBatchCreate(BaseModel):
+    """批量创建系统日志"""
+    items: List[SystemLogCreate] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="日志列表")
+
+
 class SystemLogResponse(SystemLogBase):
     """系统日志响应"""
     id: int
@@ -1,10 +1,13 @@
 """Agent 会话服务"""
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
-from sqlalchemy.orm import Session as DBSession
-from sqlalchemy import desc
+from sqlalchemy.orm import Session as DBSession, load_only
+from sqlalchemy import desc, select, tuple_
 from backend.models.session import AgentSession, AgentMessage
 
+# 会话列表中最新消息预览的长度
+PREVIEW_LENGTH = 50
+
 
 class AgentSessionService:
     """
@@ -133,23 +136,28 @@ class AgentSessionService:
             AgentMessage: 创建的消息对象
         """
         # 确保会话存在
-        AgentSessionService.get_or_create_session(db, session_id)
+        session = AgentSessionService.get_or_create_session(db, session_id)
 
+        now = datetime.now()
         message = AgentMessage(
             session_id=session_id,
             role=role,
             content=content,
             token_count=token_count or 0,
-            timestamp=datetime.now(),
+            timestamp=now,
             extra_data=extra_data,
         )
         db.add(message)
+
+        # 同一事务内更新会话计数和最新消息摘要
+        session.message_count += 1
+        session.last_message_preview = content[:PREVIEW_LENGTH]
+        session.last_message_role = role
+        session.last_message_at = now
+        session.updated_at = now
         db.commit()
         db.refresh(message)
 
-        # 更新会话计数
-        AgentSessionService.increment_message_count(db, session_id)
-
         return message
 
     @staticmethod
@@ -177,6 +185,85 @@ class AgentSessionService:
             .all()
         )
 
+    @staticmethod
+    def get_recent_messages(
+        db: DBSession,
+        session_id: str,
+        limit: int = 30,
+    ) -> List[AgentMessage]:
+        """
+        获取会话最近的消息（按时间正序返回）
+
+        用于上下文缓存未命中时恢复最近的对话窗口。
+
+        Args:
+            db: 数据库会话
+            session_id: 会话 ID
+            limit: 限制数量
+
+        Returns:
+            List[AgentMessage]: 最近 limit 条消息，按时间从旧到新
+        """
+        messages = (
+            db.query(AgentMessage)
+            .filter(AgentMessage.session_id == session_id)
+            .order_by(desc(AgentMessage.timestamp), desc(AgentMessage.id))
+            .limit(limit)
+            .all()
+        )
+        messages.reverse()
+        return messages
+
+    @staticmethod
+    def get_message_window(
+        db: DBSession,
+        session_id: str,
+        limit: int = 20,
+        before: Optional[int] = None,
+        compact: bool = False,
+    ) -> Tuple[List[AgentMessage], bool]:
+        """
+        获取消息历史窗口（从新到旧）
+
+        按 (timestamp, id) 倒序走 ix_agent_messages_session_timestamp，只读取 limit 条，
+        与会话总长度无关。向前翻页时把上一页最旧消息的 id 作为 before 传入。
+
+        Args:
+            db: 数据库会话
+            session_id: 会话 ID
+            limit: 每页数量
+            before: 游标，只返回该消息之前的消息
+            compact: 为 True 时不加载 extra_data
+
+        Returns:
+            (从新到旧的消息列表, 是否还有更早的消息)
+        """
+        query = db.query(AgentMessage).filter(AgentMessage.session_id == session_id)
+
+        if before is not None:
+            cursor_timestamp = (
+                select(AgentMessage.timestamp)
+                .where(AgentMessage.id == before)
+                .scalar_subquery()
+            )
+            query = query.filter(
+                tuple_(AgentMessage.timestamp, AgentMessage.id) < tuple_(cursor_timestamp, before)
+            )
+
+        if compact:
+            query = query.options(load_only(
+                AgentMessage.id, AgentMessage.role, AgentMessage.content, AgentMessage.timestamp
+            ))
+
+        messages = (
+            query
+            .order_by(desc(AgentMessage.timestamp), desc(AgentMessage.id))
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(messages) > limit
+        return messages[:limit], has_more
+
     @staticmethod
     def delete_session(db: DBSession, session_id: str) -> bool:
         """
@@ -216,6 +303,47 @@ class AgentSessionService:
             .all()
         )
 
+    @staticmethod
+    def list_session_summaries(db: DBSession, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        获取会话列表摘要
+
+        只读取会话表的摘要列（由 ix_agent_sessions_active_updated 覆盖），
+        不加载消息，耗时与会话长度无关。
+
+        Args:
+            db: 数据库会话
+            limit: 限制数量
+
+        Returns:
+            List[Dict[str, Any]]: 会话摘要列表，按更新时间倒序
+        """
+        rows = (
+            db.query(
+                AgentSession.session_id,
+                AgentSession.message_count,
+                AgentSession.updated_at,
+                AgentSession.last_message_at,
+                AgentSession.last_message_role,
+                AgentSession.last_message_preview,
+            )
+            .filter(AgentSession.is_active == True)
+            .order_by(desc(AgentSession.updated_at))
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "session_id": row.session_id,
+                "message_count": row.message_count,
+                "last_message_time": row.updated_at.isoformat() if row.updated_at else None,
+                "last_message_at": row.last_message_at.isoformat() if row.last_message_at else None,
+                "last_message_preview": row.last_message_preview,
+                "last_message_role": row.last_message_role,
+            }
+            for row in rows
+        ]
+
     @staticmethod
     def deactivate_session(db: DBSession, session_id: str) -> bool:
         """
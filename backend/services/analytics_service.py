@@ -0,0 +1,433 @@
+"""
+分析服务 - 八大系统的评分趋势分析
+
+一次性批量读取评分日志、系统日志、饮食偏离和日记心情，按天重采样后计算：
+- 每个系统的每日评分序列（当天最后一次评分，无记录的日期沿用前值）
+- 滑动平均
+- 连续记录天数（当前 / 最长）与饮食无偏离天数
+- 各系统评分与心情之间的相关系数（按两者都有数据的日期成对计算）
+
+八个系统在同一组 NumPy 矩阵运算中完成（NumPy 列在 requirements.txt 中，随打包产物分发）。
+_compute_python 是等价的纯 Python 实现，只作为缺少 NumPy 的环境（如未安装完整依赖的开发环境）
+的回退，同时是测试中校验向量化结果的参照；修改指标时两者需同步修改（见 tests/test_analytics.py）。
+结果按依赖表的版本号缓存（见 backend.db.versions），有新的日志写入时自动失效。
+"""
+import math
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.db.versions import get_versions
+from backend.models.diary import Diary
+from backend.models.dimension import System, SystemLog, SystemScoreLog, MealDeviation, SYSTEM_TYPES
+from backend.models.user import User
+from backend.schemas.common import error_response
+
+try:
+    import numpy as np
+except ImportError:  # 回退：依赖未完整安装时使用纯 Python 实现
+    np = None
+
+
+# 分析结果依赖的数据表
+ANALYTICS_TABLES = ("users", "systems", "system_score_logs", "system_logs", "meal_deviations", "diaries")
+
+# 心情 -> 数值（用于相关性计算）
+MOOD_VALUES = {"great": 2.0, "good": 1.0, "neutral": 0.0, "bad": -1.0, "terrible": -2.0}
+
+# 相关矩阵的维度标签：八大系统 + 心情
+CORRELATION_LABELS = [*SYSTEM_TYPES, "MOOD"]
+
+
+# ============ 数据结构 ============
+
+class AnalyticsInput:
+    """
+    按天索引的原始数据（day 为相对起始日期的天数，system 为 SYSTEM_TYPES 下标）
+
+    Attributes:
+        days: 天数
+        initial_scores: 窗口开始前各系统的评分
+        score_events: [(system, day, new_score)]，按时间升序
+        log_counts: [(system, day, count)]
+        deviation_counts: [(day, count)]
+        moods: [(day, mood_value)]
+    """
+
+    def __init__(
+        self,
+        days: int,
+        initial_scores: Sequence[float],
+        score_events: Sequence[Tuple[int, int, float]] = (),
+        log_counts: Sequence[Tuple[int, int, int]] = (),
+        deviation_counts: Sequence[Tuple[int, int]] = (),
+        moods: Sequence[Tuple[int, float]] = (),
+    ):
+        self.days = days
+        self.initial_scores = list(initial_scores)
+        self.score_events = list(score_events)
+        self.log_counts = list(log_counts)
+        self.deviation_counts = list(deviation_counts)
+        self.moods = list(moods)
+
+
+# ============ 向量化计算（NumPy） ============
+
+def _run_lengths_numpy(active: "np.ndarray") -> "np.ndarray":
+    """每一天结束时的连续 True 天数（逐行计算）"""
+    counts = np.cumsum(active, axis=1)
+    resets = np.maximum.accumulate(np.where(active, 0, counts), axis=1)
+    return counts - resets
+
+
+def _rolling_mean_numpy(values: "np.ndarray", window: int) -> "np.ndarray":
+    """沿最后一维的滑动平均（开头不足 window 天时按已有天数平均）"""
+    sums = np.cumsum(values, axis=-1)
+    shifted = np.zeros_like(sums)
+    shifted[..., window:] = sums[..., :-window]
+    sizes = np.minimum(np.arange(values.shape[-1]) + 1, window)
+    return (sums - shifted) / sizes
+
+
+def _pairwise_corr_numpy(values: "np.ndarray", mask: "np.ndarray") -> "np.ndarray":
+    """按成对有效日期计算的 Pearson 相关矩阵（无法计算处为 NaN）"""
+    m = mask.astype(float)
+    x = np.where(mask, values, 0.0)
+    n = m @ m.T
+    sx = x @ m.T  # sx[i, j]：i 在 i、j 均有效日期上的和
+    sxx = (x * x) @ m.T
+    sxy = x @ x.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        var_j = var_i.T
+        corr = cov / np.sqrt(var_i * var_j)
+    # 方差按相对阈值判断，避免常数序列因舍入误差得到虚假的相关系数
+    constant = var_i <= 1e-9 * np.maximum(sxx, 1.0)
+    corr[(n < 3) | constant | constant.T] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+
+def _compute_numpy(data: AnalyticsInput, window: int) -> Dict[str, Any]:
+    k, d = len(SYSTEM_TYPES), data.days
+
+    # 每日评分：每个 (系统, 天) 取当天最后一条评分日志，再沿时间向前填充
+    last_event = np.full(k * d, -1, dtype=np.int64)
+    if data.score_events:
+        events = np.asarray(data.score_events, dtype=float)
+        cells = events[:, 0].astype(np.int64) * d + events[:, 1].astype(np.int64)
+        np.maximum.at(last_event, cells, np.arange(len(events)))
+    last_event = np.maximum.accumulate(last_event.reshape(k, d), axis=1)
+    initial = np.asarray(data.initial_scores, dtype=float)[:, None]
+    if data.score_events:
+        scores = np.where(last_event >= 0, events[:, 2][np.maximum(last_event, 0)], initial)
+    else:
+        scores = np.repeat(initial, d, axis=1)
+
+    logs = np.zeros(k * d)
+    if data.log_counts:
+        counts = np.asarray(data.log_counts, dtype=np.int64)
+        np.add.at(logs, counts[:, 0] * d + counts[:, 1], counts[:, 2])
+    logs = logs.reshape(k, d)
+
+    deviations = np.zeros(d)
+    if data.deviation_counts:
+        counts = np.asarray(data.deviation_counts, dtype=np.int64)
+        np.add.at(deviations, counts[:, 0], counts[:, 1])
+
+    mood_sum, mood_n = np.zeros(d), np.zeros(d)
+    if data.moods:
+        moods = np.asarray(data.moods, dtype=float)
+        np.add.at(mood_sum, moods[:, 0].astype(np.int64), moods[:, 1])
+        np.add.at(mood_n, moods[:, 0].astype(np.int64), 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mood = np.where(mood_n > 0, mood_sum / mood_n, np.nan)
+
+    runs = _run_lengths_numpy(logs > 0)
+    clean_runs = _run_lengths_numpy((deviations == 0)[None, :])[0]
+
+    corr = _pairwise_corr_numpy(
+        np.vstack([scores, mood[None, :]]),
+        np.vstack([np.ones((k, d), dtype=bool), (mood_n > 0)[None, :]]),
+    )
+
+    def clean(values) -> List[Optional[float]]:
+        return [None if math.isnan(v) else round(float(v), 4) for v in values]
+
+    return {
+        "scores": scores.tolist(),
+        "rolling_mean": np.round(_rolling_mean_numpy(scores, window), 4).tolist(),
+        "log_counts": logs.astype(int).tolist(),
+        "current_streak": runs[:, -1].astype(int).tolist(),
+        "longest_streak": runs.max(axis=1).astype(int).tolist(),
+        "mood": clean(mood),
+        "deviations": deviations.astype(int).tolist(),
+        "clean_streak": int(clean_runs[-1]),
+        "correlations": [clean(row) for row in corr],
+    }
+
+
+# ============ 纯 Python 实现（与 NumPy 版本结果一致） ============
+
+def _run_lengths_python(active: Sequence[bool]) -> List[int]:
+    runs, current = [], 0
+    for flag in active:
+        current = current + 1 if flag else 0
+        runs.append(current)
+    return runs
+
+
+def _rolling_mean_python(values: Sequence[float], window: int) -> List[float]:
+    result, total = [], 0.0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        result.append(round(total / min(i + 1, window), 4))
+    return result
+
+
+def _corr_python(xs: Sequence[Optional[float]], ys: Sequence[Optional[float]]) -> Optional[float]:
+    pairs = [(x, y) for x, y in zip(xs, ys) if x is not None and y is not None]
+    n = len(pairs)
+    if n < 3:
+        return None
+    mean_x = sum(x for x, _ in pairs) / n
+    mean_y = sum(y for _, y in pairs) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    var_y = sum((y - mean_y) ** 2 for _, y in pairs)
+    if var_x <= 1e-9 or var_y <= 1e-9:
+        return None
+    return round(max(-1.0, min(1.0, cov / math.sqrt(var_x * var_y))), 4)
+
+
+def _compute_python(data: AnalyticsInput, window: int) -> Dict[str, Any]:
+    """纯 Python 回退实现（结果与 _compute_numpy 一致）"""
+    k, d = len(SYSTEM_TYPES), data.days
+
+    daily_last: Dict[Tuple[int, int], float] = {}
+    for system, day, score in data.score_events:
+        daily_last[(system, day)] = float(score)
+    scores = []
+    for system in range(k):
+        row, current = [], float(data.initial_scores[system])
+        for day in range(d):
+            current = daily_last.get((system, day), current)
+            row.append(current)
+        scores.append(row)
+
+    logs = [[0] * d for _ in range(k)]
+    for system, day, count in data.log_counts:
+        logs[system][day] += count
+
+    deviations = [0] * d
+    for day, count in data.deviation_counts:
+        deviations[day] += count
+
+    mood_sum, mood_n = [0.0] * d, [0] * d
+    for day, value in data.moods:
+        mood_sum[day] += value
+        mood_n[day] += 1
+    mood = [mood_sum[i] / mood_n[i] if mood_n[i] else None for i in range(d)]
+
+    runs = [_run_lengths_python([count > 0 for count in row]) for row in logs]
+    series = [*scores, mood]
+
+    return {
+        "scores": scores,
+        "rolling_mean": [_rolling_mean_python(row, window) for row in scores],
+        "log_counts": logs,
+        "current_streak": [row[-1] for row in runs],
+        "longest_streak": [max(row) for row in runs],
+        "mood": [None if value is None else round(value, 4) for value in mood],
+        "deviations": deviations,
+        "clean_streak": _run_lengths_python([count == 0 for count in deviations])[-1],
+        "correlations": [[_corr_python(a, b) for b in series] for a in series],
+    }
+
+
+def compute_trends(data: AnalyticsInput, window: int = 7) -> Dict[str, Any]:
+    """计算趋势指标（向量化实现；缺少 NumPy 时回退到纯 Python 实现）"""
+    if np is not None:
+        return _compute_numpy(data, window)
+    return _compute_python(data, window)
+
+
+# ============ 数据加载 ============
+
+def _day_index(value: Any, start: date) -> int:
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - start).days
+
+
+def load_input(db: Session, user_id: int, start: date, days: int) -> AnalyticsInput:
+    """批量读取窗口内的数据（每张表一次查询）"""
+    start_time = datetime.combine(start, datetime.min.time())
+    systems = db.query(System.id, System.type, System.score).filter(System.user_id == user_id).all()
+    index = {row.id: SYSTEM_TYPES.index(row.type) for row in systems if row.type in SYSTEM_TYPES}
+    system_ids = list(index)
+
+    # 窗口开始前的评分：取开始前最后一条日志；没有时取窗口内第一条的旧评分；都没有则取当前评分
+    initial = [50.0] * len(SYSTEM_TYPES)
+    for row in systems:
+        if row.id in index:
+            initial[index[row.id]] = float(row.score if row.score is not None else 50)
+
+    score_rows = (
+        db.query(SystemScoreLog.system_id, SystemScoreLog.old_score, SystemScoreLog.new_score, SystemScoreLog.created_at)
+        .filter(SystemScoreLog.system_id.in_(system_ids), SystemScoreLog.created_at >= start_time)
+        .order_by(SystemScoreLog.created_at, SystemScoreLog.id)
+        .all()
+    ) if system_ids else []
+
+    before = (
+        db.query(SystemScoreLog.system_id, func.max(SystemScoreLog.id).label("last_id"))
+        .filter(SystemScoreLog.system_id.in_(system_ids), SystemScoreLog.created_at < start_time)
+        .group_by(SystemScoreLog.system_id)
+        .subquery()
+    )
+    seeded = set()
+    for row in db.query(SystemScoreLog.system_id, SystemScoreLog.new_score).join(
+        before, SystemScoreLog.id == before.c.last_id
+    ).all():
+        initial[index[row.system_id]] = float(row.new_score)
+        seeded.add(row.system_id)
+    for row in score_rows:
+        if row.system_id not in seeded:
+            initial[index[row.system_id]] = float(row.old_score)
+            seeded.add(row.system_id)
+
+    log_day = func.date(SystemLog.created_at)
+    log_rows = (
+        db.query(SystemLog.system_id, log_day, func.count(SystemLog.id))
+        .filter(SystemLog.system_id.in_(system_ids), SystemLog.created_at >= start_time)
+        .group_by(SystemLog.system_id, log_day)
+        .all()
+    ) if system_ids else []
+
+    deviation_day = func.date(MealDeviation.occurred_at)
+    deviation_rows = (
+        db.query(deviation_day, func.count(MealDeviation.id))
+        .filter(MealDeviation.system_id.in_(system_ids), MealDeviation.occurred_at >= start_time)
+        .group_by(deviation_day)
+        .all()
+    ) if system_ids else []
+
+    mood_rows = (
+        db.query(Diary.created_at, Diary.mood)
+        .filter(Diary.user_id == user_id, Diary.created_at >= start_time)
+        .all()
+    )
+
+    data = AnalyticsInput(days=days, initial_scores=initial)
+    for row in score_rows:
+        day = _day_index(row.created_at, start)
+        if 0 <= day < days:
+            data.score_events.append((index[row.system_id], day, float(row.new_score)))
+    for system_id, log_date, count in log_rows:
+        day = _day_index(log_date, start)
+        if 0 <= day < days:
+            data.log_counts.append((index[system_id], day, count))
+    for deviation_date, count in deviation_rows:
+        day = _day_index(deviation_date, start)
+        if 0 <= day < days:
+            data.deviation_counts.append((day, count))
+    for row in mood_rows:
+        if row.mood not in MOOD_VALUES or not row.created_at:
+            continue
+        day = _day_index(row.created_at, start)
+        if 0 <= day < days:
+            data.moods.append((day, MOOD_VALUES[row.mood]))
+    return data
+
+
+# ============ 服务 ============
+
+class AnalyticsService:
+    """分析服务类"""
+
+    # 缓存：(days, window, 日期) -> (表版本, 结果)
+    _cache: "OrderedDict[Tuple[int, int, date], Tuple[Tuple[int, ...], Dict[str, Any]]]" = OrderedDict()
+    _lock = threading.Lock()
+    MAX_CACHE_ENTRIES = 16
+
+    @staticmethod
+    def build_trends(db: Session, user_id: int, days: int = 30, window: int = 7) -> Dict[str, Any]:
+        """计算趋势分析结果（不走缓存）"""
+        end = date.today()
+        start = end - timedelta(days=days - 1)
+        result = compute_trends(load_input(db, user_id, start, days), window)
+
+        dates = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+        correlations = result["correlations"]
+        return {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "days": days,
+            "window": window,
+            "dates": dates,
+            "systems": {
+                system_type: {
+                    "scores": result["scores"][i],
+                    "rolling_mean": result["rolling_mean"][i],
+                    "log_counts": result["log_counts"][i],
+                    "change": result["scores"][i][-1] - result["scores"][i][0],
+                    "current_streak": result["current_streak"][i],
+                    "longest_streak": result["longest_streak"][i],
+                }
+                for i, system_type in enumerate(SYSTEM_TYPES)
+            },
+            "mood": result["mood"],
+            "deviations": {
+                "daily": result["deviations"],
+                "clean_streak": result["clean_streak"],
+            },
+            "correlations": {
+                "labels": CORRELATION_LABELS,
+                "matrix": correlations,
+            },
+            "engine": "numpy" if np is not None else "python",
+        }
+
+    @staticmethod
+    def get_trends(db: Session, days: int = 30, window: int = 7) -> Tuple[dict, int]:
+        """
+        获取八大系统的趋势分析
+
+        Returns:
+            (response_data, status_code)
+        """
+        user = db.query(User).first()
+        if not user:
+            return error_response(message="用户不存在", code=404), 404
+
+        # 先取版本再计算：计算期间若有写入，版本已变，结果不会被再次命中
+        key = (days, window, date.today())
+        versions = get_versions(ANALYTICS_TABLES)
+        with AnalyticsService._lock:
+            cached = AnalyticsService._cache.get(key)
+            if cached is not None and cached[0] == versions:
+                AnalyticsService._cache.move_to_end(key)
+                return cached[1], 200
+
+        data = AnalyticsService.build_trends(db, user.id, days, window)
+        with AnalyticsService._lock:
+            AnalyticsService._cache[key] = (versions, data)
+            AnalyticsService._cache.move_to_end(key)
+            while len(AnalyticsService._cache) > AnalyticsService.MAX_CACHE_ENTRIES:
+                AnalyticsService._cache.popitem(last=False)
+        return data, 200
+
+    @staticmethod
+    def clear_cache() -> None:
+        """清空分析缓存"""
+        with AnalyticsService._lock:
+            AnalyticsService._cache.clear()
@@ -1,11 +1,14 @@
 """资产项服务"""
 from typing import Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from backend.core.serialization import dump_list
 from backend.models.asset import AssetCategory, AssetItem
 from backend.models.user import User
 from backend.schemas.asset import (
     AssetItemCreate,
+    AssetItemBatchCreate,
     AssetItemUpdate,
     AssetItemResponse,
 )
@@ -43,7 +46,7 @@ class AssetItemService:
             .order_by(AssetItem.created_at.desc())
             .all()
         )
-        payload = [AssetItemResponse.model_validate(i).model_dump() for i in items]
+        payload = dump_list(AssetItemResponse, items)
         return {"items": payload}, 200
 
     @staticmethod
@@ -73,6 +76,41 @@ class AssetItemService:
         db.refresh(item)
         return AssetItemResponse.model_validate(item).model_dump(), 201
 
+    @staticmethod
+    def create_items_batch(db: Session, request: AssetItemBatchCreate) -> Tuple[dict, int]:
+        user = AssetItemService.get_user(db)
+        category_ids = {entry.category_id for entry in request.items}
+        owned = {
+            row.id
+            for row in db.query(AssetCategory.id)
+            .filter(AssetCategory.id.in_(category_ids), AssetCategory.user_id == user.id)
+            .all()
+        }
+        missing = sorted(category_ids - owned)
+        if missing:
+            return error_response(
+                message="分类不存在",
+                code=404,
+                data={"category_ids": missing},
+            ), 404
+
+        items = db.scalars(
+            insert(AssetItem).returning(AssetItem),
+            [
+                {
+                    "user_id": user.id,
+                    "category_id": entry.category_id,
+                    "name": entry.name,
+                    "amount": entry.amount,
+                    "note": entry.note,
+                }
+                for entry in request.items
+            ],
+        ).all()
+        payload = dump_list(AssetItemResponse, items)
+        db.commit()
+        return {"items": payload, "total": len(payload)}, 201
+
     @staticmethod
     def update_item(
         db: Session,
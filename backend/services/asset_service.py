@@ -2,6 +2,7 @@
 from typing import Tuple
 from sqlalchemy.orm import Session
 
+from backend.core.serialization import dump_list
 from backend.models.asset import AssetCategory
 from backend.models.user import User
 from backend.schemas.asset import (
@@ -32,7 +33,7 @@ class AssetService:
             .order_by(AssetCategory.created_at.desc())
             .all()
         )
-        items = [AssetCategoryResponse.model_validate(c).model_dump() for c in categories]
+        items = dump_list(AssetCategoryResponse, categories)
         return {"items": items}, 200
 
     @staticmethod
@@ -3,6 +3,7 @@ from typing import Tuple, Optional
 from datetime import date
 from sqlalchemy.orm import Session
 
+from backend.core.serialization import dump_list
 from backend.models.asset import AssetSnapshot
 from backend.models.user import User
 from backend.schemas.asset import AssetSnapshotCreate, AssetSnapshotResponse
@@ -36,7 +37,7 @@ class AssetSnapshotService:
             query = query.filter(AssetSnapshot.snapshot_date <= end_date)
 
         snapshots = query.order_by(AssetSnapshot.snapshot_date.desc()).all()
-        items = [AssetSnapshotResponse.model_validate(s).model_dump() for s in snapshots]
+        items = dump_list(AssetSnapshotResponse, snapshots)
         return {"items": items}, 200
 
     @staticmethod
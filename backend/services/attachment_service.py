@@ -0,0 +1,250 @@
+"""
+附件服务 - 日记附件的记录管理
+
+文件内容由 attachment_store.AttachmentStore 按内容哈希存储，本模块负责附件记录的
+创建、查询和删除，并在记录不再引用某个 blob 时释放它。
+"""
+import mimetypes
+from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.core.serialization import dump_list
+from backend.models.diary import Diary, DiaryAttachment
+from backend.models.user import User
+from backend.schemas.journal import DiaryAttachmentResponse
+from backend.schemas.common import error_response
+from backend.services.attachment_store import (
+    AttachmentStore,
+    AttachmentTooLargeError,
+    get_attachment_store,
+)
+
+
+# 扩展名 -> 附件类型（与 DiaryAttachmentBase.file_type 一致）
+FILE_TYPES = {
+    ".jpg": "image", ".jpeg": "image", ".png": "image", ".gif": "image",
+    ".webp": "image", ".bmp": "image", ".heic": "image",
+    ".pdf": "pdf",
+    ".doc": "docx", ".docx": "docx",
+    ".mp4": "video", ".mov": "video", ".webm": "video", ".mkv": "video",
+    ".avi": "video", ".m4v": "video",
+}
+
+
+class AttachmentService:
+    """日记附件服务类"""
+
+    @staticmethod
+    def _get_diary(db: Session, diary_id: int) -> Optional[Diary]:
+        user = db.query(User).first()
+        if not user:
+            return None
+        return db.query(Diary).filter(Diary.id == diary_id, Diary.user_id == user.id).first()
+
+    @staticmethod
+    def _detect_type(filename: str) -> Tuple[Optional[str], str]:
+        """根据扩展名判断附件类型和 MIME 类型"""
+        file_type = FILE_TYPES.get(Path(filename).suffix.lower())
+        mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        return file_type, mime_type
+
+    @staticmethod
+    def _check_upload(db: Session, diary_id: int, filename: str) -> Optional[Tuple[dict, int]]:
+        """上传前检查（在读取请求体之前执行）"""
+        if not AttachmentService._get_diary(db, diary_id):
+            return error_response(message="日记不存在", code=404), 404
+        file_type, _ = AttachmentService._detect_type(filename)
+        if file_type is None:
+            return error_response(
+                message="不支持的附件类型",
+                code=415,
+                data={"allowed": sorted(FILE_TYPES)}
+            ), 415
+        return None
+
+    @staticmethod
+    def _save_record(db: Session, diary_id: int, filename: str, sha256: str, size: int) -> Tuple[dict, int]:
+        file_type, mime_type = AttachmentService._detect_type(filename)
+        attachment = DiaryAttachment(
+            diary_id=diary_id,
+            filename=filename,
+            file_path=AttachmentStore.blob_key(sha256),
+            file_type=file_type,
+            file_size=size,
+            sha256=sha256,
+            mime_type=mime_type,
+        )
+        db.add(attachment)
+        db.commit()
+        db.refresh(attachment)
+        return DiaryAttachmentResponse.model_validate(attachment).model_dump(), 201
+
+    @staticmethod
+    async def upload_attachment(
+        db: Session,
+        diary_id: int,
+        filename: str,
+        chunks: AsyncIterator[bytes]
+    ) -> Tuple[dict, int]:
+        """
+        流式上传附件
+
+        Returns:
+            (response_data, status_code)
+        """
+        filename = Path(filename).name
+        failed = AttachmentService._check_upload(db, diary_id, filename)
+        if failed:
+            return failed
+
+        # 接收上传流期间不占用读连接
+        db.commit()
+
+        store = get_attachment_store()
+        try:
+            sha256, size = await store.write_stream(chunks)
+        except AttachmentTooLargeError as e:
+            return error_response(message=str(e), code=413), 413
+
+        try:
+            return AttachmentService._save_record(db, diary_id, filename, sha256, size)
+        finally:
+            store.unpin(sha256)
+
+    @staticmethod
+    def import_attachment(
+        db: Session,
+        diary_id: int,
+        source_path: str,
+        filename: Optional[str] = None
+    ) -> Tuple[dict, int]:
+        """
+        从本地文件导入附件
+
+        Returns:
+            (response_data, status_code)
+        """
+        source = Path(source_path)
+        if not source.is_file():
+            return error_response(message="文件不存在", code=404), 404
+
+        filename = Path(filename or source.name).name
+        failed = AttachmentService._check_upload(db, diary_id, filename)
+        if failed:
+            return failed
+
+        store = get_attachment_store()
+        try:
+            sha256, size = store.write_file(source)
+        except AttachmentTooLargeError as e:
+            return error_response(message=str(e), code=413), 413
+
+        try:
+            return AttachmentService._save_record(db, diary_id, filename, sha256, size)
+        finally:
+            store.unpin(sha256)
+
+    @staticmethod
+    def list_attachments(db: Session, diary_id: int) -> Tuple[dict, int]:
+        """
+        获取日记的附件列表
+
+        Returns:
+            (response_data, status_code)
+        """
+        if not AttachmentService._get_diary(db, diary_id):
+            return error_response(message="日记不存在", code=404), 404
+
+        attachments = (
+            db.query(DiaryAttachment)
+            .filter(DiaryAttachment.diary_id == diary_id)
+            .order_by(DiaryAttachment.id)
+            .all()
+        )
+        items = dump_list(DiaryAttachmentResponse, attachments)
+        return {"items": items, "total": len(items)}, 200
+
+    @staticmethod
+    def get_attachment(db: Session, attachment_id: int) -> Optional[DiaryAttachment]:
+        """获取附件记录（blob 缺失时返回 None）"""
+        attachment = db.query(DiaryAttachment).filter(DiaryAttachment.id == attachment_id).first()
+        if not attachment or not attachment.sha256:
+            return None
+        if not get_attachment_store().has_blob(attachment.sha256):
+            return None
+        return attachment
+
+    @staticmethod
+    def release_blobs(db: Session, hashes: Iterable[str]) -> int:
+        """
+        删除不再被任何附件引用的 blob（在删除记录的事务提交后调用）
+
+        Returns:
+            删除的 blob 数量
+        """
+        def referenced(candidates: set) -> set:
+            # 结束之前的读事务，确保能看到并发上传已提交的记录
+            db.commit()
+            return {
+                row[0]
+                for row in db.query(DiaryAttachment.sha256)
+                .filter(DiaryAttachment.sha256.in_(candidates))
+                .distinct()
+                .all()
+            }
+
+        return get_attachment_store().delete_unreferenced(hashes, referenced)
+
+    @staticmethod
+    def delete_attachment(db: Session, attachment_id: int) -> Tuple[dict, int]:
+        """
+        删除附件（blob 无其他引用时一并删除）
+
+        Returns:
+            (response_data, status_code)
+        """
+        attachment = db.query(DiaryAttachment).filter(DiaryAttachment.id == attachment_id).first()
+        if not attachment or not AttachmentService._get_diary(db, attachment.diary_id):
+            return error_response(message="附件不存在", code=404), 404
+
+        sha256 = attachment.sha256
+        db.delete(attachment)
+        db.commit()
+        AttachmentService.release_blobs(db, [sha256])
+
+        return {"deleted_id": attachment_id}, 200
+
+    @staticmethod
+    def delete_for_diary(db: Session, diary_id: int) -> List[str]:
+        """
+        删除日记的全部附件记录（不提交）
+
+        Returns:
+            被删除附件的内容哈希，提交后传给 release_blobs
+        """
+        attachments = db.query(DiaryAttachment).filter(DiaryAttachment.diary_id == diary_id).all()
+        hashes = [a.sha256 for a in attachments if a.sha256]
+        for attachment in attachments:
+            db.delete(attachment)
+        return hashes
+
+
+def referenced_hashes(db_path: Path) -> List[str]:
+    """
+    读取数据库文件中所有附件引用的内容哈希（备份时使用，直接读取数据库副本）
+    """
+    import sqlite3
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT sha256 FROM diary_attachments WHERE sha256 IS NOT NULL"
+        ).fetchall()
+        return [row[0] for row in rows]
+    except sqlite3.Error:
+        # 旧数据库没有 sha256 列
+        return []
+    finally:
+        conn.close()
@@ -0,0 +1,265 @@
+"""
+附件存储 - 日记附件的内容寻址文件存储（只负责文件，不涉及数据库）
+
+存储布局（ATTACHMENT_DIR 下）：
+- blobs/ab/abcdef...：按 SHA-256 命名的文件内容，相同文件只保存一份
+- thumbs/abcdef..._320.jpg：图片缩略图（首次请求时用 Pillow 生成并缓存）
+- tmp/：上传中的临时文件，写完并算出哈希后原子地移动到 blobs/
+
+上传按块流式写入磁盘并增量计算哈希，下载使用 FileResponse（Starlette >= 0.39 支持 Range），
+大文件任何时候都不会完整读入内存。
+
+相同内容的上传与删除可能并发：上传在 blob 落位时登记占用（pin），直到附件记录提交后
+才释放；delete_unreferenced() 在同一把锁内查询引用并删除，跳过被占用的 blob。
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from backend.core.config import settings
+
+try:
+    from PIL import Image
+except ImportError:  # 回退：依赖未完整安装时不生成缩略图，接口返回原图
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+
+class AttachmentTooLargeError(Exception):
+    """附件超过大小上限"""
+    pass
+
+
+class AttachmentStore:
+    """内容寻址的附件存储（只负责文件，不涉及数据库）"""
+
+    def __init__(self, root: Optional[Path] = None, chunk_size: Optional[int] = None):
+        self.root = Path(root or settings.ATTACHMENT_DIR)
+        self.chunk_size = chunk_size or settings.ATTACHMENT_CHUNK_SIZE
+        self.blob_dir = self.root / "blobs"
+        self.thumb_dir = self.root / "thumbs"
+        self.tmp_dir = self.root / "tmp"
+        # blob 落位 / 删除互斥；上传中的 blob 占用计数 {sha256: 次数}
+        self._lock = threading.Lock()
+        self._pins: Dict[str, int] = {}
+
+    @staticmethod
+    def blob_key(sha256: str) -> str:
+        """blob 相对路径（存入 file_path 列）"""
+        return f"blobs/{sha256[:2]}/{sha256}"
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / self.blob_key(sha256)
+
+    def has_blob(self, sha256: str) -> bool:
+        return self.blob_path(sha256).is_file()
+
+    # ============ 写入 ============
+
+    def _new_temp(self) -> Path:
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return self.tmp_dir / f"{uuid.uuid4().hex}.part"
+
+    def _commit_temp(self, temp: Path, sha256: str, pin: bool = False) -> None:
+        """临时文件移动到 blob 位置；内容已存在时丢弃临时文件（去重）"""
+        target = self.blob_path(sha256)
+        with self._lock:
+            if pin:
+                self._pins[sha256] = self._pins.get(sha256, 0) + 1
+            if target.exists():
+                temp.unlink(missing_ok=True)
+                return
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp, target)
+
+    def unpin(self, sha256: str) -> None:
+        """释放 write_stream / write_file 登记的占用（附件记录提交或放弃后调用）"""
+        with self._lock:
+            count = self._pins.get(sha256, 0) - 1
+            if count > 0:
+                self._pins[sha256] = count
+            else:
+                self._pins.pop(sha256, None)
+
+    async def write_stream(self, chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None) -> Tuple[str, int]:
+        """
+        按块写入上传内容
+
+        返回的 blob 处于占用状态，调用方保存附件记录后须调用 unpin()。
+
+        Returns:
+            (sha256, 字节数)
+
+        Raises:
+            AttachmentTooLargeError: 超过大小上限（临时文件已删除）
+        """
+        limit = max_bytes or settings.ATTACHMENT_MAX_BYTES
+        digest = hashlib.sha256()
+        size = 0
+        temp = self._new_temp()
+        try:
+            with open(temp, "wb") as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > limit:
+                        raise AttachmentTooLargeError(f"附件超过上限 {limit} 字节")
+                    digest.update(chunk)
+                    # 磁盘写入放到线程池，不阻塞事件循环
+                    await asyncio.to_thread(f.write, chunk)
+            sha256 = digest.hexdigest()
+            self._commit_temp(temp, sha256, pin=True)
+            return sha256, size
+        finally:
+            temp.unlink(missing_ok=True)
+
+    def write_file(self, source: Path, max_bytes: Optional[int] = None) -> Tuple[str, int]:
+        """按块复制本地文件（同步，调用方应在线程池中执行；占用规则同 write_stream）"""
+        limit = max_bytes or settings.ATTACHMENT_MAX_BYTES
+        if source.stat().st_size > limit:
+            raise AttachmentTooLargeError(f"附件超过上限 {limit} 字节")
+
+        digest = hashlib.sha256()
+        size = 0
+        temp = self._new_temp()
+        try:
+            with open(source, "rb") as src, open(temp, "wb") as dst:
+                while True:
+                    chunk = src.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    digest.update(chunk)
+                    dst.write(chunk)
+            sha256 = digest.hexdigest()
+            self._commit_temp(temp, sha256, pin=True)
+            return sha256, size
+        finally:
+            temp.unlink(missing_ok=True)
+
+    def delete_unreferenced(self, hashes: Iterable[str], referenced: Callable[[Set[str]], Set[str]]) -> int:
+        """
+        删除未被引用的 blob
+
+        引用查询与删除在同一把锁内完成，跳过上传中（已落位、记录未提交）的 blob。
+
+        Args:
+            hashes: 候选 blob 哈希
+            referenced: 返回其中仍被附件记录引用的哈希（须在调用时开启新的读事务）
+
+        Returns:
+            删除的 blob 数量
+        """
+        with self._lock:
+            candidates = {h for h in hashes if h and h not in self._pins}
+            if not candidates:
+                return 0
+            orphaned = candidates - referenced(candidates)
+            for sha256 in orphaned:
+                self.delete_blob(sha256)
+        return len(orphaned)
+
+    def delete_blob(self, sha256: str) -> None:
+        """删除 blob 及其缩略图"""
+        self.blob_path(sha256).unlink(missing_ok=True)
+        if self.thumb_dir.exists():
+            for thumb in self.thumb_dir.glob(f"{sha256}_*"):
+                thumb.unlink(missing_ok=True)
+
+    # ============ 缩略图 ============
+
+    def thumbnail(self, sha256: str, size: Optional[int] = None) -> Optional[Path]:
+        """
+        获取图片缩略图（首次调用时生成并缓存）
+
+        Returns:
+            缩略图路径；未安装 Pillow 或图片无法解码时返回 None
+        """
+        if Image is None:
+            return None
+        size = size or settings.ATTACHMENT_THUMBNAIL_SIZE
+        target = self.thumb_dir / f"{sha256}_{size}.jpg"
+        if target.exists():
+            return target
+
+        source = self.blob_path(sha256)
+        if not source.exists():
+            return None
+        temp = None
+        try:
+            self.thumb_dir.mkdir(parents=True, exist_ok=True)
+            temp = self._new_temp()
+            with Image.open(source) as image:
+                # draft 让 JPEG 在解码阶段就按比例缩小，避免解码整张大图
+                image.draft("RGB", (size, size))
+                image.thumbnail((size, size))
+                image.convert("RGB").save(temp, "JPEG", quality=85)
+            os.replace(temp, target)
+            return target
+        except Exception as e:
+            logger.warning(f"Thumbnail generation failed for {sha256}: {e}")
+            if temp is not None:
+                temp.unlink(missing_ok=True)
+            return None
+
+    # ============ 备份 ============
+
+    def export_blobs(self, hashes: Iterable[str], dest_root: Path) -> int:
+        """
+        把 blob 复制到备份的共享 blob 目录（同样按哈希命名，已存在则跳过）
+
+        Returns:
+            新复制的 blob 数量
+        """
+        copied = 0
+        for sha256 in hashes:
+            source = self.blob_path(sha256)
+            target = dest_root / sha256[:2] / sha256
+            if target.exists() or not source.exists():
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                # 同一文件系统上用硬链接，不占用额外空间
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            copied += 1
+        return copied
+
+    def import_blobs(self, hashes: Iterable[str], source_root: Path) -> int:
+        """
+        从备份的共享 blob 目录恢复缺失的 blob
+
+        Returns:
+            恢复的 blob 数量
+        """
+        restored = 0
+        for sha256 in hashes:
+            source = source_root / sha256[:2] / sha256
+            if self.has_blob(sha256) or not source.exists():
+                continue
+            temp = self._new_temp()
+            shutil.copy2(source, temp)
+            self._commit_temp(temp, sha256)
+            restored += 1
+        return restored
+
+
+# 单例实例
+_store_instance: Optional[AttachmentStore] = None
+
+
+def get_attachment_store() -> AttachmentStore:
+    """获取 AttachmentStore 单例"""
+    global _store_instance
+    if _store_instance is None:
+        _store_instance = AttachmentStore()
+    return _store_instance
@@ -1,15 +1,27 @@
 """
 认证服务 - PIN 码管理业务逻辑
+
+bcrypt 哈希 / 校验在专用小线程池中执行（bcrypt 计算期间释放 GIL），
+异步路由通过 *_async 方法 await 结果，解锁期间事件循环仍可处理其他请求。
+失败次数与锁定状态保存在内存（PinLockState），变化时同步写回
+User.pin_attempts / pin_locked_until，重启或备份恢复后从数据库重新加载。
+
+异步验证在 bcrypt 之前先在 PinLockState 中预占一次尝试，并发请求不会都通过锁定检查；
+await 哈希线程池之前提交会话，归还读连接，避免大量并发验证占满连接池卡住事件循环。
 """
+import asyncio
+import threading
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 from sqlalchemy.orm import Session
 
 from backend.models.user import User
 from backend.schemas.user import PinSetupResponse, PinVerifyResponse
 from backend.schemas.common import error_response
 from backend.core.config import settings
+from backend.db.versions import get_versions
 from backend.services.base import get_current_user
 
 
@@ -23,6 +35,180 @@ def _parse_datetime(dt):
     return dt
 
 
+# ============ PIN 哈希线程池 ============
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_executor_lock = threading.Lock()
+
+
+def get_hash_executor() -> ThreadPoolExecutor:
+    """获取 bcrypt 专用线程池（与默认线程池隔离，避免被其他阻塞任务占满）"""
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.AUTH_HASH_WORKERS),
+                    thread_name_prefix="pin-hash",
+                )
+    return _hash_executor
+
+
+async def _run_in_hash_pool(func, *args):
+    """在 bcrypt 线程池中执行，当前事件循环继续处理其他请求"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), func, *args)
+
+
+# ============ 锁定状态 ============
+
+class PinLockState:
+    """
+    PIN 失败次数与锁定状态（内存副本，写穿到数据库）
+
+    - 首次访问或数据库纪元 / 用户变化时从 User 加载，之后不再依赖会话中读到的旧值
+    - 每次变化都写回传入的 User 对象，由调用方随业务一起提交
+    - 并发验证在锁内按顺序计数，不会因各自会话读到相同的失败次数而少计
+    - 验证前 reserve() 预占一次尝试：失败次数 + 进行中的验证达到上限时拒绝新的验证，
+      结果出来后 record_success / record_failure 释放预占
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self.attempts = 0
+        self.locked_until: Optional[datetime] = None
+        self.pending = 0
+
+    def _sync(self, user: User) -> None:
+        """数据库纪元或用户变化时重新加载（需持有锁）"""
+        stamp = (get_versions(())[0], user.id)
+        if stamp != self._stamp:
+            self.attempts = user.pin_attempts or 0
+            self.locked_until = _parse_datetime(user.pin_locked_until)
+            self._stamp = stamp
+
+    def _write(self, user: User) -> None:
+        """写回数据库字段（需持有锁）"""
+        user.pin_attempts = self.attempts
+        user.pin_locked_until = self.locked_until
+
+    def remaining_seconds(self, user: User) -> int:
+        """剩余锁定秒数，未锁定返回 0（只读）"""
+        with self._lock:
+            self._sync(user)
+            if self.locked_until and self.locked_until > self._clock():
+                return max(1, int((self.locked_until - self._clock()).total_seconds()))
+            return 0
+
+    def _check(self, user: User) -> int:
+        """检查锁定（需持有锁），锁定已过期时重置失败次数"""
+        self._sync(user)
+        if not self.locked_until:
+            return 0
+        now = self._clock()
+        if self.locked_until > now:
+            return max(1, int((self.locked_until - now).total_seconds()))
+        self.attempts = 0
+        self.locked_until = None
+        self._write(user)
+        return 0
+
+    def _release(self, reserved: bool) -> None:
+        """释放一次预占（需持有锁）"""
+        if reserved:
+            self.pending = max(0, self.pending - 1)
+
+    def check(self, user: User) -> int:
+        """
+        验证前检查锁定
+
+        Returns:
+            剩余锁定秒数；锁定已过期时重置失败次数并返回 0
+        """
+        with self._lock:
+            return self._check(user)
+
+    def reserve(self, user: User) -> Tuple[int, bool]:
+        """
+        检查锁定并预占一次尝试（bcrypt 校验之前调用）
+
+        Returns:
+            (剩余锁定秒数, 是否因进行中的验证已占满剩余次数而拒绝)；(0, False) 表示已预占
+        """
+        with self._lock:
+            remaining_seconds = self._check(user)
+            if remaining_seconds:
+                return remaining_seconds, False
+            if self.attempts + self.pending >= settings.PIN_MAX_ATTEMPTS:
+                return 0, True
+            self.pending += 1
+            return 0, False
+
+    def release(self) -> None:
+        """校验未完成（如异常）时释放预占"""
+        with self._lock:
+            self._release(True)
+
+    def record_success(self, user: User, reserved: bool = False) -> int:
+        """
+        验证成功，清零失败次数
+
+        Returns:
+            0 表示成功；校验期间已被锁定（如数据恢复后）时返回剩余锁定秒数，本次成功作废
+        """
+        with self._lock:
+            self._release(reserved)
+            remaining_seconds = self._check(user)
+            if remaining_seconds:
+                return remaining_seconds
+            self.attempts = 0
+            self.locked_until = None
+            self._write(user)
+            return 0
+
+    def record_failure(self, user: User, reserved: bool = False) -> Tuple[int, int]:
+        """
+        记录一次验证失败
+
+        Returns:
+            (剩余尝试次数, 锁定秒数)，未触发锁定时锁定秒数为 0
+        """
+        with self._lock:
+            self._release(reserved)
+            self._sync(user)
+            self.attempts += 1
+            locked_seconds = 0
+            if self.attempts >= settings.PIN_MAX_ATTEMPTS:
+                locked_seconds = settings.PIN_LOCK_DURATION_SECONDS
+                self.locked_until = self._clock() + timedelta(seconds=locked_seconds)
+            self._write(user)
+            return settings.PIN_MAX_ATTEMPTS - self.attempts, locked_seconds
+
+    def reset(self, user: User) -> None:
+        """清零失败次数和锁定（设置 / 修改 PIN）"""
+        with self._lock:
+            self._stamp = (get_versions(())[0], user.id)
+            self.attempts = 0
+            self.locked_until = None
+            self._write(user)
+
+
+_pin_lock_state: Optional[PinLockState] = None
+_state_lock = threading.Lock()
+
+
+def get_pin_lock_state() -> PinLockState:
+    """获取全局 PIN 锁定状态"""
+    global _pin_lock_state
+    if _pin_lock_state is None:
+        with _state_lock:
+            if _pin_lock_state is None:
+                _pin_lock_state = PinLockState()
+    return _pin_lock_state
+
+
 class AuthService:
     """认证服务类"""
 
@@ -37,6 +223,16 @@ class AuthService:
         """验证 PIN 码"""
         return bcrypt.checkpw(pin.encode('utf-8'), pin_hash.encode('utf-8'))
 
+    @staticmethod
+    async def hash_pin_async(pin: str) -> str:
+        """哈希 PIN 码（在 bcrypt 线程池中执行）"""
+        return await _run_in_hash_pool(AuthService.hash_pin, pin)
+
+    @staticmethod
+    async def verify_pin_hash_async(pin: str, pin_hash: str) -> bool:
+        """验证 PIN 码（在 bcrypt 线程池中执行）"""
+        return await _run_in_hash_pool(AuthService.verify_pin_hash, pin, pin_hash)
+
     @staticmethod
     def get_user(db: Session) -> Optional[User]:
         """获取用户（单用户应用，默认返回第一个用户）"""
@@ -51,147 +247,240 @@ class AuthService:
         db.refresh(user)
         return user
 
-    @staticmethod
-    def setup_pin(db: Session, pin: str) -> Tuple[dict, int]:
-        """
-        设置 PIN 码（首次）
+    # ============ 设置 PIN ============
 
-        Returns:
-            (response_data, status_code)
-        """
+    @staticmethod
+    def _prepare_setup(db: Session) -> Tuple[Optional[User], Optional[Tuple[dict, int]]]:
+        """设置 PIN 前检查，返回 (用户, 错误响应)"""
         user = AuthService.get_user(db)
 
         # 检查是否已设置 PIN
         if user and user.pin_hash:
-            return error_response(
+            return None, (error_response(
                 message="PIN 已设置",
                 code=409,
                 data={
                     "conflict": "PIN_ALREADY_SET",
                     "hint": "请使用 /api/pin/change 接口修改 PIN"
                 }
-            ), 409
+            ), 409)
 
         # 如果用户不存在，创建默认用户
         if not user:
             user = AuthService.create_default_user(db)
+        return user, None
 
-        # 哈希并保存 PIN
-        user.pin_hash = AuthService.hash_pin(pin)
-        user.pin_attempts = 0
-        user.pin_locked_until = None
+    @staticmethod
+    def _save_pin(db: Session, user: User, pin_hash: str) -> None:
+        """保存 PIN 哈希并清零失败次数和锁定"""
+        user.pin_hash = pin_hash
+        get_pin_lock_state().reset(user)
         db.commit()
 
-        return PinSetupResponse().model_dump(), 200
-
     @staticmethod
-    def verify_pin(db: Session, pin: str) -> Tuple[dict, int]:
+    def setup_pin(db: Session, pin: str) -> Tuple[dict, int]:
         """
-        验证 PIN 码
+        设置 PIN 码（首次）
 
         Returns:
             (response_data, status_code)
         """
+        user, error = AuthService._prepare_setup(db)
+        if error:
+            return error
+
+        AuthService._save_pin(db, user, AuthService.hash_pin(pin))
+        return PinSetupResponse().model_dump(), 200
+
+    @staticmethod
+    async def setup_pin_async(db: Session, pin: str) -> Tuple[dict, int]:
+        """设置 PIN 码（首次），哈希在 bcrypt 线程池中执行"""
+        user, error = AuthService._prepare_setup(db)
+        # 结束读事务、归还连接：拒绝时不占到请求结束，通过时 bcrypt 期间不占用连接池
+        db.commit()
+        if error:
+            return error
+
+        AuthService._save_pin(db, user, await AuthService.hash_pin_async(pin))
+        return PinSetupResponse().model_dump(), 200
+
+    # ============ 验证 PIN ============
+
+    @staticmethod
+    def _prepare_verify(db: Session) -> Tuple[Optional[User], Optional[Tuple[dict, int]]]:
+        """验证 PIN 前检查设置和锁定状态并预占一次尝试，返回 (用户, 错误响应)"""
         user = AuthService.get_user(db)
 
         # 检查是否已设置 PIN
         if not user or not user.pin_hash:
-            return error_response(
+            return None, (error_response(
                 message="PIN 未设置",
                 code=424,
                 data={"hint": "请先使用 /api/pin/setup 接口设置 PIN"}
-            ), 424
-
-        # 检查是否被锁定
-        locked_until = _parse_datetime(user.pin_locked_until)
-        if locked_until:
-            if locked_until > datetime.now():
-                # 仍在锁定中
-                remaining_seconds = int((locked_until - datetime.now()).total_seconds())
+            ), 424)
+
+        # 检查是否被锁定并预占一次尝试（锁定中或次数已被进行中的验证占满时直接拒绝，不进行 bcrypt 计算）
+        remaining_seconds, busy = get_pin_lock_state().reserve(user)
+        if busy:
+            return None, (error_response(
+                message="PIN 验证进行中，请稍后重试",
+                code=429,
+                data={"remaining_seconds": 1}
+            ), 429)
+        if remaining_seconds:
+            return None, (error_response(
+                message="PIN 已锁定",
+                code=429,
+                data={"remaining_seconds": remaining_seconds}
+            ), 429)
+        return user, None
+
+    @staticmethod
+    def _finish_verify(db: Session, user: User, verified: bool) -> Tuple[dict, int]:
+        """根据校验结果更新失败次数 / 锁定状态并写回数据库（释放 _prepare_verify 的预占）"""
+        state = get_pin_lock_state()
+
+        if verified:
+            # 验证成功，重置失败次数；校验期间已被锁定则拒绝
+            remaining_seconds = state.record_success(user, reserved=True)
+            db.commit()
+            if remaining_seconds:
                 return error_response(
                     message="PIN 已锁定",
                     code=429,
                     data={"remaining_seconds": remaining_seconds}
                 ), 429
-            else:
-                # 锁定已过期，重置失败次数和锁定状态
-                user.pin_attempts = 0
-                user.pin_locked_until = None
-                db.commit()
-
-        # 验证 PIN
-        if AuthService.verify_pin_hash(pin, user.pin_hash):
-            # 验证成功，重置失败次数
-            user.pin_attempts = 0
-            user.pin_locked_until = None
-            db.commit()
 
             return PinVerifyResponse(
                 verified=True,
                 user_id=user.id
             ).model_dump(), 200
-        else:
-            # 验证失败，增加失败次数
-            user.pin_attempts += 1
-            remaining_attempts = settings.PIN_MAX_ATTEMPTS - user.pin_attempts
-
-            # 检查是否需要锁定
-            if user.pin_attempts >= settings.PIN_MAX_ATTEMPTS:
-                user.pin_locked_until = datetime.now() + timedelta(seconds=settings.PIN_LOCK_DURATION_SECONDS)
-                db.commit()
-                return error_response(
-                    message=f"PIN 验证失败次数过多，已锁定{settings.PIN_LOCK_DURATION_SECONDS}秒",
-                    code=429,
-                    data={"remaining_seconds": settings.PIN_LOCK_DURATION_SECONDS}
-                ), 429
 
-            db.commit()
+        # 验证失败，增加失败次数（达到上限时锁定）
+        remaining_attempts, locked_seconds = state.record_failure(user, reserved=True)
+        db.commit()
 
+        if locked_seconds:
             return error_response(
-                message="PIN 验证失败",
-                code=401,
-                data={"attempts_remaining": remaining_attempts}
-            ), 401
+                message=f"PIN 验证失败次数过多，已锁定{locked_seconds}秒",
+                code=429,
+                data={"remaining_seconds": locked_seconds}
+            ), 429
+
+        return error_response(
+            message="PIN 验证失败",
+            code=401,
+            data={"attempts_remaining": remaining_attempts}
+        ), 401
 
     @staticmethod
-    def change_pin(db: Session, old_pin: str, new_pin: str) -> Tuple[dict, int]:
+    def verify_pin(db: Session, pin: str) -> Tuple[dict, int]:
         """
-        修改 PIN 码
+        验证 PIN 码
 
         Returns:
             (response_data, status_code)
         """
+        user, error = AuthService._prepare_verify(db)
+        if error:
+            return error
+
+        try:
+            verified = AuthService.verify_pin_hash(pin, user.pin_hash)
+        except Exception:
+            get_pin_lock_state().release()
+            raise
+        return AuthService._finish_verify(db, user, verified)
+
+    @staticmethod
+    async def verify_pin_async(db: Session, pin: str) -> Tuple[dict, int]:
+        """验证 PIN 码，bcrypt 校验在线程池中执行"""
+        user, error = AuthService._prepare_verify(db)
+        # 结束读事务、归还连接（并写回预检中重置的过期锁定）：
+        # 拒绝时不占到请求结束，通过时 bcrypt 期间不占用连接池
+        try:
+            db.commit()
+        except BaseException:
+            # 提交失败时释放已取得的预占，否则会一直占用一次尝试
+            if not error:
+                get_pin_lock_state().release()
+            raise
+        if error:
+            return error
+
+        try:
+            verified = await AuthService.verify_pin_hash_async(pin, user.pin_hash)
+        except BaseException:
+            # 包括请求被取消
+            get_pin_lock_state().release()
+            raise
+        return AuthService._finish_verify(db, user, verified)
+
+    # ============ 修改 PIN ============
+
+    @staticmethod
+    def _prepare_change(db: Session) -> Tuple[Optional[User], Optional[Tuple[dict, int]]]:
+        """修改 PIN 前检查，返回 (用户, 错误响应)"""
         user = AuthService.get_user(db)
 
         if not user or not user.pin_hash:
-            return error_response(
+            return None, (error_response(
                 message="PIN 未设置",
                 code=424,
-            ), 424
+            ), 424)
+        return user, None
+
+    @staticmethod
+    def _old_pin_error() -> Tuple[dict, int]:
+        return error_response(
+            message="旧 PIN 验证失败",
+            code=401
+        ), 401
+
+    @staticmethod
+    def change_pin(db: Session, old_pin: str, new_pin: str) -> Tuple[dict, int]:
+        """
+        修改 PIN 码
+
+        Returns:
+            (response_data, status_code)
+        """
+        user, error = AuthService._prepare_change(db)
+        if error:
+            return error
 
         # 验证旧 PIN
         if not AuthService.verify_pin_hash(old_pin, user.pin_hash):
-            return error_response(
-                message="旧 PIN 验证失败",
-                code=401
-            ), 401
+            return AuthService._old_pin_error()
 
         # 更新为新 PIN
-        user.pin_hash = AuthService.hash_pin(new_pin)
-        user.pin_attempts = 0
-        user.pin_locked_until = None
+        AuthService._save_pin(db, user, AuthService.hash_pin(new_pin))
+        return None, 200
+
+    @staticmethod
+    async def change_pin_async(db: Session, old_pin: str, new_pin: str) -> Tuple[dict, int]:
+        """修改 PIN 码，bcrypt 校验和哈希在线程池中执行"""
+        user, error = AuthService._prepare_change(db)
+        # 结束读事务、归还连接：拒绝时不占到请求结束，通过时 bcrypt 期间不占用连接池
         db.commit()
+        if error:
+            return error
+
+        # 验证旧 PIN
+        if not await AuthService.verify_pin_hash_async(old_pin, user.pin_hash):
+            return AuthService._old_pin_error()
 
+        # 更新为新 PIN
+        AuthService._save_pin(db, user, await AuthService.hash_pin_async(new_pin))
         return None, 200
 
     @staticmethod
     def is_pin_locked(db: Session) -> bool:
         """检查 PIN 是否被锁定"""
         user = AuthService.get_user(db)
-        if not user or not user.pin_locked_until:
+        if not user:
             return False
-        locked_until = _parse_datetime(user.pin_locked_until)
-        return locked_until and locked_until > datetime.now()
+        return get_pin_lock_state().remaining_seconds(user) > 0
 
     @staticmethod
     def get_pin_verify_requirements(db: Session) -> dict:
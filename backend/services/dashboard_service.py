@@ -0,0 +1,129 @@
+"""
+首页看板服务
+
+首页需要的统计（各系统日志数、评分区间、饮食偏离、日记数与心情分布）全部来自 daily_rollups
+的一次范围扫描（走 uq_daily_rollups_user_date_dimension 唯一索引），不再逐项扫描原始表。
+"""
+from datetime import date, timedelta
+from typing import Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.db.rollups import MOOD_COLUMNS
+from backend.models.dimension import System, SYSTEM_TYPES
+from backend.models.rollup import DailyRollup, JOURNAL_DIMENSION
+from backend.models.user import User
+from backend.schemas.common import error_response
+
+
+class DashboardService:
+    """首页看板服务类"""
+
+    @staticmethod
+    def get_dashboard(db: Session, days: int = 30) -> Tuple[dict, int]:
+        """
+        获取首页看板数据
+
+        Args:
+            days: 每日趋势的天数（本月统计不受此参数影响）
+
+        Returns:
+            (response_data, status_code)
+        """
+        user = db.query(User).first()
+        if not user:
+            return error_response(message="用户不存在", code=404), 404
+
+        today = date.today()
+        period_start = today - timedelta(days=days - 1)
+        month_start = today.replace(day=1)
+        scan_start = min(period_start, month_start)
+
+        rows = (
+            db.query(DailyRollup)
+            .filter(DailyRollup.user_id == user.id, DailyRollup.date >= scan_start)
+            .order_by(DailyRollup.date)
+            .all()
+        )
+
+        # 当前评分（系统表每个用户只有八行）
+        system_scores = dict(
+            db.query(System.type, System.score).filter(System.user_id == user.id).all()
+        )
+        scores = [
+            {"type": system_type, "score": system_scores.get(system_type, 100)}
+            for system_type in SYSTEM_TYPES
+        ]
+
+        dimensions = {
+            system_type: {
+                "today_logs": 0,
+                "period_logs": 0,
+                "score_changes": 0,
+                "score_min": None,
+                "score_max": None,
+            }
+            for system_type in SYSTEM_TYPES
+        }
+        diet = {"today_deviations": 0, "monthly_deviations": 0, "period_deviations": 0}
+        journal = {
+            "today_count": 0,
+            "period_count": 0,
+            "monthly_count": 0,
+            "mood_distribution": {mood: 0 for mood in MOOD_COLUMNS},
+        }
+        daily = {
+            (period_start + timedelta(days=i)).isoformat(): {"logs": 0, "deviations": 0, "diaries": 0}
+            for i in range(days)
+        }
+
+        for row in rows:
+            in_period = row.date >= period_start
+            is_today = row.date == today
+            day = daily.get(row.date.isoformat())
+
+            if row.dimension == JOURNAL_DIMENSION:
+                if row.date >= month_start:
+                    journal["monthly_count"] += row.diary_count
+                if not in_period:
+                    continue
+                journal["period_count"] += row.diary_count
+                if is_today:
+                    journal["today_count"] += row.diary_count
+                for mood, column in MOOD_COLUMNS.items():
+                    journal["mood_distribution"][mood] += getattr(row, column)
+                day["diaries"] += row.diary_count
+                continue
+
+            if row.date >= month_start:
+                diet["monthly_deviations"] += row.deviation_count
+            if not in_period or row.dimension not in dimensions:
+                continue
+
+            stats = dimensions[row.dimension]
+            stats["period_logs"] += row.log_count
+            stats["score_changes"] += row.score_count
+            if is_today:
+                stats["today_logs"] += row.log_count
+                diet["today_deviations"] += row.deviation_count
+            if row.score_min is not None:
+                stats["score_min"] = row.score_min if stats["score_min"] is None else min(stats["score_min"], row.score_min)
+            if row.score_max is not None:
+                stats["score_max"] = row.score_max if stats["score_max"] is None else max(stats["score_max"], row.score_max)
+            diet["period_deviations"] += row.deviation_count
+            day["logs"] += row.log_count
+            day["deviations"] += row.deviation_count
+
+        return {
+            "date": today.isoformat(),
+            "start_date": period_start.isoformat(),
+            "days": days,
+            "scores": {
+                "systems": scores,
+                "average_score": round(sum(s["score"] for s in scores) / len(scores), 1),
+            },
+            "dimensions": dimensions,
+            "diet": diet,
+            "journal": journal,
+            "daily": [{"date": key, **value} for key, value in daily.items()],
+        }, 200
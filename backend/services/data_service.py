@@ -205,6 +205,11 @@ class DataService:
                 logger.info("Recreating database engine")
                 DatabaseManager.recreate_engine()
 
+                # 旧版本备份可能缺少索引 / 列，补齐 schema 迁移
+                from backend.db import session as db_session
+                from backend.db.migrations import run_migrations
+                run_migrations(db_session.write_engine)
+
                 # 验证引擎是否正常工作
                 logger.info("Verifying database connection")
                 if not DatabaseManager.test_connection():
@@ -373,6 +378,12 @@ class DataService:
             finally:
                 new_db.close()
 
+            # 数据已清空，使所有缓存版本失效，通知前端全量刷新
+            from backend.db.versions import bump_all
+            from backend.db.cdc import change_feed
+            bump_all()
+            change_feed.reset()
+
             return {
                 "backup_path": backup_path,
                 "reset_at": datetime.now().isoformat()
@@ -0,0 +1,309 @@
+"""
+日记历史服务 - 增量存储的日记版本历史
+
+每次修改标题或内容时追加一个版本：
+- 关键帧：content_snapshot 保存全文
+- 增量：content_delta 保存相对上一版本的差异，content_snapshot 为空
+
+每 DIARY_HISTORY_KEYFRAME_INTERVAL 个版本强制保存一次关键帧，
+还原任意版本只需读取最近的关键帧并向后应用不超过 N-1 个增量。
+
+增量格式（JSON 数组，按片段操作）：
+- 正整数 n：从旧文本复制 n 个片段
+- 负整数 -n：跳过旧文本的 n 个片段
+- 字符串 s：插入文本 s
+片段按换行和句末标点切分，中文长段落的局部修改也只记录改动的句子。
+"""
+import difflib
+import hashlib
+import json
+import re
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.models.diary import Diary, DiaryEditHistory
+from backend.models.user import User
+from backend.schemas.common import error_response
+
+
+# 片段边界：换行和中英文句末标点之后
+_SEGMENT_PATTERN = re.compile(r"(?<=[\n。！？；!?;])")
+
+DeltaOp = Union[int, str]
+
+
+# ============ 差异计算 ============
+
+def split_segments(text: str) -> List[str]:
+    """把文本切分为片段（拼接后与原文完全一致）"""
+    return [segment for segment in _SEGMENT_PATTERN.split(text) if segment]
+
+
+def content_hash(text: str) -> str:
+    """计算内容哈希（用于校验增量链是否与日记当前内容一致）"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def compute_delta(old: str, new: str) -> List[DeltaOp]:
+    """计算从 old 到 new 的增量操作"""
+    old_segments = split_segments(old)
+    new_segments = split_segments(new)
+    matcher = difflib.SequenceMatcher(None, old_segments, new_segments, autojunk=False)
+
+    ops: List[DeltaOp] = []
+
+    def push(op: DeltaOp) -> None:
+        # 合并相邻的同类操作
+        if ops and type(ops[-1]) is type(op) and (
+            isinstance(op, str) or (ops[-1] > 0) == (op > 0)
+        ):
+            ops[-1] += op
+        else:
+            ops.append(op)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            push(i2 - i1)
+            continue
+        if tag in ("delete", "replace"):
+            push(-(i2 - i1))
+        if tag in ("insert", "replace"):
+            push("".join(new_segments[j1:j2]))
+
+    return ops
+
+
+def apply_delta(old: str, ops: List[DeltaOp]) -> str:
+    """把增量操作应用到 old 上，得到新文本"""
+    old_segments = split_segments(old)
+    result: List[str] = []
+    position = 0
+    for op in ops:
+        if isinstance(op, str):
+            result.append(op)
+        elif op > 0:
+            result.extend(old_segments[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(result)
+
+
+def encode_delta(ops: List[DeltaOp]) -> str:
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_delta(data: str) -> List[DeltaOp]:
+    return json.loads(data)
+
+
+# ============ 服务 ============
+
+class DiaryHistoryService:
+    """日记历史服务类"""
+
+    @staticmethod
+    def _latest(db: Session, diary_id: int) -> Optional[DiaryEditHistory]:
+        return (
+            db.query(DiaryEditHistory)
+            .filter(DiaryEditHistory.diary_id == diary_id)
+            .order_by(DiaryEditHistory.version.desc())
+            .first()
+        )
+
+    @staticmethod
+    def _add_version(
+        db: Session,
+        diary_id: int,
+        version: int,
+        title: str,
+        content: str,
+        base: Optional[str] = None,
+        force_keyframe: bool = False,
+    ) -> DiaryEditHistory:
+        """追加一个版本；增量不比全文小时退化为关键帧"""
+        delta = None
+        if base is not None and not force_keyframe:
+            delta = encode_delta(compute_delta(base, content))
+            if len(delta) >= len(content):
+                delta = None
+
+        record = DiaryEditHistory(
+            diary_id=diary_id,
+            version=version,
+            title_snapshot=title,
+            content_snapshot="" if delta is not None else content,
+            is_keyframe=0 if delta is not None else 1,
+            content_delta=delta,
+            content_hash=content_hash(content),
+            content_length=len(content),
+        )
+        db.add(record)
+        return record
+
+    @staticmethod
+    def record_edit(
+        db: Session,
+        diary: Diary,
+        title: Optional[str] = None,
+        content: Optional[str] = None,
+    ) -> Optional[DiaryEditHistory]:
+        """
+        在修改日记前记录新版本（不提交，随调用方的事务一起提交）
+
+        首次编辑时先把修改前的内容保存为关键帧；若最新版本与日记当前内容不一致
+        （例如内容曾被导入覆盖），同样先补一个关键帧，保证增量链可还原。
+
+        Returns:
+            新版本记录，标题和内容都未变化时返回 None
+        """
+        new_title = diary.title if title is None else title
+        new_content = diary.content if content is None else content
+        if new_title == diary.title and new_content == diary.content:
+            return None
+
+        interval = max(1, settings.DIARY_HISTORY_KEYFRAME_INTERVAL)
+        latest = DiaryHistoryService._latest(db, diary.id)
+        version = (latest.version or 0) if latest else 0
+
+        if latest is None or latest.content_hash != content_hash(diary.content):
+            version += 1
+            DiaryHistoryService._add_version(db, diary.id, version, diary.title, diary.content)
+            last_keyframe = version
+        else:
+            last_keyframe = db.query(func.max(DiaryEditHistory.version)).filter(
+                DiaryEditHistory.diary_id == diary.id,
+                DiaryEditHistory.is_keyframe == 1,
+            ).scalar() or 0
+
+        version += 1
+        return DiaryHistoryService._add_version(
+            db, diary.id, version, new_title, new_content,
+            base=diary.content,
+            force_keyframe=version - last_keyframe >= interval,
+        )
+
+    @staticmethod
+    def reconstruct(db: Session, diary_id: int, version: int) -> Optional[Tuple[DiaryEditHistory, str]]:
+        """
+        还原指定版本的全文
+
+        Returns:
+            (版本记录, 全文)，版本不存在时返回 None
+        """
+        keyframe = (
+            db.query(DiaryEditHistory)
+            .filter(
+                DiaryEditHistory.diary_id == diary_id,
+                DiaryEditHistory.version <= version,
+                DiaryEditHistory.is_keyframe == 1,
+            )
+            .order_by(DiaryEditHistory.version.desc())
+            .first()
+        )
+        if not keyframe:
+            return None
+
+        record = keyframe
+        content = keyframe.content_snapshot
+        if keyframe.version != version:
+            deltas = (
+                db.query(DiaryEditHistory)
+                .filter(
+                    DiaryEditHistory.diary_id == diary_id,
+                    DiaryEditHistory.version > keyframe.version,
+                    DiaryEditHistory.version <= version,
+                )
+                .order_by(DiaryEditHistory.version)
+                .all()
+            )
+            if not deltas or deltas[-1].version != version:
+                return None
+            for record in deltas:
+                content = apply_delta(content, decode_delta(record.content_delta))
+
+        return record, content
+
+    @staticmethod
+    def _get_diary(db: Session, diary_id: int) -> Optional[Diary]:
+        user = db.query(User).first()
+        if not user:
+            return None
+        return db.query(Diary).filter(Diary.id == diary_id, Diary.user_id == user.id).first()
+
+    @staticmethod
+    def list_versions(db: Session, diary_id: int) -> Tuple[dict, int]:
+        """
+        获取日记的版本列表（只读取元数据列，不加载内容和增量）
+
+        Returns:
+            (response_data, status_code)
+        """
+        if not DiaryHistoryService._get_diary(db, diary_id):
+            return error_response(message="日记不存在", code=404), 404
+
+        rows = (
+            db.query(
+                DiaryEditHistory.id,
+                DiaryEditHistory.version,
+                DiaryEditHistory.title_snapshot,
+                DiaryEditHistory.is_keyframe,
+                DiaryEditHistory.content_length,
+                DiaryEditHistory.created_at,
+            )
+            .filter(DiaryEditHistory.diary_id == diary_id)
+            .order_by(DiaryEditHistory.version.desc())
+            .all()
+        )
+        items = [
+            {
+                "id": row.id,
+                "version": row.version,
+                "title": row.title_snapshot,
+                "is_keyframe": bool(row.is_keyframe),
+                "content_length": row.content_length,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "created_at_ts": int(row.created_at.timestamp() * 1000) if row.created_at else None,
+            }
+            for row in rows
+        ]
+        return {"items": items, "total": len(items)}, 200
+
+    @staticmethod
+    def get_version(db: Session, diary_id: int, version: int) -> Tuple[dict, int]:
+        """
+        获取指定版本的完整内容
+
+        Returns:
+            (response_data, status_code)
+        """
+        if not DiaryHistoryService._get_diary(db, diary_id):
+            return error_response(message="日记不存在", code=404), 404
+
+        result = DiaryHistoryService.reconstruct(db, diary_id, version)
+        if not result:
+            return error_response(
+                message="版本不存在",
+                code=404,
+                data={"resource": "DiaryVersion", "identifier": str(version)}
+            ), 404
+
+        record, content = result
+        return {
+            "diary_id": diary_id,
+            "version": record.version,
+            "title": record.title_snapshot,
+            "content": content,
+            "created_at": record.created_at.isoformat() if record.created_at else None,
+            "created_at_ts": int(record.created_at.timestamp() * 1000) if record.created_at else None,
+        }, 200
+
+    @staticmethod
+    def delete_for_diary(db: Session, diary_id: int) -> int:
+        """删除日记的全部历史版本（不提交）"""
+        return db.query(DiaryEditHistory).filter(
+            DiaryEditHistory.diary_id == diary_id
+        ).delete(synchronize_session=False)
@@ -9,9 +9,11 @@
 from typing import Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, insert
 from sqlalchemy.orm.attributes import flag_modified
 
+from backend.core.serialization import dump_list
+from backend.db.rollups import track_inserted
 from backend.models.dimension import System, MealDeviation, SystemScoreLog, DEFAULT_SYSTEM_DETAILS
 from backend.models.user import User
 from backend.schemas.system import (
@@ -20,6 +22,7 @@ from backend.schemas.system import (
     FuelStatistics,
     MealItem,
     MealDeviationCreate,
+    MealDeviationBatchCreate,
     MealDeviationUpdate,
     MealDeviationResponse,
     SystemScoreLogResponse,
@@ -154,6 +157,46 @@ class DietService:
 
         return MealDeviationResponse.model_validate(deviation).model_dump(), 201
 
+    @staticmethod
+    def create_meal_deviations_batch(db: Session, request: MealDeviationBatchCreate) -> Tuple[dict, int]:
+        """
+        批量创建偏离事件
+
+        所有事件在一个事务内通过 executemany 插入，统计与评分只重算一次。
+
+        Returns:
+            (response_data, status_code)
+        """
+        user = DietService.get_user(db)
+        if not user:
+            return error_response(message="用户不存在", code=404), 404
+
+        system = DietService.get_or_create_fuel_system(db, user.id)
+
+        now = datetime.now()
+        deviations = db.scalars(
+            insert(MealDeviation).returning(MealDeviation),
+            [
+                {
+                    "system_id": system.id,
+                    "description": item.description,
+                    "occurred_at": item.occurred_at or now,
+                }
+                for item in request.items
+            ]
+        ).all()
+        # 批量插入不经过 flush，显式更新每日汇总
+        track_inserted(db, deviations)
+        items = dump_list(MealDeviationResponse, deviations)
+
+        # 更新系统统计（整批一次）
+        DietService._update_fuel_statistics(
+            db, system, change_reason=f"批量偏离事件（{len(items)} 条）", commit=False
+        )
+        db.commit()
+
+        return {"items": items, "total": len(items)}, 201
+
     @staticmethod
     def get_meal_deviations(
         db: Session,
@@ -205,7 +248,7 @@ class DietService:
         offset = (page - 1) * page_size
         deviations = query.offset(offset).limit(page_size).all()
 
-        items = [MealDeviationResponse.model_validate(d).model_dump() for d in deviations]
+        items = dump_list(MealDeviationResponse, deviations)
 
         # 获取评分信息
         details = system.details or {}
@@ -401,7 +444,13 @@ class DietService:
         db.flush()  # 确保日志写入但不提交事务
 
     @staticmethod
-    def _update_fuel_statistics(db: Session, system: System, deviation_id: Optional[int] = None):
+    def _update_fuel_statistics(
+        db: Session,
+        system: System,
+        deviation_id: Optional[int] = None,
+        change_reason: Optional[str] = None,
+        commit: bool = True
+    ):
         """
         更新饮食系统统计（内部方法）
 
@@ -410,24 +459,21 @@ class DietService:
         Args:
             system: 系统对象
             deviation_id: 触发更新的偏离事件ID
+            change_reason: 评分变化原因（默认根据 deviation_id 推断）
+            commit: 是否提交事务（批量写入时由调用方统一提交）
         """
         # 记录旧评分
         old_score = system.score
 
-        # 获取偏离事件统计
-        deviations = db.query(MealDeviation).filter(
-            MealDeviation.system_id == system.id
-        ).all()
-
-        total_deviations_count = len(deviations)
-
-        # 计算本月偏差
+        # 获取偏离事件统计（聚合查询，不加载事件行）
         now = datetime.now()
         month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_deviations = sum(
-            1 for d in deviations
-            if d.occurred_at >= month_start
-        )
+        total_deviations_count, monthly_deviations = db.query(
+            func.count(MealDeviation.id),
+            func.count(MealDeviation.id).filter(MealDeviation.occurred_at >= month_start)
+        ).filter(
+            MealDeviation.system_id == system.id
+        ).one()
 
         # 更新系统详情
         details = system.details or {}
@@ -450,11 +496,12 @@ class DietService:
             system=system,
             old_score=old_score,
             new_score=consistency_score,
-            change_reason="偏离事件" if deviation_id else "统计更新",
+            change_reason=change_reason or ("偏离事件" if deviation_id else "统计更新"),
             related_id=deviation_id
         )
 
-        db.commit()
+        if commit:
+            db.commit()
 
     @staticmethod
     def get_score_history(
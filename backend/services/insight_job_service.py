@@ -0,0 +1,423 @@
+"""
+洞察后台生成服务 - 在请求路径之外预生成洞察
+
+任务来源：
+- 评分变化：systems 表提交后触发，防抖窗口内的连续变化合并为一个任务
+- 每日定时：当天还没有洞察时自动生成一次
+- 手动：POST /api/insights/jobs
+
+任务记录在 insight_jobs 表中，由独立线程上的事件循环以有限并发执行。
+洞察客户端只有一个提供商，限流、服务端错误、超时等临时性失败由任务层
+按 retry_with_backoff 指数退避重试（INSIGHT_JOB_MAX_RETRIES 次）；重试用尽或
+非临时性失败时任务记为 failed，失败的每日任务不妨碍当天下次检查重新创建。
+
+评分变化和每日定时任务使用独立的每日额度（INSIGHT_AUTO_DAILY_LIMIT），
+不占用用户手动生成的次数。
+
+任务状态和生成的洞察写入数据库后经变更推送（SSE / IPC db_changes 帧）送达前端，
+前端也可轮询 /api/insights/jobs/{id}。
+"""
+import asyncio
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import FrozenSet, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.db import versions
+from backend.db.session import get_db_context
+from backend.models.insight import Insight, InsightJob
+from backend.models.user import User
+from backend.schemas.common import error_response
+from backend.agent.utils.retry import retry_with_backoff
+from backend.schemas.insight import InsightGenerateRequest, InsightJobResponse
+from backend.services.insight_service import InsightService
+
+logger = logging.getLogger(__name__)
+
+# 进行中的任务状态
+ACTIVE_STATUSES = ("pending", "running")
+
+# 自动触发来源（使用后台额度）
+AUTO_TRIGGERS = ("score_change", "daily")
+
+
+class InsightJobRetryError(Exception):
+    """生成遇到临时性失败（可重试），携带最后一次的响应"""
+
+    def __init__(self, data: dict, status_code: int):
+        super().__init__(data.get("message"))
+        self.data = data
+        self.status_code = status_code
+
+
+class InsightJobService:
+    """洞察任务服务类"""
+
+    @staticmethod
+    def get_active_job(db: Session, user_id: int) -> Optional[InsightJob]:
+        """获取用户进行中的任务"""
+        return db.query(InsightJob).filter(
+            InsightJob.user_id == user_id,
+            InsightJob.status.in_(ACTIVE_STATUSES)
+        ).order_by(InsightJob.id.desc()).first()
+
+    @staticmethod
+    def create_job(db: Session, trigger: str) -> Tuple[Optional[InsightJob], bool]:
+        """
+        创建任务（已有进行中的任务时直接返回该任务）
+
+        Returns:
+            (任务, 是否新建)；用户不存在时任务为 None
+        """
+        user = db.query(User).first()
+        if not user:
+            return None, False
+
+        active = InsightJobService.get_active_job(db, user.id)
+        if active:
+            return active, False
+
+        job = InsightJob(user_id=user.id, trigger=trigger, status="pending")
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job, True
+
+    @staticmethod
+    def create_auto_job(db: Session, trigger: str) -> Optional[InsightJob]:
+        """
+        创建自动任务（评分变化 / 每日定时）
+
+        未配置 AI 时不创建；每日任务在当天已有洞察或已有每日任务时跳过。
+        """
+        user = db.query(User).first()
+        if not user or not user.ai_config or not user.ai_config.get("api_key"):
+            return None
+
+        if trigger == "daily":
+            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            has_insight = db.query(Insight.id).filter(
+                Insight.user_id == user.id,
+                Insight.generated_at >= today_start
+            ).first()
+            # 失败的每日任务不算，下次检查重新创建
+            has_job = db.query(InsightJob.id).filter(
+                InsightJob.user_id == user.id,
+                InsightJob.trigger == "daily",
+                InsightJob.status != "failed",
+                InsightJob.created_at >= today_start
+            ).first()
+            if has_insight or has_job:
+                return None
+
+        job, created = InsightJobService.create_job(db, trigger)
+        return job if created else None
+
+    @staticmethod
+    def enqueue(db: Session, trigger: str = "manual") -> Tuple[dict, int]:
+        """
+        手动提交洞察生成任务
+
+        Returns:
+            (response_data, status_code)
+        """
+        job, created = InsightJobService.create_job(db, trigger)
+        if job is None:
+            return error_response(
+                message="用户不存在",
+                code=404
+            ), 404
+
+        if created:
+            get_insight_job_runner().submit(job.id)
+
+        return InsightJobResponse.model_validate(job).model_dump(), 200
+
+    @staticmethod
+    def get_job(db: Session, job_id: int) -> Tuple[dict, int]:
+        """
+        获取任务状态
+
+        Returns:
+            (response_data, status_code)
+        """
+        job = db.query(InsightJob).filter(InsightJob.id == job_id).first()
+        if not job:
+            return error_response(
+                message="任务不存在",
+                code=404,
+                data={"job_id": job_id}
+            ), 404
+
+        return InsightJobResponse.model_validate(job).model_dump(), 200
+
+    @staticmethod
+    def get_latest_job(db: Session) -> Tuple[dict, int]:
+        """
+        获取最近一个任务
+
+        Returns:
+            (response_data, status_code)
+        """
+        job = db.query(InsightJob).order_by(InsightJob.id.desc()).first()
+        if not job:
+            return error_response(
+                message="暂无洞察任务",
+                code=404
+            ), 404
+
+        return InsightJobResponse.model_validate(job).model_dump(), 200
+
+    @staticmethod
+    async def _generate_once(db: Session, job: InsightJob) -> Tuple[dict, int]:
+        """执行一次生成（计入尝试次数），临时性失败抛出 InsightJobRetryError"""
+        job.attempts += 1
+        db.commit()
+
+        data, status_code = await InsightService.generate_insight(
+            db, InsightGenerateRequest(), background=job.trigger in AUTO_TRIGGERS
+        )
+        if status_code >= 500 and (data.get("data") or {}).get("retryable"):
+            logger.warning(f"Insight job {job.id} attempt {job.attempts} failed: {data.get('message')}")
+            raise InsightJobRetryError(data, status_code)
+        return data, status_code
+
+    @staticmethod
+    async def process_job(db: Session, job_id: int) -> Optional[InsightJob]:
+        """
+        执行任务（由 InsightJobRunner 的工作协程调用）
+
+        Returns:
+            执行后的任务；任务不存在或已被处理时返回 None
+        """
+        job = db.query(InsightJob).filter(InsightJob.id == job_id).first()
+        if not job or job.status != "pending":
+            return None
+
+        job.status = "running"
+        job.started_at = datetime.now()
+        db.commit()
+
+        generate = retry_with_backoff(
+            max_retries=settings.INSIGHT_JOB_MAX_RETRIES,
+            base_delay=settings.INSIGHT_JOB_RETRY_BASE_DELAY,
+            max_delay=settings.INSIGHT_JOB_RETRY_MAX_DELAY,
+            exceptions=(InsightJobRetryError,),
+        )(InsightJobService._generate_once)
+
+        try:
+            try:
+                data, status_code = await generate(db, job)
+            except InsightJobRetryError as e:
+                # 重试用尽，按最后一次的响应记录
+                data, status_code = e.data, e.status_code
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            job.error = str(e)
+        else:
+            if status_code >= 500:
+                # AI 提供商调用失败（非临时性失败或重试用尽）
+                job.status = "failed"
+                job.error = data.get("message")
+            elif status_code >= 400:
+                # 未配置 AI、次数用尽且无历史等
+                job.status = "skipped"
+                job.error = data.get("message")
+            elif data.get("_limit_reached"):
+                job.status = "skipped"
+                job.error = data.get("_message")
+                job.insight_id = data.get("id")
+            else:
+                job.status = "succeeded"
+                job.insight_id = data.get("id")
+
+        job.finished_at = datetime.now()
+        db.commit()
+        db.refresh(job)
+        return job
+
+
+class InsightJobRunner:
+    """
+    洞察任务执行器
+
+    独立线程运行一个事件循环（开发模式与 IPC 模式行为一致）：
+    - 有界 asyncio.Queue 存放任务 ID，队列满时提交方等待（背压）
+    - 固定数量的工作协程消费队列，限制同时进行的 AI 调用
+    - 任务状态持久化在 insight_jobs 表，重启后未完成的任务重新入队
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        debounce_seconds: Optional[float] = None,
+        schedule_interval: Optional[float] = None,
+    ):
+        self.workers = workers or settings.INSIGHT_JOB_WORKERS
+        self.queue_size = queue_size or settings.INSIGHT_JOB_QUEUE_SIZE
+        self.debounce_seconds = (
+            settings.INSIGHT_JOB_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+        )
+        self.schedule_interval = schedule_interval or settings.INSIGHT_JOB_SCHEDULE_INTERVAL
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._refresh_handle: Optional[asyncio.TimerHandle] = None
+        # 防抖触发的任务（保留引用，避免执行中被回收）
+        self._background: set = set()
+
+    # ============ 生命周期 ============
+
+    def start(self) -> None:
+        """启动执行线程（重复调用无副作用）"""
+        with self._lock:
+            if self.running:
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name="insight-jobs", daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+        self._ready.wait(5.0)
+        versions.add_commit_listener(self._on_commit)
+        logger.info("Insight job runner started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止执行线程（进行中的任务被取消，重启后重新入队）"""
+        versions.remove_commit_listener(self._on_commit)
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            if not thread or not thread.is_alive() or loop is None:
+                return
+            loop.call_soon_threadsafe(self._stopping.set)
+        thread.join(timeout)
+        logger.info("Insight job runner stopped")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    # ============ 提交接口（线程安全） ============
+
+    def submit(self, job_id: int) -> None:
+        """提交已创建的任务；执行器未运行时任务保持 pending，下次启动时执行"""
+        if not self.running:
+            self.start()
+        asyncio.run_coroutine_threadsafe(self._queue.put(job_id), self._loop)
+
+    def request_refresh(self, trigger: str = "score_change") -> None:
+        """请求重新生成洞察（防抖，窗口内多次请求只创建一个任务）"""
+        if self.running and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._debounce, trigger)
+
+    def _on_commit(self, tables: FrozenSet[str]) -> None:
+        """提交监听：评分所在的 systems 表变化时请求刷新"""
+        if "systems" in tables:
+            self.request_refresh("score_change")
+
+    # ============ 执行线程 ============
+
+    def _run(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._main())
+        finally:
+            loop.close()
+            self._loop = None
+
+    async def _main(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopping = asyncio.Event()
+        self._ready.set()
+
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        tasks.append(asyncio.create_task(self._schedule()))
+        tasks.append(asyncio.create_task(self._recover()))
+
+        await self._stopping.wait()
+
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        from backend.agent.llm.transport import close_http_session
+        await close_http_session()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                with get_db_context() as db:
+                    job = await InsightJobService.process_job(db, job_id)
+                    if job is not None:
+                        logger.info(f"Insight job {job.id} ({job.trigger}) -> {job.status}")
+            except Exception as e:
+                logger.error(f"Insight job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _recover(self) -> None:
+        """重新入队上次未完成的任务"""
+        try:
+            with get_db_context() as db:
+                jobs = db.query(InsightJob).filter(InsightJob.status.in_(ACTIVE_STATUSES)).all()
+                for job in jobs:
+                    job.status = "pending"
+                job_ids = [job.id for job in jobs]
+        except Exception as e:
+            logger.warning(f"Failed to recover insight jobs: {e}")
+            return
+        for job_id in job_ids:
+            await self._queue.put(job_id)
+
+    async def _schedule(self) -> None:
+        """每日定时任务"""
+        while True:
+            await self._enqueue_auto("daily")
+            await asyncio.sleep(self.schedule_interval)
+
+    def _debounce(self, trigger: str) -> None:
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+        self._refresh_handle = self._loop.call_later(self.debounce_seconds, self._spawn_enqueue, trigger)
+
+    def _spawn_enqueue(self, trigger: str) -> None:
+        task = asyncio.create_task(self._enqueue_auto(trigger))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _enqueue_auto(self, trigger: str) -> None:
+        try:
+            with get_db_context() as db:
+                job = InsightJobService.create_auto_job(db, trigger)
+                job_id = job.id if job else None
+        except Exception as e:
+            logger.warning(f"Failed to create {trigger} insight job: {e}")
+            return
+        if job_id is not None:
+            await self._queue.put(job_id)
+
+
+# 全局执行器实例
+_runner: Optional[InsightJobRunner] = None
+
+
+def get_insight_job_runner() -> InsightJobRunner:
+    """获取全局洞察任务执行器"""
+    global _runner
+    if _runner is None:
+        _runner = InsightJobRunner()
+    return _runner
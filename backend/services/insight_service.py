@@ -1,11 +1,25 @@
 """
 AI 洞察服务 - AI 洞察生成业务逻辑
 """
+import asyncio
+import copy
+import hashlib
 import json
 from typing import Optional, Tuple, List, Literal, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-import httpx
+
+from backend.agent.llm import (
+    LLMClientFactory,
+    LLMClientWithFallback,
+    LLMMessage,
+    LLMProviderType,
+    LLMError,
+    RateLimitError,
+    ServerError,
+    TimeoutError,
+)
+from backend.core.config import settings
 
 from backend.models.user import User
 from backend.models.dimension import System
@@ -19,6 +33,24 @@ from backend.schemas.common import error_response, PaginatedResponse
 from backend.services.user_service import UserService
 
 
+# 提供商默认配置（与 Agent 使用同一套 LLM 客户端）
+PROVIDER_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "deepseek": {
+        "provider_type": LLMProviderType.DEEPSEEK,
+        "base_url": "https://api.deepseek.com",
+        "model": "deepseek-chat",
+    },
+    "doubao": {
+        "provider_type": LLMProviderType.DOUBAO,
+        "base_url": "https://ark.cn-beijing.volces.com/api/v3",
+        "model": "doubao-seed-2-0-lite-260215",
+    },
+}
+
+# 进行中的洞察生成 {(user_id, provider, score_hash, background): Future[(response_data, status_code)]}
+_inflight: Dict[Tuple[int, str, str, bool], "asyncio.Future"] = {}
+
+
 class InsightService:
     """AI 洞察服务类"""
 
@@ -41,23 +73,43 @@ class InsightService:
         ).order_by(Insight.generated_at.desc()).first()
 
     @staticmethod
-    def get_today_insight_count(db: Session, user_id: int) -> int:
-        """获取今日已生成的洞察次数"""
+    def get_today_insight_count(db: Session, user_id: int, background: bool = False) -> int:
+        """获取今日已生成的洞察次数（用户手动与后台自动分开计算）"""
         today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         return db.query(Insight).filter(
             Insight.user_id == user_id,
-            Insight.generated_at >= today_start
+            Insight.generated_at >= today_start,
+            Insight.background == background
         ).count()
 
     @staticmethod
-    async def call_deepseek_api(api_key: str, system_scores: dict) -> List[Dict[str, Any]]:
-        """调用 DeepSeek API 生成洞察"""
-        url = "https://api.deepseek.com/v1/chat/completions"
+    def compute_score_hash(system_scores: dict) -> str:
+        """计算评分向量哈希（与维度顺序无关）"""
+        canonical = json.dumps(sorted(system_scores.items()), separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
-        # 构建 prompt
+    @staticmethod
+    def find_reusable_insight(
+        db: Session, user_id: int, provider: str, score_hash: str
+    ) -> Optional[Insight]:
+        """查找时间窗口内评分向量相同的最近洞察"""
+        if settings.INSIGHT_REUSE_HOURS <= 0:
+            return None
+
+        since = datetime.now() - timedelta(hours=settings.INSIGHT_REUSE_HOURS)
+        return db.query(Insight).filter(
+            Insight.user_id == user_id,
+            Insight.score_hash == score_hash,
+            Insight.provider_used == provider,
+            Insight.generated_at >= since
+        ).order_by(Insight.generated_at.desc()).first()
+
+    @staticmethod
+    def build_insight_prompt(system_scores: dict) -> str:
+        """构建洞察生成 prompt"""
         scores_text = "\n".join([f"{k}: {v}" for k, v in system_scores.items()])
 
-        prompt = f"""基于以下八维系统评分，生成 3 条洞察建议：
+        return f"""基于以下八维系统评分，生成 3 条洞察建议：
 
 系统评分：
 {scores_text}
@@ -76,29 +128,9 @@ class InsightService:
 
 只返回 JSON 数组，不要有其他内容。"""
 
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-
-        # 解析响应
-        content = result["choices"][0]["message"]["content"]
-
-        # 尝试解析 JSON
+    @staticmethod
+    def parse_insight_content(content: str) -> List[Dict[str, Any]]:
+        """解析模型返回的洞察 JSON，失败时整体作为一条综合洞察"""
         try:
             insights = json.loads(content)
             if not isinstance(insights, list):
@@ -109,68 +141,55 @@ class InsightService:
         return insights
 
     @staticmethod
-    async def call_doubao_api(api_key: str, system_scores: dict) -> List[Dict[str, Any]]:
-        """调用豆包 API 生成洞察"""
-        url = "https://ark.cn-beijing.volces.com/api/v3/chat/completions"
-
-        # 构建 prompt
-        scores_text = "\n".join([f"{k}: {v}" for k, v in system_scores.items()])
-
-        prompt = f"""基于以下八维系统评分，生成 3 条洞察建议：
-
-系统评分：
-{scores_text}
+    def create_llm_client(provider: str, api_key: str, model: Optional[str]) -> Optional[LLMClientWithFallback]:
+        """根据 AI 配置创建 LLM 客户端（共享连接池）"""
+        defaults = PROVIDER_DEFAULTS.get(provider)
+        if defaults is None:
+            return None
+
+        client = LLMClientFactory.create(defaults["provider_type"], {
+            "api_key": api_key,
+            "base_url": defaults["base_url"],
+            "model": model or defaults["model"],
+            "timeout": settings.AI_REQUEST_TIMEOUT,
+        })
+        if client is None:
+            return None
+
+        return LLMClientWithFallback(clients=[client])
 
-请返回 JSON 格式，包含 3 条洞察，每条包含 category（类别）和 insight（洞察内容）：
-1. celebration（庆祝）：针对得分最高的维度
-2. warning（警告）：针对得分最低的维度
-3. action（行动）：提供具体的改进建议
-
-返回格式：
-[
-  {{"category": "饮食", "insight": "最近饮食一致性较高，继续保持"}},
-  {{"category": "运动", "insight": "运动量偏低，建议增加有氧运动"}},
-  {{"category": "行动建议", "insight": "每天运动 30 分钟可显著改善体质"}}
-]
-
-只返回 JSON 数组，不要有其他内容。"""
-
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "model": "doubao-seed-2-0-lite-260215",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 500
-        }
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-
-        # 解析响应
-        content = result["choices"][0]["message"]["content"]
-
-        # 尝试解析 JSON
-        try:
-            insights = json.loads(content)
-            if not isinstance(insights, list):
-                insights = [{"category": "综合", "insight": content}]
-        except json.JSONDecodeError:
-            insights = [{"category": "综合", "insight": content}]
+    @staticmethod
+    async def call_ai_api(llm_client: LLMClientWithFallback, system_scores: dict) -> List[Dict[str, Any]]:
+        """调用 AI 生成洞察"""
+        response = await llm_client.chat(
+            messages=[LLMMessage(role="user", content=InsightService.build_insight_prompt(system_scores))],
+            temperature=0.7,
+            max_tokens=500,
+        )
+        return InsightService.parse_insight_content(response.content)
 
-        return insights
+    @staticmethod
+    def _to_generate_response(insight: Insight) -> dict:
+        """洞察对象转换为生成响应"""
+        return InsightGenerateResponse(
+            id=insight.id,
+            user_id=insight.user_id,
+            content=insight.content,
+            system_scores=insight.system_scores,
+            provider_used=insight.provider_used,
+            generated_at=insight.generated_at
+        ).model_dump()
 
     @staticmethod
-    async def generate_insight(db: Session, request: InsightGenerateRequest) -> Tuple[dict, int]:
+    async def generate_insight(
+        db: Session, request: InsightGenerateRequest, background: bool = False
+    ) -> Tuple[dict, int]:
         """
-        生成洞察（每天最多3次）
+        生成洞察（每天最多 INSIGHT_DAILY_LIMIT 次）
+
+        - 评分向量与时间窗口内某条洞察相同时直接复用，不调用 AI、不消耗次数
+        - 相同用户、相同评分的并发请求共享同一次 AI 调用（single-flight）
+        - background=True 为后台自动任务，使用独立的 INSIGHT_AUTO_DAILY_LIMIT 额度
 
         Returns:
             (response_data, status_code)
@@ -194,23 +213,34 @@ class InsightService:
                 code=424
             ), 424
 
+        if provider not in PROVIDER_DEFAULTS:
+            return error_response(
+                message=f"不支持的 AI 提供商: {provider}，仅支持 deepseek 和 doubao",
+                code=400
+            ), 400
+
+        # 获取当前系统评分
+        system_scores = InsightService.get_system_scores(db, user.id)
+        score_hash = InsightService.compute_score_hash(system_scores)
+
         # 检查今日生成次数
-        today_count = InsightService.get_today_insight_count(db, user.id)
-        daily_limit = 3
+        today_count = InsightService.get_today_insight_count(db, user.id, background)
+        daily_limit = settings.INSIGHT_AUTO_DAILY_LIMIT if background else settings.INSIGHT_DAILY_LIMIT
+
+        # 评分未变化，复用最近的洞察
+        reusable = InsightService.find_reusable_insight(db, user.id, provider, score_hash)
+        if reusable:
+            response_data = InsightService._to_generate_response(reusable)
+            response_data['_reused'] = True
+            response_data['_remaining_today'] = max(daily_limit - today_count, 0)
+            return response_data, 200
 
         if today_count >= daily_limit:
             # 超过限制，返回最新的旧洞察
             latest_insight = InsightService.get_latest_insight(db, user.id)
 
             if latest_insight:
-                response_data = InsightGenerateResponse(
-                    id=latest_insight.id,
-                    user_id=latest_insight.user_id,
-                    content=latest_insight.content,
-                    system_scores=latest_insight.system_scores,
-                    provider_used=latest_insight.provider_used,
-                    generated_at=latest_insight.generated_at
-                ).model_dump()
+                response_data = InsightService._to_generate_response(latest_insight)
 
                 # 添加限制提示信息
                 response_data['_limit_reached'] = True
@@ -228,6 +258,49 @@ class InsightService:
                     }
                 ), 429
 
+        # 结束读事务、归还连接：AI 调用耗时数秒，期间不占用连接池（expire_on_commit=False，user 仍可用）
+        db.commit()
+
+        # 相同评分的请求已在生成中，等待其结果（手动与后台分开，各自计入自己的额度）
+        key = (user.id, provider, score_hash, background)
+        inflight = _inflight.get(key)
+        if inflight is not None and inflight.get_loop() is asyncio.get_running_loop():
+            data, status_code = await asyncio.shield(inflight)
+            return copy.deepcopy(data), status_code
+
+        future = asyncio.get_running_loop().create_future()
+        _inflight[key] = future
+        try:
+            result = await InsightService._generate_and_save(
+                db, user, provider, encrypted_key, system_scores, score_hash, today_count, daily_limit, background
+            )
+            future.set_result(result)
+            return copy.deepcopy(result[0]), result[1]
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            if _inflight.get(key) is future:
+                del _inflight[key]
+
+    @staticmethod
+    async def _generate_and_save(
+        db: Session,
+        user: User,
+        provider: str,
+        encrypted_key: str,
+        system_scores: dict,
+        score_hash: str,
+        today_count: int,
+        daily_limit: int,
+        background: bool = False
+    ) -> Tuple[dict, int]:
+        """调用 AI 并保存洞察（single-flight 的实际执行者）"""
         # 解密 API Key
         try:
             api_key = UserService.decrypt_api_key(encrypted_key)
@@ -237,51 +310,45 @@ class InsightService:
                 code=500
             ), 500
 
-        # 获取当前系统评分
-        system_scores = InsightService.get_system_scores(db, user.id)
+        llm_client = InsightService.create_llm_client(provider, api_key, user.ai_config.get("model"))
+        if llm_client is None:
+            return error_response(
+                message=f"创建 AI 客户端失败: {provider}",
+                code=500
+            ), 500
 
         # 调用 AI API
         try:
-            if provider == "deepseek":
-                insights = await InsightService.call_deepseek_api(api_key, system_scores)
-            elif provider == "doubao":
-                insights = await InsightService.call_doubao_api(api_key, system_scores)
-            else:
-                return error_response(
-                    message=f"不支持的 AI 提供商: {provider}，仅支持 deepseek 和 doubao",
-                    code=400
-                ), 400
-        except httpx.HTTPStatusError as e:
+            insights = await InsightService.call_ai_api(llm_client, system_scores)
+        except LLMError as e:
+            # retryable：限流、服务端错误、超时等临时性失败，后台任务据此退避重试
             return error_response(
-                message=f"AI API 调用失败: {e.response.status_code}",
-                code=502
+                message=f"AI API 调用失败: {e}",
+                code=502,
+                data={"retryable": isinstance(e, (RateLimitError, ServerError, TimeoutError))}
             ), 502
-        except Exception as e:
-            # AI 调用失败，返回默认建议
+        except Exception:
+            # AI 调用失败，返回默认建议（不记录评分哈希，避免被复用）
             insights = [
                 {"category": "系统提示", "insight": "AI 服务暂时不可用，请稍后再试"},
             ]
+            score_hash = None
 
         # 保存洞察
         insight = Insight(
             user_id=user.id,
             content=insights,
             system_scores=system_scores,
-            provider_used=provider
+            provider_used=provider,
+            score_hash=score_hash,
+            background=background
         )
 
         db.add(insight)
         db.commit()
         db.refresh(insight)
 
-        response_data = InsightGenerateResponse(
-            id=insight.id,
-            user_id=insight.user_id,
-            content=insight.content,
-            system_scores=insight.system_scores,
-            provider_used=insight.provider_used,
-            generated_at=insight.generated_at
-        ).model_dump()
+        response_data = InsightService._to_generate_response(insight)
 
         # 添加剩余次数提示
         response_data['_remaining_today'] = daily_limit - today_count - 1
@@ -2,18 +2,24 @@
 日记服务 - 日记管理业务逻辑
 """
 from typing import Optional, Tuple, Literal
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from backend.core.serialization import dump_list
+from backend.db import rollups, tag_index
 from backend.models.user import User
 from backend.models.diary import Diary, MOOD_TYPES
 from backend.schemas.journal import (
     DiaryCreate,
+    DiaryBatchCreate,
     DiaryUpdate,
     DiaryResponse,
     DiaryDeleteResponse,
     MoodType,
 )
 from backend.schemas.common import error_response, PaginatedResponse
+from backend.services.attachment_service import AttachmentService
+from backend.services.diary_history_service import DiaryHistoryService
 
 
 class JournalService:
@@ -71,6 +77,59 @@ class JournalService:
 
         return DiaryResponse.model_validate(diary).model_dump(), 201
 
+    @staticmethod
+    def create_diaries_batch(db: Session, request: DiaryBatchCreate) -> Tuple[dict, int]:
+        """
+        批量创建日记
+
+        先校验全部条目，任一无效则整批不写入；全部有效时在一个事务内通过 executemany 插入。
+
+        Returns:
+            (response_data, status_code)
+        """
+        user = JournalService.get_user(db)
+
+        # 验证心情值
+        errors = [
+            {
+                "field": f"items[{index}].mood",
+                "message": "心情值无效",
+                "value": item.mood
+            }
+            for index, item in enumerate(request.items)
+            if item.mood and item.mood not in MOOD_TYPES
+        ]
+        if errors:
+            return error_response(
+                message="参数验证失败",
+                code=422,
+                data={"errors": errors}
+            ), 422
+
+        diaries = db.scalars(
+            insert(Diary).returning(Diary),
+            [
+                {
+                    "user_id": user.id,
+                    "title": item.title,
+                    "content": item.content,
+                    "mood": item.mood,
+                    "tags": item.tags,
+                    "related_system": item.related_system,
+                    "is_private": 1 if item.is_private else 0,
+                }
+                for item in request.items
+            ]
+        ).all()
+        # 批量插入不经过 flush，显式更新每日汇总和标签索引
+        rollups.track_inserted(db, diaries)
+        tag_index.track_inserted(db, diaries)
+        # 提交前序列化，避免提交后逐行过期重新加载
+        items = dump_list(DiaryResponse, diaries)
+        db.commit()
+
+        return {"items": items, "total": len(items)}, 201
+
     @staticmethod
     def get_diaries(
         db: Session,
@@ -111,7 +170,7 @@ class JournalService:
         offset = (page - 1) * page_size
         diaries = query.offset(offset).limit(page_size).all()
 
-        items = [DiaryResponse.model_validate(d) for d in diaries]
+        items = dump_list(DiaryResponse, diaries)
         paginated = PaginatedResponse.create(items, total, page, page_size)
 
         return paginated.model_dump(), 200
@@ -164,6 +223,9 @@ class JournalService:
                 code=404
             ), 404
 
+        # 记录编辑版本（随本次更新一起提交）
+        DiaryHistoryService.record_edit(db, diary, request.title, request.content)
+
         # 更新字段
         if request.title is not None:
             diary.title = request.title
@@ -210,7 +272,10 @@ class JournalService:
             ), 404
 
         deleted_id = diary.id
+        attachment_hashes = AttachmentService.delete_for_diary(db, diary.id)
+        DiaryHistoryService.delete_for_diary(db, diary.id)
         db.delete(diary)
         db.commit()
+        AttachmentService.release_blobs(db, attachment_hashes)
 
         return DiaryDeleteResponse(deleted_id=deleted_id).model_dump(), 200
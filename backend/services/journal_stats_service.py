@@ -0,0 +1,188 @@
+"""
+日记统计服务 - 标签与心情的聚合分析
+
+所有统计都在数据库中 GROUP BY 完成：标签走 diary_tags（见 backend.db.tag_index），
+时间范围走 ix_diaries_user_created，不加载日记正文、不在 Python 中解析 JSON。
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Literal, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.models.diary import Diary, DiaryTag, MOOD_TYPES
+from backend.models.user import User
+from backend.schemas.common import error_response
+from backend.services.analytics_service import MOOD_VALUES
+
+
+Granularity = Literal["day", "week", "month"]
+
+
+class JournalStatsService:
+    """日记统计服务类"""
+
+    @staticmethod
+    def _filtered(query, user_id: int, days: Optional[int] = None, mood: Optional[str] = None):
+        query = query.filter(Diary.user_id == user_id)
+        if days:
+            start = datetime.combine(datetime.now().date() - timedelta(days=days - 1), datetime.min.time())
+            query = query.filter(Diary.created_at >= start)
+        if mood:
+            query = query.filter(Diary.mood == mood)
+        return query
+
+    @staticmethod
+    def _mood_summary(counts: Dict[str, int]) -> dict:
+        """心情分布 + 平均心情值（great=2 … terrible=-2）"""
+        total = sum(counts.values())
+        scored = sum(counts.get(mood, 0) for mood in MOOD_VALUES)
+        average = (
+            round(sum(MOOD_VALUES[mood] * counts.get(mood, 0) for mood in MOOD_VALUES) / scored, 2)
+            if scored else None
+        )
+        return {
+            "total": total,
+            "moods": {mood: counts.get(mood, 0) for mood in MOOD_TYPES},
+            "average_mood": average,
+        }
+
+    @staticmethod
+    def tag_frequency(
+        db: Session,
+        days: Optional[int] = None,
+        mood: Optional[str] = None,
+        limit: int = 20,
+    ) -> Tuple[dict, int]:
+        """
+        标签使用频率
+
+        Args:
+            days: 最近 N 天，None 表示全部
+            mood: 只统计该心情的日记
+            limit: 返回的标签数量
+
+        Returns:
+            (response_data, status_code)
+        """
+        user = db.query(User).first()
+        if not user:
+            return error_response(message="用户不存在", code=404), 404
+
+        count = func.count(DiaryTag.diary_id).label("count")
+        query = db.query(DiaryTag.tag, count).join(Diary, Diary.id == DiaryTag.diary_id)
+        rows = (
+            JournalStatsService._filtered(query, user.id, days, mood)
+            .group_by(DiaryTag.tag)
+            .order_by(count.desc(), DiaryTag.tag)
+            .limit(limit)
+            .all()
+        )
+        return {
+            "days": days,
+            "mood": mood,
+            "items": [{"tag": row.tag, "count": row.count} for row in rows],
+        }, 200
+
+    @staticmethod
+    def mood_by_tag(
+        db: Session,
+        days: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        limit: int = 20,
+    ) -> Tuple[dict, int]:
+        """
+        标签 × 心情热力图
+
+        Args:
+            days: 最近 N 天，None 表示全部
+            tags: 只统计这些标签；为空时取使用最多的 limit 个标签
+            limit: 标签数量上限
+
+        Returns:
+            (response_data, status_code)
+        """
+        user = db.query(User).first()
+        if not user:
+            return error_response(message="用户不存在", code=404), 404
+
+        query = (
+            db.query(DiaryTag.tag, Diary.mood, func.count(DiaryTag.diary_id))
+            .join(Diary, Diary.id == DiaryTag.diary_id)
+        )
+        if tags:
+            query = query.filter(DiaryTag.tag.in_(tags))
+        rows = JournalStatsService._filtered(query, user.id, days).group_by(DiaryTag.tag, Diary.mood).all()
+
+        counts: Dict[str, Dict[str, int]] = {}
+        for tag, mood, count in rows:
+            counts.setdefault(tag, {})[mood] = count
+
+        items = [
+            {"tag": tag, **JournalStatsService._mood_summary(mood_counts)}
+            for tag, mood_counts in counts.items()
+        ]
+        items.sort(key=lambda item: (-item["total"], item["tag"]))
+        items = items[:limit]
+
+        return {
+            "days": days,
+            "moods": MOOD_TYPES,
+            "tags": [item["tag"] for item in items],
+            "matrix": [[item["moods"][mood] for mood in MOOD_TYPES] for item in items],
+            "items": items,
+        }, 200
+
+    @staticmethod
+    def mood_timeline(
+        db: Session,
+        days: Optional[int] = 90,
+        granularity: Granularity = "week",
+        tag: Optional[str] = None,
+    ) -> Tuple[dict, int]:
+        """
+        心情随时间的变化
+
+        Args:
+            days: 最近 N 天，None 表示全部
+            granularity: 聚合粒度（day / week / month，周从周一开始）
+            tag: 只统计带该标签的日记
+
+        Returns:
+            (response_data, status_code)
+        """
+        user = db.query(User).first()
+        if not user:
+            return error_response(message="用户不存在", code=404), 404
+
+        if granularity == "day":
+            period = func.date(Diary.created_at)
+        elif granularity == "month":
+            period = func.strftime("%Y-%m-01", Diary.created_at)
+        else:
+            period = func.date(Diary.created_at, "-6 days", "weekday 1")
+        period = period.label("period")
+
+        query = db.query(period, Diary.mood, func.count(Diary.id))
+        if tag:
+            query = query.join(DiaryTag, DiaryTag.diary_id == Diary.id).filter(DiaryTag.tag == tag)
+        rows = (
+            JournalStatsService._filtered(query, user.id, days)
+            .group_by(period, Diary.mood)
+            .order_by(period)
+            .all()
+        )
+
+        periods: Dict[str, Dict[str, int]] = {}
+        for key, mood, count in rows:
+            periods.setdefault(key, {})[mood] = count
+
+        return {
+            "days": days,
+            "granularity": granularity,
+            "tag": tag,
+            "items": [
+                {"period": key, **JournalStatsService._mood_summary(mood_counts)}
+                for key, mood_counts in periods.items()
+            ],
+        }, 200
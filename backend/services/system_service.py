@@ -3,12 +3,17 @@
 
 支持功能：
 - 八大系统评分摘要
+- 系统日志批量写入
 """
 from typing import Optional, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
-from backend.models.dimension import System, SYSTEM_TYPES
+from backend.core.serialization import dump_list
+from backend.db.rollups import track_inserted
+from backend.models.dimension import System, SystemLog, SYSTEM_TYPES, DEFAULT_SYSTEM_DETAILS
 from backend.models.user import User
+from backend.schemas.system import SystemLogBatchCreate, SystemLogResponse
 from backend.schemas.common import error_response, success_response
 
 
@@ -70,4 +75,60 @@ class SystemService:
                 "total_systems": len(SYSTEM_TYPES)
             },
             message="获取系统评分成功"
-        ), 200
\ No newline at end of file
+        ), 200
+
+    @staticmethod
+    def create_system_logs_batch(
+        db: Session,
+        system_type: str,
+        request: SystemLogBatchCreate
+    ) -> Tuple[dict, int]:
+        """
+        批量创建系统日志
+
+        系统不存在时自动创建；日志在一个事务内通过 executemany 插入。
+
+        Returns:
+            (response_data, status_code)
+        """
+        system_type = system_type.upper()
+        if system_type not in SYSTEM_TYPES:
+            return error_response(message="系统类型无效", code=404), 404
+
+        user = SystemService.get_user(db)
+        if not user:
+            return error_response(message="用户不存在", code=404), 404
+
+        system = db.query(System).filter(
+            System.user_id == user.id,
+            System.type == system_type
+        ).first()
+
+        if not system:
+            system = System(
+                user_id=user.id,
+                type=system_type,
+                score=50,
+                details=DEFAULT_SYSTEM_DETAILS.get(system_type, {})
+            )
+            db.add(system)
+            db.flush()
+
+        logs = db.scalars(
+            insert(SystemLog).returning(SystemLog),
+            [
+                {
+                    "system_id": system.id,
+                    "label": item.label,
+                    "value": item.value,
+                    "meta_data": item.meta_data,
+                }
+                for item in request.items
+            ]
+        ).all()
+        # 批量插入不经过 flush，显式更新每日汇总
+        track_inserted(db, logs)
+        items = dump_list(SystemLogResponse, logs)
+        db.commit()
+
+        return {"items": items, "total": len(items)}, 201
@@ -52,63 +52,61 @@ class TimelineService:
         if not user:
             return error_response(message="用户不存在", code=404), 404
 
+        # 先收集轻量元组 (时间戳, 类型, ID, 标题, 内容, 发生时间)，排序分页后只为当前页创建事件模型
         events = []
 
         # 获取日记事件（使用 created_at 作为事件时间）
         if type in ["all", "diary"]:
-            diaries = db.query(Diary).filter(Diary.user_id == user.id).all()
-            for diary in diaries:
+            diaries = db.query(
+                Diary.id, Diary.title, Diary.content, Diary.created_at
+            ).filter(Diary.user_id == user.id).all()
+            for diary_id, title, content, created_at in diaries:
                 # 确保字段不为空
-                title = diary.title or "无标题日记"
-                content = diary.content or ""
-                if diary.created_at:
-                    time_str = diary.created_at.strftime("%H:%M")
-                    ts = int(diary.created_at.timestamp() * 1000)
-                else:
-                    time_str = "00:00"
-                    ts = 0
-                events.append(TimelineEventItem(
-                    id=f"diary_{diary.id}",
-                    type="diary",
-                    title=title,
-                    content=content,
-                    time=time_str,
-                    timestamp=ts
+                events.append((
+                    TimelineService._timestamp(created_at),
+                    "diary",
+                    f"diary_{diary_id}",
+                    title or "无标题日记",
+                    content or "",
+                    created_at,
                 ))
 
         # 获取饮食偏离事件（使用 occurred_at 作为事件时间）
         if type in ["all", "diet"]:
             system = DietService.get_or_create_fuel_system(db, user.id)
-            deviations = db.query(MealDeviation).filter(
-                MealDeviation.system_id == system.id
-            ).all()
+            deviations = db.query(
+                MealDeviation.id, MealDeviation.description, MealDeviation.occurred_at
+            ).filter(MealDeviation.system_id == system.id).all()
 
-            for deviation in deviations:
+            for deviation_id, description, occurred_at in deviations:
                 # 确保字段不为空
-                description = deviation.description or "未描述饮食偏离事件"
-                if deviation.occurred_at:
-                    time_str = deviation.occurred_at.strftime("%H:%M")
-                    ts = int(deviation.occurred_at.timestamp() * 1000)
-                else:
-                    time_str = "00:00"
-                    ts = 0
-                events.append(TimelineEventItem(
-                    id=f"diet_{deviation.id}",
-                    type="diet",
-                    title="饮食偏离记录",
-                    content=description,
-                    time=time_str,
-                    timestamp=ts
+                events.append((
+                    TimelineService._timestamp(occurred_at),
+                    "diet",
+                    f"diet_{deviation_id}",
+                    "饮食偏离记录",
+                    description or "未描述饮食偏离事件",
+                    occurred_at,
                 ))
 
         # 按时间戳降序排序（最新事件在前）
-        events.sort(key=lambda x: x.timestamp, reverse=True)
+        events.sort(key=lambda x: x[0], reverse=True)
 
         # 分页
         total_events = len(events)
         start_idx = (page - 1) * page_size
         end_idx = start_idx + page_size
-        page_events = events[start_idx:end_idx]
+        page_events = [
+            TimelineEventItem(
+                id=event_id,
+                type=event_type,
+                title=title,
+                content=content,
+                time=occurred.strftime("%H:%M") if occurred else "00:00",
+                timestamp=ts,
+            )
+            for ts, event_type, event_id, title, content, occurred in events[start_idx:end_idx]
+        ]
 
         # 按日期分组
         grouped = TimelineService._group_by_date(page_events)
@@ -121,6 +119,11 @@ class TimelineService:
 
         return response.model_dump(), 200
 
+    @staticmethod
+    def _timestamp(value: Optional[datetime]) -> int:
+        """事件时间转换为毫秒时间戳（缺失时为 0）"""
+        return int(value.timestamp() * 1000) if value else 0
+
     @staticmethod
     def _group_by_date(events: list) -> list[TimelineDateGroup]:
         """
@@ -8,6 +8,7 @@ from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 
+from backend.agent.llm.credentials import invalidate_ai_config
 from backend.models.user import User, UserSettings
 from backend.schemas.user import UserResponse, UserUpdate, UserSettingsResponse, UserSettingsUpdate
 from backend.schemas.common import error_response
@@ -203,6 +204,9 @@ class UserService:
         user.ai_config = ai_config
         db.commit()
 
+        # 缓存的凭据和 LLM 客户端失效，下一轮对话按新配置重建
+        invalidate_ai_config()
+
         return {
             "provider": provider_lower,
             "model": model,
@@ -0,0 +1,89 @@
+"""测试会话历史分页（before 游标、has_more、同一时间戳按 ID 排序）"""
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import agent
+from backend.db import session as db_session
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine
+from backend.models.session import AgentMessage, AgentSession
+
+
+def test_history_pages_back_with_before_cursor():
+    """按 next_before 向前翻页，覆盖全部消息且不重复；最后一页 has_more 为 False"""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+            db = factory()
+            base = datetime(2026, 1, 1, 12, 0, 0)
+            db.add(AgentSession(session_id="s1"))
+            # 每 3 条共用一个时间戳，翻页须按 (timestamp, id) 定位
+            db.add_all([
+                AgentMessage(
+                    session_id="s1",
+                    role="user" if i % 2 else "assistant",
+                    content=f"m{i}",
+                    timestamp=base + timedelta(seconds=i // 3),
+                    extra_data={"n": i},
+                )
+                for i in range(1, 26)
+            ])
+            db.add(AgentSession(session_id="other"))
+            db.add(AgentMessage(session_id="other", role="user", content="x", timestamp=base))
+            db.commit()
+            db.close()
+
+            app = FastAPI()
+            app.include_router(agent.router)
+            client = TestClient(app)
+
+            pages, before = [], None
+            with mock.patch.object(db_session, "SessionLocal", factory):
+                while True:
+                    params = {"session_id": "s1", "limit": 10}
+                    if before is not None:
+                        params["before"] = before
+                    data = client.get("/api/agent/history", params=params).json()["data"]
+                    pages.append(data)
+                    before = data["next_before"]
+                    if not data["has_more"]:
+                        break
+
+                desc_page = client.get("/api/agent/history", params={
+                    "session_id": "s1", "limit": 3, "order": "desc", "compact": True
+                }).json()["data"]
+
+            contents = [[m["content"] for m in page["messages"]] for page in pages]
+            assert contents == [
+                [f"m{i}" for i in range(16, 26)],
+                [f"m{i}" for i in range(6, 16)],
+                [f"m{i}" for i in range(1, 6)],
+            ]
+            assert [page["has_more"] for page in pages] == [True, True, False]
+            assert pages[-1]["next_before"] is None
+            assert pages[0]["messages"][0]["extra_data"] == {"n": 16}
+
+            assert [m["content"] for m in desc_page["messages"]] == ["m25", "m24", "m23"]
+            assert "extra_data" not in desc_page["messages"][0]
+            print("[SUCCESS] History paging test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+if __name__ == "__main__":
+    test_history_pages_back_with_before_cursor()
@@ -0,0 +1,69 @@
+"""测试趋势分析计算（NumPy 与纯 Python 实现结果一致）"""
+import random
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.services import analytics_service
+from backend.services.analytics_service import AnalyticsInput, _compute_python
+
+
+def _sample_input(days: int = 30) -> AnalyticsInput:
+    rng = random.Random(42)
+    events = sorted(
+        ((rng.randrange(8), rng.randrange(days), float(rng.randint(0, 100))) for _ in range(120)),
+        key=lambda event: event[1],
+    )
+    return AnalyticsInput(
+        days=days,
+        initial_scores=[50.0] * 8,
+        score_events=events,
+        log_counts=[(rng.randrange(8), rng.randrange(days), rng.randint(1, 3)) for _ in range(60)],
+        deviation_counts=[(rng.randrange(days), 1) for _ in range(8)],
+        moods=[(rng.randrange(days), float(rng.randint(-2, 2))) for _ in range(25)],
+    )
+
+
+def test_python_trends():
+    """重采样、滑动平均与连续天数"""
+    data = AnalyticsInput(
+        days=5,
+        initial_scores=[50.0] * 8,
+        score_events=[(0, 1, 60.0), (0, 1, 70.0), (0, 3, 40.0)],
+        log_counts=[(0, 2, 1), (0, 3, 2), (0, 4, 1), (1, 0, 1)],
+        deviation_counts=[(1, 2)],
+    )
+    result = _compute_python(data, window=2)
+    assert result["scores"][0] == [50.0, 70.0, 70.0, 40.0, 40.0]
+    assert result["rolling_mean"][0] == [50.0, 60.0, 70.0, 55.0, 40.0]
+    assert result["current_streak"][:2] == [3, 0]
+    assert result["longest_streak"][:2] == [3, 1]
+    assert result["clean_streak"] == 3
+    assert result["correlations"][1][1] is None  # 常数序列无相关系数
+    print("[SUCCESS] Python trends test PASSED!")
+
+
+def test_numpy_matches_python():
+    """安装 NumPy 时两种实现结果一致"""
+    if analytics_service.np is None:
+        print("[SKIP] NumPy not installed")
+        return
+
+    data = _sample_input()
+    expected = _compute_python(data, window=7)
+    actual = analytics_service._compute_numpy(data, window=7)
+    for key in ("scores", "rolling_mean", "log_counts", "current_streak",
+                "longest_streak", "mood", "deviations", "clean_streak"):
+        assert actual[key] == expected[key], key
+    for row_a, row_b in zip(actual["correlations"], expected["correlations"]):
+        for a, b in zip(row_a, row_b):
+            assert (a is None and b is None) or abs(a - b) < 1e-3
+    print("[SUCCESS] NumPy matches Python test PASSED!")
+
+
+if __name__ == "__main__":
+    test_python_trends()
+    test_numpy_matches_python()
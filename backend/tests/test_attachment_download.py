@@ -0,0 +1,129 @@
+"""测试附件下载（Range 请求）和缩略图（首次生成并缓存、解码失败回退原图）"""
+import io
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import text
+
+from backend.api import journals
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine, get_db
+from backend.services import attachment_store
+from backend.services.attachment_store import AttachmentStore
+
+
+def _with_client(test):
+    """在临时数据库和附件目录上运行测试（含一篇日记）"""
+    def wrapper():
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/app.db"
+            reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+            factory = _create_session_factory(reader, writer)
+            store = AttachmentStore(root=Path(tmp) / "files")
+            try:
+                Base.metadata.create_all(bind=writer)
+                with writer.begin() as conn:
+                    conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+                    conn.execute(text("INSERT INTO diaries (id, user_id, title, content) VALUES (1, 1, 't', 'c')"))
+
+                app = FastAPI()
+                app.include_router(journals.router)
+
+                def override_get_db():
+                    db = factory()
+                    try:
+                        yield db
+                    finally:
+                        db.close()
+
+                app.dependency_overrides[get_db] = override_get_db
+                with mock.patch.object(attachment_store, "_store_instance", store):
+                    test(TestClient(app), store)
+            finally:
+                reader.dispose()
+                writer.dispose()
+    wrapper.__name__ = test.__name__
+    wrapper.__doc__ = test.__doc__
+    return wrapper
+
+
+def _upload(client, filename: str, content: bytes) -> dict:
+    response = client.post("/api/journal/1/attachments", params={"filename": filename}, content=content)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+@_with_client
+def test_range_request(client, store):
+    """Range 请求返回 206 和 Content-Range，只返回请求的字节"""
+    content = bytes(range(256)) * 40
+    attachment = _upload(client, "clip.mp4", content)
+
+    response = client.get(f"/api/journal/attachments/{attachment['id']}", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 100-199/{len(content)}"
+    assert response.content == content[100:200]
+
+    response = client.get(f"/api/journal/attachments/{attachment['id']}")
+    assert response.status_code == 200 and response.content == content
+    assert response.headers["accept-ranges"] == "bytes"
+    print("[SUCCESS] Range request test PASSED!")
+
+
+@_with_client
+def test_thumbnail_generated_and_cached(client, store):
+    """首次请求生成缩略图并缓存，再次请求直接返回缓存文件"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (1200, 800), (200, 30, 30)).save(buffer, "PNG")
+    attachment = _upload(client, "photo.png", buffer.getvalue())
+
+    response = client.get(f"/api/journal/attachments/{attachment['id']}/thumbnail", params={"size": 100})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    with Image.open(io.BytesIO(response.content)) as thumb:
+        assert thumb.size == (100, 67)
+
+    cached = store.thumb_dir / f"{attachment['sha256']}_100.jpg"
+    assert cached.exists()
+    with mock.patch.object(attachment_store.Image, "open", side_effect=AssertionError("不应重新生成")):
+        again = client.get(f"/api/journal/attachments/{attachment['id']}/thumbnail", params={"size": 100})
+    assert again.content == response.content
+    print("[SUCCESS] Thumbnail cache test PASSED!")
+
+
+@_with_client
+def test_undecodable_image_falls_back_to_original(client, store):
+    """图片无法解码时返回原图，不残留临时文件"""
+    content = b"\x89PNG" + bytes(300)
+    attachment = _upload(client, "broken.png", content)
+
+    response = client.get(f"/api/journal/attachments/{attachment['id']}/thumbnail")
+    assert response.status_code == 200 and response.content == content
+    assert not list(store.tmp_dir.glob("*.part"))
+    assert not store.thumb_dir.exists() or not list(store.thumb_dir.iterdir())
+
+    # 缩略图已写入临时文件但落位失败
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buffer, "PNG")
+    image = _upload(client, "small.png", buffer.getvalue())
+    with mock.patch.object(attachment_store.os, "replace", side_effect=OSError("disk full")):
+        response = client.get(f"/api/journal/attachments/{image['id']}/thumbnail")
+    assert response.status_code == 200 and response.content == buffer.getvalue()
+    assert not list(store.tmp_dir.glob("*.part"))
+    print("[SUCCESS] Thumbnail fallback test PASSED!")
+
+
+if __name__ == "__main__":
+    test_range_request()
+    test_thumbnail_generated_and_cached()
+    test_undecodable_image_falls_back_to_original()
@@ -0,0 +1,69 @@
+"""测试本地文件导入附件（只对 IPC 应用开放）"""
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.api import journals
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine, get_db
+from backend.services import attachment_store
+from backend.services.attachment_store import AttachmentStore
+
+
+def test_import_requires_ipc_app():
+    """开发模式 HTTP 应用拒绝按路径导入；IPC 应用正常导入"""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        store = AttachmentStore(root=Path(tmp) / "files")
+        try:
+            Base.metadata.create_all(bind=writer)
+            with writer.begin() as conn:
+                conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+                conn.execute(text("INSERT INTO diaries (id, user_id, title, content) VALUES (1, 1, 't', 'c')"))
+            source = Path(tmp) / "photo.png"
+            source.write_bytes(b"\x89PNG" + bytes(200))
+
+            app = FastAPI()
+            app.include_router(journals.router)
+
+            def override_get_db():
+                db = factory()
+                try:
+                    yield db
+                finally:
+                    db.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            client = TestClient(app)
+            body = {"source_path": str(source)}
+
+            with mock.patch.object(attachment_store, "_store_instance", store):
+                response = client.post("/api/journal/1/attachments/import", json=body)
+                assert response.status_code == 403
+                assert not store.blob_dir.exists()
+
+                app.state.local_file_access = True
+                response = client.post("/api/journal/1/attachments/import", json=body)
+                assert response.status_code == 200, response.text
+                assert response.json()["data"]["filename"] == "photo.png"
+                assert store.has_blob(response.json()["data"]["sha256"])
+            print("[SUCCESS] Import restriction test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+if __name__ == "__main__":
+    test_import_requires_ipc_app()
@@ -0,0 +1,112 @@
+"""测试附件内容寻址存储（去重、上传与删除并发、备份 blob 回收）"""
+import asyncio
+import hashlib
+import json
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.db.backup import ATTACHMENT_MANIFEST, DatabaseBackup
+from backend.services.attachment_store import AttachmentStore, AttachmentTooLargeError
+
+
+async def _chunks(data: bytes, size: int = 1000):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_attachment_store_dedupe_and_limit():
+    """相同内容只保存一份；超过上限时不留下临时文件"""
+    data = bytes(range(256)) * 40
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AttachmentStore(root=Path(tmp), chunk_size=512)
+
+        sha256, size = asyncio.run(store.write_stream(_chunks(data)))
+        assert sha256 == hashlib.sha256(data).hexdigest() and size == len(data)
+
+        source = Path(tmp) / "copy.bin"
+        source.write_bytes(data)
+        assert store.write_file(source) == (sha256, size)
+        assert len([p for p in store.blob_dir.rglob("*") if p.is_file()]) == 1
+
+        try:
+            asyncio.run(store.write_stream(_chunks(data), max_bytes=100))
+            assert False, "should raise"
+        except AttachmentTooLargeError:
+            pass
+        assert not any(store.tmp_dir.iterdir())
+        print("[SUCCESS] Dedupe and limit test PASSED!")
+
+
+def test_attachment_store_backup_roundtrip():
+    """blob 导出到备份目录后可恢复"""
+    data = b"attachment" * 100
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AttachmentStore(root=Path(tmp) / "attachments")
+        sha256, _ = asyncio.run(store.write_stream(_chunks(data)))
+
+        backup_blobs = Path(tmp) / "backups" / "blobs"
+        assert store.export_blobs([sha256], backup_blobs) == 1
+        assert store.export_blobs([sha256], backup_blobs) == 0  # 已存在则跳过
+
+        store.delete_blob(sha256)
+        assert not store.has_blob(sha256)
+        assert store.import_blobs([sha256], backup_blobs) == 1
+        assert store.blob_path(sha256).read_bytes() == data
+        print("[SUCCESS] Backup roundtrip test PASSED!")
+
+
+def test_attachment_store_keeps_blob_of_pending_upload():
+    """相同内容的上传尚未保存记录时，删除另一条引用不会删掉 blob"""
+    data = b"same content" * 50
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AttachmentStore(root=Path(tmp))
+        sha256, _ = asyncio.run(store.write_stream(_chunks(data)))
+        # 第二次上传相同内容：blob 已存在，记录尚未提交
+        assert asyncio.run(store.write_stream(_chunks(data)))[0] == sha256
+
+        # 第一条记录被删除，此时数据库中没有任何引用
+        assert store.delete_unreferenced([sha256], lambda candidates: set()) == 0
+        assert store.has_blob(sha256)
+
+        store.unpin(sha256)
+        assert store.delete_unreferenced([sha256], lambda candidates: {sha256}) == 0
+        store.unpin(sha256)
+        assert store.delete_unreferenced([sha256], lambda candidates: set()) == 1
+        assert not store.has_blob(sha256)
+        print("[SUCCESS] Pending upload test PASSED!")
+
+
+def test_backup_blob_garbage_collection():
+    """共享 blob 目录只保留现存备份清单引用的 blob；清单无法读取时不删除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backup = DatabaseBackup(str(Path(tmp) / "app.db"), backup_dir=str(Path(tmp) / "backups"))
+        kept, dropped = "a" * 64, "b" * 64
+        for sha256 in (kept, dropped):
+            blob = backup.blob_dir / sha256[:2] / sha256
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            blob.write_bytes(sha256.encode())
+
+        with zipfile.ZipFile(backup.backup_dir / "backup_1.zip", "w") as zipf:
+            zipf.writestr(ATTACHMENT_MANIFEST, json.dumps({"blob_dir": "blobs", "hashes": [kept]}))
+        corrupt = backup.backup_dir / "backup_2.zip"
+        corrupt.write_bytes(b"not a zip")
+
+        assert backup._collect_blob_garbage() == 0
+        corrupt.unlink()
+        assert backup._collect_blob_garbage() == 1
+        assert (backup.blob_dir / kept[:2] / kept).exists()
+        assert not (backup.blob_dir / dropped[:2] / dropped).exists()
+        print("[SUCCESS] Backup blob GC test PASSED!")
+
+
+if __name__ == "__main__":
+    test_attachment_store_dedupe_and_limit()
+    test_attachment_store_backup_roundtrip()
+    test_attachment_store_keeps_blob_of_pending_upload()
+    test_backup_blob_garbage_collection()
@@ -0,0 +1,121 @@
+"""测试批量写入接口（整批写入 / 整批拒绝、每日汇总和标签索引的显式登记）"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.api import asset, diet, journals, systems
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.rollups import rebuild_rollups
+from backend.db.session import _create_session_factory, create_db_engine, get_db
+from backend.db.tag_index import rebuild_tag_index
+
+
+def _snapshot(conn):
+    rollups = conn.execute(text(
+        "SELECT user_id, date, dimension, log_count, deviation_count, diary_count, mood_good "
+        "FROM daily_rollups ORDER BY user_id, date, dimension"
+    )).fetchall()
+    tags = conn.execute(text("SELECT diary_id, tag FROM diary_tags ORDER BY diary_id, tag")).fetchall()
+    return rollups, tags
+
+
+def _count(conn, table: str) -> int:
+    return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+
+def test_batch_endpoints_write_and_track_derived_tables():
+    """四个批量接口整批写入；派生表与从原始表重建的结果一致；无效批次不写入任何行"""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+            with writer.begin() as conn:
+                conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+                conn.execute(text("INSERT INTO asset_categories (id, user_id, name) VALUES (1, 1, '现金')"))
+
+            app = FastAPI()
+            for module in (asset, diet, journals, systems):
+                app.include_router(module.router)
+
+            def override_get_db():
+                db = factory()
+                try:
+                    yield db
+                finally:
+                    db.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            client = TestClient(app)
+
+            response = client.post("/api/journal/batch", json={"items": [
+                {"title": "a", "content": "x", "mood": "good", "tags": ["work", " work ", "运动"]},
+                {"title": "b", "content": "y", "tags": ["work"]},
+            ]})
+            assert response.status_code == 200, response.text
+            assert response.json()["data"]["total"] == 2
+
+            response = client.post("/api/diet/deviations/batch", json={"items": [
+                {"description": "零食"}, {"description": "夜宵"}, {"description": "没吃早餐"},
+            ]})
+            assert response.status_code == 200 and response.json()["data"]["total"] == 3
+
+            response = client.post("/api/systems/intellectual/logs/batch", json={"items": [
+                {"label": "冥想", "value": "10 分钟"}, {"label": "阅读", "value": "30 页"},
+            ]})
+            assert response.status_code == 200 and response.json()["data"]["total"] == 2
+
+            response = client.post("/api/assets/items/batch", json={"items": [
+                {"category_id": 1, "name": "钱包", "amount": 100},
+                {"category_id": 1, "name": "储蓄", "amount": 2000.5},
+            ]})
+            assert response.status_code == 200 and response.json()["data"]["total"] == 2
+
+            # 任一条目无效则整批不写入
+            assert client.post("/api/assets/items/batch", json={"items": [
+                {"category_id": 1, "name": "ok", "amount": 1},
+                {"category_id": 99, "name": "missing", "amount": 1},
+            ]}).status_code == 404
+            assert client.post("/api/journal/batch", json={"items": [
+                {"title": "ok"}, {"title": "bad", "mood": "furious"},
+            ]}).status_code == 422
+
+            with reader.connect() as conn:
+                assert _count(conn, "diaries") == 2
+                assert _count(conn, "meal_deviations") == 3
+                assert _count(conn, "system_logs") == 2
+                assert _count(conn, "asset_items") == 2
+                tracked = _snapshot(conn)
+
+            rollups, tags = tracked
+            assert sorted(tag for _, tag in tags) == ["work", "work", "运动"]
+            totals = {
+                "log_count": sum(row.log_count for row in rollups),
+                "deviation_count": sum(row.deviation_count for row in rollups),
+                "diary_count": sum(row.diary_count for row in rollups),
+            }
+            assert totals == {"log_count": 2, "deviation_count": 3, "diary_count": 2}
+
+            # 增量登记的结果与从原始表整体重算一致
+            with writer.begin() as conn:
+                rebuild_rollups(conn)
+                rebuild_tag_index(conn)
+                assert _snapshot(conn) == tracked
+            print("[SUCCESS] Batch endpoint test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+if __name__ == "__main__":
+    test_batch_endpoints_write_and_track_derived_tables()
@@ -0,0 +1,163 @@
+"""测试变更数据捕获（保存点回滚、断线补齐、SSE 续传、IPC 推送帧）"""
+import asyncio
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from sqlalchemy import text
+
+from backend.api import changes as changes_api
+from backend.db import cdc
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.cdc import ChangeFeed, ChangePusher
+from backend.db.session import _create_session_factory, create_db_engine
+from backend.models.diary import Diary
+
+
+def test_savepoint_rollback_discards_changes():
+    """保存点回滚后，其中捕获的记录不发布；释放的保存点保留"""
+    feed = ChangeFeed()
+    batches = []
+    feed.add_listener(batches.append)
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(cdc, "change_feed", feed):
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+            with writer.begin() as conn:
+                conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+
+            db = factory()
+            try:
+                db.add(Diary(id=1, user_id=1, title="kept", content="c"))
+                # 与写队列相同：每个任务一个保存点
+                with db.begin_nested():
+                    db.add(Diary(id=2, user_id=1, title="released", content="c"))
+                try:
+                    with db.begin_nested():
+                        db.add(Diary(id=3, user_id=1, title="rolled back", content="c"))
+                        db.flush()
+                        db.execute(text("UPDATE systems SET score = 0"))
+                        raise ValueError("job failed")
+                except ValueError:
+                    pass
+                db.commit()
+            finally:
+                db.close()
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+    assert len(batches) == 1
+    published = {(c["table"], c["id"], c["op"]) for c in batches[0]["changes"]}
+    assert ("diaries", 1, "insert") in published and ("diaries", 2, "insert") in published
+    assert ("diaries", 3, "insert") not in published
+    assert not any(table == "systems" for table, _, _ in published)
+    print("[SUCCESS] Savepoint rollback test PASSED!")
+
+
+def test_feed_since_and_reset():
+    """按序号补齐；请求的序号已移出缓冲区或来自上一个进程时要求全量刷新"""
+    feed = ChangeFeed(buffer_size=3)
+    for i in range(5):
+        feed.publish([{"table": "diaries", "id": i, "op": "insert", "version": i}])
+
+    changes, reset = feed.since(3)
+    assert not reset and [c["id"] for c in changes] == [3, 4]
+    assert feed.since(1) == ([], True)
+    assert feed.since(99) == ([], True)
+    assert feed.since(5) == ([], False)
+    print("[SUCCESS] Feed since test PASSED!")
+
+
+class _FakeRequest:
+    def __init__(self, headers: dict):
+        self.headers = headers
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+def test_sse_resumes_from_last_event_id():
+    """SSE 按 Last-Event-ID 补齐并继续推送；未迭代的响应不注册监听器"""
+    feed = ChangeFeed()
+
+    async def scenario():
+        for i in range(3):
+            feed.publish([{"table": "diaries", "id": i, "op": "insert", "version": i}])
+
+        # 从未开始迭代的响应不遗留监听器
+        await changes_api.stream_changes(_FakeRequest({}), since=None)
+        assert feed._listeners == []
+
+        request = _FakeRequest({"last-event-id": "1"})
+        response = await changes_api.stream_changes(request, since=None)
+        stream = response.body_iterator
+
+        first = await asyncio.wait_for(stream.__anext__(), 5)
+        assert first.startswith("id: 3\nevent: changes\n")
+        assert '"id": 1' in first and '"id": 2' in first and '"id": 0' not in first
+        assert len(feed._listeners) == 1
+
+        feed.publish([{"table": "diaries", "id": 9, "op": "update", "version": 4}])
+        second = await asyncio.wait_for(stream.__anext__(), 5)
+        assert second.startswith("id: 4\nevent: changes\n") and '"id": 9' in second
+
+        request.disconnected = True
+        try:
+            await asyncio.wait_for(stream.__anext__(), 5)
+            assert False, "stream should end after disconnect"
+        except StopAsyncIteration:
+            pass
+        assert feed._listeners == []
+
+    with mock.patch.object(changes_api, "change_feed", feed), \
+            mock.patch.object(changes_api, "HEARTBEAT_SECONDS", 0.05):
+        asyncio.run(scenario())
+    print("[SUCCESS] SSE resume test PASSED!")
+
+
+def test_ipc_pusher_merges_batches():
+    """推送线程把积压的批次合并为一帧，停止时发送完已入队的批次"""
+    feed = ChangeFeed()
+    frames = []
+    writing, gate = threading.Event(), threading.Event()
+
+    def write(frame):
+        writing.set()
+        gate.wait(5)
+        frames.append(frame)
+
+    pusher = ChangePusher(write, feed=feed)
+    pusher.start()
+    try:
+        feed.publish([{"table": "diaries", "id": 1, "op": "insert", "version": 1}])
+        assert writing.wait(5)
+        # 第一帧阻塞在写出时，后续批次积压
+        for i in range(2, 5):
+            feed.publish([{"table": "diaries", "id": i, "op": "insert", "version": i}])
+    finally:
+        gate.set()
+        pusher.stop()
+
+    assert frames[0] == {"type": "db_changes", "seq": 1, "changes": [mock.ANY]}
+    assert len(frames) == 2 and frames[1]["seq"] == 4
+    assert [c["id"] for c in frames[1]["changes"]] == [2, 3, 4]
+    assert feed._listeners == []
+    print("[SUCCESS] IPC push test PASSED!")
+
+
+if __name__ == "__main__":
+    test_savepoint_rollback_discards_changes()
+    test_feed_since_and_reset()
+    test_sse_resumes_from_last_event_id()
+    test_ipc_pusher_merges_batches()
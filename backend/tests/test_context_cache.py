@@ -0,0 +1,110 @@
+"""测试会话上下文缓存（LRU 淘汰、消息裁剪、过期清理、未命中恢复）"""
+import sys
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.agent.core.context import ContextManager
+from backend.agent.models.context import ContextState
+
+
+class InMemoryContextManager(ContextManager):
+    """用字典代替 agent_messages 表"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.stored = {}
+
+    def _sync_to_db(self, session_id, role, content):
+        self.stored.setdefault(session_id, []).append((role, content))
+
+    def _load_from_db(self, session_id, create):
+        if session_id not in self.stored and not create:
+            return None
+        context = ContextState(session_id=session_id)
+        for role, content in self.stored.get(session_id, [])[-self.MAX_MESSAGES:]:
+            context.add_message(role, content)
+        if context.messages:
+            self._hydrations += 1
+        return context
+
+
+def test_context_trim_and_lru_eviction():
+    """每个会话只保留最近消息；超出会话数上限时淘汰最久未用的会话"""
+    manager = InMemoryContextManager(max_sessions=3, max_bytes=10 ** 9)
+    for n in range(ContextManager.MAX_MESSAGES + 10):
+        manager.add_message_to_context("s0", "user", f"msg {n}")
+    context = manager.get("s0")
+    assert len(context.messages) == ContextManager.MAX_MESSAGES
+    assert context.messages[-1]["content"] == f"msg {ContextManager.MAX_MESSAGES + 9}"
+
+    for sid in ("s1", "s2", "s3"):
+        manager.add_message_to_context(sid, "user", "hi")
+    stats = manager.get_stats()
+    assert stats["active_sessions"] == 3
+    assert manager.get("s0") is None  # 最久未用，已淘汰
+    assert stats["total_bytes"] == sum(ctx.size_bytes for ctx in manager._contexts.values())
+    print("[SUCCESS] Trim and LRU eviction test PASSED!")
+
+
+def test_context_byte_budget_and_rehydration():
+    """超出字节预算时淘汰；被淘汰的会话再次访问时恢复最近窗口"""
+    manager = InMemoryContextManager(max_sessions=100, max_bytes=4096)
+    for sid in ("a", "b", "c"):
+        manager.add_message_to_context(sid, "user", "x" * 1500)
+    assert manager.get_stats()["total_bytes"] <= 4096
+    assert manager.get("a") is None
+
+    restored = manager.get_or_create("a")
+    assert [m["content"] for m in restored.messages] == ["x" * 1500]
+    assert manager.get_stats()["hydrations"] == 1
+
+    assert manager.get("unknown", hydrate=True) is None
+    print("[SUCCESS] Byte budget and rehydration test PASSED!")
+
+
+def test_context_cleanup_expired():
+    """超过 TTL 未访问的会话被清理"""
+    manager = InMemoryContextManager(max_sessions=100, max_bytes=10 ** 9)
+    for sid in ("old", "new"):
+        manager.add_message_to_context(sid, "user", "hi")
+    manager._contexts["old"].last_accessed -= ContextManager.SESSION_TTL + timedelta(minutes=1)
+
+    assert manager.cleanup_expired() == 1
+    assert manager.get("old") is None and manager.get("new") is not None
+    print("[SUCCESS] Cleanup expired test PASSED!")
+
+
+def test_sweeper_cleans_and_stops():
+    """后台清理线程按间隔清理过期会话，stop_sweeper 立即结束线程，可再次启动"""
+    manager = InMemoryContextManager(max_sessions=100, max_bytes=10 ** 9, sweep_interval=0.05)
+    manager.add_message_to_context("old", "user", "hi")
+    manager._contexts["old"].last_accessed -= ContextManager.SESSION_TTL + timedelta(minutes=1)
+
+    manager.start_sweeper()
+    deadline = time.monotonic() + 2
+    while "old" in manager._contexts and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "old" not in manager._contexts
+
+    manager.stop_sweeper()
+    assert not manager._sweeper.is_alive()
+    assert not [t for t in threading.enumerate() if t.name == "context-sweeper"]
+
+    manager.start_sweeper()
+    assert manager._sweeper.is_alive()
+    manager.stop_sweeper()
+    assert not manager._sweeper.is_alive()
+    print("[SUCCESS] Sweeper test PASSED!")
+
+
+if __name__ == "__main__":
+    test_context_trim_and_lru_eviction()
+    test_context_byte_budget_and_rehydration()
+    test_context_cleanup_expired()
+    test_sweeper_cleans_and_stops()
@@ -0,0 +1,113 @@
+"""测试 AI 凭据缓存（按配置版本复用解密结果和 LLM 客户端）"""
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.agent.llm.credentials import AICredentials, CredentialManager, CredentialsLoadError
+from backend.db.versions import bump_all
+
+
+class _Loader:
+    def __init__(self):
+        self.calls = 0
+        self.api_key = "sk-first"
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("database not ready")
+        return AICredentials(provider="deepseek", api_key=self.api_key, model="deepseek-chat")
+
+
+def test_credentials_cached_until_invalidated():
+    """配置未变化时不重复加载，invalidate / bump_all 后重新加载"""
+    loader = _Loader()
+    manager = CredentialManager(loader)
+
+    assert manager.get_credentials().api_key == "sk-first"
+    assert manager.get_credentials().api_key == "sk-first"
+    assert loader.calls == 1
+
+    loader.api_key = "sk-second"
+    manager.invalidate()
+    assert manager.get_credentials().api_key == "sk-second"
+    assert loader.calls == 2
+
+    bump_all()
+    manager.get_credentials()
+    assert loader.calls == 3
+    print("[SUCCESS] Credential cache test PASSED!")
+
+
+def test_load_failure_not_cached():
+    """读取失败抛出 CredentialsLoadError（不当作未配置）且不缓存，下次调用重试"""
+    loader = _Loader()
+    loader.fail = True
+    manager = CredentialManager(loader)
+
+    try:
+        manager.get_credentials()
+    except CredentialsLoadError as e:
+        assert "database not ready" in str(e)
+    else:
+        raise AssertionError("读取失败应抛出 CredentialsLoadError")
+    loader.fail = False
+    assert manager.get_credentials().api_key == "sk-first"
+    assert loader.calls == 2
+    print("[SUCCESS] Load failure test PASSED!")
+
+
+def test_client_rebuilt_only_on_change():
+    """同一配置版本内客户端只构建一次"""
+    loader = _Loader()
+    manager = CredentialManager(loader)
+    built = []
+
+    def build(credentials):
+        built.append(credentials.api_key)
+        return object()
+
+    first = manager.get_client("agent", build)
+    assert manager.get_client("agent", build) is first
+    assert built == ["sk-first"]
+
+    loader.api_key = "sk-second"
+    manager.invalidate()
+    assert manager.get_client("agent", build) is not first
+    assert built == ["sk-first", "sk-second"]
+    print("[SUCCESS] Client reuse test PASSED!")
+
+
+def test_chat_reports_load_failure_distinctly():
+    """读取配置出错时对话返回读取失败，而不是「未配置 AI API Key」"""
+    from backend.agent import init as agent_init
+
+    loader = _Loader()
+    loader.fail = True
+    with patch.object(agent_init, "get_credential_manager", return_value=CredentialManager(loader)):
+        try:
+            asyncio.run(agent_init.execute_chat("hi", session_id="sess_test"))
+        except agent_init.AgentConfigError as e:
+            assert "读取 AI 配置失败" in str(e) and "未配置" not in str(e)
+        else:
+            raise AssertionError("读取失败应抛出 AgentConfigError")
+
+        async def collect():
+            return [chunk async for chunk in agent_init.execute_stream_chat("hi", session_id="sess_test")]
+
+        chunks = asyncio.run(collect())
+        assert chunks == [{"type": "error", "data": "读取 AI 配置失败：database not ready，请稍后重试"}]
+    print("[SUCCESS] Chat load failure test PASSED!")
+
+
+if __name__ == "__main__":
+    test_credentials_cached_until_invalidated()
+    test_load_failure_not_cached()
+    test_client_rebuilt_only_on_change()
+    test_chat_reports_load_failure_distinctly()
@@ -0,0 +1,104 @@
+"""测试首页看板（基于每日汇总的统计、区间边界、删除后回退）"""
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import dashboard
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine, get_db
+from backend.models.diary import Diary
+from backend.models.dimension import SYSTEM_TYPES, MealDeviation, System, SystemLog, SystemScoreLog
+from backend.models.user import User
+
+
+def test_dashboard_counts_from_rollups():
+    """日志、评分变化、偏离、日记和心情按今日 / 区间统计，区间外的数据不计入"""
+    now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    days_ago = lambda n: now - timedelta(days=n)  # noqa: E731
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+            db = factory()
+            db.add(User(id=1, username="u"))
+            fuel = System(user_id=1, type="FUEL", score=70)
+            physical = System(user_id=1, type="PHYSICAL", score=40)
+            db.add_all([fuel, physical])
+            db.flush()
+            db.add_all([
+                SystemLog(system_id=physical.id, label="跑步", value="5km", created_at=now),
+                SystemLog(system_id=physical.id, label="跑步", value="3km", created_at=now),
+                SystemLog(system_id=physical.id, label="游泳", value="1km", created_at=days_ago(5)),
+                SystemLog(system_id=physical.id, label="旧", value="x", created_at=days_ago(40)),
+                SystemScoreLog(system_id=physical.id, old_score=50, new_score=45, created_at=days_ago(2)),
+                SystemScoreLog(system_id=physical.id, old_score=45, new_score=40, created_at=now),
+                MealDeviation(system_id=fuel.id, description="零食", occurred_at=now),
+                MealDeviation(system_id=fuel.id, description="夜宵", occurred_at=days_ago(3)),
+                MealDeviation(system_id=fuel.id, description="旧", occurred_at=days_ago(40)),
+                Diary(user_id=1, title="a", content="c", mood="good", created_at=now),
+                Diary(user_id=1, title="b", content="c", mood="bad", created_at=days_ago(3)),
+                Diary(user_id=1, title="c", content="c", mood="great", created_at=days_ago(40)),
+            ])
+            db.commit()
+
+            # 删除一条今日日志，汇总随之回退
+            removed = db.query(SystemLog).filter(SystemLog.value == "3km").one()
+            db.delete(removed)
+            db.commit()
+            db.close()
+
+            app = FastAPI()
+            app.include_router(dashboard.router)
+
+            def override_get_db():
+                session = factory()
+                try:
+                    yield session
+                finally:
+                    session.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            response = TestClient(app).get("/api/dashboard", params={"days": 7})
+            assert response.status_code == 200, response.text
+            data = response.json()["data"]
+
+            scores = {s["type"]: s["score"] for s in data["scores"]["systems"]}
+            assert set(scores) == set(SYSTEM_TYPES)
+            # 未创建的系统按满分展示
+            assert scores["FUEL"] == 70 and scores["PHYSICAL"] == 40
+            assert all(score == 100 for t, score in scores.items() if t not in ("FUEL", "PHYSICAL"))
+
+            physical_stats = data["dimensions"]["PHYSICAL"]
+            assert physical_stats["today_logs"] == 1 and physical_stats["period_logs"] == 2
+            assert physical_stats["score_changes"] == 2
+            assert (physical_stats["score_min"], physical_stats["score_max"]) == (40, 45)
+
+            assert data["diet"]["today_deviations"] == 1 and data["diet"]["period_deviations"] == 2
+            assert data["journal"]["today_count"] == 1 and data["journal"]["period_count"] == 2
+            assert data["journal"]["mood_distribution"]["good"] == 1
+            assert data["journal"]["mood_distribution"]["bad"] == 1
+            assert data["journal"]["mood_distribution"]["great"] == 0
+
+            assert len(data["daily"]) == 7 and data["daily"][-1]["date"] == now.date().isoformat()
+            assert data["daily"][-1] == {"date": now.date().isoformat(), "logs": 1, "deviations": 1, "diaries": 1}
+            assert sum(day["logs"] for day in data["daily"]) == 2
+            print("[SUCCESS] Dashboard test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+if __name__ == "__main__":
+    test_dashboard_counts_from_rollups()
@@ -0,0 +1,135 @@
+"""测试日记历史的增量编码与还原（含数据库中的版本记录、关键帧间隔和历史接口）"""
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.api import journals
+from backend.core.config import settings
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine, get_db
+from backend.models.diary import DiaryEditHistory
+from backend.services.diary_history_service import (
+    apply_delta,
+    compute_delta,
+    encode_delta,
+    split_segments,
+)
+
+
+def test_delta_roundtrip():
+    """增量应用后与新文本完全一致"""
+    cases = [
+        ("", "今天天气很好。"),
+        ("今天天气很好。", ""),
+        ("第一句。第二句！第三句？\n第四行", "第一句。第二句改了！第三句？\n第四行\n新增一行"),
+        ("a\nb\nc\n", "a\nc\nd\n"),
+        ("没有标点的一整段", "没有标点的一整段，结尾不同"),
+    ]
+    for old, new in cases:
+        assert "".join(split_segments(old)) == old
+        assert apply_delta(old, compute_delta(old, new)) == new
+    print("[SUCCESS] Delta roundtrip test PASSED!")
+
+
+def test_delta_is_compact():
+    """长文本的局部修改只记录改动的句子"""
+    old = "".join(f"这是第{n}句话，内容比较长一些。" for n in range(200))
+    new = old.replace("这是第100句话", "这是被修改的第100句话")
+    delta = encode_delta(compute_delta(old, new))
+    assert apply_delta(old, compute_delta(old, new)) == new
+    assert len(delta) < len(new) / 20
+    print("[SUCCESS] Compact delta test PASSED!")
+
+
+def test_edits_reconstruct_across_keyframes():
+    """连续编辑超过关键帧间隔，每个版本都能经接口精确还原"""
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(settings, "DIARY_HISTORY_KEYFRAME_INTERVAL", 10):
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+            with writer.begin() as conn:
+                conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+
+            app = FastAPI()
+            app.include_router(journals.router)
+
+            def override_get_db():
+                db = factory()
+                try:
+                    yield db
+                finally:
+                    db.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+            client = TestClient(app)
+
+            paragraphs = [f"第{i}段：今天记录了一些事情。" for i in range(30)]
+            title, content = "日记", "\n".join(paragraphs)
+            response = client.post("/api/journal", json={"title": title, "content": content, "mood": "good"})
+            assert response.status_code == 200, response.text
+            diary_id = response.json()["data"]["id"]
+
+            # 版本 1 为修改前的原文，之后每次编辑追加一个版本
+            expected = [(title, content)]
+            for i in range(14):
+                paragraphs[i * 2] = f"第{i * 2}段：第 {i} 次修改！"
+                if i == 6:
+                    paragraphs.append("新增的结尾。")
+                if i % 5 == 4:
+                    title = f"日记（{i}）"
+                body = {"title": title, "content": "\n".join(paragraphs)}
+                response = client.patch(f"/api/journal/{diary_id}", json=body)
+                assert response.status_code == 200, response.text
+                expected.append((title, body["content"]))
+
+            # 内容被绕过历史直接覆盖（如导入）后再编辑：先补一个关键帧
+            overwritten = "导入覆盖的内容。\n" + "\n".join(paragraphs[1:])
+            with writer.begin() as conn:
+                conn.execute(text("UPDATE diaries SET content = :c WHERE id = :id"), {"c": overwritten, "id": diary_id})
+            expected.append((title, overwritten))
+            final = overwritten + "\n最后一次编辑。"
+            assert client.patch(f"/api/journal/{diary_id}", json={"title": title, "content": final}).status_code == 200
+            expected.append((title, final))
+
+            listing = client.get(f"/api/journal/{diary_id}/history").json()["data"]
+            assert listing["total"] == len(expected) == 17
+            keyframes = sorted(item["version"] for item in listing["items"] if item["is_keyframe"])
+            assert keyframes == [1, 11, 16], keyframes
+
+            db = factory()
+            try:
+                deltas = db.query(DiaryEditHistory).filter(DiaryEditHistory.is_keyframe == 0).all()
+                assert deltas and all(row.content_snapshot == "" for row in deltas)
+                assert all(len(row.content_delta) < row.content_length for row in deltas)
+            finally:
+                db.close()
+
+            for version, (expected_title, expected_content) in enumerate(expected, start=1):
+                data = client.get(f"/api/journal/{diary_id}/history/{version}").json()["data"]
+                assert data["version"] == version
+                assert (data["title"], data["content"]) == (expected_title, expected_content), version
+
+            assert client.get(f"/api/journal/{diary_id}/history/{len(expected) + 1}").status_code == 404
+            assert client.get("/api/journal/999/history").status_code == 404
+            print("[SUCCESS] Diary history reconstruction test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+if __name__ == "__main__":
+    test_delta_roundtrip()
+    test_delta_is_compact()
+    test_edits_reconstruct_across_keyframes()
@@ -0,0 +1,115 @@
+"""测试事件总线（有界队列、合并、投递统计）"""
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.agent.utils import event_bus
+from backend.agent.utils.event_bus import EventBus, AgentEvents
+
+
+def test_event_bus_coalesces_refresh_events():
+    """合并窗口内相同的刷新事件只投递一次，普通事件按顺序全部投递"""
+    bus = EventBus(debounce_ms=50)
+    refreshes, created = [], []
+    bus.subscribe(AgentEvents.DATA_REFRESH, refreshes.append)
+
+    async def on_created(data):
+        created.append(data)
+    bus.subscribe(AgentEvents.JOURNAL_CREATED, on_created)
+
+    async def burst():
+        for i in range(100):
+            await bus.emit(AgentEvents.DATA_REFRESH, {"table": "diaries"})
+            await bus.emit(AgentEvents.JOURNAL_CREATED, {"id": i})
+        bus.emit_sync(AgentEvents.DATA_REFRESH, {"table": "systems"})
+
+    try:
+        asyncio.run(burst())
+        bus.flush(timeout=5)
+
+        assert created == [{"id": i} for i in range(100)]
+        assert sorted(r["table"] for r in refreshes) == ["diaries", "systems"]
+
+        metrics = bus.get_metrics()
+        assert metrics[AgentEvents.DATA_REFRESH]["emitted"] == 101
+        assert metrics[AgentEvents.DATA_REFRESH]["coalesced"] == 99
+        assert metrics[AgentEvents.JOURNAL_CREATED]["delivered"] == 100
+        print(f"[SUCCESS] Coalescing test PASSED! {metrics}")
+    finally:
+        bus.stop()
+
+
+def test_event_bus_bounded_queue_drops_sync_emits():
+    """慢订阅者不阻塞发布方；队列满时 emit_sync 丢弃并计数"""
+    bus = EventBus(queue_size=5)
+    release = threading.Event()
+    bus.subscribe(AgentEvents.MEMORY_CREATED, lambda data: release.wait(5))
+
+    try:
+        start = time.perf_counter()
+        for i in range(20):
+            bus.emit_sync(AgentEvents.MEMORY_CREATED, i)
+        elapsed = time.perf_counter() - start
+        time.sleep(0.1)
+        release.set()
+        bus.flush(timeout=5)
+
+        metrics = bus.get_metrics()[AgentEvents.MEMORY_CREATED]
+        assert elapsed < 0.5
+        assert metrics["emitted"] == 20
+        assert metrics["dropped"] >= 14
+        assert metrics["delivered"] + metrics["dropped"] == 20
+        print(f"[SUCCESS] Back-pressure test PASSED! {metrics}")
+    finally:
+        bus.stop()
+
+
+def test_event_bus_coroutine_subscriber_runs_on_dispatcher_loop():
+    """协程订阅者在分发线程的循环中执行，需转交后才能使用订阅方循环上的对象"""
+    bus = EventBus()
+    seen = {}
+
+    async def scenario():
+        caller_loop = asyncio.get_running_loop()
+        inbox: asyncio.Queue = asyncio.Queue()
+
+        async def on_updated(data):
+            seen["loop"] = asyncio.get_running_loop()
+            # inbox 绑定在订阅方的循环上，直接 await inbox.put() 会跨循环
+            caller_loop.call_soon_threadsafe(inbox.put_nowait, data)
+
+        async def on_failing(data):
+            raise RuntimeError("boom")
+
+        bus.subscribe(AgentEvents.JOURNAL_UPDATED, on_updated)
+        bus.subscribe(AgentEvents.JOURNAL_UPDATED, on_failing)
+        await bus.emit(AgentEvents.JOURNAL_UPDATED, {"id": 1})
+        received = await asyncio.wait_for(inbox.get(), 5)
+        await bus.flush_async()
+        return caller_loop, received
+
+    try:
+        with mock.patch.object(event_bus.logger, "error") as log_error:
+            caller_loop, received = asyncio.run(scenario())
+        assert received == {"id": 1}
+        assert seen["loop"] is bus.loop and seen["loop"] is not caller_loop
+        # 回调异常写入日志并计数，不影响其他订阅者
+        assert log_error.call_count == 1 and "boom" in log_error.call_args[0][0]
+        metrics = bus.get_metrics()[AgentEvents.JOURNAL_UPDATED]
+        assert metrics["delivered"] == 1 and metrics["errors"] == 1
+        print("[SUCCESS] Dispatcher loop test PASSED!")
+    finally:
+        bus.stop()
+
+
+if __name__ == "__main__":
+    test_event_bus_coalesces_refresh_events()
+    test_event_bus_bounded_queue_drops_sync_emits()
+    test_event_bus_coroutine_subscriber_runs_on_dispatcher_loop()
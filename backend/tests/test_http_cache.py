@@ -0,0 +1,147 @@
+"""测试条件 GET（ETag 随写入失效、重启后不误命中、派生表写入递增版本）"""
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from backend.api import users
+from backend.core.http_cache import response_cache
+from backend.db import versions
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine, get_db
+from backend.models.diary import Diary
+
+
+def _with_database(test):
+    """在临时数据库上运行测试（含一个用户）"""
+    def wrapper():
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/app.db"
+            reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+            try:
+                Base.metadata.create_all(bind=writer)
+                with writer.begin() as conn:
+                    conn.execute(text("INSERT INTO users (id, username, display_name) VALUES (1, 'u', 'before')"))
+                test(_create_session_factory(reader, writer))
+            finally:
+                reader.dispose()
+                writer.dispose()
+    wrapper.__name__ = test.__name__
+    wrapper.__doc__ = test.__doc__
+    return wrapper
+
+
+@_with_database
+def test_profile_etag_round_trip(factory):
+    """200 → 304 → 写入 → 200（新 ETag、新数据）"""
+    app = FastAPI()
+    app.include_router(users.router)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+
+    first = client.get("/api/user/profile")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json()["data"]["display_name"] == "before"
+
+    cached = client.get("/api/user/profile", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    assert client.patch("/api/user/profile", json={"display_name": "after"}).status_code == 200
+
+    fresh = client.get("/api/user/profile", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json()["data"]["display_name"] == "after"
+    print("[SUCCESS] ETag round trip test PASSED!")
+
+
+@_with_database
+def test_cached_response_restamps_timestamp(factory):
+    """命中缓存时数据不变，timestamp 为本次响应时间而非首次生成时间"""
+    app = FastAPI()
+    app.include_router(users.router)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    client = TestClient(app)
+    response_cache.clear()
+
+    first = client.get("/api/user/profile")
+    hits = response_cache.get_stats()["hits"]
+    time.sleep(0.01)
+    second = client.get("/api/user/profile")
+    assert response_cache.get_stats()["hits"] == hits + 1
+    assert second.headers["etag"] == first.headers["etag"]
+    assert second.json()["data"] == first.json()["data"]
+    assert set(second.json()) == set(first.json())
+    assert second.json()["timestamp"] > first.json()["timestamp"]
+    print("[SUCCESS] Cached timestamp test PASSED!")
+
+
+def test_epoch_differs_across_restarts():
+    """每次启动的全局纪元不同，重启前保存的 ETag 不会命中"""
+    script = "from backend.db.versions import get_versions; print(get_versions(['users']))"
+    cwd = str(project_root.parent)
+    outputs = {
+        subprocess.run([sys.executable, "-c", script], cwd=cwd, capture_output=True, text=True, check=True).stdout
+        for _ in range(2)
+    }
+    assert len(outputs) == 2
+    print("[SUCCESS] Epoch nonce test PASSED!")
+
+
+@_with_database
+def test_derived_table_writes_bump_versions(factory):
+    """每日汇总和标签索引经由连接直接写入，提交后同样递增版本"""
+    before = versions.get_versions(["daily_rollups", "diary_tags"])
+    db = factory()
+    try:
+        db.add(Diary(user_id=1, title="t", content="c", tags=["work"]))
+        db.commit()
+    finally:
+        db.close()
+    after = versions.get_versions(["daily_rollups", "diary_tags"])
+    assert after[1] > before[1] and after[2] > before[2]
+
+    # 回滚的事务不递增
+    db = factory()
+    try:
+        db.add(Diary(user_id=1, title="t2", content="c", tags=["home"]))
+        db.flush()
+        db.rollback()
+    finally:
+        db.close()
+    assert versions.get_versions(["daily_rollups", "diary_tags"]) == after
+    print("[SUCCESS] Derived table version test PASSED!")
+
+
+if __name__ == "__main__":
+    test_profile_etag_round_trip()
+    test_cached_response_restamps_timestamp()
+    test_epoch_differs_across_restarts()
+    test_derived_table_writes_bump_versions()
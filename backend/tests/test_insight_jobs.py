@@ -0,0 +1,136 @@
+"""测试洞察后台任务（独立的每日额度、临时性失败退避重试、失败的每日任务可重建）"""
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.agent.llm import LLMError, ServerError
+from backend.core.config import settings
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine
+from backend.models.dimension import System
+from backend.models.insight import Insight, InsightJob
+from backend.models.user import User
+from backend.schemas.insight import InsightGenerateRequest
+from backend.services.insight_job_service import InsightJobService
+from backend.services.insight_service import InsightService
+from backend.services.user_service import UserService
+
+
+def _with_database(test):
+    """在临时数据库上运行测试（含已配置 AI 的用户和一个维度）"""
+    def wrapper():
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/app.db"
+            reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+            factory = _create_session_factory(reader, writer)
+            try:
+                Base.metadata.create_all(bind=writer)
+                db = factory()
+                db.add(User(id=1, username="u", ai_config={
+                    "provider": "deepseek", "api_key": UserService.encrypt_api_key("sk-test")
+                }))
+                db.add(System(user_id=1, type="FUEL", score=60))
+                db.commit()
+                db.close()
+                with mock.patch.object(InsightService, "create_llm_client", return_value=object()):
+                    test(factory)
+            finally:
+                reader.dispose()
+                writer.dispose()
+    wrapper.__name__ = test.__name__
+    wrapper.__doc__ = test.__doc__
+    return wrapper
+
+
+async def _fake_insights(llm_client, system_scores):
+    return [{"category": "测试", "insight": f"评分 {system_scores}"}]
+
+
+def _run_job(factory, trigger: str):
+    db = factory()
+    try:
+        job, created = InsightJobService.create_job(db, trigger)
+        assert created
+        job = asyncio.run(InsightJobService.process_job(db, job.id))
+        return job.status, job.attempts, job.error
+    finally:
+        db.close()
+
+
+@_with_database
+def test_background_jobs_use_own_budget(factory):
+    """评分变化任务不占用用户的每日次数"""
+    with mock.patch.object(settings, "INSIGHT_DAILY_LIMIT", 1), \
+            mock.patch.object(InsightService, "call_ai_api", side_effect=_fake_insights):
+        assert _run_job(factory, "score_change")[0] == "succeeded"
+
+        db = factory()
+        try:
+            db.query(System).update({System.score: 80})
+            db.commit()
+            data, status_code = asyncio.run(InsightService.generate_insight(db, InsightGenerateRequest()))
+            assert status_code == 200
+            assert "_limit_reached" not in data and data["_remaining_today"] == 0
+            assert [i.background for i in db.query(Insight).order_by(Insight.id)] == [True, False]
+        finally:
+            db.close()
+    print("[SUCCESS] Background budget test PASSED!")
+
+
+@_with_database
+def test_provider_failure_is_not_retried_by_job(factory):
+    """非临时性的提供商失败时任务只调用一次生成并记为 failed"""
+    ai_call = mock.AsyncMock(side_effect=LLMError("provider down"))
+    with mock.patch.object(InsightService, "call_ai_api", ai_call):
+        status, attempts, error = _run_job(factory, "score_change")
+    assert status == "failed" and attempts == 1 and "provider down" in error
+    assert ai_call.await_count == 1
+    print("[SUCCESS] Single retry layer test PASSED!")
+
+
+@_with_database
+def test_transient_failure_retried_then_succeeds(factory):
+    """服务端错误后退避重试，第二次成功"""
+    ai_call = mock.AsyncMock(side_effect=[ServerError("503 busy"), [{"category": "测试", "insight": "ok"}]])
+    with mock.patch.object(settings, "INSIGHT_JOB_RETRY_BASE_DELAY", 0), \
+            mock.patch.object(InsightService, "call_ai_api", ai_call):
+        status, attempts, error = _run_job(factory, "score_change")
+    assert status == "succeeded" and attempts == 2 and error is None
+    assert ai_call.await_count == 2
+    print("[SUCCESS] Transient retry test PASSED!")
+
+
+@_with_database
+def test_retries_exhausted_and_failed_daily_job_recreated(factory):
+    """重试用尽记为 failed，当天的每日检查仍会重新创建任务"""
+    ai_call = mock.AsyncMock(side_effect=ServerError("503 busy"))
+    with mock.patch.object(settings, "INSIGHT_JOB_RETRY_BASE_DELAY", 0), \
+            mock.patch.object(InsightService, "call_ai_api", ai_call):
+        status, attempts, error = _run_job(factory, "daily")
+    assert status == "failed" and "503 busy" in error
+    assert attempts == ai_call.await_count == settings.INSIGHT_JOB_MAX_RETRIES + 1
+
+    db = factory()
+    try:
+        job = InsightJobService.create_auto_job(db, "daily")
+        assert job is not None and job.status == "pending"
+        # 已有未失败的每日任务时跳过
+        assert InsightJobService.create_auto_job(db, "daily") is None
+        assert db.query(InsightJob).count() == 2
+    finally:
+        db.close()
+    print("[SUCCESS] Retry exhaustion test PASSED!")
+
+
+if __name__ == "__main__":
+    test_background_jobs_use_own_budget()
+    test_provider_failure_is_not_retried_by_job()
+    test_transient_failure_retried_then_succeeds()
+    test_retries_exhausted_and_failed_daily_job_recreated()
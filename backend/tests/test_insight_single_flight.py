@@ -0,0 +1,82 @@
+"""测试洞察生成去重（并发请求共享一次 AI 调用、评分未变时复用）"""
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine
+from backend.models.dimension import System
+from backend.models.insight import Insight
+from backend.models.user import User
+from backend.schemas.insight import InsightGenerateRequest
+from backend.services.insight_service import InsightService
+from backend.services.user_service import UserService
+
+
+def test_concurrent_generation_shares_one_ai_call():
+    """并发生成只调用一次 AI；评分未变时复用已有洞察，不消耗次数"""
+    calls = []
+
+    async def fake_call_ai_api(llm_client, system_scores):
+        calls.append(dict(system_scores))
+        await asyncio.sleep(0.1)
+        return [{"category": "测试", "insight": "保持节奏"}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+            db = factory()
+            db.add(User(id=1, username="u", ai_config={
+                "provider": "deepseek", "api_key": UserService.encrypt_api_key("sk-test")
+            }))
+            db.add_all([System(user_id=1, type="FUEL", score=60), System(user_id=1, type="MIND", score=70)])
+            db.commit()
+            db.close()
+
+            async def generate():
+                session = factory()
+                try:
+                    return await InsightService.generate_insight(session, InsightGenerateRequest())
+                finally:
+                    session.close()
+
+            async def run_all():
+                return await asyncio.gather(*(generate() for _ in range(3)))
+
+            with mock.patch.object(InsightService, "create_llm_client", return_value=object()), \
+                    mock.patch.object(InsightService, "call_ai_api", side_effect=fake_call_ai_api):
+                results = asyncio.run(run_all())
+                assert [status for _, status in results] == [200] * 3
+                assert len({data["id"] for data, _ in results}) == 1
+                assert len(calls) == 1
+
+                # 评分未变化：复用已有洞察，不再调用 AI
+                data, status_code = asyncio.run(generate())
+                assert status_code == 200 and data["_reused"] is True
+                assert data["id"] == results[0][0]["id"]
+                assert len(calls) == 1
+
+            db = factory()
+            try:
+                insight = db.query(Insight).one()
+                assert insight.score_hash == InsightService.compute_score_hash({"FUEL": 60, "MIND": 70})
+            finally:
+                db.close()
+            print("[SUCCESS] Insight single-flight test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+if __name__ == "__main__":
+    test_concurrent_generation_shares_one_ai_call()
@@ -0,0 +1,72 @@
+"""测试日志队列管道、请求 ID 上下文和追踪日志限速"""
+import io
+import json
+import logging
+import sys
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.core.logging_config import TraceSampler, request_id_var, setup_logging, stop_logging
+
+
+def _trace_record(trace: str, level: int = logging.INFO) -> logging.LogRecord:
+    record = logging.LogRecord("agent", level, __file__, 0, "[ReAct] Thought: %s", ("x",), None)
+    record.trace = trace
+    return record
+
+
+def test_trace_sampler():
+    """超出速率的追踪日志被丢弃，恢复后报告丢弃条数；普通日志和警告不受影响"""
+    clock = [100.0]
+    with mock.patch("backend.core.logging_config.time.monotonic", lambda: clock[0]):
+        sampler = TraceSampler(rate=1, burst=2)
+        assert sampler.filter(_trace_record("thought"))
+        assert sampler.filter(_trace_record("thought"))
+        assert not sampler.filter(_trace_record("thought"))
+        assert not sampler.filter(_trace_record("thought"))
+        # 其他 trace 独立计数
+        assert sampler.filter(_trace_record("observation"))
+        # 警告和不带 trace 的记录始终放行
+        assert sampler.filter(_trace_record("thought", logging.WARNING))
+        assert sampler.filter(logging.LogRecord("agent", logging.INFO, __file__, 0, "plain", None, None))
+        assert sampler.get_stats() == {"thought": 2}
+
+        clock[0] += 1
+        record = _trace_record("thought")
+        assert sampler.filter(record)
+        assert record.getMessage().endswith("(+2 suppressed)")
+        assert sampler.get_stats() == {}
+    print("[SUCCESS] Trace sampler test PASSED!")
+
+
+def test_queue_pipeline_request_id():
+    """记录经队列由后台线程写出，并带上产生日志时的请求 ID"""
+    stream = io.StringIO()
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    try:
+        setup_logging(stream=stream, file_logging=False)
+        token = request_id_var.set("req-123")
+        payload = {"count": 1}
+        logging.getLogger("test.pipeline").info("payload=%s", payload)
+        payload["count"] = 2  # 入队后修改参数不影响已记录的消息
+        request_id_var.reset(token)
+        stop_logging()
+    finally:
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    record = next(line for line in lines if line["logger"] == "test.pipeline")
+    assert record["message"] == "payload={'count': 1}"
+    assert record["request_id"] == "req-123"
+    print("[SUCCESS] Queue pipeline test PASSED!")
+
+
+if __name__ == "__main__":
+    test_trace_sampler()
+    test_queue_pipeline_request_id()
@@ -0,0 +1,200 @@
+"""测试版本化迁移"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from sqlalchemy import create_engine, event, inspect, text
+
+
+def test_migrations_upgrade_existing_database():
+    """旧数据库（有表无索引）应补齐索引，并在再次启动时跳过"""
+    from backend.db.base import Base
+    import backend.models  # noqa: F401  注册所有模型
+    from backend.db.migrations import run_migrations, get_current_version, LATEST_VERSION
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/legacy.db")
+        try:
+            # 1. 模拟旧数据库：建表后删除迁移负责的索引
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as conn:
+                conn.execute(text("DROP INDEX ix_diaries_user_created"))
+                conn.execute(text("DROP INDEX ix_agent_messages_session_timestamp"))
+
+            # 2. 首次执行迁移
+            applied = run_migrations(engine)
+            print(f"[INFO] Applied migrations: {applied}")
+            assert applied == LATEST_VERSION
+
+            index_names = {ix["name"] for ix in inspect(engine).get_indexes("diaries")}
+            assert "ix_diaries_user_created" in index_names
+            assert "ix_diaries_mood" in index_names
+
+            with engine.connect() as conn:
+                assert get_current_version(conn) == LATEST_VERSION
+
+            # 3. 已是最新版本时直接跳过
+            assert run_migrations(engine) == 0
+            print("[SUCCESS] Migration test PASSED!")
+        finally:
+            engine.dispose()
+
+
+def test_migrations_backfill_session_summary():
+    """已有会话的最新消息摘要由迁移回填"""
+    from backend.db.base import Base
+    import backend.models  # noqa: F401  注册所有模型
+    from backend.db.migrations import run_migrations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/legacy.db")
+        try:
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "INSERT INTO agent_sessions (session_id, message_count, created_at, updated_at, is_active) "
+                    "VALUES ('s1', 2, '2026-01-01 00:00:00', '2026-01-01 00:00:00', 1)"
+                ))
+                conn.execute(text(
+                    "INSERT INTO agent_messages (session_id, role, content, timestamp) VALUES "
+                    "('s1', 'user', 'hello', '2026-01-01 00:00:01'), "
+                    "('s1', 'assistant', :reply, '2026-01-01 00:00:02')"
+                ), {"reply": "x" * 80})
+
+            run_migrations(engine)
+
+            with engine.connect() as conn:
+                row = conn.execute(text(
+                    "SELECT last_message_preview, last_message_role FROM agent_sessions"
+                )).one()
+            assert row == ("x" * 50, "assistant")
+            print("[SUCCESS] Session summary backfill test PASSED!")
+        finally:
+            engine.dispose()
+
+
+def test_migrations_backfill_daily_rollups():
+    """每日汇总由迁移从原始表回填"""
+    from backend.db.base import Base
+    import backend.models  # noqa: F401  注册所有模型
+    from backend.db.migrations import run_migrations
+    from backend.db.session import local_now
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/legacy.db")
+        # 原始表的 server_default 使用应用注册的 localnow()
+        event.listen(engine, "connect", lambda conn, _: conn.create_function("localnow", 0, local_now))
+        try:
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as conn:
+                conn.execute(text("DROP TABLE daily_rollups"))
+                conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+                conn.execute(text("INSERT INTO systems (id, user_id, type, score) VALUES (1, 1, 'FUEL', 80)"))
+                conn.execute(text(
+                    "INSERT INTO system_score_logs (system_id, old_score, new_score, created_at) VALUES "
+                    "(1, 100, 90, '2026-01-01 08:00:00'), (1, 90, 80, '2026-01-01 09:00:00')"
+                ))
+                conn.execute(text(
+                    "INSERT INTO meal_deviations (system_id, description, occurred_at) VALUES "
+                    "(1, 'a', '2026-01-01 08:00:00'), (1, 'b', '2026-01-01 09:00:00')"
+                ))
+                conn.execute(text(
+                    "INSERT INTO diaries (user_id, title, content, mood, created_at) VALUES "
+                    "(1, 't', 'c', 'good', '2026-01-01 10:00:00'), (1, 't', 'c', 'bad', '2026-01-02 10:00:00')"
+                ))
+
+            run_migrations(engine)
+
+            with engine.connect() as conn:
+                rows = conn.execute(text(
+                    "SELECT date, dimension, score_count, score_min, score_last, deviation_count, "
+                    "diary_count, mood_good, mood_bad FROM daily_rollups ORDER BY date, dimension"
+                )).fetchall()
+            assert [tuple(row) for row in rows] == [
+                ("2026-01-01", "FUEL", 2, 80, 80, 2, 0, 0, 0),
+                ("2026-01-01", "JOURNAL", 0, None, None, 0, 1, 1, 0),
+                ("2026-01-02", "JOURNAL", 0, None, None, 0, 1, 0, 1),
+            ]
+            print("[SUCCESS] Daily rollups backfill test PASSED!")
+        finally:
+            engine.dispose()
+
+
+def test_migrations_backfill_diary_tags():
+    """日记标签索引由迁移从 JSON 列回填（兼容字符串形式的历史数据）"""
+    from backend.db.base import Base
+    import backend.models  # noqa: F401  注册所有模型
+    from backend.db.migrations import run_migrations
+    from backend.db.session import local_now
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/legacy.db")
+        event.listen(engine, "connect", lambda conn, _: conn.create_function("localnow", 0, local_now))
+        try:
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as conn:
+                conn.execute(text("DROP TABLE diary_tags"))
+                conn.execute(text(
+                    "INSERT INTO diaries (id, user_id, title, content, tags) VALUES "
+                    "(1, 1, 't', 'c', :a), (2, 1, 't', 'c', :b), (3, 1, 't', 'c', NULL)"
+                ), {"a": '["工作", " 工作 ", "运动"]', "b": '"读书, 旅行"'})
+
+            run_migrations(engine)
+
+            with engine.connect() as conn:
+                rows = conn.execute(text("SELECT diary_id, tag FROM diary_tags ORDER BY diary_id, tag")).fetchall()
+            assert sorted(tuple(row) for row in rows) == sorted([
+                (1, "工作"), (1, "运动"), (2, "读书"), (2, "旅行"),
+            ])
+            print("[SUCCESS] Diary tags backfill test PASSED!")
+        finally:
+            engine.dispose()
+
+def test_migration_tables_match_models():
+    """迁移中手写的建表语句与当前模型建出的表结构一致"""
+    from backend.db.base import Base
+    import backend.models  # noqa: F401  注册所有模型
+    from backend.db.migrations import run_migrations
+
+    tables = ("insight_jobs", "daily_rollups", "diary_tags")
+
+    def schema(engine):
+        inspector = inspect(engine)
+        return {
+            table: (
+                [(c["name"], str(c["type"]), c["nullable"], c["default"]) for c in inspector.get_columns(table)],
+                sorted((ix["name"], tuple(ix["column_names"])) for ix in inspector.get_indexes(table)),
+                sorted(tuple(u["column_names"]) for u in inspector.get_unique_constraints(table)),
+                inspector.get_pk_constraint(table)["constrained_columns"],
+            )
+            for table in tables
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        expected_engine = create_engine(f"sqlite:///{tmp}/models.db")
+        engine = create_engine(f"sqlite:///{tmp}/legacy.db")
+        try:
+            Base.metadata.create_all(bind=expected_engine)
+            Base.metadata.create_all(bind=engine)
+            with engine.begin() as conn:
+                for table in tables:
+                    conn.execute(text(f"DROP TABLE {table}"))
+
+            run_migrations(engine)
+            assert schema(engine) == schema(expected_engine)
+            print("[SUCCESS] Migration table schema test PASSED!")
+        finally:
+            engine.dispose()
+            expected_engine.dispose()
+
+
+if __name__ == "__main__":
+    test_migrations_upgrade_existing_database()
+    test_migrations_backfill_session_summary()
+    test_migrations_backfill_daily_rollups()
+    test_migrations_backfill_diary_tags()
+    test_migration_tables_match_models()
@@ -0,0 +1,190 @@
+"""测试 PIN 锁定状态（内存计数，写穿到 User 字段）"""
+import asyncio
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from backend.api import auth
+from backend.core.config import settings
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine, get_db
+from backend.db.versions import bump_all
+from backend.models.user import User
+from backend.services import auth_service
+from backend.services.auth_service import AuthService, PinLockState
+
+
+def _user(**fields):
+    return SimpleNamespace(id=1, pin_attempts=fields.get("pin_attempts", 0),
+                           pin_locked_until=fields.get("pin_locked_until"))
+
+
+def test_failures_lock_and_expire():
+    """失败达到上限后锁定并写回字段，过期后重置"""
+    clock = [datetime(2026, 1, 1, 12, 0, 0)]
+    state = PinLockState(clock=lambda: clock[0])
+    user = _user()
+
+    for i in range(settings.PIN_MAX_ATTEMPTS - 1):
+        remaining, locked = state.record_failure(user)
+        assert locked == 0
+        assert remaining == settings.PIN_MAX_ATTEMPTS - i - 1
+        assert user.pin_attempts == i + 1
+
+    remaining, locked = state.record_failure(user)
+    assert locked == settings.PIN_LOCK_DURATION_SECONDS
+    assert user.pin_locked_until == clock[0] + timedelta(seconds=locked)
+    assert state.check(user) == locked
+
+    clock[0] += timedelta(seconds=locked + 1)
+    assert state.check(user) == 0
+    assert user.pin_attempts == 0 and user.pin_locked_until is None
+    print("[SUCCESS] Lockout test PASSED!")
+
+
+def test_state_survives_stale_session_objects():
+    """不同会话读到的旧字段值不会覆盖内存计数"""
+    state = PinLockState()
+    first, second = _user(), _user()
+    state.record_failure(first)
+    state.record_failure(second)
+    assert second.pin_attempts == 2
+    print("[SUCCESS] Concurrent count test PASSED!")
+
+
+def test_reload_after_epoch_change():
+    """数据库纪元变化（备份恢复）后从数据库字段重新加载"""
+    state = PinLockState()
+    state.record_failure(_user())
+    bump_all()
+    restored = _user(pin_attempts=0)
+    assert state.check(restored) == 0
+    state.record_failure(restored)
+    assert restored.pin_attempts == 1
+
+    locked_until = datetime.now() + timedelta(seconds=60)
+    bump_all()
+    assert state.remaining_seconds(_user(pin_locked_until=locked_until.isoformat())) > 0
+    print("[SUCCESS] Reload test PASSED!")
+
+
+def test_reservation_blocks_concurrent_attempts():
+    """进行中的验证占满剩余次数后拒绝新的验证；校验期间被锁定时成功作废"""
+    state = PinLockState()
+    user = _user()
+    for _ in range(settings.PIN_MAX_ATTEMPTS):
+        assert state.reserve(user) == (0, False)
+    assert state.reserve(user) == (0, True)
+
+    state.release()
+    assert state.reserve(user) == (0, False)
+    for _ in range(settings.PIN_MAX_ATTEMPTS - 1):
+        state.record_failure(user, reserved=True)
+    assert state.pending == 1
+    state.record_failure(_user(), reserved=False)  # 其他途径触发锁定
+    assert state.record_success(user, reserved=True) > 0
+    assert state.pending == 0 and state.attempts == settings.PIN_MAX_ATTEMPTS
+    print("[SUCCESS] Reservation test PASSED!")
+
+
+def test_verify_async_releases_reservation_when_commit_fails():
+    """预检后的提交失败时释放预占，不会永久占用一次尝试"""
+    state = PinLockState()
+    user = SimpleNamespace(id=1, pin_hash="hash", pin_attempts=0, pin_locked_until=None)
+
+    class FailingSession:
+        def commit(self):
+            raise RuntimeError("commit failed")
+
+    with patch.object(auth_service, "_pin_lock_state", state), \
+            patch.object(AuthService, "get_user", return_value=user):
+        for _ in range(settings.PIN_MAX_ATTEMPTS + 1):
+            try:
+                asyncio.run(AuthService.verify_pin_async(FailingSession(), "123456"))
+            except RuntimeError:
+                pass
+            else:
+                raise AssertionError("commit error was swallowed")
+        assert state.pending == 0
+        assert state.reserve(user) == (0, False)
+    print("[SUCCESS] Commit failure release test PASSED!")
+
+
+def _run_concurrent_verifies(pins, pool_size=None):
+    """在临时数据库上通过 /api/pin/verify 并发验证（会话由依赖注入管理），返回状态码列表"""
+    overrides = {"PIN_MAX_ATTEMPTS": 3}
+    if pool_size is not None:
+        overrides.update(DB_READ_POOL_SIZE=pool_size, DB_READ_POOL_OVERFLOW=0, DB_POOL_TIMEOUT=3)
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            patch.multiple(settings, **overrides), \
+            patch.object(auth_service, "_pin_lock_state", PinLockState()):
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+            db = factory()
+            db.add(User(id=1, username="u", pin_hash=AuthService.hash_pin("123456")))
+            db.commit()
+            db.close()
+
+            app = FastAPI()
+            app.include_router(auth.router)
+
+            def override_get_db():
+                session = factory()
+                try:
+                    yield session
+                finally:
+                    session.close()
+
+            app.dependency_overrides[get_db] = override_get_db
+
+            async def run():
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    requests = (client.post("/api/pin/verify", json={"pin": pin}) for pin in pins)
+                    responses = await asyncio.wait_for(asyncio.gather(*requests), timeout=20)
+                return [response.status_code for response in responses]
+
+            return asyncio.run(run())
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+def test_concurrent_verifies_respect_lockout():
+    """并发的错误尝试不能越过锁定：上限 3 次时 7 错 1 对，最多 3 次进入 bcrypt 且正确的 PIN 不能通过"""
+    statuses = _run_concurrent_verifies(["000000"] * 7 + ["123456"])
+    assert statuses.count(401) == 2, statuses
+    assert statuses.count(429) == 6, statuses
+    assert 200 not in statuses
+    print("[SUCCESS] Concurrent lockout test PASSED!")
+
+
+def test_verify_releases_connection_during_hash():
+    """bcrypt 期间和拒绝后不占用读连接：并发验证多于读连接池时不会卡住事件循环"""
+    statuses = _run_concurrent_verifies(["123456"] * 8, pool_size=2)
+    assert statuses.count(200) >= 3 and set(statuses) <= {200, 429}, statuses
+    print("[SUCCESS] Connection release test PASSED!")
+
+
+if __name__ == "__main__":
+    test_failures_lock_and_expire()
+    test_state_survives_stale_session_objects()
+    test_reload_after_epoch_change()
+    test_reservation_blocks_concurrent_attempts()
+    test_verify_async_releases_reservation_when_commit_fails()
+    test_concurrent_verifies_respect_lockout()
+    test_verify_releases_connection_during_hash()
@@ -0,0 +1,76 @@
+"""测试慢查询分析器（失败语句不打乱计时、诊断接口返回统计）"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from backend.db.profiler import QueryProfiler, query_profiler
+
+
+def test_failed_statement_does_not_leak_start_time():
+    """执行失败的语句不记录，也不在连接上残留计时起点"""
+    engine = create_engine("sqlite://")
+    profiler = QueryProfiler(threshold_ms=50)
+    profiler.install(engine)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                try:
+                    conn.execute(text("SELECT * FROM missing_table"))
+                except OperationalError:
+                    pass
+            # 失败语句的计时起点不残留在连接上（长连接上会无限累积）
+            assert not conn.info.get("_query_start")
+            conn.execute(text("SELECT 1"))
+        assert profiler.top() == []
+    finally:
+        profiler.uninstall(engine)
+        engine.dispose()
+    print("[SUCCESS] Failed statement test PASSED!")
+
+
+def test_slow_query_endpoint():
+    """诊断接口返回按指纹聚合的慢查询和执行计划"""
+    from backend.api.diagnostics import router
+
+    engine = create_engine("sqlite://")
+    saved_threshold = query_profiler.threshold_ms
+    query_profiler.threshold_ms = 0
+    query_profiler.reset()
+    query_profiler.install(engine)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)"))
+            conn.execute(text("INSERT INTO notes (body) VALUES ('a'), ('b')"))
+            for body in ("a", "b"):
+                conn.execute(text("SELECT * FROM notes WHERE body = :body"), {"body": body})
+
+        app = FastAPI()
+        app.include_router(router)
+        client = TestClient(app)
+        data = client.get("/api/diagnostics/slow-queries", params={"order_by": "count"}).json()["data"]
+        assert data["enabled"] and data["threshold_ms"] == 0
+        select = next(q for q in data["queries"] if q["fingerprint"].startswith("SELECT * FROM notes"))
+        assert select["count"] == 2
+        assert select["full_scan"]
+
+        assert client.delete("/api/diagnostics/slow-queries").json()["data"]["cleared"] >= 1
+        assert client.get("/api/diagnostics/slow-queries").json()["data"]["queries"] == []
+    finally:
+        query_profiler.uninstall(engine)
+        query_profiler.threshold_ms = saved_threshold
+        query_profiler.reset()
+        engine.dispose()
+    print("[SUCCESS] Slow query endpoint test PASSED!")
+
+
+if __name__ == "__main__":
+    test_failed_statement_does_not_leak_start_time()
+    test_slow_query_endpoint()
@@ -0,0 +1,46 @@
+"""测试令牌桶限流器"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from backend.core.middleware import RateLimiter
+
+
+def test_rate_limiter_burst_and_weights():
+    """突发容量耗尽后拒绝；加权请求消耗更多令牌"""
+    limiter = RateLimiter()
+    limiter.rate_limits["default"] = {"capacity": 10, "refill_rate": 0.001}
+
+    results = [limiter.is_allowed("1.1.1.1")[0] for _ in range(11)]
+    assert results == [True] * 10 + [False]
+
+    cost = limiter.get_cost("POST", "/api/agent/chat/stream")
+    assert cost == 5
+    assert limiter.get_cost("GET", "/api/agent/chat") == 1
+
+    allowed, info = limiter.is_allowed("2.2.2.2", tokens=cost)
+    assert allowed and info["remaining"] == 5
+    print("[SUCCESS] Burst and weight test PASSED!")
+
+
+def test_rate_limiter_memory_cap_and_idle_eviction():
+    """桶数量不超过上限，空闲桶从 LRU 队首淘汰"""
+    limiter = RateLimiter(max_buckets=100, idle_seconds=60)
+    for n in range(1000):
+        limiter.is_allowed(f"10.0.{n // 256}.{n % 256}")
+    assert len(limiter.buckets) == 100
+
+    # 模拟时间流逝：除最后一个外全部空闲
+    for bucket in list(limiter.buckets.values())[:-1]:
+        bucket.last_update -= 120
+    limiter.is_allowed("10.0.3.231")  # 最近访问过的键
+    assert len(limiter.buckets) == 1
+    print("[SUCCESS] Eviction test PASSED!")
+
+
+if __name__ == "__main__":
+    test_rate_limiter_burst_and_weights()
+    test_rate_limiter_memory_cap_and_idle_eviction()
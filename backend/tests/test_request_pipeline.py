@@ -0,0 +1,87 @@
+"""测试请求处理中间件（限流不分发、超时 408、流式响应不受超时截断）"""
+import asyncio
+import sys
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.core import middleware
+from backend.core.middleware import RateLimiter, RequestPipelineMiddleware
+
+
+def _make_client(timeout: float = 0.2):
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/fast")
+    async def fast():
+        app.state.calls += 1
+        return {"ok": True}
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(timeout * 5)
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(5):
+                await asyncio.sleep(timeout / 2)
+                yield f"chunk{i};"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(RequestPipelineMiddleware, timeout=timeout)
+    return app, TestClient(app)
+
+
+def test_rate_limited_request_is_not_dispatched():
+    """限流拒绝的请求返回 429，业务处理函数不执行"""
+    limiter = RateLimiter()
+    limiter.rate_limits["default"] = {"capacity": 2, "refill_rate": 0.001}
+    app, client = _make_client()
+    with mock.patch.object(middleware, "rate_limiter", limiter):
+        statuses = [client.get("/fast").status_code for _ in range(4)]
+        rejected = client.get("/fast")
+
+    assert statuses == [200, 200, 429, 429]
+    assert rejected.status_code == 429 and rejected.json()["code"] == 429
+    assert rejected.headers["x-ratelimit-remaining"] == "0"
+    assert "x-request-id" in rejected.headers and "x-content-type-options" in rejected.headers
+    assert app.state.calls == 2
+    print("[SUCCESS] Rate limit dispatch test PASSED!")
+
+
+def test_timeout_before_response_returns_408():
+    """响应开始前超时返回 408"""
+    _, client = _make_client()
+    with mock.patch.object(middleware, "rate_limiter", RateLimiter()):
+        response = client.get("/slow")
+    assert response.status_code == 408
+    assert response.json()["data"] == {"timeout": 0.2}
+    assert "x-ratelimit-limit" in response.headers
+    print("[SUCCESS] Timeout test PASSED!")
+
+
+def test_streaming_response_outlives_timeout():
+    """响应开始后超时取消，流式响应完整输出"""
+    _, client = _make_client()
+    with mock.patch.object(middleware, "rate_limiter", RateLimiter()):
+        response = client.get("/stream")
+    assert response.status_code == 200
+    assert response.text == "".join(f"chunk{i};" for i in range(5))
+    assert "x-process-time" in response.headers
+    print("[SUCCESS] Streaming timeout test PASSED!")
+
+
+if __name__ == "__main__":
+    test_rate_limited_request_is_not_dispatched()
+    test_timeout_before_response_returns_408()
+    test_streaming_response_outlives_timeout()
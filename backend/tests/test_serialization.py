@@ -0,0 +1,65 @@
+"""测试统一 JSON 序列化（orjson 与标准库回退输出一致）"""
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from pydantic import BaseModel
+
+from backend.core import serialization
+
+
+class _Item(BaseModel):
+    name: str
+    created_at: datetime
+
+
+SAMPLE = {
+    "text": "中文内容",
+    "created_at": datetime(2026, 3, 2, 9, 30, 33, 120000),
+    "day": date(2026, 3, 2),
+    "amount": Decimal("12.5"),
+    "tags": ["工作"],
+    "item": _Item(name="a", created_at=datetime(2026, 1, 1, 8, 0)),
+    1: None,
+}
+
+
+def test_roundtrip():
+    """序列化后再解析，得到 JSON 兼容的等价结构"""
+    data = serialization.loads(serialization.dumps(SAMPLE))
+    assert data["text"] == "中文内容"
+    assert data["created_at"] == "2026-03-02T09:30:33.120000"
+    assert data["day"] == "2026-03-02"
+    assert data["amount"] == 12.5
+    assert data["item"] == {"name": "a", "created_at": "2026-01-01T08:00:00"}
+    assert data["1"] is None
+    print("[SUCCESS] Roundtrip test PASSED!")
+
+
+def test_stdlib_fallback_matches():
+    """未安装 orjson 时输出与 orjson 完全一致（不转义中文、紧凑分隔符）"""
+    fast = serialization.dumps(SAMPLE)
+    with mock.patch.object(serialization, "orjson", None):
+        fallback = serialization.dumps(SAMPLE)
+        assert serialization.loads(memoryview(fallback)) == serialization.loads(fast)
+    assert fallback == fast
+    print("[SUCCESS] Stdlib fallback test PASSED!")
+
+
+def test_lenient():
+    """lenient 模式下无法序列化的对象转为字符串"""
+    data = serialization.loads(serialization.dumps({"obj": object()}, lenient=True))
+    assert data["obj"].startswith("<object object")
+    print("[SUCCESS] Lenient test PASSED!")
+
+
+if __name__ == "__main__":
+    test_roundtrip()
+    test_stdlib_fallback_matches()
+    test_lenient()
@@ -0,0 +1,121 @@
+"""测试 async 路径在 await 期间归还读连接（连接池耗尽时不阻塞事件循环）"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from sqlalchemy import text
+
+from backend.core.config import settings
+from backend.db.base import Base
+import backend.models  # noqa: F401  注册所有模型
+from backend.db.session import _create_session_factory, create_db_engine
+from backend.services import attachment_store
+from backend.services.attachment_service import AttachmentService
+from backend.services.attachment_store import AttachmentStore
+
+
+async def _slow_chunks(data: bytes):
+    for i in range(0, len(data), 100):
+        await asyncio.sleep(0.01)
+        yield data[i:i + 100]
+
+
+def test_concurrent_uploads_with_single_reader_connection():
+    """读连接池只有 1 个连接时，多个并发上传仍能完成"""
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch.multiple(settings, DB_READ_POOL_SIZE=1, DB_READ_POOL_OVERFLOW=0, DB_POOL_TIMEOUT=2):
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        store = mock.patch.object(attachment_store, "_store_instance", AttachmentStore(root=Path(tmp) / "files"))
+        try:
+            Base.metadata.create_all(bind=writer)
+            with writer.begin() as conn:
+                conn.execute(text("INSERT INTO users (id, username) VALUES (1, 'u')"))
+                conn.execute(text("INSERT INTO diaries (id, user_id, title, content) VALUES (1, 1, 't', 'c')"))
+
+            async def upload(n: int):
+                db = factory()
+                try:
+                    return await AttachmentService.upload_attachment(
+                        db, 1, f"photo{n}.png", _slow_chunks(bytes([n]) * 500)
+                    )
+                finally:
+                    db.close()
+
+            async def run_all():
+                return await asyncio.gather(*(upload(n) for n in range(4)))
+
+            with store:
+                results = asyncio.run(run_all())
+            assert [status for _, status in results] == [201] * 4
+            print("[SUCCESS] Concurrent upload test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+def test_write_held_across_await_fails_fast():
+    """另一个任务写入后未提交就 await 时，同一事件循环上的写入立即报错而不是阻塞事件循环"""
+    with tempfile.TemporaryDirectory() as tmp, mock.patch.object(settings, "DB_POOL_TIMEOUT", 5):
+        url = f"sqlite:///{tmp}/app.db"
+        reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+        factory = _create_session_factory(reader, writer)
+        try:
+            Base.metadata.create_all(bind=writer)
+
+            async def holder(flushed: asyncio.Event, release: asyncio.Event):
+                db = factory()
+                try:
+                    db.execute(text("INSERT INTO users (id, username) VALUES (1, 'holder')"))
+                    flushed.set()
+                    await release.wait()
+                    db.commit()
+                finally:
+                    db.close()
+
+            def write(user_id: int):
+                db = factory()
+                try:
+                    db.execute(text("INSERT INTO users (id, username) VALUES (:id, 'other')"), {"id": user_id})
+                    db.commit()
+                finally:
+                    db.close()
+
+            async def run():
+                flushed, release = asyncio.Event(), asyncio.Event()
+                task = asyncio.create_task(holder(flushed, release))
+                await flushed.wait()
+
+                start = time.perf_counter()
+                try:
+                    write(2)
+                    assert False, "should raise"
+                except RuntimeError:
+                    pass
+                assert time.perf_counter() - start < 1
+
+                release.set()
+                await task
+                # 持有方提交后正常写入
+                write(3)
+
+            asyncio.run(run())
+            with reader.connect() as conn:
+                assert [row[0] for row in conn.execute(text("SELECT id FROM users ORDER BY id"))] == [1, 3]
+            print("[SUCCESS] Write across await test PASSED!")
+        finally:
+            reader.dispose()
+            writer.dispose()
+
+
+if __name__ == "__main__":
+    test_concurrent_uploads_with_single_reader_connection()
+    test_write_held_across_await_fails_fast()
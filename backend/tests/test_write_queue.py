@@ -0,0 +1,186 @@
+"""测试单写队列（组提交、SAVEPOINT 隔离、失败传递、单写连接误用检测）"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root.parent))
+
+from sqlalchemy import text
+
+from backend.core.config import settings
+from backend.db import session as db_session
+from backend.db.session import _create_session_factory, create_db_engine
+from backend.db.write_queue import WriteQueue, _BatchSession
+
+
+def _insert(value: str, fail: bool = False):
+    def job(db):
+        db.execute(text("INSERT INTO notes (body) VALUES (:body)"), {"body": value})
+        if fail:
+            raise ValueError(f"job {value} failed")
+        return value
+    return job
+
+
+def _with_database(test):
+    """在临时数据库上运行测试（写队列使用模块级 engine / write_engine）"""
+    def wrapper():
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(settings, "DB_POOL_TIMEOUT", 2):
+            url = f"sqlite:///{tmp}/app.db"
+            reader, writer = create_db_engine(url), create_db_engine(url, role="writer")
+            with writer.begin() as conn:
+                conn.execute(text("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)"))
+            try:
+                with mock.patch.multiple(db_session, engine=reader, write_engine=writer):
+                    test(_create_session_factory(reader, writer), reader)
+            finally:
+                reader.dispose()
+                writer.dispose()
+    wrapper.__name__ = test.__name__
+    wrapper.__doc__ = test.__doc__
+    return wrapper
+
+
+def _bodies(reader):
+    with reader.connect() as conn:
+        return sorted(row[0] for row in conn.execute(text("SELECT body FROM notes")))
+
+
+@_with_database
+def test_group_commit_and_savepoint_isolation(factory, reader):
+    """积压的任务合并为一次提交；失败的任务只回滚自身"""
+    queue = WriteQueue(linger_ms=200)
+    try:
+        futures = [queue.submit(_insert(str(i), fail=(i == 2))) for i in range(5)]
+        assert [f.result(5) for f in futures if f is not futures[2]] == ["0", "1", "3", "4"]
+        try:
+            futures[2].result(5)
+            assert False, "should raise"
+        except ValueError:
+            pass
+        assert _bodies(reader) == ["0", "1", "3", "4"]
+
+        stats = queue.get_stats()
+        assert stats["batches"] == 1 and stats["max_batch_size"] == 5
+        assert stats["committed"] == 4 and stats["failed"] == 1 and stats["submitted"] == 5
+    finally:
+        queue.stop()
+    print("[SUCCESS] Group commit test PASSED!")
+
+
+@_with_database
+def test_commit_failure_propagates(factory, reader):
+    """批次提交失败时，批内所有已执行的任务都收到异常，数据不落库"""
+    queue = WriteQueue(linger_ms=100)
+
+    def broken_commit(self):
+        raise RuntimeError("disk full")
+
+    try:
+        with mock.patch.object(_BatchSession, "commit_batch", broken_commit):
+            futures = [queue.submit(_insert(str(i))) for i in range(3)]
+            for future in futures:
+                try:
+                    future.result(5)
+                    assert False, "should raise"
+                except RuntimeError as e:
+                    assert "disk full" in str(e)
+        assert _bodies(reader) == []
+        assert queue.get_stats()["failed"] == 3
+
+        # 之后的批次正常提交
+        assert queue.run(_insert("ok"), timeout=5) == "ok"
+        assert _bodies(reader) == ["ok"]
+    finally:
+        queue.stop()
+    print("[SUCCESS] Commit failure test PASSED!")
+
+
+@_with_database
+def test_single_writer_misuse_fails_fast(factory, reader):
+    """持有写事务时嵌套写会话、同步等待写队列、写任务内同步等待，都立即报错而不是等待超时"""
+    queue = WriteQueue(linger_ms=0)
+    outer = factory()
+    try:
+        outer.execute(text("INSERT INTO notes (body) VALUES ('outer')"))
+
+        start = time.perf_counter()
+        nested = factory()
+        try:
+            nested.execute(text("INSERT INTO notes (body) VALUES ('nested')"))
+            assert False, "should raise"
+        except RuntimeError:
+            pass
+        finally:
+            nested.close()
+
+        try:
+            queue.run(_insert("queued"))
+            assert False, "should raise"
+        except RuntimeError:
+            pass
+        assert time.perf_counter() - start < 1
+
+        outer.commit()
+        # 提交后可以正常使用另一个写会话和写队列
+        nested = factory()
+        nested.execute(text("INSERT INTO notes (body) VALUES ('after')"))
+        nested.commit()
+        nested.close()
+        assert queue.run(_insert("queued"), timeout=5) == "queued"
+
+        future = queue.submit(lambda db: queue.run(_insert("inner")))
+        try:
+            future.result(5)
+            assert False, "should raise"
+        except RuntimeError:
+            pass
+        assert _bodies(reader) == ["after", "outer", "queued"]
+    finally:
+        outer.close()
+        queue.stop()
+    print("[SUCCESS] Misuse detection test PASSED!")
+
+
+@_with_database
+def test_async_wait_while_holding_writer_fails_fast(factory, reader):
+    """协程持有写事务时 run_async / flush_async 立即报错，提交后正常等待"""
+    queue = WriteQueue(linger_ms=0)
+
+    async def scenario():
+        db = factory()
+        try:
+            db.execute(text("INSERT INTO notes (body) VALUES ('task')"))
+            for wait in (lambda: queue.run_async(_insert("queued")), queue.flush_async):
+                try:
+                    # asyncio.timeout 不新建任务，等待仍在持有写事务的协程中
+                    async with asyncio.timeout(1):
+                        await wait()
+                    assert False, "should raise"
+                except RuntimeError:
+                    pass
+            db.commit()
+            assert await queue.run_async(_insert("queued")) == "queued"
+            await queue.flush_async()
+        finally:
+            db.close()
+
+    try:
+        queue.start()
+        asyncio.run(scenario())
+        assert _bodies(reader) == ["queued", "task"]
+    finally:
+        queue.stop()
+    print("[SUCCESS] Async misuse detection test PASSED!")
+
+
+if __name__ == "__main__":
+    test_group_commit_and_savepoint_isolation()
+    test_commit_failure_propagates()
+    test_single_writer_misuse_fails_fast()
+    test_async_wait_while_holding_writer_fails_fast()
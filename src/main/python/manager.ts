@@ -6,7 +6,7 @@ import { spawn, type ChildProcess } from 'node:child_process'
 import path from 'node:path'
 import { platform } from 'node:os'
 
-import { app } from 'electron'
+import { app, BrowserWindow } from 'electron'
 
 // 记录启动时的进程 PID，用于清理僵尸进程
 let startedPid: number | null = null
@@ -177,6 +177,14 @@ export class PythonManager {
       return
     }
 
+    // 处理数据变更推送（无 id，转发给所有渲染进程）
+    if (response.type === 'db_changes') {
+      for (const window of BrowserWindow.getAllWindows()) {
+        window.webContents.send('backend:db-changes', response)
+      }
+      return
+    }
+
     // 处理业务响应
     const callback = this.responseCallbacks.get(response.id)
     if (callback) {
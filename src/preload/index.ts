@@ -23,6 +23,14 @@ const API = {
   // 通用 API 请求（通过 IPC 转发到 Python 后端）
   request: (action: string, params: any = {}) =>
     ipcRenderer.invoke('api:request', action, params),
+  // 订阅后端数据变更推送，返回取消订阅函数
+  onDbChanges: (callback: (payload: any) => void) => {
+    const listener = (_event: unknown, payload: any) => callback(payload)
+    ipcRenderer.on('backend:db-changes', listener)
+    return () => {
+      ipcRenderer.removeListener('backend:db-changes', listener)
+    }
+  },
 }
 
 contextBridge.exposeInMainWorld('App', API)
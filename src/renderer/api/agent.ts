@@ -40,6 +40,7 @@ export interface ConfirmRequest {
  * 会话消息
  */
 export interface SessionMessage {
+  id?: number
   role: 'user' | 'assistant'
   content: string
   timestamp: string
@@ -290,11 +291,18 @@ export const agentApi = {
   },
 
   /**
-   * 获取会话历史
+   * 获取会话历史（最近 limit 条，从旧到新）
+   *
+   * 传入 before（已加载的最旧消息 ID）可继续向前加载更早的消息
    */
-  async getHistory(sessionId: string, limit = 10): Promise<SessionMessage[]> {
+  async getHistory(
+    sessionId: string,
+    limit = 10,
+    before?: number
+  ): Promise<SessionMessage[]> {
+    const cursor = before !== undefined ? `&before=${before}` : ''
     const response = await apiRequest(
-      `/api/agent/history?session_id=${sessionId}&limit=${limit}`,
+      `/api/agent/history?session_id=${sessionId}&limit=${limit}&compact=true${cursor}`,
       {
         method: 'GET',
       }
@@ -113,6 +113,18 @@ export const assetApi = {
     })
   },
 
+  createItemsBatch(
+    items: { category_id: number; name: string; amount: number; note?: string }[]
+  ): Promise<Response> {
+    return apiRequest('/api/assets/items/batch', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ items }),
+    })
+  },
+
   updateItem(
     itemId: number,
     data: { name?: string; amount?: number; note?: string }
@@ -0,0 +1,13 @@
+/**
+ * 首页看板 API 客户端
+ */
+import { apiRequest } from './client'
+
+export const dashboardApi = {
+  /**
+   * 获取首页看板数据（评分、日志、饮食偏离、日记与心情分布）
+   */
+  get(days = 30): Promise<Response> {
+    return apiRequest(`/api/dashboard?days=${days}`)
+  },
+}
@@ -93,6 +93,17 @@ export const dietApi = {
     })
   },
 
+  /**
+   * 批量创建偏离事件（统计和评分只重算一次）
+   */
+  createDeviationsBatch(items: MealDeviationCreate[]): Promise<Response> {
+    return apiRequest('/api/diet/deviations/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ items }),
+    })
+  },
+
   /**
    * 获取偏离事件列表
    */
@@ -85,6 +85,14 @@ export const journalApi = {
     })
   },
 
+  createBatch(items: JournalCreateRequest[]): Promise<Response> {
+    return apiRequest('/api/journal/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ items }),
+    })
+  },
+
   update(id: number, data: JournalUpdateRequest): Promise<Response> {
     return apiRequest(`/api/journal/${id}`, {
       method: 'PATCH',
@@ -98,4 +106,71 @@ export const journalApi = {
       method: 'DELETE',
     })
   },
+
+  /**
+   * 标签使用频率
+   */
+  getTagStats(days?: number): Promise<Response> {
+    const query = days ? `?days=${days}` : ''
+    return apiRequest(`/api/journal/stats/tags${query}`)
+  },
+
+  /**
+   * 标签 × 心情热力图
+   */
+  getMoodByTag(days?: number): Promise<Response> {
+    const query = days ? `?days=${days}` : ''
+    return apiRequest(`/api/journal/stats/mood-by-tag${query}`)
+  },
+
+  /**
+   * 心情随时间的变化
+   */
+  getMoodTimeline(days = 90, granularity: 'day' | 'week' | 'month' = 'week'): Promise<Response> {
+    return apiRequest(`/api/journal/stats/mood-timeline?days=${days}&granularity=${granularity}`)
+  },
+
+  /**
+   * 获取历史版本列表（不含内容）
+   */
+  listVersions(id: number): Promise<Response> {
+    return apiRequest(`/api/journal/${id}/history`)
+  },
+
+  getVersion(id: number, version: number): Promise<Response> {
+    return apiRequest(`/api/journal/${id}/history/${version}`)
+  },
+
+  listAttachments(diaryId: number): Promise<Response> {
+    return apiRequest(`/api/journal/${diaryId}/attachments`)
+  },
+
+  /**
+   * 上传附件（请求体为文件原始字节，仅开发模式 HTTP 可用）
+   */
+  uploadAttachment(diaryId: number, file: File): Promise<Response> {
+    const filename = encodeURIComponent(file.name)
+    return apiRequest(`/api/journal/${diaryId}/attachments?filename=${filename}`, {
+      method: 'POST',
+      headers: { 'Content-Type': file.type || 'application/octet-stream' },
+      body: file,
+    })
+  },
+
+  /**
+   * 从本地路径导入附件（生产模式通过 IPC 使用）
+   */
+  importAttachment(diaryId: number, sourcePath: string, filename?: string): Promise<Response> {
+    return apiRequest(`/api/journal/${diaryId}/attachments/import`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ source_path: sourcePath, filename }),
+    })
+  },
+
+  deleteAttachment(attachmentId: number): Promise<Response> {
+    return apiRequest(`/api/journal/attachments/${attachmentId}`, {
+      method: 'DELETE',
+    })
+  },
 }
@@ -21,4 +21,11 @@ export const systemsApi = {
   getScores(): Promise<Response> {
     return apiRequest('/api/systems/scores')
   },
+
+  /**
+   * 获取八大系统评分趋势（每日评分、滑动平均、连续天数、相关系数）
+   */
+  getTrends(days = 30, window = 7): Promise<Response> {
+    return apiRequest(`/api/systems/trends?days=${days}&window=${window}`)
+  },
 }